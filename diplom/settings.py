@@ -1,5 +1,6 @@
 import os
 import importlib.util
+import django
 from datetime import timedelta
 from pathlib import Path
 
@@ -25,17 +26,84 @@ if HAS_DRF_SPECTACULAR:
     INSTALLED_APPS.append('drf_spectacular')
 
 MIDDLEWARE = [
+    'messenger.metrics.RequestMetricsMiddleware',
+    'messenger.profiling.RequestProfilingMiddleware',
+    'messenger.slowlog.SlowQueryMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'messenger.routers.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
 ROOT_URLCONF = 'diplom.urls'
 
+# Метрики /api/metrics/: при нескольких воркерах укажите общий каталог, каждый процесс пишет туда свой снимок.
+METRICS_DIR = os.getenv('DJANGO_METRICS_DIR') or None
+METRICS_FLUSH_SECONDS = float(os.getenv('DJANGO_METRICS_FLUSH_SECONDS', '5'))
+
+# Профилирование запроса: заголовок X-Profile от staff или случайная доля запросов.
+PROFILING_ENABLED = os.getenv('DJANGO_PROFILING', 'true').lower() == 'true'
+PROFILING_DIR = os.getenv('DJANGO_PROFILING_DIR') or str(BASE_DIR / 'profiles')
+PROFILING_SAMPLE_RATE = float(os.getenv('DJANGO_PROFILING_SAMPLE_RATE', '0'))
+PROFILING_KEEP = int(os.getenv('DJANGO_PROFILING_KEEP', '200'))
+# 'pyinstrument' — сэмплирующий профайлер (если установлен), иначе cProfile.
+PROFILING_ENGINE = os.getenv('DJANGO_PROFILING_ENGINE', 'cprofile')
+
+# Медленные SQL (дольше SLOW_QUERY_MS, -1 — выключено) с планом EXPLAIN: ротируемый лог и буфер /api/debug/slow-queries/.
+SLOW_QUERY_MS = float(os.getenv('DJANGO_SLOW_QUERY_MS', '200'))
+SLOW_QUERY_EXPLAIN_ANALYZE = os.getenv('DJANGO_SLOW_QUERY_EXPLAIN_ANALYZE', 'false').lower() == 'true'
+SLOW_QUERY_BUFFER_SIZE = int(os.getenv('DJANGO_SLOW_QUERY_BUFFER_SIZE', '200'))
+SLOW_QUERY_LOG = os.getenv('DJANGO_SLOW_QUERY_LOG') or str(BASE_DIR / 'logs' / 'slow_queries.log')
+
+# Фоновые задачи (messenger.taskqueue): воркер — manage.py run_worker. TASKS_EAGER выполняет их сразу в запросе.
+TASKS_EAGER = os.getenv('DJANGO_TASKS_EAGER', 'false').lower() == 'true'
+TASKS_RETRY_DELAY = float(os.getenv('DJANGO_TASKS_RETRY_DELAY', '10'))
+TASKS_LOCK_TIMEOUT = int(os.getenv('DJANGO_TASKS_LOCK_TIMEOUT', '600'))
+TASKS_POLL_INTERVAL = float(os.getenv('DJANGO_TASKS_POLL_INTERVAL', '1'))
+
+# Прием текстовых сообщений чата (messenger.ingest): off, wait — пачки bulk_create с ожиданием записи,
+# buffered — ответ с id из последовательности до записи (только Postgres; при падении процесса буфер теряется).
+MESSAGE_INGEST = os.getenv('DJANGO_MESSAGE_INGEST', 'off').lower()
+MESSAGE_INGEST_FLUSH_MS = float(os.getenv('DJANGO_MESSAGE_INGEST_FLUSH_MS', '5'))
+MESSAGE_INGEST_BATCH_SIZE = int(os.getenv('DJANGO_MESSAGE_INGEST_BATCH_SIZE', '200'))
+
+# Срок хранения сообщений по типам комнат в днях (manage.py archive_messages), например
+# "parents=365,students=365,management=730". Тип без срока не архивируется.
+MESSAGE_RETENTION_DAYS = {
+    room_type.strip(): int(days)
+    for room_type, _, days in (
+        item.partition('=') for item in os.getenv('DJANGO_MESSAGE_RETENTION', '').split(',') if item.strip()
+    )
+}
+ARCHIVE_BATCH_SIZE = int(os.getenv('DJANGO_ARCHIVE_BATCH_SIZE', '500'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        # Запись уже сериализована в JSON, по строке на запрос.
+        'raw': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'slow_queries': {
+            'class': 'messenger.slowlog.RotatingLogFileHandler',
+            'filename': SLOW_QUERY_LOG,
+            'maxBytes': 10 * 1024 * 1024,
+            'backupCount': 5,
+            'encoding': 'utf-8',
+            'delay': True,
+            'formatter': 'raw',
+        },
+    },
+    'loggers': {
+        'messenger.slow_queries': {'handlers': ['slow_queries'], 'level': 'WARNING', 'propagate': False},
+    },
+}
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -51,6 +119,15 @@ TEMPLATES = [
         },
     },
 ]
+if not DEBUG:
+    # В проде шаблоны компилируются один раз на процесс.
+    TEMPLATES[0]['APP_DIRS'] = False
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
 
 WSGI_APPLICATION = 'diplom.wsgi.application'
 ASGI_APPLICATION = 'diplom.asgi.application'
@@ -62,6 +139,8 @@ POSTGRES = {
     'HOST': os.getenv('POSTGRES_HOST', 'localhost'),
     'PORT': os.getenv('POSTGRES_PORT', '5432'),
 }
+# Профиль БД: tuned — настройки под параллельную нагрузку, basic — умолчания Django.
+DB_PROFILE = os.getenv('DJANGO_DB_PROFILE', 'tuned').lower()
 if POSTGRES['NAME'] and POSTGRES['USER']:
     DATABASES = {
         'default': {
@@ -69,6 +148,25 @@ if POSTGRES['NAME'] and POSTGRES['USER']:
             **POSTGRES,
         }
     }
+    if DB_PROFILE == 'tuned':
+        DATABASES['default'].update({
+            # Постоянные соединения с проверкой перед переиспользованием вместо connect() на каждый запрос.
+            'CONN_MAX_AGE': int(os.getenv('DJANGO_DB_CONN_MAX_AGE', '60')),
+            'CONN_HEALTH_CHECKS': True,
+            # .iterator() читает серверным курсором; за pgbouncer в transaction-режиме их надо выключить.
+            'DISABLE_SERVER_SIDE_CURSORS': os.getenv('DJANGO_DB_PGBOUNCER', 'false').lower() == 'true',
+        })
+        # Пул соединений есть только у psycopg 3 (psycopg_pool) и Django 5.1+; иначе остаются постоянные соединения.
+        HAS_PSYCOPG_POOL = importlib.util.find_spec('psycopg_pool') is not None and django.VERSION >= (5, 1)
+        if HAS_PSYCOPG_POOL and os.getenv('DJANGO_DB_POOL', 'false').lower() == 'true':
+            DATABASES['default']['CONN_MAX_AGE'] = 0
+            DATABASES['default']['OPTIONS'] = {
+                'pool': {
+                    'min_size': int(os.getenv('DJANGO_DB_POOL_MIN', '2')),
+                    'max_size': int(os.getenv('DJANGO_DB_POOL_MAX', '10')),
+                    'timeout': float(os.getenv('DJANGO_DB_POOL_TIMEOUT', '10')),
+                },
+            }
 else:
     DATABASES = {
         'default': {
@@ -76,6 +174,38 @@ else:
             'NAME': BASE_DIR / 'db.sqlite3',
         }
     }
+    if DB_PROFILE == 'tuned':
+        SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('DJANGO_SQLITE_BUSY_TIMEOUT_MS', '5000'))
+        DATABASES['default']['OPTIONS'] = {'timeout': SQLITE_BUSY_TIMEOUT_MS / 1000}
+        if django.VERSION >= (5, 1):
+            # Запись сразу берет RESERVED-блокировку: нет взаимных блокировок при повышении с SHARED.
+            DATABASES['default']['OPTIONS']['transaction_mode'] = 'IMMEDIATE'
+        # Применяются в messenger.db на connection_created.
+        SQLITE_PRAGMAS = {
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',
+            'busy_timeout': SQLITE_BUSY_TIMEOUT_MS,
+            'mmap_size': int(os.getenv('DJANGO_SQLITE_MMAP_SIZE', str(256 * 1024 * 1024))),
+            'cache_size': -int(os.getenv('DJANGO_SQLITE_CACHE_KB', '65536')),
+            'temp_store': 'MEMORY',
+        }
+
+# Реплики только для чтения: для Postgres — host[:port] через запятую (логин как у основной),
+# для SQLite — пути к файлам (например, копия db.sqlite3 для локальной проверки).
+DATABASE_REPLICAS = []
+for index, replica in enumerate(filter(None, os.getenv('DJANGO_DB_REPLICAS', '').split(',')), start=1):
+    alias = f'replica{index}'
+    if DATABASES['default']['ENGINE'].endswith('postgresql'):
+        host, _, port = replica.strip().partition(':')
+        DATABASES[alias] = {**DATABASES['default'], 'HOST': host, 'PORT': port or DATABASES['default']['PORT']}
+    else:
+        DATABASES[alias] = {**DATABASES['default'], 'NAME': replica.strip()}
+    # В тестах реплика — та же тестовая база.
+    DATABASES[alias]['TEST'] = {'MIRROR': 'default'}
+    DATABASE_REPLICAS.append(alias)
+DATABASE_ROUTERS = ['messenger.routers.ReadReplicaRouter']
+# Сколько секунд после записи пользователь читает с основной базы.
+REPLICA_PIN_SECONDS = int(os.getenv('DJANGO_REPLICA_PIN_SECONDS', '5'))
 
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -91,8 +221,69 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
+# Хешированные имена + .gz/.br варианты готовятся при collectstatic; по умолчанию включено вне DEBUG.
+STATIC_MANIFEST = os.getenv('DJANGO_STATIC_MANIFEST', str(not DEBUG)).lower() == 'true'
+# Раздавать STATIC_ROOT самим Django (если перед приложением нет nginx).
+SERVE_STATIC = os.getenv('DJANGO_SERVE_STATIC', 'false').lower() == 'true'
+# Медиа с дедупликацией: одинаковые файлы хранятся один раз (blobs/ в MEDIA_ROOT, учет ссылок в Blob).
+MEDIA_DEDUP = os.getenv('DJANGO_MEDIA_DEDUP', 'true').lower() == 'true'
+# local — MEDIA_ROOT; s3 — S3-совместимый бакет (нужен boto3): файлы не лежат на узлах приложения,
+# клиенты загружают их напрямую по presigned URL (/api/uploads/direct/).
+MEDIA_STORAGE = os.getenv('DJANGO_MEDIA_STORAGE', 'local').lower()
+if MEDIA_STORAGE == 's3':
+    DEFAULT_STORAGE = {
+        'BACKEND': 'messenger.storage.S3Storage',
+        'OPTIONS': {
+            'bucket': os.getenv('DJANGO_S3_BUCKET', ''),
+            'endpoint_url': os.getenv('DJANGO_S3_ENDPOINT_URL', ''),
+            'region': os.getenv('DJANGO_S3_REGION', ''),
+            'access_key': os.getenv('DJANGO_S3_ACCESS_KEY', ''),
+            'secret_key': os.getenv('DJANGO_S3_SECRET_KEY', ''),
+            'url_expires': int(os.getenv('DJANGO_S3_URL_EXPIRES', '3600')),
+            'location': os.getenv('DJANGO_S3_LOCATION', ''),
+        },
+    }
+elif MEDIA_DEDUP:
+    DEFAULT_STORAGE = {'BACKEND': 'messenger.storage.DedupFileSystemStorage'}
+else:
+    DEFAULT_STORAGE = {'BACKEND': 'django.core.files.storage.FileSystemStorage'}
+STORAGES = {
+    'default': DEFAULT_STORAGE,
+    'staticfiles': {
+        'BACKEND': (
+            'messenger.storage.CompressedManifestStaticFilesStorage'
+            if STATIC_MANIFEST
+            else 'django.contrib.staticfiles.storage.StaticFilesStorage'
+        ),
+    },
+}
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# Вложения отдаются через /api/.../attachment/ после проверки прав. MEDIA_ACCEL=nginx — X-Accel-Redirect
+# на internal-location MEDIA_ACCEL_PREFIX (alias на MEDIA_ROOT), sendfile — X-Sendfile (Apache, lighttpd),
+# пусто — файл отдает сам Django потоком.
+MEDIA_ACCEL = os.getenv('DJANGO_MEDIA_ACCEL', '').lower()
+MEDIA_ACCEL_PREFIX = os.getenv('DJANGO_MEDIA_ACCEL_PREFIX', '/protected-media/')
+MEDIA_CACHE_SECONDS = int(os.getenv('DJANGO_MEDIA_CACHE_SECONDS', '3600'))
+# Превью вложений и медиа ленты (messenger.previews): длинная сторона в пикселях. Картинки — при
+# установленном Pillow, PDF — при наличии pdftoppm (poppler-utils).
+PREVIEW_SIZE = int(os.getenv('DJANGO_PREVIEW_SIZE', '480'))
+PREVIEW_TIMEOUT = int(os.getenv('DJANGO_PREVIEW_TIMEOUT', '30'))
+
+# Текст вложений для поиска (messenger.extraction): файлы больше EXTRACT_MAX_BYTES пропускаются,
+# текст обрезается до EXTRACT_MAX_CHARS. PDF — при установленном pypdf или pdftotext.
+EXTRACT_MAX_BYTES = int(os.getenv('DJANGO_EXTRACT_MAX_BYTES', str(20 * 1024 * 1024)))
+EXTRACT_MAX_CHARS = int(os.getenv('DJANGO_EXTRACT_MAX_CHARS', '100000'))
+EXTRACT_TIMEOUT = int(os.getenv('DJANGO_EXTRACT_TIMEOUT', '60'))
+
+# Докачиваемые загрузки (/api/uploads/): части копятся во временном каталоге вне MEDIA_ROOT.
+UPLOAD_TEMP_DIR = os.getenv('DJANGO_UPLOAD_TEMP_DIR') or str(BASE_DIR / 'upload-sessions')
+UPLOAD_CHUNK_SIZE = int(os.getenv('DJANGO_UPLOAD_CHUNK_SIZE', str(4 * 1024 * 1024)))
+UPLOAD_MAX_BYTES = int(os.getenv('DJANGO_UPLOAD_MAX_BYTES', str(200 * 1024 * 1024)))
+UPLOAD_MAX_SESSIONS = int(os.getenv('DJANGO_UPLOAD_MAX_SESSIONS', '3'))
+# Сколько байт всего могут занимать незавершенные загрузки одного пользователя.
+UPLOAD_MAX_PENDING_BYTES = int(os.getenv('DJANGO_UPLOAD_MAX_PENDING_BYTES', str(UPLOAD_MAX_BYTES * 2)))
+UPLOAD_SESSION_TTL = int(os.getenv('DJANGO_UPLOAD_SESSION_TTL', str(24 * 3600)))
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
@@ -1,13 +1,13 @@
 from django.contrib import admin
-from django.urls import include, path
+from django.urls import include, path, re_path
 from django.shortcuts import redirect
 from django.conf import settings
-from django.conf.urls.static import static
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
 )
-from messenger.views import login_page, admin_console, admin_create_page, student_page, parent_page, teacher_page, methodist_page, manager_page, manager_console_page, manager_create_page
+from messenger.assets import serve_static
+from messenger.views import service_worker, login_page, admin_console, admin_create_page, student_page, parent_page, teacher_page, methodist_page, manager_page, manager_console_page, manager_create_page
 
 try:
     from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView, SpectacularRedocView
@@ -18,6 +18,7 @@ except Exception:
 urlpatterns = [
     path('', lambda r: redirect('/login/')),
     path('login/', login_page, name='login'),
+    path('sw.js', service_worker, name='service_worker'),
     path('console/', admin_console, name='admin_console'),
     path('console/create/<str:model>/', admin_create_page, name='admin_create_page'),
     path('student/', student_page, name='student_page'),
@@ -40,5 +41,6 @@ if HAS_SPECTACULAR:
         path('redoc/', SpectacularRedocView.as_view(url_name='schema'), name='redoc'),
     ]
 
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+if settings.SERVE_STATIC:
+    static_prefix = settings.STATIC_URL.strip('/')
+    urlpatterns += [re_path(rf'^{static_prefix}/(?P<path>.*)$', serve_static, name='static_asset')]
@@ -0,0 +1,55 @@
+"""
+Роли и области видимости чатов: общие для синхронных (views) и async (async_views) эндпоинтов,
+чтобы правила доступа в них не расходились.
+"""
+from .models import Group
+
+CHAT_ROOM_TYPES = ('parents', 'students', 'management')
+ROLE_CHAT_ACCESS = {
+    'teacher': {'parents', 'students', 'management'},
+    'manager': {'parents', 'students', 'management'},
+    'parent': {'parents', 'students'},
+    'student': {'students'},
+    'admin': {'parents', 'students', 'management'},
+    'methodist': {'parents', 'students', 'management'},
+}
+
+
+def role_for_user(user):
+    profile = getattr(user, 'profile', None)
+    if profile and profile.role:
+        return profile.role
+    if user.is_staff:
+        return 'admin'
+    return ''
+
+
+def allowed_room_types_for_role(role: str):
+    return ROLE_CHAT_ACCESS.get(role, set())
+
+
+def _group_ids(user, role: str):
+    """id доступных групп: множество, если запрос не нужен, иначе ленивый values_list."""
+    if role in ('admin', 'methodist', 'manager') or user.is_staff:
+        return Group.objects.values_list('id', flat=True)
+    if role == 'teacher':
+        teacher = getattr(user, 'teacher_profile', None)
+        return Group.objects.filter(teachers=teacher).values_list('id', flat=True) if teacher else set()
+    if role == 'student':
+        student = getattr(user, 'student_profile', None)
+        return {student.group_id} if student and student.group_id else set()
+    if role == 'parent':
+        parent = getattr(user, 'parent_profile', None)
+        return Group.objects.filter(students__parents=parent).values_list('id', flat=True).distinct() if parent else set()
+    return set()
+
+
+def accessible_group_ids(user, role: str):
+    ids = _group_ids(user, role)
+    return ids if isinstance(ids, set) else set(ids)
+
+
+async def aaccessible_group_ids(user, role: str):
+    # Профили ролей у user должны быть загружены заранее (select_related): в event loop их не догрузить.
+    ids = _group_ids(user, role)
+    return ids if isinstance(ids, set) else {group_id async for group_id in ids}
@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import Group, Teacher, Parent, Student, MethodPackage, ScheduleSlot, ChatRoom, Message, Event, FeedPost, MethodAssignment, UserProfile, Holiday, Subject, LessonTopic
+from .models import Group, Teacher, Parent, Student, MethodPackage, ScheduleSlot, ChatRoom, Message, Event, FeedPost, MethodAssignment, UserProfile, Holiday, Subject, LessonTopic, Tombstone, Task, Blob, SearchEntry
 
 
 @admin.register(Group)
@@ -102,3 +102,32 @@ class MethodAssignmentAdmin(admin.ModelAdmin):
 class UserProfileAdmin(admin.ModelAdmin):
     list_display = ('user', 'role')
     list_filter = ('role',)
+
+
+@admin.register(Tombstone)
+class TombstoneAdmin(admin.ModelAdmin):
+    list_display = ('collection', 'object_id', 'deleted_at')
+    list_filter = ('collection',)
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'status', 'priority', 'attempts', 'run_after', 'locked_by', 'finished_at')
+    list_filter = ('status', 'name')
+    search_fields = ('idempotency_key',)
+    readonly_fields = ('created_at', 'updated_at', 'finished_at', 'last_error')
+
+
+@admin.register(Blob)
+class BlobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'size', 'refcount', 'created_at')
+    search_fields = ('digest',)
+    readonly_fields = ('name', 'digest', 'size', 'refcount', 'created_at')
+
+
+@admin.register(SearchEntry)
+class SearchEntryAdmin(admin.ModelAdmin):
+    list_display = ('kind', 'object_id', 'room_type', 'group_id', 'title', 'created_at')
+    list_filter = ('kind', 'room_type')
+    readonly_fields = ('kind', 'object_id', 'group_id', 'room_id', 'room_type', 'teacher_user_id', 'title', 'body', 'created_at')
+    exclude = ('title_terms', 'body_terms')
@@ -7,4 +7,4 @@ class MessengerConfig(AppConfig):
 
     def ready(self):
         # noqa: F401
-        from . import signals
+        from . import db, signals, tasks
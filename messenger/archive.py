@@ -0,0 +1,116 @@
+import gzip
+import json
+from datetime import timedelta
+from itertools import groupby
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import ArchivedAttachment, ArchivedMessageChunk, Message
+
+# Что попадает в архив: строка Message; файл остается в хранилище, ссылку на него держит ArchivedAttachment.
+ARCHIVED_FIELDS = ('id', 'group_id', 'room_id', 'sender_id', 'sender_type', 'sender_name', 'text', 'attachment', 'attachment_name', 'created_at')
+
+
+def retention_policy():
+    """{тип комнаты: дней хранения} из MESSAGE_RETENTION_DAYS."""
+    return {room_type: days for room_type, days in getattr(settings, 'MESSAGE_RETENTION_DAYS', {}).items() if days > 0}
+
+
+def cutoff_for(days, now=None):
+    return (now or timezone.now()) - timedelta(days=days)
+
+
+def _month(moment):
+    return timezone.localtime(moment).date().replace(day=1)
+
+
+def _pack(rows):
+    lines = (
+        json.dumps({**row, 'created_at': row['created_at'].isoformat()}, ensure_ascii=False, separators=(',', ':'))
+        for row in rows
+    )
+    return gzip.compress('\n'.join(lines).encode(), compresslevel=6)
+
+
+def unpack(chunk):
+    """Сообщения пачки от старых к новым: словари с полями ARCHIVED_FIELDS."""
+    rows = []
+    for line in gzip.decompress(bytes(chunk.data)).decode().splitlines():
+        row = json.loads(line)
+        row['created_at'] = parse_datetime(row['created_at'])
+        rows.append(row)
+    return rows
+
+
+def pending(room_type, cutoff):
+    return Message.objects.filter(room__room_type=room_type, created_at__lt=cutoff)
+
+
+def archive_batch(room_type, cutoff, batch_size=None):
+    """
+    Переносит до batch_size старейших сообщений комнат room_type старше cutoff в архив и удаляет их.
+    Одна короткая транзакция на пачку; возвращает число перенесенных сообщений.
+    """
+    batch_size = batch_size or getattr(settings, 'ARCHIVE_BATCH_SIZE', 500)
+    with transaction.atomic():
+        rows = list(pending(room_type, cutoff).order_by('id').values(*ARCHIVED_FIELDS)[:batch_size])
+        if not rows:
+            return 0
+        chunks, files = [], []
+        ordered = sorted(rows, key=lambda row: (row['room_id'], _month(row['created_at']), row['id']))
+        for (room_id, month), items in groupby(ordered, key=lambda row: (row['room_id'], _month(row['created_at']))):
+            items = list(items)
+            chunk = ArchivedMessageChunk(
+                room_id=room_id, month=month,
+                first_id=items[0]['id'], last_id=items[-1]['id'],
+                first_at=items[0]['created_at'], last_at=items[-1]['created_at'],
+                count=len(items), data=_pack(items),
+            )
+            chunks.append(chunk)
+            files += [
+                ArchivedAttachment(chunk=chunk, message_id=row['id'], name=row['attachment'], filename=row['attachment_name'])
+                for row in items if row['attachment']
+            ]
+        ArchivedMessageChunk.objects.bulk_create(chunks)
+        ArchivedAttachment.objects.bulk_create(files)
+
+        ids = [row['id'] for row in rows]
+        # Сводка комнаты (счетчик, последнее сообщение) и строки поиска остаются: архив — часть истории,
+        # найденное в нем сообщение открывается через history() (в выдаче поиска archived: true).
+        # Удаление без сигналов: ссылки на файлы переходят к ArchivedAttachment, поэтому их не освобождаем.
+        messages = Message.objects.filter(pk__in=ids)
+        messages._raw_delete(messages.db)
+    return len(rows)
+
+
+def attachment(room, message_id):
+    """Файл архивного сообщения комнаты или None."""
+    return ArchivedAttachment.objects.filter(message_id=message_id, chunk__room=room).first()
+
+
+def history(room, before=None, limit=50):
+    """
+    Сообщения комнаты от новых к старым с id < before: сначала из таблицы Message, затем из архива.
+    Возвращает (живые сообщения, архивные словари); архив распаковывается, только если живых не хватило.
+    """
+    live = room.messages.select_related('room').order_by('-id')
+    if before:
+        live = live.filter(id__lt=before)
+    live = list(live[:limit])
+    archived = []
+    need = limit - len(live)
+    if need <= 0:
+        return live, archived
+    cursor = live[-1].id if live else before
+    chunks = room.archived_chunks.order_by('-last_id')
+    if cursor:
+        chunks = chunks.filter(first_id__lt=cursor)
+    for chunk in chunks.iterator(chunk_size=4):
+        rows = [row for row in reversed(unpack(chunk)) if not cursor or row['id'] < cursor]
+        archived.extend(rows[:need - len(archived)])
+        if len(archived) >= need:
+            break
+    return live, archived
@@ -0,0 +1,192 @@
+import mimetypes
+import os
+import posixpath
+import re
+from pathlib import Path
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, HttpResponseRedirect
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+from django.utils.http import content_disposition_header, http_date
+
+# ManifestStaticFilesStorage добавляет к имени 12 hex-символов md5: такие файлы неизменяемы.
+HASHED_NAME_RE = re.compile(r'\.[0-9a-f]{12}\.[^./]+$')
+FAR_FUTURE_CACHE = 'public, max-age=31536000, immutable'
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+DIGEST_RE = re.compile(r'^[0-9a-f]{64}$')
+# Остальное (html, svg и т.п.) отдается на скачивание: иначе вложение исполнится в нашем origin.
+INLINE_PREFIXES = ('image/', 'video/', 'audio/')
+INLINE_TYPES = {'application/pdf', 'text/plain'}
+
+
+def _accepted_encodings(request):
+    header = request.headers.get('Accept-Encoding', '')
+    return {part.split(';')[0].strip().lower() for part in header.split(',') if part.strip()}
+
+
+def serve_static(request, path):
+    """
+    Раздача собранной статики из STATIC_ROOT без nginx: предсжатые .br/.gz варианты
+    и вечный кэш для хешированных имен. При наличии фронт-сервера лучше отдавать статику им.
+    """
+    normalized = posixpath.normpath(path).lstrip('/')
+    try:
+        full_path = safe_join(settings.STATIC_ROOT, normalized)
+    except ValueError:
+        raise Http404('Файл не найден.')
+    if not os.path.isfile(full_path):
+        raise Http404('Файл не найден.')
+
+    content_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+    accepted = _accepted_encodings(request)
+    served_path, encoding = full_path, None
+    for candidate, suffix in ENCODINGS:
+        if candidate in accepted and os.path.isfile(full_path + suffix):
+            served_path, encoding = full_path + suffix, candidate
+            break
+
+    response = FileResponse(open(served_path, 'rb'), content_type=content_type)
+    if encoding:
+        response['Content-Encoding'] = encoding
+    patch_vary_headers(response, ('Accept-Encoding',))
+    if HASHED_NAME_RE.search(normalized):
+        response['Cache-Control'] = FAR_FUTURE_CACHE
+    else:
+        response['Cache-Control'] = 'public, max-age=0, must-revalidate'
+    return response
+
+
+class RangeFile:
+    """
+    Окно [start, start + length) открытого файла: read() не выходит за диапазон,
+    а fileno() позволяет WSGI-серверу отдать его через os.sendfile.
+    """
+
+    def __init__(self, handle, start, length):
+        handle.seek(start)
+        self._handle = handle
+        self._remaining = length
+
+    def read(self, size=-1):
+        if self._remaining <= 0:
+            return b''
+        if size is None or size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._handle.read(size)
+        self._remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self._handle.fileno()
+
+    def close(self):
+        self._handle.close()
+
+
+def _parse_range(header, size):
+    """Один диапазон 'bytes=a-b' -> (start, end) включительно; None — отдать файл целиком; ValueError — 416."""
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        # Несколько диапазонов и прочие формы: по RFC 9110 можно ответить всем файлом.
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        start, end = max(0, size - int(last)), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end
+
+
+def _file_etag(name, stat):
+    # В хранилище с дедупликацией имя — sha256 содержимого, он же сильный ETag.
+    digest = Path(name).name.split('.')[0]
+    if DIGEST_RE.match(digest):
+        return f'"{digest}"'
+    return f'"{stat.st_size:x}-{int(stat.st_mtime):x}"'
+
+
+def serve_attachment(request, fieldfile, filename=''):
+    """
+    Отдача вложения после проверки прав (ее делает вызывающий код). Тело не читается
+    в память: X-Accel-Redirect/X-Sendfile передают файл фронт-серверу (MEDIA_ACCEL),
+    иначе FileResponse (WSGI-сервер отдаст его через sendfile) с поддержкой Range.
+    """
+    if not fieldfile:
+        raise Http404('Файл не найден.')
+    return serve_stored(request, fieldfile.storage, fieldfile.name, filename)
+
+
+def serve_stored(request, storage, name, filename=''):
+    """То же для файла, известного только по имени в хранилище (превью и т.п.)."""
+    try:
+        path = storage.path(name)
+    except NotImplementedError:
+        # Хранилище без локальных путей (объектное): его URL сам ограничен по времени.
+        return HttpResponseRedirect(storage.url(name))
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        raise Http404('Файл не найден.')
+
+    filename = filename or Path(name).name
+    content_type = mimetypes.guess_type(filename)[0] or mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    inline = content_type in INLINE_TYPES or (content_type.startswith(INLINE_PREFIXES) and content_type != 'image/svg+xml')
+    etag = _file_etag(name, stat)
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(stat.st_mtime),
+        # Ответ зависит от прав пользователя: общим кэшам (прокси, CDN) его хранить нельзя.
+        'Cache-Control': f'private, max-age={settings.MEDIA_CACHE_SECONDS}',
+    }
+    if etag in [tag.strip() for tag in request.headers.get('If-None-Match', '').split(',')]:
+        response = HttpResponseNotModified()
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+    accel = settings.MEDIA_ACCEL
+    if accel:
+        response = HttpResponse(content_type=content_type)
+        if accel == 'nginx':
+            response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_PREFIX.rstrip('/') + '/' + quote(name)
+        else:
+            response['X-Sendfile'] = path
+        response['Content-Disposition'] = content_disposition_header(not inline, filename)
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+    byte_range = None
+    if_range = request.headers.get('If-Range')
+    if request.headers.get('Range') and (not if_range or if_range == etag):
+        try:
+            byte_range = _parse_range(request.headers['Range'], stat.st_size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{stat.st_size}'
+            return response
+
+    handle = open(path, 'rb')
+    if byte_range is None:
+        response = FileResponse(handle, content_type=content_type, as_attachment=not inline, filename=filename)
+    else:
+        start, end = byte_range
+        response = FileResponse(
+            RangeFile(handle, start, end - start + 1),
+            content_type=content_type, as_attachment=not inline, filename=filename, status=206,
+        )
+        response['Content-Length'] = str(end - start + 1)
+        response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+    response.block_size = 64 * 1024
+    response['Accept-Ranges'] = 'bytes'
+    for header, value in headers.items():
+        response[header] = value
+    return response
@@ -0,0 +1,209 @@
+import json
+from functools import reduce, wraps
+from operator import or_
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max, Q
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.authentication import CSRFCheck
+from rest_framework.exceptions import ValidationError as DRFValidationError
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from .conditional import aqueryset_fingerprint, apply_validators, build_etag, etag_matches, latest_change
+from .ingest import aingest, ingest_mode
+from .models import ChatRoom, Message
+from .serializers import ChatRoomSerializer, MessageSerializer
+from .access import CHAT_ROOM_TYPES, aaccessible_group_ids, allowed_room_types_for_role, role_for_user
+from .views import _room_ordering, _sender_meta
+
+User = get_user_model()
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+# Профили ролей грузятся вместе с пользователем: sync-хелперы ролей не ходят в БД из event loop.
+USER_RELATIONS = ('profile', 'teacher_profile', 'parent_profile', 'student_profile')
+
+
+def _json(data, status=200):
+    return JsonResponse(data, status=status, safe=False, json_dumps_params={'ensure_ascii': False})
+
+
+async def _authenticate(request):
+    """(пользователь, вошел ли через сессию): JWT как в DRF, иначе сессионная cookie."""
+    jwt = JWTAuthentication()
+    header = jwt.get_header(request)
+    if header is not None:
+        raw_token = jwt.get_raw_token(header)
+        if raw_token is None:
+            return None, False
+        try:
+            token = jwt.get_validated_token(raw_token)
+        except (InvalidToken, TokenError):
+            return None, False
+        lookup = {jwt_settings.USER_ID_FIELD: token.get(jwt_settings.USER_ID_CLAIM)}
+        via_session = False
+    else:
+        session_user = await request.auser()
+        if not session_user.is_authenticated:
+            return None, True
+        lookup = {'pk': session_user.pk}
+        via_session = True
+    user = await User.objects.select_related(*USER_RELATIONS).filter(is_active=True, **lookup).afirst()
+    return user, via_session
+
+
+def _csrf_failure(request):
+    # Как SessionAuthentication в DRF: CSRF проверяется только для входа по сессии.
+    check = CSRFCheck(lambda _request: None)
+    check.process_request(request)
+    return check.process_view(request, None, (), {})
+
+
+def async_api_view(methods):
+    """Аналог @api_view для async-функций: методы, JWT/сессия, CSRF для сессии, IsAuthenticated."""
+    def decorator(view):
+        @wraps(view)
+        async def wrapped(request, *args, **kwargs):
+            if request.method not in methods:
+                return _json({'detail': f'Метод "{request.method}" не разрешен.'}, status=405)
+            user, via_session = await _authenticate(request)
+            if user is None:
+                return _json({'detail': 'Учетные данные не были предоставлены.'}, status=401)
+            if via_session and request.method not in SAFE_METHODS:
+                reason = _csrf_failure(request)
+                if reason:
+                    return _json({'detail': f'CSRF Failed: {reason}'}, status=403)
+            request.user = user
+            return await view(request, user, *args, **kwargs)
+
+        return csrf_exempt(wrapped)
+    return decorator
+
+
+async def _ensure_chat_rooms(group_ids):
+    existing = {pair async for pair in ChatRoom.objects.filter(group_id__in=group_ids).values_list('group_id', 'room_type')}
+    missing = [
+        ChatRoom(group_id=group_id, room_type=room_type)
+        for group_id in group_ids
+        for room_type in CHAT_ROOM_TYPES
+        if (group_id, room_type) not in existing
+    ]
+    if missing:
+        await ChatRoom.objects.abulk_create(missing, ignore_conflicts=True)
+
+
+async def _accessible_rooms(user, role):
+    group_ids = await aaccessible_group_ids(user, role)
+    room_types = allowed_room_types_for_role(role)
+    if not group_ids or not room_types:
+        return ChatRoom.objects.none()
+    await _ensure_chat_rooms(group_ids)
+    return ChatRoom.objects.filter(group_id__in=group_ids, room_type__in=room_types)
+
+
+@async_api_view(['GET'])
+async def chat_rooms(request, user):
+    rooms = await _accessible_rooms(user, role_for_user(user))
+    try:
+        ordering = _room_ordering(request.GET.get('order'))
+    except DRFValidationError as exc:
+        return _json(exc.detail, status=400)
+    items = [room async for room in rooms.select_related('group').order_by(*ordering)]
+    return _json(ChatRoomSerializer(items, many=True).data)
+
+
+@async_api_view(['GET', 'POST'])
+async def room_messages(request, user, pk):
+    role = role_for_user(user)
+    room = await ChatRoom.objects.select_related('group').filter(pk=pk).afirst()
+    if room is None:
+        return _json({'detail': 'Страница не найдена.'}, status=404)
+    if room.room_type not in allowed_room_types_for_role(role) or room.group_id not in await aaccessible_group_ids(user, role):
+        return _json({'detail': 'Нет доступа к этому чату.'}, status=403)
+
+    if request.method == 'POST':
+        if request.content_type == 'application/json':
+            try:
+                data = json.loads(request.body or b'{}')
+            except ValueError:
+                return _json({'detail': 'Некорректный JSON.'}, status=400)
+        else:
+            data = request.POST
+        text = str(data.get('text', '')).strip()
+        attachment = request.FILES.get('attachment')
+        if not text and not attachment:
+            return _json({'detail': 'Нужно передать текст сообщения или файл.'}, status=400)
+        sender_type, sender_name = _sender_meta(user, role)
+        message = Message(
+            group=room.group,
+            room=room,
+            sender=user,
+            sender_type=sender_type,
+            sender_name=sender_name,
+            text=text,
+            attachment=attachment,
+            attachment_name=attachment.name if attachment else '',
+        )
+        if attachment or ingest_mode() == 'off':
+            await message.asave()
+        else:
+            try:
+                message = await aingest(message)
+            except ValidationError as exc:
+                return _json(exc.message_dict, status=400)
+        return _json(MessageSerializer(message, context={'request': request}).data, status=201)
+
+    fingerprint = await aqueryset_fingerprint(room.messages.all())
+    etag = build_etag(request, fingerprint)
+    last_modified = latest_change([fingerprint])
+    if etag_matches(request, etag):
+        return apply_validators(HttpResponse(status=304), etag, last_modified)
+    messages = [message async for message in room.messages.select_related('room').order_by('-created_at')[:100]]
+    response = _json(MessageSerializer(messages, many=True, context={'request': request}).data)
+    return apply_validators(response, etag, last_modified)
+
+
+def _parse_seen(value):
+    seen = {}
+    for pair in filter(None, value.split(',')):
+        room_id, _, message_id = pair.partition(':')
+        try:
+            seen[int(room_id)] = int(message_id or 0)
+        except ValueError:
+            continue
+    return seen
+
+
+@async_api_view(['GET'])
+async def unread_state(request, user):
+    """
+    Непрочитанное по всем доступным чатам одним запросом вместо опроса каждого чата:
+    ?seen=<room>:<последний прочитанный id>,... Свои сообщения не считаются.
+    """
+    role = role_for_user(user)
+    rooms = await _accessible_rooms(user, role)
+    room_ids = [room_id async for room_id in rooms.values_list('id', flat=True)]
+    seen = {room_id: message_id for room_id, message_id in _parse_seen(request.GET.get('seen', '')).items() if room_id in room_ids}
+    sender_type, sender_name = _sender_meta(user, role)
+
+    new_messages = Q(room_id__in=[room_id for room_id in room_ids if room_id not in seen])
+    if seen:
+        new_messages |= reduce(or_, (Q(room_id=room_id, id__gt=message_id) for room_id, message_id in seen.items()))
+    # Свои — по id отправителя; у сообщений, записанных до появления поля sender, — по подписи.
+    own = Q(sender_id=user.pk) | Q(sender__isnull=True, sender_type=sender_type, sender_name=sender_name)
+    unread_filter = new_messages & ~own
+
+    rows = (
+        Message.objects
+        .filter(room_id__in=room_ids)
+        .values('room_id')
+        .annotate(latest_id=Max('id'), unread=Count('id', filter=unread_filter))
+        .order_by()
+    )
+    state = {room_id: {'room': room_id, 'latest_id': None, 'unread': 0} for room_id in room_ids}
+    async for row in rows:
+        state[row['room_id']].update(latest_id=row['latest_id'], unread=row['unread'])
+    return _json(list(state.values()))
@@ -0,0 +1,375 @@
+import http.client
+import json
+import math
+import subprocess
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.http.request import validate_host
+from django.test import Client
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .db import describe_database
+from .models import Holiday, Message, ScheduleSlot
+from .seeding import seed_usernames
+
+BENCH_TEXT = 'bench-сообщение'
+BENCH_HOLIDAY_TITLE = 'bench-выходной'
+
+
+class InProcessTransport:
+    """Настоящие URL-маршруты и middleware через django.test.Client, без сети."""
+
+    def __init__(self):
+        host = 'testserver'
+        if not validate_host(host, settings.ALLOWED_HOSTS):
+            host = settings.ALLOWED_HOSTS[0].lstrip('.') or 'localhost'
+        self.client = Client(SERVER_NAME=host)
+
+    def request(self, method, path, body, token):
+        response = self.client.generic(
+            method,
+            path,
+            json.dumps(body) if body is not None else '',
+            content_type='application/json',
+            HTTP_AUTHORIZATION=f'Bearer {token}',
+        )
+        content = b''.join(response.streaming_content) if response.streaming else response.content
+        return response.status_code, content
+
+
+class HttpTransport:
+    """
+    Запросы к запущенному серверу (runserver/gunicorn/uvicorn) по base_url.
+    slow_client_ms > 0 имитирует медленную мобильную сеть: тело запроса уходит,
+    а ответ читается порциями по CHUNK_SIZE с паузой между ними.
+    """
+    CHUNK_SIZE = 1024
+
+    def __init__(self, base_url, timeout=30, slow_client_ms=0):
+        parsed = urllib.parse.urlsplit(base_url.rstrip('/'))
+        self.connection_class = http.client.HTTPSConnection if parsed.scheme == 'https' else http.client.HTTPConnection
+        self.netloc = parsed.netloc
+        self.base_path = parsed.path
+        self.timeout = timeout
+        self.delay = slow_client_ms / 1000
+
+    def _pause(self):
+        if self.delay:
+            time.sleep(self.delay)
+
+    def request(self, method, path, body, token):
+        data = json.dumps(body).encode('utf-8') if body is not None else b''
+        connection = self.connection_class(self.netloc, timeout=self.timeout)
+        try:
+            connection.putrequest(method, self.base_path + path)
+            connection.putheader('Authorization', f'Bearer {token}')
+            if body is not None:
+                connection.putheader('Content-Type', 'application/json')
+            connection.putheader('Content-Length', str(len(data)))
+            connection.endheaders()
+            for start in range(0, len(data), self.CHUNK_SIZE):
+                self._pause()
+                connection.send(data[start:start + self.CHUNK_SIZE])
+            response = connection.getresponse()
+            chunks = []
+            while True:
+                self._pause()
+                chunk = response.read(self.CHUNK_SIZE)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+            return response.status, b''.join(chunks)
+        finally:
+            connection.close()
+
+
+class Scenario:
+    """Один шаг сценария — последовательность запросов одного пользователя; латентность меряется по шагу."""
+    name = ''
+    role = ''
+
+    def __init__(self, bench):
+        self.bench = bench
+
+    def setup(self, transport):
+        pass
+
+    def before(self, index):
+        """Подготовка шага вне замера."""
+
+    def requests(self, index):
+        raise NotImplementedError
+
+    def cleanup(self):
+        pass
+
+    def get_json(self, transport, path):
+        status, content = transport.request('GET', path, None, self.bench.tokens[self.role])
+        if status != 200:
+            raise RuntimeError(f'{self.name}: GET {path} -> {status}')
+        return json.loads(content)
+
+
+class PortalBootstrap(Scenario):
+    """Первая загрузка портала родителя: профиль, чаты, карточки групп."""
+    name = 'portal-bootstrap'
+    role = 'parent'
+
+    def setup(self, transport):
+        rooms = self.get_json(transport, '/api/chats/')
+        self.group_ids = sorted({room['group'] for room in rooms})
+
+    def requests(self, index):
+        return [('GET', '/api/me/', None), ('GET', '/api/chats/', None)] + [
+            ('GET', f'/api/groups/{group_id}/', None) for group_id in self.group_ids
+        ]
+
+
+class UnreadPoll(Scenario):
+    """Опрос непрочитанного раз в 12 секунд: последние сообщения каждого доступного чата."""
+    name = 'unread-poll'
+    role = 'parent'
+
+    def setup(self, transport):
+        self.room_ids = [room['id'] for room in self.get_json(transport, '/api/chats/')]
+
+    def requests(self, index):
+        return [('GET', f'/api/chats/{room_id}/messages/', None) for room_id in self.room_ids]
+
+
+class ChatSend(Scenario):
+    name = 'chat-send'
+    role = 'teacher'
+
+    def setup(self, transport):
+        self.room_ids = [room['id'] for room in self.get_json(transport, '/api/chats/')]
+
+    def requests(self, index):
+        room_id = self.room_ids[index % len(self.room_ids)]
+        return [('POST', f'/api/chats/{room_id}/messages/', {'text': f'{BENCH_TEXT} {index}'})]
+
+    def cleanup(self):
+        Message.objects.filter(text__startswith=BENCH_TEXT).delete()
+
+
+class AsyncChatRead(UnreadPoll):
+    """Те же запросы, что unread-poll, но через async-эндпоинты."""
+    name = 'chat-read-async'
+
+    def setup(self, transport):
+        self.room_ids = [room['id'] for room in self.get_json(transport, '/api/async/chats/')]
+
+    def requests(self, index):
+        return [('GET', f'/api/async/chats/{room_id}/messages/', None) for room_id in self.room_ids]
+
+
+class AsyncUnreadPoll(Scenario):
+    """Опрос непрочитанного одним запросом /api/async/unread/ вместо запроса на каждый чат."""
+    name = 'unread-poll-async'
+    role = 'parent'
+
+    def setup(self, transport):
+        state = self.get_json(transport, '/api/async/unread/')
+        self.seen = ','.join(f'{row["room"]}:{row["latest_id"] or 0}' for row in state)
+
+    def requests(self, index):
+        return [('GET', f'/api/async/unread/?seen={self.seen}', None)]
+
+
+class AsyncChatSend(ChatSend):
+    name = 'chat-send-async'
+
+    def setup(self, transport):
+        self.room_ids = [room['id'] for room in self.get_json(transport, '/api/async/chats/')]
+
+    def requests(self, index):
+        room_id = self.room_ids[index % len(self.room_ids)]
+        return [('POST', f'/api/async/chats/{room_id}/messages/', {'text': f'{BENCH_TEXT} {index}'})]
+
+
+class HolidayCreate(Scenario):
+    """Создание выходного у группы в день ее занятия: с переносом уроков на неделю вперед."""
+    name = 'holiday-create'
+    role = 'admin'
+
+    def setup(self, transport):
+        taken = set(Holiday.objects.values_list('date', flat=True))
+        pairs = (
+            ScheduleSlot.objects
+            .filter(group__name__startswith=f'{self.bench.prefix} ', lesson_date__isnull=False)
+            .order_by('lesson_date', 'group_id')
+            .values_list('lesson_date', 'group_id')
+        )
+        self.targets = []
+        for lesson_date, group_id in pairs:
+            if lesson_date not in taken:
+                taken.add(lesson_date)
+                self.targets.append((lesson_date, group_id))
+        if not self.targets:
+            raise RuntimeError(f'{self.name}: нет свободных дат занятий, запустите seed_scale.')
+
+    def _target(self, index):
+        return self.targets[index % len(self.targets)]
+
+    def before(self, index):
+        # Дата выходного уникальна: при повторном проходе по списку освобождаем ее заранее.
+        lesson_date, _ = self._target(index)
+        Holiday.objects.filter(date=lesson_date, title=BENCH_HOLIDAY_TITLE).delete()
+
+    def requests(self, index):
+        lesson_date, group_id = self._target(index)
+        body = {'date': lesson_date.isoformat(), 'title': BENCH_HOLIDAY_TITLE, 'group': group_id}
+        return [('POST', '/api/holidays/', body)]
+
+    def cleanup(self):
+        Holiday.objects.filter(title=BENCH_HOLIDAY_TITLE).delete()
+
+
+class ConsoleTableLoad(Scenario):
+    """Открытие консоли управления: полный снимок синхронизации и справочники."""
+    name = 'console-table'
+    role = 'admin'
+
+    def requests(self, index):
+        return [
+            ('GET', '/api/me/', None),
+            ('GET', '/api/sync/', None),
+            ('GET', '/api/holidays/', None),
+            ('GET', '/api/subjects/', None),
+            ('GET', '/api/profiles/?role=manager', None),
+        ]
+
+
+SCENARIOS = {
+    scenario.name: scenario
+    for scenario in (
+        PortalBootstrap, UnreadPoll, ChatSend, HolidayCreate, ConsoleTableLoad,
+        AsyncChatRead, AsyncUnreadPoll, AsyncChatSend,
+    )
+}
+
+
+def percentile(sorted_values, fraction):
+    """Перцентиль по ближайшему рангу."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 3)
+
+
+def summarize(latencies, errors, request_count, wall_seconds):
+    values = sorted(latencies)
+    return {
+        'iterations': len(values),
+        'requests': request_count,
+        'errors': errors,
+        'p50_ms': _ms(percentile(values, 0.50)),
+        'p95_ms': _ms(percentile(values, 0.95)),
+        'p99_ms': _ms(percentile(values, 0.99)),
+        'mean_ms': _ms(sum(values) / len(values)) if values else 0.0,
+        'max_ms': _ms(values[-1]) if values else 0.0,
+        'throughput_rps': round(len(values) / wall_seconds, 2) if wall_seconds else 0.0,
+        'requests_rps': round(request_count / wall_seconds, 2) if wall_seconds else 0.0,
+    }
+
+
+def git_commit():
+    try:
+        result = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=5,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return 'unknown'
+    return result.stdout.strip() or 'unknown'
+
+
+class Benchmark:
+    def __init__(self, prefix='seed', base_url=None, concurrency=1, iterations=100, warmup=5, slow_client_ms=0):
+        self.prefix = prefix
+        self.base_url = base_url
+        self.slow_client_ms = slow_client_ms
+        self.concurrency = max(1, concurrency)
+        self.iterations = iterations
+        self.warmup = warmup
+        self.tokens = self._tokens()
+        self._local = threading.local()
+
+    def _tokens(self):
+        usernames = seed_usernames(self.prefix)
+        users = {user.username: user for user in get_user_model().objects.filter(username__in=usernames.values())}
+        missing = [username for username in usernames.values() if username not in users]
+        if missing:
+            raise RuntimeError(f'Нет учеток {", ".join(missing)}: сначала выполните seed_scale --prefix {self.prefix}.')
+        return {role: str(AccessToken.for_user(users[username])) for role, username in usernames.items()}
+
+    def transport(self):
+        transport = getattr(self._local, 'transport', None)
+        if transport is None:
+            transport = HttpTransport(self.base_url, slow_client_ms=self.slow_client_ms) if self.base_url else InProcessTransport()
+            self._local.transport = transport
+        return transport
+
+    def _step(self, scenario, index):
+        scenario.before(index)
+        transport = self.transport()
+        token = self.tokens[scenario.role]
+        started = time.perf_counter()
+        failed = None
+        steps = scenario.requests(index)
+        for method, path, body in steps:
+            try:
+                status, _ = transport.request(method, path, body, token)
+            except Exception as exc:  # noqa: BLE001 — ошибка сети считается неуспешным шагом
+                failed = f'{method} {path}: {exc}'
+                break
+            if status >= 400:
+                failed = f'{method} {path} -> {status}'
+                break
+        return time.perf_counter() - started, len(steps), failed
+
+    def run_scenario(self, scenario_class):
+        scenario = scenario_class(self)
+        scenario.setup(self.transport())
+        try:
+            for index in range(self.warmup):
+                self._step(scenario, -1 - index)
+            started = time.perf_counter()
+            if self.concurrency == 1:
+                results = [self._step(scenario, index) for index in range(self.iterations)]
+            else:
+                with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+                    results = list(pool.map(lambda index: self._step(scenario, index), range(self.iterations)))
+            wall = time.perf_counter() - started
+        finally:
+            scenario.cleanup()
+        failures = [failure for _, _, failure in results if failure]
+        stats = summarize([elapsed for elapsed, _, _ in results], len(failures), sum(count for _, count, _ in results), wall)
+        if failures:
+            stats['first_error'] = failures[0]
+        return stats
+
+    def run(self, names):
+        return {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'commit': git_commit(),
+            'mode': 'http' if self.base_url else 'in-process',
+            'base_url': self.base_url,
+            'database': describe_database(connection),
+            'concurrency': self.concurrency,
+            'slow_client_ms': self.slow_client_ms if self.base_url else 0,
+            'iterations': self.iterations,
+            'prefix': self.prefix,
+            'scenarios': {name: self.run_scenario(SCENARIOS[name]) for name in names},
+        }
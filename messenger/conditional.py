@@ -0,0 +1,120 @@
+import hashlib
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Count, Max
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date, parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def _change_field(model):
+    for name in ('updated_at', 'created_at'):
+        try:
+            model._meta.get_field(name)
+        except FieldDoesNotExist:
+            continue
+        return name
+    return None
+
+
+def _fingerprint_aggregates(model):
+    aggregates = {'count': Count('pk'), 'max_id': Max('pk')}
+    change_field = _change_field(model)
+    if change_field:
+        aggregates['max_changed'] = Max(change_field)
+    return aggregates
+
+
+def queryset_fingerprint(queryset):
+    """
+    Дешевый валидатор выборки: количество строк, максимальный id и время последнего изменения.
+    Удаление меняет count, вставка — max_id, редактирование — max_changed.
+    """
+    return queryset.order_by().aggregate(**_fingerprint_aggregates(queryset.model))
+
+
+async def aqueryset_fingerprint(queryset):
+    return await queryset.order_by().aaggregate(**_fingerprint_aggregates(queryset.model))
+
+
+def latest_change(fingerprints):
+    values = [fp.get('max_changed') for fp in fingerprints if fp.get('max_changed')]
+    return max(values) if values else None
+
+
+def build_etag(request, *parts):
+    digest = hashlib.sha1()
+    user = getattr(request, 'user', None)
+    digest.update(str(getattr(user, 'pk', '') or '').encode())
+    digest.update(request.get_host().encode())
+    digest.update(request.get_full_path().encode())
+    for part in parts:
+        if isinstance(part, dict):
+            part = sorted(part.items())
+        digest.update(repr(part).encode())
+    # Тело ответа эквивалентно по смыслу, но не побайтно, поэтому ETag слабый.
+    return 'W/' + quote_etag(digest.hexdigest())
+
+
+def etag_matches(request, etag):
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return False
+    candidates = parse_etags(header)
+    if '*' in candidates:
+        return True
+    bare = etag.removeprefix('W/')
+    return any(candidate.removeprefix('W/') == bare for candidate in candidates)
+
+
+def apply_validators(response, etag, last_modified=None):
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    response['Cache-Control'] = 'private, no-cache'
+    patch_vary_headers(response, ('Authorization', 'Cookie'))
+    return response
+
+
+def not_modified(etag, last_modified=None):
+    return apply_validators(Response(status=status.HTTP_304_NOT_MODIFIED), etag, last_modified)
+
+
+def conditional_response(request, fingerprints, build_response):
+    """
+    Сверяет If-None-Match с валидатором до сериализации.
+    build_response вызывается только если у клиента устаревшие данные.
+    """
+    etag = build_etag(request, *fingerprints)
+    last_modified = latest_change(fingerprints)
+    if etag_matches(request, etag):
+        return not_modified(etag, last_modified)
+    return apply_validators(build_response(), etag, last_modified)
+
+
+class ConditionalListMixin:
+    """
+    Поддержка ETag/304 для list. Валидатор строится агрегатом по уже отфильтрованной
+    выборке и по таблицам, данные которых попадают во вложенные поля сериализатора.
+    """
+    etag_related_models = ()
+
+    def get_list_fingerprints(self, queryset):
+        fingerprints = [queryset_fingerprint(queryset)]
+        for model in self.etag_related_models:
+            fingerprints.append(queryset_fingerprint(model.objects.all()))
+        return fingerprints
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+
+        def build_response():
+            page = self.paginate_queryset(queryset)
+            if page is not None:
+                serializer = self.get_serializer(page, many=True)
+                return self.get_paginated_response(serializer.data)
+            serializer = self.get_serializer(queryset, many=True)
+            return Response(serializer.data)
+
+        return conditional_response(request, self.get_list_fingerprints(queryset), build_response)
@@ -0,0 +1,75 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+_query_observers = ContextVar('query_observers', default=())
+
+
+@contextmanager
+def observe_queries(observer):
+    """
+    Подписывает observer(sql, params, many, context, elapsed, ok) на SQL текущего контекста.
+    Контекст переходит в потоки sync_to_async, поэтому работает и для async-view, в отличие от
+    connection.execute_wrapper, привязанного к соединению текущего потока.
+    """
+    token = _query_observers.set(_query_observers.get() + (observer,))
+    try:
+        yield observer
+    finally:
+        _query_observers.reset(token)
+
+
+def _observing_wrapper(execute, sql, params, many, context):
+    observers = _query_observers.get()
+    if not observers:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    ok = False
+    try:
+        result = execute(sql, params, many, context)
+        ok = True
+        return result
+    finally:
+        elapsed = time.perf_counter() - started
+        for observer in observers:
+            observer(sql, params, many, context, elapsed, ok)
+
+
+@receiver(connection_created)
+def install_query_observers(sender, connection, **kwargs):
+    # Обертка ставится один раз на объект соединения и переживает переподключения.
+    if _observing_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _observing_wrapper)
+
+
+@receiver(connection_created)
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """PRAGMA профиля tuned (WAL, synchronous=NORMAL, busy_timeout, mmap, кэш) для каждого нового соединения SQLite."""
+    if connection.vendor != 'sqlite':
+        return
+    for name, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+        # Сырой вызов: PRAGMA не попадают в connection.queries и execute_wrapper.
+        connection.connection.execute(f'PRAGMA {name} = {value}')
+
+
+def describe_database(connection):
+    """Фактические настройки соединения — для результатов bench."""
+    connection.ensure_connection()
+    info = {
+        'vendor': connection.vendor,
+        'profile': getattr(settings, 'DB_PROFILE', 'basic'),
+        'conn_max_age': connection.settings_dict.get('CONN_MAX_AGE'),
+        'conn_health_checks': connection.settings_dict.get('CONN_HEALTH_CHECKS'),
+    }
+    if connection.vendor == 'sqlite':
+        for name in ('journal_mode', 'synchronous', 'busy_timeout', 'mmap_size', 'cache_size'):
+            row = connection.connection.execute(f'PRAGMA {name}').fetchone()
+            info[name] = row[0] if row else None
+    elif connection.vendor == 'postgresql':
+        info['pool'] = bool(connection.settings_dict.get('OPTIONS', {}).get('pool'))
+        info['server_side_cursors'] = not connection.settings_dict.get('DISABLE_SERVER_SIDE_CURSORS')
+    return info
@@ -0,0 +1,191 @@
+import logging
+import mimetypes
+import shutil
+import subprocess
+import tempfile
+import zipfile
+from dataclasses import dataclass
+from importlib.util import find_spec
+from pathlib import Path
+from typing import Callable
+from xml.etree import ElementTree
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+
+from .models import AttachmentText, Task
+from .taskqueue import enqueue
+
+logger = logging.getLogger(__name__)
+
+COPY_BUFFER = 64 * 1024
+WORD_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+
+@dataclass
+class TextExtractor:
+    func: Callable
+    content_types: tuple
+    available: Callable
+
+
+_extractors = []
+
+
+def extractor(*content_types, available=lambda: True):
+    """Регистрирует извлекатель текста: func(path, limit) -> str (не длиннее limit символов с запасом)."""
+    def decorator(func):
+        _extractors.append(TextExtractor(func, content_types, available))
+        return func
+    return decorator
+
+
+def max_bytes():
+    return getattr(settings, 'EXTRACT_MAX_BYTES', 20 * 1024 * 1024)
+
+
+def max_chars():
+    return getattr(settings, 'EXTRACT_MAX_CHARS', 100_000)
+
+
+def _extractor_for(filename):
+    content_type = mimetypes.guess_type(filename or '')[0] or ''
+    for item in _extractors:
+        if content_type.startswith(item.content_types) and item.available():
+            return item
+    return None
+
+
+def supports(filename):
+    return bool(filename) and _extractor_for(filename) is not None
+
+
+@extractor('text/plain', 'text/markdown', 'text/csv')
+def plain_text(path, limit):
+    # Читаем с запасом на многобайтовые символы; cp1251 — для старых файлов из Windows.
+    with open(path, 'rb') as handle:
+        data = handle.read(limit * 4)
+    try:
+        return data.decode('utf-8')
+    except UnicodeDecodeError as exc:
+        if exc.start >= len(data) - 3:
+            # Чтение оборвалось посреди символа.
+            return data[:exc.start].decode('utf-8')
+        return data.decode('cp1251', errors='replace')
+
+
+@extractor('application/vnd.openxmlformats-officedocument.wordprocessingml.document')
+def docx_text(path, limit):
+    # DOCX — zip с word/document.xml: абзацы w:p, текст w:t, табуляции w:tab. Библиотеки не нужны.
+    paragraphs, size = [], 0
+    with zipfile.ZipFile(path) as archive, archive.open('word/document.xml') as document:
+        parts = []
+        for event, element in ElementTree.iterparse(document, events=('end',)):
+            if element.tag == f'{WORD_NS}t':
+                parts.append(element.text or '')
+            elif element.tag == f'{WORD_NS}tab':
+                parts.append('\t')
+            elif element.tag == f'{WORD_NS}p':
+                paragraph = ''.join(parts)
+                parts = []
+                element.clear()
+                if paragraph:
+                    paragraphs.append(paragraph)
+                    size += len(paragraph) + 1
+                    if size > limit:
+                        break
+    return '\n'.join(paragraphs)
+
+
+@extractor('application/pdf', available=lambda: find_spec('pypdf') is not None)
+def pdf_text(path, limit):
+    from pypdf import PdfReader
+
+    pages, size = [], 0
+    for page in PdfReader(path).pages:
+        text = page.extract_text() or ''
+        pages.append(text)
+        size += len(text)
+        if size > limit:
+            break
+    return '\n'.join(pages)
+
+
+@extractor('application/pdf', available=lambda: shutil.which('pdftotext') is not None)
+def pdftotext(path, limit):
+    # Без pypdf — утилита из poppler-utils, как и pdftoppm у превью.
+    result = subprocess.run(
+        ['pdftotext', '-enc', 'UTF-8', '-q', str(path), '-'],
+        check=True, capture_output=True, timeout=getattr(settings, 'EXTRACT_TIMEOUT', 60),
+    )
+    return result.stdout[:limit * 4].decode('utf-8', errors='ignore')
+
+
+def _normalize(text):
+    lines = (' '.join(line.split()) for line in text.replace('\x00', '').splitlines())
+    return '\n'.join(line for line in lines if line)
+
+
+def _save(item):
+    try:
+        with transaction.atomic():
+            item.save()
+    except IntegrityError:
+        # Тот же файл уже обработал параллельный воркер.
+        return AttachmentText.objects.get(source=item.source)
+    return item
+
+
+def extract(source, filename=''):
+    """Текст вложения source (имя в хранилище). None — тип не поддерживается или файла нет."""
+    existing = AttachmentText.objects.filter(source=source).first()
+    if existing is not None:
+        return existing
+    item = _extractor_for(filename or source)
+    if item is None or not default_storage.exists(source):
+        return None
+    limit = max_chars()
+    with tempfile.TemporaryDirectory() as directory:
+        # Локальная копия: zip и PDF читаются с произвольным доступом, а тело из S3 — только потоком.
+        path = Path(directory) / f'source{Path(filename or source).suffix.lower()}'
+        copied = 0
+        with default_storage.open(source) as handle, open(path, 'wb') as target:
+            while copied <= max_bytes():
+                block = handle.read(COPY_BUFFER)
+                if not block:
+                    break
+                target.write(block)
+                copied += len(block)
+        if copied > max_bytes():
+            return _save(AttachmentText(source=source, status='skipped'))
+        try:
+            text = _normalize(item.func(path, limit))
+        except Exception:  # noqa: BLE001 — битый файл не должен ронять воркер
+            logger.exception('Не удалось извлечь текст из %s', source)
+            return _save(AttachmentText(source=source, status='failed'))
+    return _save(AttachmentText(source=source, text=text[:limit], truncated=len(text) > limit))
+
+
+def texts_for(sources):
+    """{имя в хранилище: извлеченный текст} — одним запросом для пачки записей."""
+    sources = {source for source in sources if source}
+    if not sources:
+        return {}
+    return dict(AttachmentText.objects.filter(source__in=sources, status='ready').values_list('source', 'text'))
+
+
+def queue(source, filename=''):
+    # После коммита: при TASKS_EAGER разбор идет сразу, и строка поиска записи к этому моменту уже должна быть.
+    if source and supports(filename or source):
+        transaction.on_commit(lambda: enqueue(
+            'extract_attachment_text', {'source': source, 'filename': filename}, idempotency_key=f'extract:{source}'[:160],
+        ))
+
+
+def release(source):
+    """Удаляет текст оригинала, которого больше нет в хранилище; тот же файл, загруженный снова, извлечется заново."""
+    if default_storage.exists(source):
+        return
+    AttachmentText.objects.filter(source=source).delete()
+    Task.objects.filter(idempotency_key=f'extract:{source}'[:160], status__in=('done', 'failed')).delete()
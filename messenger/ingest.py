@@ -0,0 +1,166 @@
+import asyncio
+import atexit
+import logging
+import threading
+import time
+from concurrent.futures import Future
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+
+from . import search
+from .models import ChatRoom, Message
+
+logger = logging.getLogger(__name__)
+
+# off — обычный Message.objects.create;
+# wait — запрос ждет свою пачку bulk_create (групповой коммит), в ответе id из базы;
+# buffered — id берется из последовательности сразу, ответ не ждет записи (Postgres; на других базах как wait).
+INGEST_MODES = ('off', 'wait', 'buffered')
+# Поля, которые не проверяются при приеме: FK проверит база, файлы в буфер не попадают.
+UNCHECKED_FIELDS = ('group', 'room', 'sender', 'attachment', 'attachment_name')
+
+
+def ingest_mode():
+    mode = getattr(settings, 'MESSAGE_INGEST', 'off')
+    if mode == 'buffered' and connection.vendor != 'postgresql':
+        return 'wait'
+    return mode if mode in INGEST_MODES else 'off'
+
+
+def reserve_message_id():
+    """Следующий id из последовательности messenger_message: порядок id = порядок приема."""
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT nextval(pg_get_serial_sequence(%s, %s))', [Message._meta.db_table, 'id'])
+        return cursor.fetchone()[0]
+
+
+class MessageIngestor:
+    """
+    Буфер сообщений в памяти процесса. Фоновый поток пишет их пачками bulk_create:
+    не реже чем раз в flush_ms или сразу при batch_size сообщениях.
+    """
+
+    def __init__(self, flush_ms=None, batch_size=None):
+        self._flush_ms = flush_ms
+        self._batch_size = batch_size
+        self._pending = []
+        self._cond = threading.Condition()
+        self._thread = None
+
+    @property
+    def flush_seconds(self):
+        return (self._flush_ms if self._flush_ms is not None else getattr(settings, 'MESSAGE_INGEST_FLUSH_MS', 5)) / 1000
+
+    @property
+    def batch_size(self):
+        return self._batch_size or getattr(settings, 'MESSAGE_INGEST_BATCH_SIZE', 200)
+
+    def prepare(self, message):
+        """Проверка и group_id из уже загруженной комнаты: в буфер попадает готовая к вставке строка."""
+        if message.attachment:
+            raise ValueError('Сообщения с файлами пишутся напрямую.')
+        message.clean_fields(exclude=UNCHECKED_FIELDS)
+        if message.room_id:
+            message.group_id = message.room.group_id
+        # Для ответа в режиме buffered; при вставке auto_now_add поставит время записи пачки.
+        message.created_at = timezone.now()
+        return message
+
+    def submit(self, message):
+        future = Future()
+        with self._cond:
+            self._pending.append((message, future))
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='message-ingest', daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return future
+
+    def pending(self):
+        with self._cond:
+            return len(self._pending)
+
+    def _take(self):
+        batch, self._pending = self._pending[:self.batch_size], self._pending[self.batch_size:]
+        return batch
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                # Ждем попутчиков не дольше flush_ms от первого сообщения пачки.
+                deadline = time.monotonic() + self.flush_seconds
+                while len(self._pending) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._take()
+            self._write(batch)
+
+    def flush(self):
+        """Синхронно записывает все, что в буфере (тесты, завершение процесса)."""
+        while True:
+            with self._cond:
+                batch = self._take()
+            if not batch:
+                return
+            self._write(batch)
+
+    def _write(self, batch):
+        messages = [message for message, _ in batch]
+        try:
+            with transaction.atomic():
+                Message.objects.bulk_create(messages)
+                ChatRoom.record_messages(messages)
+                search.index_messages(messages)
+        except DatabaseError:
+            # Одна битая строка не должна терять всю пачку: повторяем по одной.
+            logger.exception('bulk_create пачки из %s сообщений не удался, пишем по одному', len(batch))
+            connection.close_if_unusable_or_obsolete()
+            for message, future in batch:
+                message._state.adding = True
+                try:
+                    message.save(force_insert=True)
+                except Exception as exc:  # noqa: BLE001 — ошибка уходит ожидающему запросу
+                    future.set_exception(exc)
+                else:
+                    future.set_result(message)
+            return
+        except Exception as exc:  # noqa: BLE001 — поток записи не должен умирать, запросы получают ошибку
+            logger.exception('Запись пачки сообщений не удалась')
+            for _, future in batch:
+                future.set_exception(exc)
+            return
+        for message, future in batch:
+            future.set_result(message)
+
+
+ingestor = MessageIngestor()
+atexit.register(ingestor.flush)
+
+
+def ingest(message, timeout=10):
+    """
+    Принимает сообщение через буфер. Возвращает его с окончательным id: в режиме wait — после
+    записи пачки, в buffered — сразу, с id, зарезервированным в последовательности.
+    """
+    ingestor.prepare(message)
+    if ingest_mode() == 'buffered':
+        message.id = reserve_message_id()
+        ingestor.submit(message)
+        return message
+    return ingestor.submit(message).result(timeout)
+
+
+async def aingest(message, timeout=10):
+    ingestor.prepare(message)
+    if ingest_mode() == 'buffered':
+        message.id = await sync_to_async(reserve_message_id)()
+        ingestor.submit(message)
+        return message
+    return await asyncio.wait_for(asyncio.wrap_future(ingestor.submit(message)), timeout)
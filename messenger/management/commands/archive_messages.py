@@ -0,0 +1,54 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from messenger.archive import archive_batch, cutoff_for, pending, retention_policy
+from messenger.models import ChatRoom
+
+
+class Command(BaseCommand):
+    help = 'Переносит сообщения старше срока хранения (MESSAGE_RETENTION_DAYS) в сжатый архив небольшими пачками.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--room-type', action='append', choices=[value for value, _ in ChatRoom.ROOM_TYPES], help='Только эти типы комнат.')
+        parser.add_argument('--older-than', type=int, help='Срок в днях вместо политики (для выбранных или всех типов).')
+        parser.add_argument('--batch-size', type=int, help='Сообщений в одной транзакции (по умолчанию ARCHIVE_BATCH_SIZE).')
+        parser.add_argument('--max-batches', type=int, default=0, help='Остановиться после стольких пачек (0 — без ограничения).')
+        parser.add_argument('--pause-ms', type=int, default=0, help='Пауза между пачками: меньше конкуренции с рабочей нагрузкой.')
+        parser.add_argument('--dry-run', action='store_true', help='Только посчитать сообщения для архива.')
+
+    def handle(self, *args, **options):
+        if options['older_than'] is not None:
+            if options['older_than'] < 1:
+                raise CommandError('--older-than должен быть положительным.')
+            room_types = options['room_type'] or [value for value, _ in ChatRoom.ROOM_TYPES]
+            policy = {room_type: options['older_than'] for room_type in room_types}
+        else:
+            policy = retention_policy()
+            if options['room_type']:
+                policy = {room_type: days for room_type, days in policy.items() if room_type in options['room_type']}
+        if not policy:
+            self.stdout.write('Срок хранения не задан (DJANGO_MESSAGE_RETENTION или --older-than): архивировать нечего.')
+            return
+
+        batches = total = 0
+        for room_type, days in sorted(policy.items()):
+            cutoff = cutoff_for(days)
+            if options['dry_run']:
+                count = pending(room_type, cutoff).count()
+                self.stdout.write(f'{room_type}: {count} сообщений старше {days} дн.')
+                total += count
+                continue
+            archived = 0
+            while not options['max_batches'] or batches < options['max_batches']:
+                moved = archive_batch(room_type, cutoff, options['batch_size'])
+                if not moved:
+                    break
+                archived += moved
+                batches += 1
+                if options['pause_ms']:
+                    time.sleep(options['pause_ms'] / 1000)
+            self.stdout.write(f'{room_type}: в архив перенесено {archived} сообщений старше {days} дн.')
+            total += archived
+        verb = 'К переносу' if options['dry_run'] else 'Перенесено'
+        self.stdout.write(self.style.SUCCESS(f'{verb}: {total}.'))
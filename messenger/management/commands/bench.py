@@ -0,0 +1,95 @@
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from messenger.benchmark import SCENARIOS, Benchmark
+
+COMPARED_FIELDS = ('p50_ms', 'p95_ms', 'p99_ms', 'throughput_rps')
+
+
+class Command(BaseCommand):
+    help = 'Нагрузочные сценарии по настоящим URL: p50/p95/p99 и пропускная способность, результат в JSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prefix', default='seed', help='Префикс данных seed_scale.')
+        parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='Через запятую: ' + ', '.join(SCENARIOS))
+        parser.add_argument('--iterations', type=int, default=100, help='Шагов на сценарий.')
+        parser.add_argument('--warmup', type=int, default=5, help='Шагов прогрева вне замера.')
+        parser.add_argument('--concurrency', type=int, default=1, help='Параллельных клиентов.')
+        parser.add_argument('--base-url', default='', help='Адрес запущенного сервера; без него — django.test.Client в процессе.')
+        parser.add_argument(
+            '--slow-client-ms', type=int, default=0,
+            help='Только с --base-url: пауза перед каждой порцией 1 КБ тела запроса и ответа (медленные клиенты).',
+        )
+        parser.add_argument('--output', default='', help='Файл результата (по умолчанию bench-results/<время>-<коммит>.json).')
+        parser.add_argument('--compare', default='', help='Прошлый файл результата для сравнения.')
+
+    def handle(self, *args, **options):
+        names = [name.strip() for name in options['scenarios'].split(',') if name.strip()]
+        unknown = [name for name in names if name not in SCENARIOS]
+        if unknown:
+            raise CommandError(f'Неизвестные сценарии: {", ".join(unknown)}')
+        if options['iterations'] < 1:
+            raise CommandError('--iterations должен быть больше нуля.')
+        if options['slow_client_ms'] and not options['base_url']:
+            raise CommandError('--slow-client-ms имеет смысл только с --base-url.')
+
+        try:
+            bench = Benchmark(
+                prefix=options['prefix'],
+                base_url=options['base_url'] or None,
+                concurrency=options['concurrency'],
+                iterations=options['iterations'],
+                warmup=options['warmup'],
+                slow_client_ms=options['slow_client_ms'],
+            )
+            result = bench.run(names)
+        except RuntimeError as exc:
+            raise CommandError(str(exc))
+
+        self._print(result)
+        output = Path(options['output']) if options['output'] else (
+            Path(settings.BASE_DIR) / 'bench-results' / f'{result["created_at"].replace(":", "")}-{result["commit"]}.json'
+        )
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding='utf-8')
+        self.stdout.write(self.style.SUCCESS(f'Результат: {output}'))
+
+        if options['compare']:
+            try:
+                previous = json.loads(Path(options['compare']).read_text(encoding='utf-8'))
+            except (OSError, ValueError) as exc:
+                raise CommandError(f'Не удалось прочитать {options["compare"]}: {exc}')
+            self._print_comparison(previous, result)
+
+    def _print(self, result):
+        database = result['database']
+        details = ', '.join(f'{key}={value}' for key, value in database.items() if key not in ('vendor', 'profile'))
+        self.stdout.write(
+            f'{result["mode"]}, {database["vendor"]} ({database["profile"]}: {details}), коммит {result["commit"]}, '
+            f'параллельно {result["concurrency"]}, шагов {result["iterations"]}'
+            + (f', медленный клиент {result["slow_client_ms"]} мс' if result.get('slow_client_ms') else '')
+        )
+        self.stdout.write(f'{"сценарий":<18}{"p50 мс":>10}{"p95 мс":>10}{"p99 мс":>10}{"шаг/с":>10}{"запр/с":>10}{"ошибки":>8}')
+        for name, stats in result['scenarios'].items():
+            self.stdout.write(
+                f'{name:<18}{stats["p50_ms"]:>10.1f}{stats["p95_ms"]:>10.1f}{stats["p99_ms"]:>10.1f}'
+                f'{stats["throughput_rps"]:>10.1f}{stats["requests_rps"]:>10.1f}{stats["errors"]:>8}'
+            )
+            if stats.get('first_error'):
+                self.stdout.write(self.style.WARNING(f'  первая ошибка: {stats["first_error"]}'))
+
+    def _print_comparison(self, previous, current):
+        self.stdout.write(f'Сравнение с {previous.get("commit", "?")} ({previous.get("created_at", "?")}):')
+        for name, stats in current['scenarios'].items():
+            before = previous.get('scenarios', {}).get(name)
+            if not before:
+                continue
+            parts = []
+            for field in COMPARED_FIELDS:
+                old, new = before.get(field) or 0, stats[field]
+                delta = f'{(new - old) / old * 100:+.1f}%' if old else 'н/д'
+                parts.append(f'{field} {old} -> {new} ({delta})')
+            self.stdout.write(f'  {name}: ' + '; '.join(parts))
@@ -0,0 +1,26 @@
+import shutil
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from messenger.models import UploadSession
+from messenger.uploads import cleanup_sessions
+
+
+class Command(BaseCommand):
+    help = 'Удаляет брошенные сессии докачиваемых загрузок и осиротевшие каталоги частей (для cron).'
+
+    def handle(self, *args, **options):
+        removed = cleanup_sessions()
+        orphans = 0
+        root = Path(settings.UPLOAD_TEMP_DIR)
+        if root.is_dir():
+            known = {str(pk) for pk in UploadSession.objects.values_list('id', flat=True)}
+            for directory in root.iterdir():
+                # Свежие каталоги не трогаем: сессия могла появиться после выборки known.
+                if directory.is_dir() and directory.name not in known and directory.stat().st_mtime < time.time() - 60:
+                    shutil.rmtree(directory, ignore_errors=True)
+                    orphans += 1
+        self.stdout.write(f'Удалено сессий: {removed}, каталогов без сессии: {orphans}.')
@@ -0,0 +1,42 @@
+from pathlib import Path
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from messenger.models import Message, MethodPackage
+from messenger.storage import DedupFileSystemStorage
+
+
+class Command(BaseCommand):
+    help = 'Переносит вложения, сохраненные до дедупликации, в blobs/: одинаковые файлы остаются в одном экземпляре.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Только посчитать файлы для переноса.')
+
+    def handle(self, *args, **options):
+        if not isinstance(default_storage, DedupFileSystemStorage):
+            raise CommandError('Хранилище по умолчанию без дедупликации: включите DJANGO_MEDIA_DEDUP.')
+        moved = missing = 0
+        for model in (Message, MethodPackage):
+            legacy = (
+                model.objects
+                .exclude(attachment='')
+                .exclude(attachment__isnull=True)
+                .exclude(attachment__startswith=default_storage.blob_prefix + '/')
+            )
+            for item in legacy.iterator():
+                name = item.attachment.name
+                if not default_storage.exists(name):
+                    missing += 1
+                    continue
+                moved += 1
+                if options['dry_run']:
+                    continue
+                with transaction.atomic():
+                    with default_storage.open(name) as handle:
+                        item.attachment.name = default_storage.save(Path(name).name, handle)
+                    update_fields = ['attachment'] + (['updated_at'] if hasattr(item, 'updated_at') else [])
+                    # Старый файл освобождает сигнал замены вложения после коммита.
+                    item.save(update_fields=update_fields)
+        self.stdout.write(f'Перенесено вложений: {moved}, файлов не найдено: {missing}.')
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from messenger.sync import purge_tombstones
+
+
+class Command(BaseCommand):
+    help = 'Удаляет записи журнала удалений синхронизации старше SYNC_TOMBSTONE_RETENTION_DAYS (для cron).'
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Удалено записей журнала: {purge_tombstones()}.')
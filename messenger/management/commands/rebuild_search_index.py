@@ -0,0 +1,62 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from messenger import archive, search
+from messenger.extraction import texts_for
+from messenger.models import ArchivedMessageChunk, Message, MethodAssignmentComment, MethodPackage, SearchEntry
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает поисковый индекс по сообщениям, комментариям к назначениям и методпакетам.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Сколько строк индекса вставлять за раз.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        # build(item, texts): texts — извлеченный текст вложений пачки, одним запросом.
+        def message_entry(message, texts):
+            return search.message_entry(
+                message, message.room.room_type if message.room_id else '', texts.get(message.attachment.name, ''),
+            )
+
+        sources = (
+            (Message.objects.select_related('room').exclude(text='', attachment_name='').iterator(chunk_size=batch_size), message_entry),
+            # Архив (archive_messages) тоже ищется: сообщения восстанавливаются из пачек без записи в Message.
+            (self._archived_messages(), message_entry),
+            (
+                MethodAssignmentComment.objects.select_related('assignment__teacher').iterator(chunk_size=batch_size),
+                lambda comment, texts: search.comment_entry(comment, comment.assignment.teacher.user_id),
+            ),
+            (
+                MethodPackage.objects.iterator(chunk_size=batch_size),
+                lambda method, texts: search.method_entry(method, texts.get(method.attachment.name, '')),
+            ),
+        )
+        total = 0
+        with transaction.atomic():
+            SearchEntry.objects.all().delete()
+            for items, build in sources:
+                batch = []
+                for item in items:
+                    batch.append(item)
+                    if len(batch) >= batch_size:
+                        total += self._write(batch, build)
+                        batch = []
+                if batch:
+                    total += self._write(batch, build)
+        self.stdout.write(self.style.SUCCESS(f'В индексе {total} записей.'))
+
+    def _archived_messages(self):
+        # Пачка архива — до ARCHIVE_BATCH_SIZE сообщений, поэтому из базы их читаем понемногу.
+        for chunk in ArchivedMessageChunk.objects.select_related('room').iterator(chunk_size=16):
+            for row in archive.unpack(chunk):
+                if row['text'] or row['attachment_name']:
+                    yield Message(room=chunk.room, **{field: value for field, value in row.items() if field != 'room_id'})
+
+    def _write(self, batch, build):
+        texts = texts_for(item.attachment.name for item in batch if getattr(item, 'attachment', None))
+        SearchEntry.objects.bulk_create([build(item, texts) for item in batch])
+        return len(batch)
@@ -0,0 +1,50 @@
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from messenger.taskqueue import requeue_stale, work_once, worker_name
+
+
+class Command(BaseCommand):
+    help = 'Воркер фоновых задач: берет задачи из таблицы Task по приоритету, с повторами при ошибках.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Выполнить все готовые задачи и выйти.')
+        parser.add_argument('--max-tasks', type=int, default=0, help='Выйти после N задач (0 — без ограничения).')
+        parser.add_argument('--poll-interval', type=float, default=None, help='Пауза при пустой очереди, секунд.')
+        parser.add_argument('--name', default='', help='Имя воркера в locked_by (по умолчанию host:pid).')
+
+    def handle(self, *args, **options):
+        name = options['name'] or worker_name()
+        poll_interval = options['poll_interval'] if options['poll_interval'] is not None else settings.TASKS_POLL_INTERVAL
+        self.stopping = False
+        # SIGTERM/SIGINT: дорабатываем текущую задачу и выходим, чтобы она не осталась в running.
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, self._stop)
+
+        requeued = requeue_stale()
+        if requeued:
+            self.stdout.write(f'Возвращено в очередь зависших задач: {requeued}')
+        self.stdout.write(f'Воркер {name} запущен.')
+        done = 0
+        while not self.stopping:
+            close_old_connections()
+            task = work_once(name)
+            if task is None:
+                if options['once']:
+                    break
+                time.sleep(poll_interval)
+                requeue_stale()
+                continue
+            done += 1
+            style = self.style.SUCCESS if task.status == 'done' else self.style.WARNING
+            self.stdout.write(style(f'{task.name}#{task.id}: {task.status} (попытка {task.attempts})'))
+            if options['max_tasks'] and done >= options['max_tasks']:
+                break
+        self.stdout.write(f'Воркер {name} остановлен, выполнено задач: {done}.')
+
+    def _stop(self, signum, frame):
+        self.stopping = True
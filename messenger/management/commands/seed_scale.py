@@ -0,0 +1,45 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from messenger.seeding import DEFAULTS, flush_school, seed_school, seed_usernames
+
+
+class Command(BaseCommand):
+    help = 'Генерирует школу заданного размера для нагрузочных замеров (bulk-вставка в обход сигналов).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prefix', default='seed', help='Префикс имен групп, предметов и логинов.')
+        parser.add_argument('--password', default='seed-password', help='Пароль всех созданных учеток.')
+        parser.add_argument('--random-seed', type=int, default=0)
+        parser.add_argument('--flush', action='store_true', help='Сначала удалить данные с тем же префиксом.')
+        parser.add_argument('--groups', type=int, default=DEFAULTS['groups'])
+        parser.add_argument('--teachers', type=int, default=DEFAULTS['teachers'], help='0 — по одному на две группы.')
+        parser.add_argument('--students-per-group', type=int, default=DEFAULTS['students_per_group'])
+        parser.add_argument('--parents-per-student', type=int, default=DEFAULTS['parents_per_student'])
+        parser.add_argument('--messages-per-room', type=int, default=DEFAULTS['messages_per_room'])
+        parser.add_argument('--attachment-ratio', type=float, default=DEFAULTS['attachment_ratio'])
+        parser.add_argument('--subjects', type=int, default=DEFAULTS['subjects'], help='У каждого предмета 12 методпакетов.')
+        parser.add_argument('--weeks', type=int, default=DEFAULTS['weeks'], help='Длина четверти в неделях.')
+        parser.add_argument('--lessons-per-week', type=int, default=DEFAULTS['lessons_per_week'])
+        parser.add_argument('--holidays', type=int, default=DEFAULTS['holidays'])
+
+    def handle(self, *args, **options):
+        if options['groups'] < 1:
+            raise CommandError('Нужна хотя бы одна группа.')
+        prefix = options['prefix']
+        if options['flush']:
+            flush_school(prefix)
+        elif get_user_model().objects.filter(username=seed_usernames(prefix)['admin']).exists():
+            raise CommandError(f'Данные с префиксом "{prefix}" уже есть: используйте --flush или другой --prefix.')
+
+        counts = seed_school(
+            prefix=prefix,
+            password=options['password'],
+            random_seed=options['random_seed'],
+            **{key: options[key] for key in DEFAULTS},
+        )
+        for name, count in counts.items():
+            self.stdout.write(f'{name}: {count}')
+        logins = ', '.join(f'{role}={username}' for role, username in seed_usernames(prefix).items())
+        self.stdout.write(self.style.SUCCESS(f'Готово. Учетки: {logins}; пароль: {options["password"]}'))
+
@@ -0,0 +1,215 @@
+import json
+import os
+import tempfile
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .db import observe_queries
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+HISTOGRAMS = {
+    'diplom_http_request_duration_seconds': ('Время обработки запроса.', LATENCY_BUCKETS),
+    'diplom_http_request_db_queries': ('Количество SQL-запросов на HTTP-запрос.', QUERY_COUNT_BUCKETS),
+}
+COUNTERS = {
+    'diplom_http_request_db_seconds_total': 'Суммарное время SQL-запросов.',
+    'diplom_http_response_bytes_total': 'Суммарный размер тел ответов.',
+    'diplom_http_responses_total': 'Ответы по кодам статуса.',
+}
+
+
+class MetricsRegistry:
+    """
+    Счетчики текущего процесса. В многопроцессном режиме (METRICS_DIR) каждый процесс
+    периодически сбрасывает свой снимок в отдельный файл, а /api/metrics/ суммирует файлы.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._last_flush = 0.0
+
+    def observe(self, name, labels, value):
+        buckets = HISTOGRAMS[name][1]
+        key = (name, labels)
+        with self._lock:
+            entry = self._histograms.get(key)
+            if entry is None:
+                entry = self._histograms[key] = {'buckets': [0] * len(buckets), 'sum': 0.0, 'count': 0}
+            for index, bound in enumerate(buckets):
+                if value <= bound:
+                    entry['buckets'][index] += 1
+            entry['sum'] += value
+            entry['count'] += 1
+
+    def inc(self, name, labels, value=1.0):
+        key = (name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'histograms': [[name, list(labels), dict(entry, buckets=list(entry['buckets']))] for (name, labels), entry in self._histograms.items()],
+                'counters': [[name, list(labels), value] for (name, labels), value in self._counters.items()],
+            }
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def maybe_flush(self, force=False):
+        directory = getattr(settings, 'METRICS_DIR', None)
+        if not directory:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_flush < getattr(settings, 'METRICS_FLUSH_SECONDS', 5):
+            return
+        self._last_flush = now
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.metrics-', suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as handle:
+            json.dump(self.snapshot(), handle)
+        os.replace(tmp_path, os.path.join(directory, f'metrics-{os.getpid()}.json'))
+
+
+registry = MetricsRegistry()
+
+
+def _collect_snapshots():
+    directory = getattr(settings, 'METRICS_DIR', None)
+    if not directory:
+        return [registry.snapshot()]
+    registry.maybe_flush(force=True)
+    snapshots = []
+    for filename in sorted(os.listdir(directory)):
+        if not (filename.startswith('metrics-') and filename.endswith('.json')):
+            continue
+        try:
+            with open(os.path.join(directory, filename), encoding='utf-8') as handle:
+                snapshots.append(json.load(handle))
+        except (OSError, ValueError):
+            continue
+    return snapshots
+
+
+def _merge(snapshots):
+    histograms, counters = {}, {}
+    for snapshot in snapshots:
+        for name, labels, entry in snapshot.get('histograms', []):
+            key = (name, tuple(labels))
+            merged = histograms.setdefault(key, {'buckets': [0] * len(entry['buckets']), 'sum': 0.0, 'count': 0})
+            merged['buckets'] = [a + b for a, b in zip(merged['buckets'], entry['buckets'])]
+            merged['sum'] += entry['sum']
+            merged['count'] += entry['count']
+        for name, labels, value in snapshot.get('counters', []):
+            key = (name, tuple(labels))
+            counters[key] = counters.get(key, 0.0) + value
+    return histograms, counters
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(pairs):
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in pairs) + '}'
+
+
+def _format_number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_prometheus():
+    histograms, counters = _merge(_collect_snapshots())
+    lines = []
+    for name, (help_text, buckets) in HISTOGRAMS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} histogram')
+        for (metric, labels), entry in sorted(histograms.items()):
+            if metric != name:
+                continue
+            base = [('route', labels[0]), ('method', labels[1])]
+            for bound, count in zip(buckets, entry['buckets']):
+                lines.append(f'{name}_bucket{_format_labels(base + [("le", bound)])} {count}')
+            lines.append(f'{name}_bucket{_format_labels(base + [("le", "+Inf")])} {entry["count"]}')
+            lines.append(f'{name}_sum{_format_labels(base)} {_format_number(entry["sum"])}')
+            lines.append(f'{name}_count{_format_labels(base)} {entry["count"]}')
+    for name, help_text in COUNTERS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} counter')
+        for (metric, labels), value in sorted(counters.items()):
+            if metric != name:
+                continue
+            label_names = ('route', 'method', 'status')[:len(labels)]
+            lines.append(f'{name}{_format_labels(list(zip(label_names, labels)))} {_format_number(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, sql, params, many, context, elapsed, ok):
+        self.count += 1
+        self.seconds += elapsed
+
+
+def route_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return '<unresolved>'
+    return match.view_name or match._func_path
+
+
+def _response_bytes(response):
+    if getattr(response, 'streaming', False):
+        return int(response.get('Content-Length') or 0)
+    return len(response.content)
+
+
+class RequestMetricsMiddleware:
+    """Латентность, число и время SQL, размер ответа и коды статуса по имени маршрута и методу."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        counter = QueryCounter()
+        started = time.perf_counter()
+        with observe_queries(counter):
+            response = self.get_response(request)
+        return self._record(request, response, counter, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        counter = QueryCounter()
+        started = time.perf_counter()
+        with observe_queries(counter):
+            response = await self.get_response(request)
+        return self._record(request, response, counter, time.perf_counter() - started)
+
+    def _record(self, request, response, counter, elapsed):
+        labels = (route_name(request), request.method)
+        registry.observe('diplom_http_request_duration_seconds', labels, elapsed)
+        registry.observe('diplom_http_request_db_queries', labels, counter.count)
+        registry.inc('diplom_http_request_db_seconds_total', labels, counter.seconds)
+        registry.inc('diplom_http_response_bytes_total', labels, _response_bytes(response))
+        registry.inc('diplom_http_responses_total', labels + (str(response.status_code),))
+        registry.maybe_flush()
+        return response
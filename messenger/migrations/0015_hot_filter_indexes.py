@@ -0,0 +1,70 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:29
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messenger', '0014_tombstone'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    # Сначала составные индексы, потом удаление покрытых ими индексов по FK.
+    operations = [
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['room', '-created_at'], name='message_room_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='methodassignment',
+            index=models.Index(fields=['teacher', 'method_package'], name='assign_teacher_method_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='methodassignmentcomment',
+            index=models.Index(fields=['assignment', '-created_at'], name='comment_assign_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='methodpackage',
+            index=models.Index(fields=['subject', 'method_number'], name='method_subject_number_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='scheduleslot',
+            index=models.Index(fields=['lesson_date'], name='slot_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='scheduleslot',
+            index=models.Index(fields=['group', 'lesson_date', 'start_time'], name='slot_group_date_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='scheduleslot',
+            index=models.Index(fields=['group', 'lesson_number'], name='slot_group_number_idx'),
+        ),
+        migrations.AlterField(
+            model_name='message',
+            name='room',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='messages', to='messenger.chatroom'),
+        ),
+        migrations.AlterField(
+            model_name='methodassignment',
+            name='teacher',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='method_assignments', to='messenger.teacher'),
+        ),
+        migrations.AlterField(
+            model_name='methodassignmentcomment',
+            name='assignment',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='comments', to='messenger.methodassignment'),
+        ),
+        migrations.AlterField(
+            model_name='methodpackage',
+            name='subject',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='method_packages', to='messenger.subject'),
+        ),
+        migrations.AlterField(
+            model_name='scheduleslot',
+            name='group',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='schedule', to='messenger.group'),
+        ),
+    ]
@@ -0,0 +1,83 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:00
+
+from django.db import migrations, models
+
+# Полнотекстовый индекс зависит от базы: в SQLite — внешняя FTS5-таблица над *_terms
+# (основы слов считает messenger.search.stem) с триггерами синхронизации, в Postgres —
+# генерируемый tsvector со стеммингом 'russian' и GIN-индекс.
+SQLITE_FORWARD = [
+    """CREATE VIRTUAL TABLE messenger_searchentry_fts USING fts5(
+        title_terms, body_terms, content='messenger_searchentry', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER messenger_searchentry_ai AFTER INSERT ON messenger_searchentry BEGIN
+        INSERT INTO messenger_searchentry_fts(rowid, title_terms, body_terms) VALUES (new.id, new.title_terms, new.body_terms);
+    END""",
+    """CREATE TRIGGER messenger_searchentry_ad AFTER DELETE ON messenger_searchentry BEGIN
+        INSERT INTO messenger_searchentry_fts(messenger_searchentry_fts, rowid, title_terms, body_terms)
+        VALUES ('delete', old.id, old.title_terms, old.body_terms);
+    END""",
+    """CREATE TRIGGER messenger_searchentry_au AFTER UPDATE ON messenger_searchentry BEGIN
+        INSERT INTO messenger_searchentry_fts(messenger_searchentry_fts, rowid, title_terms, body_terms)
+        VALUES ('delete', old.id, old.title_terms, old.body_terms);
+        INSERT INTO messenger_searchentry_fts(rowid, title_terms, body_terms) VALUES (new.id, new.title_terms, new.body_terms);
+    END""",
+]
+SQLITE_BACKWARD = [
+    'DROP TRIGGER IF EXISTS messenger_searchentry_au',
+    'DROP TRIGGER IF EXISTS messenger_searchentry_ad',
+    'DROP TRIGGER IF EXISTS messenger_searchentry_ai',
+    'DROP TABLE IF EXISTS messenger_searchentry_fts',
+]
+POSTGRES_FORWARD = [
+    """ALTER TABLE messenger_searchentry ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('russian'::regconfig, coalesce(title, '')), 'A')
+        || setweight(to_tsvector('russian'::regconfig, coalesce(body, '')), 'B')
+    ) STORED""",
+    'CREATE INDEX search_entry_vector_idx ON messenger_searchentry USING gin (search_vector)',
+]
+POSTGRES_BACKWARD = [
+    'DROP INDEX IF EXISTS search_entry_vector_idx',
+    'ALTER TABLE messenger_searchentry DROP COLUMN IF EXISTS search_vector',
+]
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messenger', '0020_preview'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('message', 'Сообщение'), ('comment', 'Комментарий к назначению'), ('method', 'Методпакет')], max_length=16)),
+                ('object_id', models.BigIntegerField()),
+                ('group_id', models.BigIntegerField(blank=True, null=True)),
+                ('room_id', models.BigIntegerField(blank=True, null=True)),
+                ('room_type', models.CharField(blank=True, max_length=20)),
+                ('teacher_user_id', models.BigIntegerField(blank=True, null=True)),
+                ('title', models.CharField(blank=True, max_length=255)),
+                ('body', models.TextField(blank=True)),
+                ('title_terms', models.TextField(blank=True, help_text='Основы слов заголовка (только SQLite).')),
+                ('body_terms', models.TextField(blank=True, help_text='Основы слов текста (только SQLite).')),
+                ('created_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('kind', 'object_id'), name='search_entry_object_uniq')],
+            },
+        ),
+        migrations.RunPython(
+            _run({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRES_FORWARD}),
+            _run({'sqlite': SQLITE_BACKWARD, 'postgresql': POSTGRES_BACKWARD}),
+        ),
+    ]
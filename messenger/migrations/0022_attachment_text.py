@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messenger', '0021_search_entry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttachmentText',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(help_text='Имя оригинала в хранилище.', max_length=255, unique=True)),
+                ('text', models.TextField(blank=True)),
+                ('truncated', models.BooleanField(default=False, help_text='Текст обрезан по EXTRACT_MAX_CHARS.')),
+                ('status', models.CharField(choices=[('ready', 'Готово'), ('skipped', 'Пропущено'), ('failed', 'Ошибка')], default='ready', max_length=16)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
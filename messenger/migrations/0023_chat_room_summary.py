@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:07
+
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def fill_room_summaries(apps, schema_editor):
+    ChatRoom = apps.get_model('messenger', 'ChatRoom')
+    Message = apps.get_model('messenger', 'Message')
+    rows = Message.objects.filter(room__isnull=False).values('room_id').annotate(count=Count('id'), last=Max('id')).order_by()
+    for row in rows.iterator():
+        message = Message.objects.only('text', 'attachment_name', 'created_at').get(pk=row['last'])
+        preview = ' '.join(message.text.split()) or message.attachment_name
+        ChatRoom.objects.filter(pk=row['room_id']).update(
+            message_count=row['count'],
+            last_message_id=message.id,
+            last_message_at=message.created_at,
+            last_message_preview=preview if len(preview) <= 120 else preview[:119] + '…',
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messenger', '0022_attachment_text'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatroom',
+            name='last_message_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='chatroom',
+            name='last_message_id',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='chatroom',
+            name='last_message_preview',
+            field=models.CharField(blank=True, max_length=121),
+        ),
+        migrations.AddField(
+            model_name='chatroom',
+            name='message_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='chatroom',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='chatroom',
+            index=models.Index(fields=['-last_message_at', 'id'], name='chatroom_activity_idx'),
+        ),
+        migrations.RunPython(fill_room_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messenger', '0026_archived_attachment'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tombstone',
+            name='scope',
+            field=models.CharField(blank=True, default='', max_length=40),
+        ),
+    ]
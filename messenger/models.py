@@ -1,11 +1,16 @@
-from django.db import models
+import uuid
+
+from django.db import models, transaction
+from django.db.models import Case, Count, F, Max, Q, Sum, Value, When
 from django.conf import settings
+from django.utils import timezone
 from django.utils.text import slugify
 
 
 class Group(models.Model):
     name = models.CharField(max_length=120, unique=True)
     description = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self) -> str:
         return self.name
@@ -19,6 +24,7 @@ class Teacher(models.Model):
     groups = models.ManyToManyField(Group, related_name='teachers', blank=True)
     user = models.OneToOneField(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL, related_name='teacher_profile')
     initial_password = models.CharField(max_length=32, blank=True, help_text='Сгенерированный пароль (показывается один раз, попросите сменить).')
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self) -> str:
         return f"{self.last_name} {self.first_name}"
@@ -35,6 +41,7 @@ class Parent(models.Model):
     email = models.EmailField(blank=True)
     user = models.OneToOneField(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL, related_name='parent_profile')
     initial_password = models.CharField(max_length=32, blank=True, help_text='Сгенерированный пароль (показывается один раз, попросите сменить).')
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self) -> str:
         return f"{self.last_name} {self.first_name}"
@@ -52,6 +59,7 @@ class Student(models.Model):
     notes = models.TextField(blank=True)
     user = models.OneToOneField(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL, related_name='student_profile')
     initial_password = models.CharField(max_length=32, blank=True, help_text='Сгенерированный пароль (показывается один раз, попросите сменить).')
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self) -> str:
         return f"{self.last_name} {self.first_name}"
@@ -62,13 +70,20 @@ class Student(models.Model):
 
 
 class MethodPackage(models.Model):
-    subject = models.ForeignKey('Subject', related_name='method_packages', on_delete=models.SET_NULL, null=True, blank=True)
+    # Отдельный индекс по subject не нужен: его покрывает составной (subject, method_number).
+    subject = models.ForeignKey('Subject', related_name='method_packages', on_delete=models.SET_NULL, null=True, blank=True, db_index=False)
     method_number = models.PositiveSmallIntegerField(default=1, help_text='Номер методпакета в рамках предмета (1-12).')
     title = models.CharField(max_length=120)
     description = models.TextField(blank=True)
     material_url = models.URLField(blank=True)
     content_blocks = models.JSONField(default=list, blank=True)
     attachment = models.FileField(upload_to='method_packages/', blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['subject', 'method_number'], name='method_subject_number_idx'),
+        ]
 
     def __str__(self) -> str:
         return self.title
@@ -85,7 +100,7 @@ class ScheduleSlot(models.Model):
         (6, 'Воскресенье'),
     ]
 
-    group = models.ForeignKey(Group, related_name='schedule', on_delete=models.CASCADE)
+    group = models.ForeignKey(Group, related_name='schedule', on_delete=models.CASCADE, db_index=False)
     lesson_topic = models.ForeignKey('LessonTopic', related_name='schedule_slots', on_delete=models.SET_NULL, null=True, blank=True)
     lesson_date = models.DateField(null=True, blank=True)
     weekday = models.IntegerField(choices=WEEKDAY_CHOICES)
@@ -94,9 +109,18 @@ class ScheduleSlot(models.Model):
     duration_minutes = models.PositiveSmallIntegerField(default=90)
     method_package = models.ForeignKey(MethodPackage, related_name='schedule_slots', on_delete=models.SET_NULL, null=True)
     moved_from_date = models.DateField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['group', 'lesson_date', 'weekday', 'start_time', 'lesson_number']
+        indexes = [
+            # Выходные и переносы ищут занятия по дате без группы.
+            models.Index(fields=['lesson_date'], name='slot_date_idx'),
+            # Проверка конфликтов при переносе; заодно заменяет индекс по group.
+            models.Index(fields=['group', 'lesson_date', 'start_time'], name='slot_group_date_time_idx'),
+            # Сдвиг методпакетов «начиная с занятия N».
+            models.Index(fields=['group', 'lesson_number'], name='slot_group_number_idx'),
+        ]
 
     def __str__(self) -> str:
         if self.lesson_date:
@@ -109,6 +133,7 @@ class Holiday(models.Model):
     title = models.CharField(max_length=180, blank=True, default='Праздничный день')
     group = models.ForeignKey(Group, related_name='holidays', on_delete=models.CASCADE, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['date']
@@ -121,6 +146,7 @@ class Holiday(models.Model):
 
 class Subject(models.Model):
     name = models.CharField(max_length=120, unique=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['name']
@@ -133,6 +159,7 @@ class LessonTopic(models.Model):
     name = models.CharField(max_length=180, unique=True)
     subject = models.ForeignKey(Subject, related_name='lesson_topics', on_delete=models.CASCADE)
     method_package = models.ForeignKey(MethodPackage, related_name='lesson_topics', on_delete=models.SET_NULL, null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['name']
@@ -148,17 +175,90 @@ class ChatRoom(models.Model):
         ('management', 'Менеджер и преподаватель'),
     ]
 
+    PREVIEW_CHARS = 120
+
     group = models.ForeignKey(Group, related_name='chat_rooms', on_delete=models.CASCADE)
     room_type = models.CharField(max_length=16, choices=ROOM_TYPES)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Сводка для списка чатов: обновляется в транзакции записи сообщения (см. record_messages).
+    last_message_id = models.BigIntegerField(null=True, blank=True)
+    last_message_at = models.DateTimeField(null=True, blank=True)
+    last_message_preview = models.CharField(max_length=PREVIEW_CHARS + 1, blank=True)
+    message_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['group', 'room_type']
         unique_together = ('group', 'room_type')
+        indexes = [
+            # Список чатов по активности (?order=activity).
+            models.Index(fields=['-last_message_at', 'id'], name='chatroom_activity_idx'),
+        ]
 
     def __str__(self) -> str:
         return f"{self.group.name}: {self.get_room_type_display()}"
 
+    @classmethod
+    def preview_for(cls, message):
+        text = ' '.join((message.text or '').split()) or message.attachment_name
+        return text if len(text) <= cls.PREVIEW_CHARS else text[:cls.PREVIEW_CHARS - 1] + '…'
+
+    @classmethod
+    def record_messages(cls, messages):
+        """
+        Учитывает только что записанные сообщения в сводках их комнат одним UPDATE на все комнаты.
+        Последнее сообщение меняется, только если новое старше по id (пачки могут прийти не по порядку).
+        """
+        by_room = {}
+        for message in messages:
+            if message.room_id:
+                by_room.setdefault(message.room_id, []).append(message)
+        if not by_room:
+            return
+        count_cases, latest_cases = [], {'last_message_id': [], 'last_message_at': [], 'last_message_preview': []}
+        for room_id, items in by_room.items():
+            latest = max(items, key=lambda message: message.id)
+            count_cases.append(When(pk=room_id, then=Value(len(items))))
+            newer = Q(pk=room_id) & (Q(last_message_id__isnull=True) | Q(last_message_id__lt=latest.id))
+            latest_cases['last_message_id'].append(When(newer, then=Value(latest.id)))
+            latest_cases['last_message_at'].append(When(newer, then=Value(latest.created_at)))
+            latest_cases['last_message_preview'].append(When(newer, then=Value(cls.preview_for(latest))))
+        cls.objects.filter(pk__in=by_room).update(
+            message_count=F('message_count') + Case(*count_cases, default=Value(0), output_field=models.PositiveIntegerField()),
+            updated_at=timezone.now(),
+            **{
+                name: Case(*cases, default=F(name), output_field=cls._meta.get_field(name))
+                for name, cases in latest_cases.items()
+            },
+        )
+
+    @classmethod
+    def refresh_summaries(cls, room_ids):
+        """Пересчитывает сводки по таблице сообщений: после удаления или вставки в обход save()."""
+        room_ids = set(room_ids)
+        if not room_ids:
+            return
+        stats = {
+            row['room_id']: row
+            for row in Message.objects.filter(room_id__in=room_ids).values('room_id').annotate(count=Count('id'), last=Max('id')).order_by()
+        }
+        latest = Message.objects.only('id', 'text', 'attachment_name', 'created_at').in_bulk([row['last'] for row in stats.values()])
+        # Счетчик включает архив (archive_messages): история комнаты читается целиком.
+        archived = dict(
+            ArchivedMessageChunk.objects.filter(room_id__in=room_ids).values('room_id').annotate(total=Sum('count')).order_by()
+            .values_list('room_id', 'total')
+        )
+        now = timezone.now()
+        for room_id in room_ids:
+            message = latest.get(stats[room_id]['last']) if room_id in stats else None
+            cls.objects.filter(pk=room_id).update(
+                message_count=(stats[room_id]['count'] if message else 0) + archived.get(room_id, 0),
+                last_message_id=message.id if message else None,
+                last_message_at=message.created_at if message else None,
+                last_message_preview=cls.preview_for(message) if message else '',
+                updated_at=now,
+            )
+
 
 class Message(models.Model):
     SENDER_TYPES = [
@@ -170,7 +270,9 @@ class Message(models.Model):
     ]
 
     group = models.ForeignKey(Group, related_name='messages', on_delete=models.CASCADE)
-    room = models.ForeignKey(ChatRoom, related_name='messages', on_delete=models.CASCADE, null=True, blank=True)
+    room = models.ForeignKey(ChatRoom, related_name='messages', on_delete=models.CASCADE, null=True, blank=True, db_index=False)
+    # Кто отправил: подпись sender_name у разных пользователей может совпадать. Пусто у старых и системных сообщений.
+    sender = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='chat_messages', on_delete=models.SET_NULL, null=True, blank=True)
     sender_type = models.CharField(max_length=10, choices=SENDER_TYPES)
     sender_name = models.CharField(max_length=120)
     text = models.TextField()
@@ -180,16 +282,69 @@ class Message(models.Model):
 
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            # Лента чата: последние сообщения комнаты.
+            models.Index(fields=['room', '-created_at'], name='message_room_created_idx'),
+            # Кто еще ссылается на файл: общее вложение рассылки, текст вложения для поиска.
+            models.Index(fields=['attachment'], name='message_attachment_idx'),
+        ]
 
     def save(self, *args, **kwargs):
-        if self.room_id and self.group_id != self.room.group_id:
-            self.group_id = self.room.group_id
-        super().save(*args, **kwargs)
+        if self.room_id:
+            if self._meta.get_field('room').is_cached(self):
+                room_group_id = self.room.group_id
+            else:
+                # Комната не загружена: нужен только ее group_id, а не вся строка.
+                room_group_id = ChatRoom.objects.filter(pk=self.room_id).values_list('group_id', flat=True).first()
+            if room_group_id and self.group_id != room_group_id:
+                self.group_id = room_group_id
+        if not self._state.adding:
+            super().save(*args, **kwargs)
+            return
+        # Сообщение и сводка комнаты — в одной транзакции.
+        with transaction.atomic(savepoint=False):
+            super().save(*args, **kwargs)
+            ChatRoom.record_messages([self])
 
     def __str__(self) -> str:
         return f"{self.group.name}: {self.sender_name}"
 
 
+class ArchivedMessageChunk(models.Model):
+    """
+    Архивная пачка сообщений одной комнаты за один месяц (manage.py archive_messages): строки
+    Message в NDJSON, сжатом gzip. История читает пачки по индексу (room, last_id).
+    """
+    room = models.ForeignKey(ChatRoom, related_name='archived_chunks', on_delete=models.CASCADE, db_index=False)
+    month = models.DateField(help_text='Первое число месяца, к которому относятся сообщения.')
+    first_id = models.BigIntegerField()
+    last_id = models.BigIntegerField()
+    first_at = models.DateTimeField()
+    last_at = models.DateTimeField()
+    count = models.PositiveIntegerField()
+    data = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['room', '-last_id'], name='archive_room_last_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return f"Архив комнаты #{self.room_id} за {self.month:%Y-%m}: {self.count} сообщ."
+
+
+class ArchivedAttachment(models.Model):
+    """Файл архивного сообщения: ссылка на него в хранилище живет, пока жива пачка архива."""
+    chunk = models.ForeignKey(ArchivedMessageChunk, related_name='attachments', on_delete=models.CASCADE)
+    message_id = models.BigIntegerField(unique=True)
+    name = models.CharField(max_length=255, db_index=True, help_text='Имя в хранилище, как у Message.attachment.')
+    filename = models.CharField(max_length=255, blank=True)
+
+    def __str__(self) -> str:
+        return f"{self.filename or self.name} (архивное сообщение #{self.message_id})"
+
+
 class Event(models.Model):
     MEDIA_CHOICES = [
         ('none', 'Без медиа'),
@@ -204,6 +359,7 @@ class Event(models.Model):
     media_type = models.CharField(max_length=10, choices=MEDIA_CHOICES, default='none')
     media_url = models.URLField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-event_date', '-created_at']
@@ -225,6 +381,7 @@ class FeedPost(models.Model):
     media_type = models.CharField(max_length=10, choices=MEDIA_CHOICES, default='none')
     media_url = models.URLField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-created_at']
@@ -242,24 +399,29 @@ class MethodAssignment(models.Model):
     ]
 
     method_package = models.ForeignKey(MethodPackage, related_name='assignments', on_delete=models.CASCADE)
-    teacher = models.ForeignKey(Teacher, related_name='method_assignments', on_delete=models.CASCADE)
+    teacher = models.ForeignKey(Teacher, related_name='method_assignments', on_delete=models.CASCADE, db_index=False)
     granted_by = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='granted_method_assignments', on_delete=models.SET_NULL, null=True, blank=True)
     deadline = models.DateField(null=True, blank=True)
     can_edit = models.BooleanField(default=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='todo')
     notes = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ('method_package', 'teacher')
         ordering = ['deadline', '-created_at']
+        indexes = [
+            # Назначения преподавателя по предмету (уникальность начинается с method_package и не подходит).
+            models.Index(fields=['teacher', 'method_package'], name='assign_teacher_method_idx'),
+        ]
 
     def __str__(self) -> str:
         return f"{self.method_package.title} -> {self.teacher}"
 
 
 class MethodAssignmentComment(models.Model):
-    assignment = models.ForeignKey(MethodAssignment, related_name='comments', on_delete=models.CASCADE)
+    assignment = models.ForeignKey(MethodAssignment, related_name='comments', on_delete=models.CASCADE, db_index=False)
     sender = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='method_assignment_comments', on_delete=models.SET_NULL, null=True, blank=True)
     sender_role = models.CharField(max_length=20, blank=True)
     sender_name = models.CharField(max_length=120, blank=True)
@@ -268,11 +430,175 @@ class MethodAssignmentComment(models.Model):
 
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['assignment', '-created_at'], name='comment_assign_created_idx'),
+        ]
 
     def __str__(self) -> str:
         return f"Comment #{self.id} for assignment #{self.assignment_id}"
 
 
+class Tombstone(models.Model):
+    collection = models.CharField(max_length=40)
+    object_id = models.BigIntegerField()
+    # Область видимости, из которой пропала запись: group:<id>, user:<id> или '' (только staff).
+    scope = models.CharField(max_length=40, blank=True, default='')
+    deleted_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ['deleted_at']
+
+    def __str__(self) -> str:
+        return f"{self.collection}#{self.object_id} ({self.deleted_at})"
+
+
+class UploadSession(models.Model):
+    """
+    Загрузка файла: докачиваемая (части во временном каталоге до complete, messenger.uploads)
+    или прямая (object_key — клиент кладет файл в объектное хранилище по presigned URL).
+    """
+    STATUS_CHOICES = [
+        ('open', 'Идет загрузка'),
+        ('complete', 'Завершена'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='upload_sessions', on_delete=models.CASCADE)
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=120, blank=True)
+    size = models.PositiveBigIntegerField()
+    chunk_size = models.PositiveIntegerField()
+    object_key = models.CharField(max_length=100, blank=True, help_text='Ключ объекта для прямой загрузки в хранилище.')
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default='open')
+    result = models.JSONField(null=True, blank=True, help_text='Ответ complete: повторный вызов вернет его же.')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    def __str__(self) -> str:
+        return f"{self.filename} ({self.status})"
+
+    @property
+    def chunk_count(self):
+        return max(1, -(-self.size // self.chunk_size))
+
+
+class Blob(models.Model):
+    """Содержимое файла в хранилище с дедупликацией: один файл на sha256, refcount — число ссылок из FileField."""
+    name = models.CharField(max_length=100, unique=True, help_text='Имя в хранилище: blobs/<2 символа>/<sha256><расширение>.')
+    digest = models.CharField(max_length=64, db_index=True)
+    size = models.PositiveBigIntegerField()
+    refcount = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:
+        return f"{self.name} x{self.refcount}"
+
+
+class Preview(models.Model):
+    """Уменьшенная копия вложения или медиа (messenger.previews): файл в том же хранилище и его размеры."""
+    STATUS_CHOICES = [
+        ('ready', 'Готово'),
+        ('failed', 'Ошибка'),
+    ]
+
+    source = models.CharField(max_length=255, unique=True, help_text='Имя оригинала в хранилище.')
+    name = models.CharField(max_length=255, blank=True)
+    width = models.PositiveIntegerField(default=0)
+    height = models.PositiveIntegerField(default=0)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default='ready')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:
+        return f"{self.source} -> {self.name or self.status}"
+
+
+class AttachmentText(models.Model):
+    """Текст, извлеченный из вложения (messenger.extraction): по имени в хранилище, общий для одинаковых файлов."""
+    STATUS_CHOICES = [
+        ('ready', 'Готово'),
+        ('skipped', 'Пропущено'),
+        ('failed', 'Ошибка'),
+    ]
+
+    source = models.CharField(max_length=255, unique=True, help_text='Имя оригинала в хранилище.')
+    text = models.TextField(blank=True)
+    truncated = models.BooleanField(default=False, help_text='Текст обрезан по EXTRACT_MAX_CHARS.')
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default='ready')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:
+        return f"{self.source} ({self.status}, {len(self.text)} симв.)"
+
+
+class SearchEntry(models.Model):
+    """
+    Строка полнотекстового индекса (messenger.search): копия текста сообщения, комментария
+    или методпакета и поля для проверки доступа. Сам индекс — FTS5 над *_terms в SQLite
+    или генерируемый tsvector ('russian') в Postgres, см. миграцию 0021.
+    """
+    KIND_CHOICES = [
+        ('message', 'Сообщение'),
+        ('comment', 'Комментарий к назначению'),
+        ('method', 'Методпакет'),
+    ]
+
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    group_id = models.BigIntegerField(null=True, blank=True)
+    room_id = models.BigIntegerField(null=True, blank=True)
+    room_type = models.CharField(max_length=20, blank=True)
+    teacher_user_id = models.BigIntegerField(null=True, blank=True)
+    title = models.CharField(max_length=255, blank=True)
+    body = models.TextField(blank=True)
+    title_terms = models.TextField(blank=True, help_text='Основы слов заголовка (только SQLite).')
+    body_terms = models.TextField(blank=True, help_text='Основы слов текста (только SQLite).')
+    created_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='search_entry_object_uniq'),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.kind}#{self.object_id}"
+
+
+class Task(models.Model):
+    """Фоновая задача: выполняется процессом manage.py run_worker (или сразу при TASKS_EAGER)."""
+    STATUS_CHOICES = [
+        ('queued', 'В очереди'),
+        ('running', 'Выполняется'),
+        ('done', 'Готово'),
+        ('failed', 'Ошибка'),
+    ]
+
+    name = models.CharField(max_length=80)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default='queued')
+    priority = models.SmallIntegerField(default=0, help_text='Чем больше, тем раньше.')
+    idempotency_key = models.CharField(max_length=160, unique=True, null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=120, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-priority', 'run_after', 'id']
+        indexes = [
+            models.Index(fields=['status', '-priority', 'run_after'], name='task_queue_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.name}#{self.id} ({self.status})"
+
+
 class UserProfile(models.Model):
     ROLE_CHOICES = [
         ('admin', 'Админ'),
@@ -285,6 +611,7 @@ class UserProfile(models.Model):
 
     user = models.OneToOneField(settings.AUTH_USER_MODEL, related_name='profile', on_delete=models.CASCADE)
     role = models.CharField(max_length=20, choices=ROLE_CHOICES)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self) -> str:
         return f"{self.user.username} ({self.get_role_display()})"
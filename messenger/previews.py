@@ -0,0 +1,163 @@
+import logging
+import mimetypes
+import shutil
+import struct
+import subprocess
+import tempfile
+from dataclasses import dataclass
+from io import BytesIO
+from pathlib import Path
+from typing import Callable
+from urllib.parse import unquote, urlsplit
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+
+from .models import Preview, Task
+from .taskqueue import enqueue
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow — необязательная зависимость, без нее превью картинок не строятся
+    Image = ImageOps = None
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PreviewGenerator:
+    func: Callable
+    content_types: tuple
+    available: Callable
+
+
+_generators = []
+
+
+def generator(*content_types, available=lambda: True):
+    """Регистрирует построитель превью: func(handle, size) -> (jpeg-байты, ширина, высота)."""
+    def decorator(func):
+        _generators.append(PreviewGenerator(func, content_types, available))
+        return func
+    return decorator
+
+
+def preview_size():
+    return getattr(settings, 'PREVIEW_SIZE', 480)
+
+
+def _content_type(filename):
+    return mimetypes.guess_type(filename or '')[0] or ''
+
+
+def _generator_for(filename):
+    content_type = _content_type(filename)
+    for item in _generators:
+        if content_type.startswith(item.content_types) and item.available():
+            return item
+    return None
+
+
+def supports(filename):
+    return bool(filename) and _generator_for(filename) is not None
+
+
+def media_name(url):
+    """Имя в хранилище по media_url ленты или события; '' — внешняя ссылка."""
+    path = unquote(urlsplit(url or '').path)
+    prefix = settings.MEDIA_URL if settings.MEDIA_URL.startswith('/') else '/' + settings.MEDIA_URL
+    return path[len(prefix):] if path.startswith(prefix) else ''
+
+
+def _jpeg_size(data):
+    # Размеры из маркера SOF: без Pillow, для JPEG от внешних утилит.
+    index = 2
+    while index + 9 < len(data):
+        marker, length = data[index + 1], struct.unpack('>H', data[index + 2:index + 4])[0]
+        if marker in (0xC0, 0xC1, 0xC2):
+            height, width = struct.unpack('>HH', data[index + 5:index + 9])
+            return width, height
+        index += 2 + length
+    return 0, 0
+
+
+@generator('image/', available=lambda: Image is not None)
+def image_thumbnail(handle, size):
+    with Image.open(handle) as image:
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((size, size))
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        output = BytesIO()
+        image.save(output, 'JPEG', quality=80, optimize=True)
+        return output.getvalue(), image.width, image.height
+
+
+@generator('application/pdf', available=lambda: shutil.which('pdftoppm') is not None)
+def pdf_first_page(handle, size):
+    with tempfile.TemporaryDirectory() as directory:
+        source = Path(directory) / 'source.pdf'
+        with open(source, 'wb') as target:
+            shutil.copyfileobj(handle, target, 64 * 1024)
+        subprocess.run(
+            ['pdftoppm', '-f', '1', '-l', '1', '-singlefile', '-jpeg', '-scale-to', str(size), str(source), str(Path(directory) / 'page')],
+            check=True, capture_output=True, timeout=getattr(settings, 'PREVIEW_TIMEOUT', 30),
+        )
+        data = (Path(directory) / 'page.jpg').read_bytes()
+    return (data, *_jpeg_size(data))
+
+
+def generate(source, filename=''):
+    """Строит превью оригинала source (имя в хранилище). None — тип не поддерживается или файла нет."""
+    existing = Preview.objects.filter(source=source).first()
+    if existing is not None:
+        return existing
+    item = _generator_for(filename or source)
+    if item is None or not default_storage.exists(source):
+        return None
+    try:
+        with default_storage.open(source) as handle:
+            data, width, height = item.func(handle, preview_size())
+    except Exception:  # noqa: BLE001 — битый файл не должен ронять воркер или запрос
+        logger.exception('Не удалось построить превью %s', source)
+        preview = Preview(source=source, status='failed')
+    else:
+        name = default_storage.save(f'previews/{Path(source).stem}.jpg', ContentFile(data))
+        preview = Preview(source=source, name=name, width=width, height=height)
+    try:
+        with transaction.atomic():
+            preview.save()
+    except IntegrityError:
+        # Параллельный запрос успел первым: наш файл лишний.
+        if preview.name:
+            default_storage.delete(preview.name)
+        return Preview.objects.get(source=source)
+    return preview
+
+
+def ready(source, filename=''):
+    """Готовое превью; при первом обращении строится на месте (ленивый путь, если воркер не успел)."""
+    preview = generate(source, filename)
+    return preview if preview is not None and preview.status == 'ready' else None
+
+
+def queue(source, filename=''):
+    # После коммита: при откате загрузки воркер не должен получить задачу на файл, которого уже нет.
+    if source and supports(filename or source):
+        transaction.on_commit(lambda: enqueue(
+            'generate_preview', {'source': source, 'filename': filename}, idempotency_key=f'preview:{source}'[:160],
+        ))
+
+
+def release(source):
+    """Удаляет превью оригинала, которого больше нет в хранилище (последняя ссылка освобождена)."""
+    if default_storage.exists(source):
+        return
+    for preview in Preview.objects.filter(source=source):
+        if preview.name:
+            default_storage.delete(preview.name)
+        preview.delete()
+    # Иначе тот же файл, загруженный снова, не получит новую задачу: ключ занят старой.
+    Task.objects.filter(idempotency_key=f'preview:{source}'[:160], status__in=('done', 'failed')).delete()
@@ -0,0 +1,206 @@
+import cProfile
+import os
+import random
+import re
+import time
+from datetime import datetime
+from importlib import import_module
+from types import SimpleNamespace
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.core.exceptions import MiddlewareNotUsed
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from .metrics import route_name
+
+try:
+    from pyinstrument import Profiler as SamplingProfiler
+except ImportError:  # pyinstrument — необязательная зависимость, без нее работает cProfile
+    SamplingProfiler = None
+
+PROFILE_SUFFIXES = ('.prof', '.html')
+_UNSAFE = re.compile(r'[^\w.-]+')
+_PROFILE_NAME = re.compile(r'^[\w.-]+\.(prof|html)$')
+
+
+def profiles_dir():
+    return getattr(settings, 'PROFILING_DIR', None)
+
+
+def _use_sampler():
+    return SamplingProfiler is not None and getattr(settings, 'PROFILING_ENGINE', 'cprofile') == 'pyinstrument'
+
+
+class _CProfileRun:
+    suffix = '.prof'
+
+    def __init__(self):
+        self.profiler = cProfile.Profile()
+
+    def start(self):
+        self.profiler.enable()
+
+    def stop(self):
+        self.profiler.disable()
+
+    def dump(self, path):
+        self.profiler.dump_stats(path)
+
+
+class _SamplingRun:
+    suffix = '.html'
+
+    def __init__(self):
+        self.profiler = SamplingProfiler(interval=0.001)
+
+    def start(self):
+        self.profiler.start()
+
+    def stop(self):
+        self.profiler.stop()
+
+    def dump(self, path):
+        with open(path, 'w', encoding='utf-8') as handle:
+            handle.write(self.profiler.output_html())
+
+
+def profile_filename(route, method, elapsed, suffix, moment=None):
+    moment = moment or datetime.now()
+    safe_route = _UNSAFE.sub('_', route).strip('_') or 'route'
+    return f'{moment:%Y%m%dT%H%M%S_%f}__{safe_route}__{method}__{int(elapsed * 1000)}ms{suffix}'
+
+
+def list_profiles(limit=100):
+    directory = profiles_dir()
+    if not directory or not os.path.isdir(directory):
+        return []
+    items = []
+    for entry in os.scandir(directory):
+        if not entry.is_file() or not entry.name.endswith(PROFILE_SUFFIXES):
+            continue
+        parts = entry.name.rsplit('.', 1)[0].split('__')
+        stat = entry.stat()
+        items.append({
+            'name': entry.name,
+            'route': parts[1] if len(parts) == 4 else '',
+            'method': parts[2] if len(parts) == 4 else '',
+            'duration_ms': int(parts[3][:-2]) if len(parts) == 4 and parts[3][:-2].isdigit() else None,
+            'size': stat.st_size,
+            'created_at': datetime.fromtimestamp(stat.st_mtime).isoformat(timespec='seconds'),
+        })
+    items.sort(key=lambda item: item['name'], reverse=True)
+    return items[:limit]
+
+
+def profile_path(name):
+    """Путь к сохраненному профилю или None; имя проверяется, чтобы нельзя было выйти из каталога."""
+    directory = profiles_dir()
+    if not directory or not _PROFILE_NAME.match(name):
+        return None
+    path = os.path.join(directory, name)
+    return path if os.path.isfile(path) else None
+
+
+def _prune(directory, keep):
+    names = sorted(name for name in os.listdir(directory) if name.endswith(PROFILE_SUFFIXES))
+    for name in names[:max(0, len(names) - keep)]:
+        try:
+            os.remove(os.path.join(directory, name))
+        except OSError:
+            pass
+
+
+def _is_staff(request):
+    """
+    Staff ли автор запроса, до запуска профилировщика: middleware стоит раньше сессий и аутентификации,
+    поэтому проверяем JWT из Authorization или сессионную cookie сами.
+    """
+    try:
+        authenticated = JWTAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return False
+    if authenticated is not None:
+        user = authenticated[0]
+    else:
+        session_key = request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+        if not session_key:
+            return False
+        user = get_user(SimpleNamespace(session=import_module(settings.SESSION_ENGINE).SessionStore(session_key)))
+    return user.is_authenticated and user.is_staff
+
+
+class RequestProfilingMiddleware:
+    """
+    Профилирует запрос по заголовку X-Profile (только staff) или по доле PROFILING_SAMPLE_RATE.
+    Без триггера стоит одну проверку заголовка; заголовок от остальных игнорируется до запуска профилировщика.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PROFILING_ENABLED', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def _requested(self, request):
+        """None — не профилировать, иначе True для заголовка и False для сэмплирования."""
+        if not profiles_dir():
+            return None
+        if getattr(settings, 'PROFILING_HEADER', 'HTTP_X_PROFILE') in request.META:
+            return True
+        rate = getattr(settings, 'PROFILING_SAMPLE_RATE', 0.0)
+        if rate > 0 and random.random() < rate:
+            return False
+        return None
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        requested = self._requested(request)
+        if requested and not _is_staff(request):
+            requested = None
+        if requested is None:
+            return self.get_response(request)
+
+        run = _SamplingRun() if _use_sampler() else _CProfileRun()
+        started = time.perf_counter()
+        run.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            run.stop()
+        return self._save(request, response, run, time.perf_counter() - started, requested)
+
+    async def __acall__(self, request):
+        requested = self._requested(request)
+        if requested and not await sync_to_async(_is_staff)(request):
+            requested = None
+        if requested is None:
+            return await self.get_response(request)
+
+        # В async-режиме cProfile видит только поток event loop; ORM-вызовы идут в потоке sync_to_async.
+        run = _SamplingRun() if _use_sampler() else _CProfileRun()
+        started = time.perf_counter()
+        run.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            run.stop()
+        # Запись файла — блокирующая.
+        return await sync_to_async(self._save)(request, response, run, time.perf_counter() - started, requested)
+
+    def _save(self, request, response, run, elapsed, requested):
+        directory = profiles_dir()
+        os.makedirs(directory, exist_ok=True)
+        name = profile_filename(route_name(request), request.method, elapsed, run.suffix)
+        run.dump(os.path.join(directory, name))
+        _prune(directory, getattr(settings, 'PROFILING_KEEP', 200))
+        if requested:
+            response['X-Profile-Saved'] = name
+        return response
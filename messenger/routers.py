@@ -0,0 +1,109 @@
+import random
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+PIN_COOKIE = 'db_pin'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+REPLICA_ACTIONS = ('list', 'retrieve')
+# Сессии и пользователи читаются с основной базы: свежий логин не должен зависеть от лага реплики.
+REPLICA_APPS = ('messenger',)
+
+
+@dataclass
+class RoutingState:
+    read_only: bool = False
+    wrote: bool = False
+
+
+_state: ContextVar = ContextVar('db_routing_state', default=None)
+
+
+def replicas():
+    return list(getattr(settings, 'DATABASE_REPLICAS', ()))
+
+
+class ReadReplicaRouter:
+    """
+    Чтения запросов, помеченных ReplicaRoutingMiddleware как read-only, уходят на реплику.
+    Любая запись (и все чтения после нее в том же запросе) — на основную базу.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        aliases = replicas()
+        if state is None or not state.read_only or state.wrote or not aliases:
+            return None
+        if model._meta.app_label not in REPLICA_APPS:
+            return None
+        return random.choice(aliases)
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        # Явно: иначе объект, прочитанный с реплики, Django сохранил бы обратно в реплику.
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db not in replicas()
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Помечает GET/HEAD на list/retrieve ViewSet как read-only. После записи ставит короткую cookie,
+    чтобы следующие чтения пользователя шли на основную базу, пока реплика догоняет.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        token = _state.set(RoutingState())
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self._pin(request, response)
+
+    async def __acall__(self, request):
+        token = _state.set(RoutingState())
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self._pin(request, response)
+
+    def _pin(self, request, response):
+        if request.method not in SAFE_METHODS and replicas():
+            response.set_cookie(
+                PIN_COOKIE, '1',
+                max_age=getattr(settings, 'REPLICA_PIN_SECONDS', 5),
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        actions = getattr(view_func, 'actions', None) or {}
+        if (
+            request.method in SAFE_METHODS
+            and actions.get(request.method.lower()) in REPLICA_ACTIONS
+            and PIN_COOKIE not in request.COOKIES
+        ):
+            _state.get().read_only = True
+        return None
@@ -0,0 +1,258 @@
+import html
+import re
+
+from django.db import connection
+
+from .extraction import texts_for
+from .models import ChatRoom, Message, MethodAssignment, MethodPackage, SearchEntry
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+VOWELS = set('аеиоуыэюя')
+SNIPPET_CHARS = 200
+# Длинные тексты (вложения, большие методички) индексируются не целиком.
+MAX_BODY_CHARS = 100_000
+
+# Окончания стеммера Snowball для русского. Группа *_AFTER_A применяется, только если перед
+# окончанием стоит «а» или «я» (сама буква остается).
+PERFECTIVE_GERUND_AFTER_A = ('в', 'вши', 'вшись')
+PERFECTIVE_GERUND = ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись')
+ADJECTIVE = (
+    'ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем', 'им', 'ым', 'ом',
+    'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю', 'ая', 'яя', 'ою', 'ею',
+)
+PARTICIPLE_AFTER_A = ('ем', 'нн', 'вш', 'ющ', 'щ')
+PARTICIPLE = ('ивш', 'ывш', 'ующ')
+REFLEXIVE = ('ся', 'сь')
+VERB_AFTER_A = ('ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но', 'ет', 'ют', 'ны', 'ть', 'ешь', 'нно')
+VERB = (
+    'ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей', 'уй', 'ил', 'ыл', 'им', 'ым', 'ен',
+    'ило', 'ыло', 'ено', 'ят', 'ует', 'уют', 'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю',
+)
+NOUN = (
+    'а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии', 'и', 'ией', 'ей', 'ой', 'ий', 'й',
+    'иям', 'ям', 'ием', 'ем', 'ам', 'ом', 'о', 'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия', 'ья', 'я',
+)
+SUPERLATIVE = ('ейше', 'ейш')
+DERIVATIONAL = ('ость', 'ост')
+
+
+def _region_after_consonant(word, start):
+    # R1/R2 Snowball: позиция после первой пары «гласная + согласная», начиная с start.
+    for index in range(start + 1, len(word)):
+        if word[index] not in VOWELS and word[index - 1] in VOWELS:
+            return index + 1
+    return len(word)
+
+
+def _remove(word, start, endings, after_a=()):
+    """Снимает самое длинное из окончаний, целиком лежащее в word[start:]; None — ничего не снято."""
+    best, conditional = '', False
+    for group, needs_a in ((endings, False), (after_a, True)):
+        for ending in group:
+            if len(ending) > len(best) and word.endswith(ending) and len(word) - len(ending) >= start:
+                best, conditional = ending, needs_a
+    if not best:
+        return None
+    stem = word[:-len(best)]
+    if conditional and not (len(stem) > start and stem[-1] in 'ая'):
+        return None
+    return stem
+
+
+def stem(word):
+    """Основа русского слова (алгоритм Snowball); латиница и числа возвращаются как есть."""
+    word = word.lower().replace('ё', 'е')
+    rv = next((index + 1 for index, char in enumerate(word) if char in VOWELS), len(word))
+    if rv >= len(word):
+        return word
+    r2 = _region_after_consonant(word, _region_after_consonant(word, 0))
+
+    result = _remove(word, rv, PERFECTIVE_GERUND, PERFECTIVE_GERUND_AFTER_A)
+    if result is None:
+        word = _remove(word, rv, REFLEXIVE) or word
+        result = _remove(word, rv, ADJECTIVE)
+        if result is not None:
+            result = _remove(result, rv, PARTICIPLE, PARTICIPLE_AFTER_A) or result
+        else:
+            result = _remove(word, rv, VERB, VERB_AFTER_A)
+            if result is None:
+                result = _remove(word, rv, NOUN)
+    word = result if result is not None else word
+
+    if word.endswith('и') and len(word) - 1 >= rv:
+        word = word[:-1]
+    derivational = _remove(word, max(rv, r2), DERIVATIONAL)
+    if derivational is not None:
+        word = derivational
+    superlative = _remove(word, rv, SUPERLATIVE)
+    if superlative is not None:
+        word = superlative
+    if word.endswith('нн') and len(word) - 1 >= rv:
+        word = word[:-1]
+    elif superlative is None and word.endswith('ь') and len(word) - 1 >= rv:
+        word = word[:-1]
+    return word
+
+
+def terms(text):
+    return ' '.join(stem(word) for word in WORD_RE.findall(text or ''))
+
+
+def highlight(text, stems, limit=SNIPPET_CHARS):
+    """Фрагмент text вокруг первого совпадения; совпавшие слова в <mark>, остальное экранировано."""
+    text = text or ''
+    matches = [match for match in WORD_RE.finditer(text) if stem(match.group()) in stems]
+    start = 0
+    if matches and matches[0].start() > limit // 3:
+        start = text.rfind(' ', 0, matches[0].start() - limit // 3) + 1
+    end = min(len(text), start + limit)
+    parts, cursor = [], start
+    for match in matches:
+        if match.start() < start or match.end() > end:
+            continue
+        parts.append(html.escape(text[cursor:match.start()]))
+        parts.append(f'<mark>{html.escape(match.group())}</mark>')
+        cursor = match.end()
+    parts.append(html.escape(text[cursor:end]))
+    return ('…' if start else '') + ''.join(parts) + ('…' if end < len(text) else '')
+
+
+def _content_block_text(blocks):
+    if not isinstance(blocks, list):
+        return ''
+    return '\n'.join(
+        str(block.get(key) or '')
+        for block in blocks if isinstance(block, dict)
+        for key in ('text', 'caption') if block.get(key)
+    )
+
+
+def _entry(kind, object_id, title='', body='', **fields):
+    body = (body or '')[:MAX_BODY_CHARS]
+    entry = SearchEntry(kind=kind, object_id=object_id, title=(title or '')[:255], body=body, **fields)
+    if connection.vendor == 'sqlite':
+        # В Postgres tsvector считает сама база (генерируемый столбец), в SQLite стеммер — наш.
+        entry.title_terms = terms(entry.title)
+        entry.body_terms = terms(body)
+    return entry
+
+
+def _attachment_text(instance, attachment_text):
+    # Текст вложения готовит воркер (messenger.extraction); None — взять уже извлеченный, если есть.
+    if attachment_text is None:
+        attachment_text = texts_for([instance.attachment.name]).get(instance.attachment.name, '') if instance.attachment else ''
+    return attachment_text
+
+
+def _join(*parts):
+    return '\n'.join(part for part in parts if part)
+
+
+def message_entry(message, room_type=None, attachment_text=None):
+    if room_type is None:
+        room_type = message.room.room_type if message.room_id else ''
+    return _entry(
+        'message', message.id, message.attachment_name, _join(message.text, _attachment_text(message, attachment_text)),
+        group_id=message.group_id, room_id=message.room_id, room_type=room_type, created_at=message.created_at,
+    )
+
+
+def comment_entry(comment, teacher_user_id=None):
+    if teacher_user_id is None:
+        teacher_user_id = MethodAssignment.objects.filter(pk=comment.assignment_id).values_list('teacher__user_id', flat=True).first()
+    return _entry('comment', comment.id, '', comment.text, teacher_user_id=teacher_user_id, created_at=comment.created_at)
+
+
+def method_entry(method, attachment_text=None):
+    body = _join(method.description, _content_block_text(method.content_blocks), _attachment_text(method, attachment_text))
+    return _entry('method', method.id, method.title, body, created_at=method.updated_at)
+
+
+def save_entry(entry):
+    """Вставка или замена строки индекса (FTS5-триггеры и генерируемый tsvector обновятся сами)."""
+    fields = [field.attname for field in SearchEntry._meta.concrete_fields if field.attname != 'id']
+    SearchEntry.objects.update_or_create(
+        kind=entry.kind, object_id=entry.object_id,
+        defaults={name: getattr(entry, name) for name in fields if name not in ('kind', 'object_id')},
+    )
+
+
+def index_messages(messages):
+    """Индекс для сообщений, записанных bulk_create (сигналы post_save не срабатывают)."""
+    missing = {message.room_id for message in messages if message.room_id and not message._meta.get_field('room').is_cached(message)}
+    room_types = dict(ChatRoom.objects.filter(pk__in=missing).values_list('id', 'room_type')) if missing else {}
+    texts = texts_for(message.attachment.name for message in messages if message.attachment)
+    entries = [
+        message_entry(
+            message, room_types.get(message.room_id) if message.room_id in room_types else None,
+            texts.get(message.attachment.name, ''),
+        )
+        for message in messages if message.text or message.attachment_name
+    ]
+    SearchEntry.objects.bulk_create(entries, batch_size=500)
+
+
+def reindex_attachment(source, text):
+    """Добавляет извлеченный текст вложения в строки индекса всех сообщений и методпакетов с этим файлом."""
+    for message in Message.objects.filter(attachment=source).select_related('room').iterator():
+        save_entry(message_entry(message, attachment_text=text))
+    for method in MethodPackage.objects.filter(attachment=source).iterator():
+        save_entry(method_entry(method, attachment_text=text))
+
+
+def remove(kind, object_id):
+    SearchEntry.objects.filter(kind=kind, object_id=object_id).delete()
+
+
+def query_terms(query):
+    return [word.lower().replace('ё', 'е') for word in WORD_RE.findall(query or '')][:12]
+
+
+def _match_expression(words):
+    stems = [stem(word) for word in words]
+    if connection.vendor == 'sqlite':
+        # Последнее слово — префиксом: находится, пока пользователь его допечатывает.
+        return ' AND '.join(f'"{item}"' for item in stems[:-1]) + (' AND ' if len(stems) > 1 else '') + f'"{stems[-1]}"*'
+    return ' & '.join(words[:-1] + [f'{words[-1]}:*'])
+
+
+def search(query, scope, page=1, page_size=20):
+    """
+    Ранжированный поиск по индексу. scope — список (sql, params) условий доступа по таблице
+    messenger_searchentry (алиас e), объединяемых через OR. Возвращает (count, [(entry, snippet)]).
+    """
+    words = query_terms(query)
+    if not words or not scope:
+        return 0, []
+    stems = {stem(word) for word in words}
+    scope_sql = ' OR '.join(f'({sql})' for sql, _ in scope)
+    scope_params = [param for _, params in scope for param in params]
+    match = _match_expression(words)
+    table = SearchEntry._meta.db_table
+    if connection.vendor == 'sqlite':
+        source = f'{table}_fts JOIN {table} e ON e.id = {table}_fts.rowid'
+        condition = f'{table}_fts MATCH %s'
+        # bm25: меньше — лучше; совпадение в заголовке весит вдвое больше.
+        score, order = f'bm25({table}_fts, 2.0, 1.0)', 'score'
+    elif connection.vendor == 'postgresql':
+        source = f"{table} e, to_tsquery('russian', %s) query"
+        condition = 'e.search_vector @@ query'
+        score, order = 'ts_rank(e.search_vector, query)', 'score DESC'
+    else:
+        raise NotImplementedError('Полнотекстовый поиск есть только для SQLite (FTS5) и Postgres.')
+
+    where = f'{condition} AND ({scope_sql})'
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT COUNT(*) FROM {source} WHERE {where}', [match, *scope_params])
+        count = cursor.fetchone()[0]
+        cursor.execute(
+            f'SELECT e.id, {score} AS score FROM {source} WHERE {where} ORDER BY {order}, e.created_at DESC LIMIT %s OFFSET %s',
+            [match, *scope_params, page_size, (page - 1) * page_size],
+        )
+        ids = [row[0] for row in cursor.fetchall()]
+    entries = SearchEntry.objects.in_bulk(ids)
+    results = []
+    for pk in ids:
+        entry = entries[pk]
+        results.append((entry, highlight(entry.body or entry.title, stems)))
+    return count, results
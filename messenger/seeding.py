@@ -0,0 +1,235 @@
+import random
+from datetime import date, time, timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from .models import (
+    ChatRoom,
+    Group,
+    Holiday,
+    LessonTopic,
+    Message,
+    MethodAssignment,
+    MethodPackage,
+    Parent,
+    ScheduleSlot,
+    Student,
+    Subject,
+    Teacher,
+    UserProfile,
+)
+
+User = get_user_model()
+
+METHODS_PER_SUBJECT = 12
+LESSON_TIMES = (time(10, 0), time(12, 0), time(14, 0), time(16, 0))
+ATTACHMENT_NAMES = ('homework.pdf', 'photo.jpg', 'schedule.xlsx', 'notes.docx')
+SENDERS = {
+    'parents': ('parent', 'teacher'),
+    'students': ('student', 'teacher'),
+    'management': ('manager', 'teacher'),
+}
+DEFAULTS = {
+    'groups': 20,
+    'teachers': 0,  # 0 — по одному преподавателю на две группы
+    'students_per_group': 12,
+    'parents_per_student': 1,
+    'messages_per_room': 50,
+    'attachment_ratio': 0.1,
+    'subjects': 4,
+    'weeks': 16,
+    'lessons_per_week': 2,
+    'holidays': 8,
+}
+
+
+def seed_usernames(prefix):
+    """Служебные учетки, по которым bench находит пользователей нужных ролей."""
+    return {
+        'admin': f'{prefix}-admin',
+        'manager': f'{prefix}-manager',
+        'methodist': f'{prefix}-methodist',
+        'teacher': f'{prefix}-t0',
+        'parent': f'{prefix}-p0',
+        'student': f'{prefix}-s0',
+    }
+
+
+def term_start(today=None):
+    # Половина четверти уже прошла: в расписании есть и прошедшие, и будущие занятия.
+    today = today or date.today()
+    return today - timedelta(days=today.weekday()) - timedelta(weeks=4)
+
+
+def flush_school(prefix):
+    """Удаляет данные, созданные seed_school с тем же префиксом."""
+    with transaction.atomic():
+        Group.objects.filter(name__startswith=f'{prefix} ').delete()
+        Teacher.objects.filter(user__username__startswith=f'{prefix}-').delete()
+        Parent.objects.filter(user__username__startswith=f'{prefix}-').delete()
+        MethodPackage.objects.filter(subject__name__startswith=f'{prefix} ').delete()
+        Subject.objects.filter(name__startswith=f'{prefix} ').delete()
+        Holiday.objects.filter(title__startswith=f'{prefix} ').delete()
+        User.objects.filter(username__startswith=f'{prefix}-').delete()
+
+
+def _users(prefix, role, count, password):
+    users = User.objects.bulk_create([
+        User(username=f'{prefix}-{role[0]}{i}', first_name=role, last_name=str(i), password=password)
+        for i in range(count)
+    ])
+    UserProfile.objects.bulk_create([UserProfile(user=user, role=role) for user in users])
+    return users
+
+
+def seed_school(prefix='seed', password='seed-password', random_seed=0, **options):
+    """
+    Наполняет базу школой заданного размера. Все строки вставляются bulk_create,
+    поэтому сигналы (создание учеток, чатов, updated_at у связей) не срабатывают.
+    Возвращает число созданных записей по моделям.
+    """
+    opts = {**DEFAULTS, **{key: value for key, value in options.items() if value is not None}}
+    rnd = random.Random(random_seed)
+    password_hash = make_password(password)
+    group_count = opts['groups']
+    teacher_count = opts['teachers'] or max(1, (group_count + 1) // 2)
+    student_count = group_count * opts['students_per_group']
+    parent_count = student_count * opts['parents_per_student']
+    start = term_start()
+    counts = {}
+
+    with transaction.atomic():
+        staff = User.objects.bulk_create([
+            User(username=username, password=password_hash, is_staff=role == 'admin')
+            for role, username in seed_usernames(prefix).items()
+            if role in ('admin', 'manager', 'methodist')
+        ])
+        UserProfile.objects.bulk_create([
+            UserProfile(user=user, role=user.username.rsplit('-', 1)[1]) for user in staff
+        ])
+        admin = staff[0]
+
+        groups = Group.objects.bulk_create([Group(name=f'{prefix} {i + 1}') for i in range(group_count)])
+        rooms = ChatRoom.objects.bulk_create([
+            ChatRoom(group=group, room_type=room_type) for group in groups for room_type in SENDERS
+        ])
+
+        teachers = Teacher.objects.bulk_create([
+            Teacher(first_name='Преподаватель', last_name=str(i), user=user)
+            for i, user in enumerate(_users(prefix, 'teacher', teacher_count, password_hash))
+        ])
+        parents = Parent.objects.bulk_create([
+            Parent(first_name='Родитель', last_name=str(i), user=user)
+            for i, user in enumerate(_users(prefix, 'parent', parent_count, password_hash))
+        ])
+        students = Student.objects.bulk_create([
+            Student(first_name='Ученик', last_name=str(i), group=groups[i % group_count], user=user)
+            for i, user in enumerate(_users(prefix, 'student', student_count, password_hash))
+        ])
+
+        # Каждая группа достается двум преподавателям, у каждого ученика свои родители.
+        teacher_groups = Teacher.groups.through
+        teacher_groups.objects.bulk_create([
+            teacher_groups(teacher_id=teachers[(i + shift) % teacher_count].id, group_id=group.id)
+            for i, group in enumerate(groups)
+            for shift in range(min(2, teacher_count))
+        ], ignore_conflicts=True)
+        student_parents = Student.parents.through
+        student_parents.objects.bulk_create([
+            student_parents(student_id=student.id, parent_id=parents[i * opts['parents_per_student'] + n].id)
+            for i, student in enumerate(students)
+            for n in range(opts['parents_per_student'])
+        ])
+
+        subjects = Subject.objects.bulk_create([
+            Subject(name=f'{prefix} предмет {i + 1}') for i in range(opts['subjects'])
+        ])
+        methods = MethodPackage.objects.bulk_create([
+            MethodPackage(subject=subject, method_number=n + 1, title=f'{subject.name}: урок {n + 1}')
+            for subject in subjects
+            for n in range(METHODS_PER_SUBJECT)
+        ])
+        topics = LessonTopic.objects.bulk_create([
+            LessonTopic(name=f'{method.title} (тема)', subject=method.subject, method_package=method)
+            for method in methods
+        ])
+        topic_by_method = {topic.method_package_id: topic for topic in topics}
+
+        slots = []
+        for i, group in enumerate(groups):
+            subject_methods = methods[(i % len(subjects)) * METHODS_PER_SUBJECT:][:METHODS_PER_SUBJECT] if subjects else []
+            lesson_number = 0
+            for week in range(opts['weeks']):
+                for n in range(opts['lessons_per_week']):
+                    lesson_date = start + timedelta(weeks=week, days=(i + n * 2) % 5)
+                    method = subject_methods[lesson_number % len(subject_methods)] if subject_methods else None
+                    lesson_number += 1
+                    slots.append(ScheduleSlot(
+                        group=group,
+                        lesson_date=lesson_date,
+                        weekday=lesson_date.weekday(),
+                        lesson_number=lesson_number,
+                        start_time=LESSON_TIMES[(i + n) % len(LESSON_TIMES)],
+                        method_package=method,
+                        lesson_topic=topic_by_method.get(method.id) if method else None,
+                    ))
+        ScheduleSlot.objects.bulk_create(slots, batch_size=2000)
+
+        term_days = [start + timedelta(days=day) for day in range(opts['weeks'] * 7)]
+        holiday_dates = rnd.sample(term_days, min(opts['holidays'], len(term_days)))
+        existing = set(Holiday.objects.filter(date__in=holiday_dates).values_list('date', flat=True))
+        holidays = Holiday.objects.bulk_create([
+            Holiday(date=day, title=f'{prefix} выходной') for day in sorted(holiday_dates) if day not in existing
+        ])
+
+        messages = []
+        for room in rooms:
+            sender_types = SENDERS[room.room_type]
+            for n in range(opts['messages_per_room']):
+                sender_type = sender_types[n % len(sender_types)]
+                message = Message(
+                    group_id=room.group_id,
+                    room=room,
+                    sender_type=sender_type,
+                    sender_name=f'{sender_type} {n % 7}',
+                    text=f'Сообщение {n + 1} в чате «{room.get_room_type_display()}»',
+                )
+                if rnd.random() < opts['attachment_ratio']:
+                    # Только метаданные: сами файлы для нагрузочных сценариев не нужны.
+                    name = rnd.choice(ATTACHMENT_NAMES)
+                    message.attachment.name = f'chat_attachments/{prefix}/{room.id}-{n}-{name}'
+                    message.attachment_name = name
+                messages.append(message)
+        Message.objects.bulk_create(messages, batch_size=2000)
+        ChatRoom.record_messages(messages)
+
+        assignments = MethodAssignment.objects.bulk_create([
+            MethodAssignment(
+                method_package=method,
+                teacher=teacher,
+                granted_by=admin,
+                deadline=start + timedelta(weeks=n),
+                status='done' if n < 2 else ('in_progress' if n == 2 else 'todo'),
+            )
+            for i, teacher in enumerate(teachers)
+            if subjects
+            for n, method in enumerate(methods[(i % len(subjects)) * METHODS_PER_SUBJECT:][:METHODS_PER_SUBJECT])
+        ])
+
+    counts.update({
+        'groups': len(groups),
+        'teachers': len(teachers),
+        'parents': len(parents),
+        'students': len(students),
+        'chat_rooms': len(rooms),
+        'messages': len(messages),
+        'attachments': sum(1 for message in messages if message.attachment_name),
+        'subjects': len(subjects),
+        'method_packages': len(methods),
+        'schedule_slots': len(slots),
+        'holidays': len(holidays),
+        'method_assignments': len(assignments),
+    })
+    return counts
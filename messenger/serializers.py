@@ -1,11 +1,20 @@
 from rest_framework import serializers
 import re
 from django.contrib.auth import get_user_model
+from django.urls import reverse
 
-from .models import Group, Teacher, Parent, Student, MethodPackage, ScheduleSlot, ChatRoom, Message, Event, FeedPost, MethodAssignment, MethodAssignmentComment, UserProfile, Holiday, Subject, LessonTopic
+from . import previews
+
+from .models import Group, Teacher, Parent, Student, MethodPackage, ScheduleSlot, ChatRoom, Message, Event, FeedPost, MethodAssignment, MethodAssignmentComment, UserProfile, Holiday, Subject, LessonTopic, Task
 User = get_user_model()
 
 
+def _protected_url(request, view_name, obj):
+    # Вложения отдаются только через эндпоинт с проверкой прав, а не прямой ссылкой на /media/.
+    url = reverse(view_name, args=[obj.pk])
+    return request.build_absolute_uri(url) if request else url
+
+
 def _normalize_phone(phone: str) -> str:
     if not phone:
         return ''
@@ -38,6 +47,7 @@ class SubjectSerializer(serializers.ModelSerializer):
 
 class MethodPackageSerializer(serializers.ModelSerializer):
     subject_name = serializers.CharField(source='subject.name', read_only=True)
+    attachment_url = serializers.SerializerMethodField()
 
     def validate(self, attrs):
         subject = attrs.get('subject', getattr(self.instance, 'subject', None))
@@ -57,7 +67,11 @@ class MethodPackageSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = MethodPackage
-        fields = ['id', 'subject', 'subject_name', 'method_number', 'title', 'description', 'material_url', 'content_blocks', 'attachment']
+        fields = ['id', 'subject', 'subject_name', 'method_number', 'title', 'description', 'material_url', 'content_blocks', 'attachment', 'attachment_url']
+        extra_kwargs = {'attachment': {'write_only': True}}
+
+    def get_attachment_url(self, obj):
+        return _protected_url(self.context.get('request'), 'methodpackage-attachment', obj) if obj.attachment else ''
 
 
 class LessonTopicSerializer(serializers.ModelSerializer):
@@ -192,12 +206,16 @@ class ChatRoomSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = ChatRoom
-        fields = ['id', 'group', 'group_name', 'room_type', 'room_label', 'created_at']
+        fields = [
+            'id', 'group', 'group_name', 'room_type', 'room_label', 'created_at',
+            'last_message_id', 'last_message_at', 'last_message_preview', 'message_count',
+        ]
 
 
 class MessageSerializer(serializers.ModelSerializer):
     room_type = serializers.CharField(source='room.room_type', read_only=True)
     attachment_url = serializers.SerializerMethodField()
+    thumbnail_url = serializers.SerializerMethodField()
 
     class Meta:
         model = Message
@@ -206,26 +224,48 @@ class MessageSerializer(serializers.ModelSerializer):
             'group',
             'room',
             'room_type',
+            'sender',
             'sender_type',
             'sender_name',
             'text',
             'attachment',
             'attachment_name',
             'attachment_url',
+            'thumbnail_url',
             'created_at',
         ]
-        read_only_fields = ['group', 'room', 'room_type', 'sender_type', 'sender_name']
+        read_only_fields = ['group', 'room', 'room_type', 'sender', 'sender_type', 'sender_name']
+        # Ссылку на /media/ не отдаем: файл доступен только через attachment_url.
+        extra_kwargs = {'attachment': {'write_only': True}}
 
     def get_attachment_url(self, obj):
-        if not obj.attachment:
+        return _protected_url(self.context.get('request'), 'message-attachment', obj) if obj.attachment else ''
+
+    def get_thumbnail_url(self, obj):
+        if not obj.attachment or not previews.supports(obj.attachment_name or obj.attachment.name):
             return ''
-        request = self.context.get('request')
-        if request:
-            return request.build_absolute_uri(obj.attachment.url)
-        return obj.attachment.url
+        return _protected_url(self.context.get('request'), 'message-thumbnail', obj)
+
 
+class MediaThumbnailMixin(serializers.Serializer):
+    thumbnail_url = serializers.SerializerMethodField()
+    media_file_url = serializers.SerializerMethodField()
 
-class EventSerializer(serializers.ModelSerializer):
+    def get_media_file_url(self, obj):
+        # media_url загруженного файла — имя в хранилище; открывать его нужно через эндпоинт с проверкой прав.
+        if obj.media_type == 'none' or not previews.media_name(obj.media_url):
+            return ''
+        return _protected_url(self.context.get('request'), f'{obj._meta.model_name}-media', obj)
+
+    def get_thumbnail_url(self, obj):
+        name = previews.media_name(obj.media_url) if obj.media_type == 'image' else ''
+        if not name or not previews.supports(name):
+            return ''
+        view_name = f'{obj._meta.model_name}-thumbnail'
+        return _protected_url(self.context.get('request'), view_name, obj)
+
+
+class EventSerializer(MediaThumbnailMixin, serializers.ModelSerializer):
     group_name = serializers.CharField(source='group.name', read_only=True)
 
     class Meta:
@@ -239,11 +279,13 @@ class EventSerializer(serializers.ModelSerializer):
             'event_date',
             'media_type',
             'media_url',
+            'media_file_url',
+            'thumbnail_url',
             'created_at',
         ]
 
 
-class FeedPostSerializer(serializers.ModelSerializer):
+class FeedPostSerializer(MediaThumbnailMixin, serializers.ModelSerializer):
     group_name = serializers.CharField(source='group.name', read_only=True)
 
     class Meta:
@@ -256,6 +298,8 @@ class FeedPostSerializer(serializers.ModelSerializer):
             'text',
             'media_type',
             'media_url',
+            'media_file_url',
+            'thumbnail_url',
             'created_at',
         ]
 
@@ -365,3 +409,16 @@ class UserProfileSerializer(serializers.ModelSerializer):
             setattr(instance, key, value)
         instance.save()
         return instance
+
+
+class TaskSerializer(serializers.ModelSerializer):
+    error = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Task
+        fields = ['id', 'name', 'status', 'attempts', 'max_attempts', 'result', 'error', 'created_at', 'updated_at', 'finished_at']
+
+    def get_error(self, obj):
+        # Только последняя строка трейсбека: полный текст есть в админке и логе воркера.
+        lines = [line for line in obj.last_error.splitlines() if line.strip()]
+        return lines[-1] if lines else ''
@@ -2,11 +2,22 @@ import secrets
 import string
 
 from django.contrib.auth import get_user_model
-from django.db.models.signals import post_save
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.db.models import F
+from django.db.models.functions import Greatest
 from django.dispatch import receiver
+from django.utils import timezone
 from django.utils.text import slugify
 
-from .models import Teacher, Parent, Student, UserProfile, Group, ChatRoom
+from . import extraction, previews, search
+from .models import (
+    Teacher, Parent, Student, UserProfile, Group, ChatRoom, Message, MethodPackage, MethodAssignment, MethodAssignmentComment,
+    FeedPost, Event, ScheduleSlot, ArchivedAttachment, ArchivedMessageChunk, SearchEntry,
+)
+from .sync import COLLECTION_BY_MODEL, record_tombstone, scopes_of
+from .taskqueue import enqueue
 
 User = get_user_model()
 
@@ -58,6 +69,15 @@ def _ensure_profile(user, role: str):
     UserProfile.objects.get_or_create(user=user, defaults={'role': role})
 
 
+def _queue_password_hash(instance, user):
+    # PBKDF2 — самая дорогая часть создания учетки: хеш считает воркер, вход заработает после него.
+    enqueue(
+        'set_initial_password',
+        {'model': instance._meta.label, 'pk': instance.pk},
+        idempotency_key=f'initial-password:{user.pk}',
+    )
+
+
 def _ensure_group_chat_rooms(group: Group):
     ChatRoom.objects.get_or_create(group=group, room_type='parents')
     ChatRoom.objects.get_or_create(group=group, room_type='students')
@@ -77,14 +97,15 @@ def create_parent_user(sender, instance: Parent, created, **kwargs):
     username = _unique_username(base)
     password = _random_password()
 
-    user = User.objects.create(username=username, first_name=instance.first_name, last_name=instance.last_name, email=instance.email)
-    user.set_password(password)
-    user.save(update_fields=['password', 'first_name', 'last_name', 'email'])
+    user = User(username=username, first_name=instance.first_name, last_name=instance.last_name, email=instance.email)
+    user.set_unusable_password()
+    user.save()
 
     instance.user = user
     instance.initial_password = password
     instance.save(update_fields=['user', 'initial_password'])
     _ensure_profile(user, 'parent')
+    _queue_password_hash(instance, user)
 
 
 @receiver(post_save, sender=Student)
@@ -95,14 +116,15 @@ def create_student_user(sender, instance: Student, created, **kwargs):
     username = _unique_username(base)
     password = _random_password()
 
-    user = User.objects.create(username=username, first_name=instance.first_name, last_name=instance.last_name)
-    user.set_password(password)
-    user.save(update_fields=['password', 'first_name', 'last_name'])
+    user = User(username=username, first_name=instance.first_name, last_name=instance.last_name)
+    user.set_unusable_password()
+    user.save()
 
     instance.user = user
     instance.initial_password = password
     instance.save(update_fields=['user', 'initial_password'])
     _ensure_profile(user, 'student')
+    _queue_password_hash(instance, user)
 
 
 @receiver(post_save, sender=Teacher)
@@ -113,11 +135,294 @@ def create_teacher_user(sender, instance: Teacher, created, **kwargs):
     username = _unique_username(base)
     password = _random_password()
 
-    user = User.objects.create(username=username, first_name=instance.first_name, last_name=instance.last_name, email=instance.email)
-    user.set_password(password)
-    user.save(update_fields=['password', 'first_name', 'last_name', 'email'])
+    user = User(username=username, first_name=instance.first_name, last_name=instance.last_name, email=instance.email)
+    user.set_unusable_password()
+    user.save()
 
     instance.user = user
     instance.initial_password = password
     instance.save(update_fields=['user', 'initial_password'])
     _ensure_profile(user, 'teacher')
+    _queue_password_hash(instance, user)
+
+
+@receiver(m2m_changed, sender=Teacher.groups.through)
+@receiver(m2m_changed, sender=Student.parents.through)
+def touch_m2m_sides(sender, instance, action, reverse, model, pk_set, **kwargs):
+    # Изменение M2M не вызывает save(), а ETag/синхронизация опираются на updated_at обеих сторон.
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    now = timezone.now()
+    type(instance).objects.filter(pk=instance.pk).update(updated_at=now)
+    if pk_set:
+        model.objects.filter(pk__in=pk_set).update(updated_at=now)
+
+
+# Журнал удалений для /api/sync/ ведется по областям видимости (group:<id>, user:<id>): запись,
+# ушедшая из группы, для этой группы тоже считается удаленной.
+
+@receiver(pre_delete)
+def remember_sync_scopes(sender, instance, **kwargs):
+    if sender in COLLECTION_BY_MODEL:
+        # После удаления связей M2M (группы преподавателя, дети родителя) области уже не узнать.
+        instance._sync_scopes = scopes_of(instance)
+
+
+@receiver(post_delete)
+def record_sync_tombstone(sender, instance, **kwargs):
+    if sender in COLLECTION_BY_MODEL:
+        record_tombstone(instance, getattr(instance, '_sync_scopes', None))
+
+
+# Поле, от которого зависит область записи: смена группы или преподавателя — уход из прежней области.
+SCOPE_FIELDS = {
+    Student: 'group_id',
+    ScheduleSlot: 'group_id',
+    Event: 'group_id',
+    FeedPost: 'group_id',
+    MethodAssignment: 'teacher_id',
+}
+
+
+@receiver(pre_save)
+def remember_previous_scope(sender, instance, update_fields=None, **kwargs):
+    # Единственный запрос прежней строки при сохранении: область для журнала и, у ученика, прежняя группа.
+    field = SCOPE_FIELDS.get(sender)
+    if field is None or instance._state.adding:
+        return
+    if update_fields is not None and not {field, field.removesuffix('_id')} & set(update_fields):
+        return
+    previous = sender.objects.filter(pk=instance.pk).values_list(field, flat=True).first()
+    if previous is None or previous == getattr(instance, field):
+        return
+    instance._previous_scope = (previous, scopes_of(sender(pk=instance.pk, **{field: previous})))
+    if sender is Student:
+        # Список учеников прежней группы изменился без ее save().
+        Group.objects.filter(pk=previous).update(updated_at=timezone.now())
+
+
+@receiver(post_save)
+def record_scope_exit(sender, instance, **kwargs):
+    previous = instance.__dict__.pop('_previous_scope', None)
+    if previous is None:
+        return
+    previous_value, previous_scopes = previous
+    left = sorted(set(previous_scopes) - set(scopes_of(instance)))
+    if left:
+        record_tombstone(instance, left)
+    if sender is Student:
+        _record_parent_exits({(parent_id, previous_value) for parent_id in instance.parents.values_list('pk', flat=True)})
+
+
+def _record_parent_exits(pairs):
+    """pairs — (родитель, группа), где у родителя пропал ребенок: без других детей в группе родитель из нее уходит."""
+    pairs = {(parent_id, group_id) for parent_id, group_id in pairs if group_id}
+    if not pairs:
+        return
+    parent_ids = {parent_id for parent_id, _ in pairs}
+    still = set(
+        Student.parents.through.objects
+        .filter(parent_id__in=parent_ids, student__group_id__in={group_id for _, group_id in pairs})
+        .values_list('parent_id', 'student__group_id')
+    )
+    for parent_id, group_id in sorted(pairs - still):
+        record_tombstone(Parent(pk=parent_id), [f'group:{group_id}'])
+    # Родитель в других группах пользователя остается: updated_at вернет его в дельту.
+    Parent.objects.filter(pk__in=parent_ids).update(updated_at=timezone.now())
+
+
+@receiver(m2m_changed, sender=Teacher.groups.through)
+def record_teacher_group_exit(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('pre_remove', 'pre_clear'):
+        return
+    links = sender.objects.filter(**({'group_id': instance.pk} if reverse else {'teacher_id': instance.pk}))
+    if pk_set is not None:
+        links = links.filter(**({'teacher_id__in': pk_set} if reverse else {'group_id__in': pk_set}))
+    for teacher_id, group_id in links.values_list('teacher_id', 'group_id'):
+        record_tombstone(Teacher(pk=teacher_id), [f'group:{group_id}'])
+
+
+@receiver(m2m_changed, sender=Student.parents.through)
+def record_parent_exit(sender, instance, action, reverse, pk_set, **kwargs):
+    # Пары (родитель, группа) запоминаем до удаления связей, проверяем после.
+    if action in ('pre_remove', 'pre_clear'):
+        links = sender.objects.filter(**({'parent_id': instance.pk} if reverse else {'student_id': instance.pk}))
+        if pk_set is not None:
+            links = links.filter(**({'student_id__in': pk_set} if reverse else {'parent_id__in': pk_set}))
+        instance._unlinked_parents = set(links.values_list('parent_id', 'student__group_id'))
+    elif action in ('post_remove', 'post_clear'):
+        _record_parent_exits(instance.__dict__.pop('_unlinked_parents', set()))
+
+
+# Ниже — поддержание updated_at у родительских записей, чьи вложенные списки
+# (группа -> ученики/преподаватели, ученик -> родители) меняются без save() самой записи.
+# Прежнюю группу ученика при переводе обновляет remember_previous_scope.
+
+@receiver(post_delete, sender=Student)
+def touch_student_group(sender, instance: Student, **kwargs):
+    Group.objects.filter(pk=instance.group_id).update(updated_at=timezone.now())
+
+
+@receiver(pre_delete, sender=Teacher)
+def touch_teacher_groups(sender, instance: Teacher, **kwargs):
+    Group.objects.filter(teachers=instance).update(updated_at=timezone.now())
+
+
+@receiver(pre_delete, sender=Parent)
+def touch_parent_children(sender, instance: Parent, **kwargs):
+    Student.objects.filter(parents=instance).update(updated_at=timezone.now())
+
+
+# Файлы вложений: при удалении записи или замене файла ссылка освобождается после коммита
+# (в хранилище с дедупликацией это уменьшает refcount, сам файл удаляется с последней ссылкой).
+
+def _file_in_use(name):
+    return (
+        Message.objects.filter(attachment=name).exists()
+        or MethodPackage.objects.filter(attachment=name).exists()
+        or ArchivedAttachment.objects.filter(name=name).exists()
+        or FeedPost.objects.filter(media_url__endswith=name).exists()
+        or Event.objects.filter(media_url__endswith=name).exists()
+    )
+
+
+def release_file(storage, name):
+    def release():
+        # Без счетчика ссылок (файлы вне blobs/) один файл может быть у нескольких записей — например, у рассылки.
+        is_counted = getattr(storage, 'is_blob', lambda name: False)(name)
+        if not is_counted and _file_in_use(name):
+            return
+        storage.delete(name)
+        previews.release(name)
+        extraction.release(name)
+
+    if name:
+        transaction.on_commit(release)
+
+
+@receiver(post_delete, sender=Message)
+@receiver(post_delete, sender=MethodPackage)
+def release_attachment(sender, instance, **kwargs):
+    release_file(instance.attachment.storage, instance.attachment.name)
+
+
+@receiver(post_delete, sender=ArchivedAttachment)
+def release_archived_attachment(sender, instance, **kwargs):
+    # Архив удаляется вместе с комнатой: тогда файл сообщения больше никому не нужен.
+    release_file(Message._meta.get_field('attachment').storage, instance.name)
+
+
+@receiver(pre_save, sender=Message)
+@receiver(pre_save, sender=MethodPackage)
+def release_replaced_attachment(sender, instance, **kwargs):
+    if instance._state.adding:
+        return
+    previous = sender.objects.filter(pk=instance.pk).values_list('attachment', flat=True).first()
+    if previous and previous != instance.attachment.name:
+        release_file(instance.attachment.storage, previous)
+
+
+# Медиа ленты и событий загружается через /api/upload/ и хранится в default_storage;
+# внешние ссылки media_name() не узнает, их не трогаем.
+
+@receiver(post_delete, sender=FeedPost)
+@receiver(post_delete, sender=Event)
+def release_media(sender, instance, **kwargs):
+    release_file(default_storage, previews.media_name(instance.media_url))
+
+
+@receiver(pre_save, sender=FeedPost)
+@receiver(pre_save, sender=Event)
+def release_replaced_media(sender, instance, **kwargs):
+    if instance._state.adding:
+        return
+    previous = sender.objects.filter(pk=instance.pk).values_list('media_url', flat=True).first()
+    if previous and previous != instance.media_url:
+        release_file(default_storage, previews.media_name(previous))
+
+
+# Сводка комнаты (последнее сообщение, счетчик) при создании обновляется в Message.save;
+# здесь — правка и удаление сообщения.
+
+@receiver(post_save, sender=Message)
+def update_room_preview(sender, instance, created, **kwargs):
+    if not created and instance.room_id:
+        ChatRoom.objects.filter(pk=instance.room_id, last_message_id=instance.id).update(
+            last_message_preview=ChatRoom.preview_for(instance), updated_at=timezone.now(),
+        )
+
+
+@receiver(post_delete, sender=Message)
+def update_room_summary(sender, instance, **kwargs):
+    if not instance.room_id:
+        return
+    rooms = ChatRoom.objects.filter(pk=instance.room_id)
+    rooms.update(message_count=Greatest(F('message_count') - 1, 0), updated_at=timezone.now())
+    if rooms.filter(last_message_id=instance.id).exists():
+        ChatRoom.refresh_summaries([instance.room_id])
+
+
+# Превью строит воркер сразу после загрузки; до этого их лениво строит эндпоинт .../thumbnail/.
+
+@receiver(post_save, sender=Message)
+def queue_attachment_preview(sender, instance, created, **kwargs):
+    if created and instance.attachment:
+        previews.queue(instance.attachment.name, instance.attachment_name)
+
+
+# Текст PDF/DOCX/TXT-вложений для поиска извлекает воркер, не запрос загрузки.
+
+@receiver(post_save, sender=Message)
+def queue_attachment_text(sender, instance, created, **kwargs):
+    if created and instance.attachment:
+        extraction.queue(instance.attachment.name, instance.attachment_name)
+
+
+@receiver(post_save, sender=MethodPackage)
+def queue_method_attachment_text(sender, instance, **kwargs):
+    if instance.attachment:
+        extraction.queue(instance.attachment.name)
+
+
+@receiver(post_save, sender=FeedPost)
+@receiver(post_save, sender=Event)
+def queue_media_preview(sender, instance, **kwargs):
+    if instance.media_type == 'image':
+        previews.queue(previews.media_name(instance.media_url))
+
+
+# Поисковый индекс (messenger.search) обновляется вместе с записью; bulk_create приема сообщений
+# индексирует сам ingest.
+
+SEARCH_ENTRIES = {
+    Message: ('message', search.message_entry),
+    MethodAssignmentComment: ('comment', search.comment_entry),
+    MethodPackage: ('method', search.method_entry),
+}
+
+
+@receiver(post_save, sender=Message)
+@receiver(post_save, sender=MethodAssignmentComment)
+@receiver(post_save, sender=MethodPackage)
+def index_for_search(sender, instance, created, **kwargs):
+    entry = SEARCH_ENTRIES[sender][1](instance)
+    if created:
+        if entry.body or entry.title:
+            entry.save(force_insert=True)
+        return
+    search.save_entry(entry)
+
+
+@receiver(post_delete, sender=Message)
+@receiver(post_delete, sender=MethodAssignmentComment)
+@receiver(post_delete, sender=MethodPackage)
+def remove_from_search(sender, instance, **kwargs):
+    search.remove(SEARCH_ENTRIES[sender][0], instance.pk)
+
+
+@receiver(post_delete, sender=ArchivedMessageChunk)
+def remove_archived_from_search(sender, instance, **kwargs):
+    # Архивные сообщения остаются в поиске, пока жив архив комнаты.
+    SearchEntry.objects.filter(
+        kind='message', room_id=instance.room_id, object_id__range=(instance.first_id, instance.last_id),
+    ).exclude(object_id__in=Message.objects.filter(room_id=instance.room_id).values('id')).delete()
@@ -0,0 +1,146 @@
+import json
+import logging
+import os
+import threading
+from collections import deque
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .db import observe_queries
+from .metrics import route_name
+
+logger = logging.getLogger('messenger.slow_queries')
+
+_EXPLAINABLE = ('select', 'with')
+_MAX_SQL = 5000
+_MAX_PARAMS = 1000
+
+
+class SlowQueryBuffer:
+    """Последние медленные запросы текущего процесса для /api/debug/slow-queries/."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = deque(maxlen=getattr(settings, 'SLOW_QUERY_BUFFER_SIZE', 200))
+
+    def add(self, entry):
+        with self._lock:
+            self._entries.append(entry)
+
+    def entries(self):
+        with self._lock:
+            return list(reversed(self._entries))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+buffer = SlowQueryBuffer()
+
+
+class RotatingLogFileHandler(RotatingFileHandler):
+    """RotatingFileHandler, который сам создает каталог лога при первой записи."""
+
+    def _open(self):
+        directory = os.path.dirname(os.path.abspath(self.baseFilename))
+        os.makedirs(directory, exist_ok=True)
+        return super()._open()
+
+
+def _view_info(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return None, None
+    actions = getattr(match.func, 'actions', None) or {}
+    return match._func_path, actions.get(request.method.lower())
+
+
+def explain(connection, sql, params):
+    """План запроса через EXPLAIN (SQLite: EXPLAIN QUERY PLAN, Postgres: опционально ANALYZE)."""
+    statement = sql.lstrip().lower()
+    if not statement.startswith(_EXPLAINABLE):
+        return None
+    options = {}
+    # ANALYZE выполняет запрос повторно: только для SELECT, ведь WITH может оказаться INSERT/UPDATE/DELETE.
+    if connection.vendor == 'postgresql' and getattr(settings, 'SLOW_QUERY_EXPLAIN_ANALYZE', False) and statement.startswith('select'):
+        options['analyze'] = True
+    prefix = connection.ops.explain_query_prefix(**options)
+    # Сырой курсор: EXPLAIN не должен попадать в execute_wrapper, connection.queries и счетчики тестов.
+    cursor = connection.create_cursor()
+    try:
+        cursor.execute(f'{prefix} {sql}', params)
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+    if connection.vendor == 'sqlite':
+        return '\n'.join(str(row[-1]) for row in rows)
+    return '\n'.join(' '.join(str(value) for value in row) for row in rows)
+
+
+class SlowQueryLogger:
+    def __init__(self, request, threshold):
+        self.request = request
+        self.threshold = threshold
+
+    def __call__(self, sql, params, many, context, elapsed, ok):
+        if elapsed >= self.threshold:
+            self.record(context['connection'], sql, params, many, elapsed, ok)
+
+    def record(self, connection, sql, params, many, elapsed, ok=True):
+        view, view_action = _view_info(self.request)
+        plan = None
+        # После ошибки транзакция Postgres может быть прервана: план не снимаем.
+        if ok and not many:
+            try:
+                plan = explain(connection, sql, params)
+            except Exception as exc:  # noqa: BLE001 — лог не должен ронять запрос
+                plan = f'EXPLAIN не удался: {exc}'
+        entry = {
+            'at': datetime.now().isoformat(timespec='milliseconds'),
+            'duration_ms': round(elapsed * 1000, 3),
+            'database': connection.alias,
+            'sql': sql[:_MAX_SQL],
+            'params': repr(params)[:_MAX_PARAMS],
+            'many': many,
+            'route': route_name(self.request),
+            'view': view,
+            'action': view_action,
+            'method': self.request.method,
+            'path': self.request.path,
+            'explain': plan,
+        }
+        buffer.add(entry)
+        logger.warning(json.dumps(entry, ensure_ascii=False))
+
+
+class SlowQueryMiddleware:
+    """Пишет SQL дольше SLOW_QUERY_MS в ротируемый лог и кольцевой буфер вместе с планом запроса."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if getattr(settings, 'SLOW_QUERY_MS', 200) < 0:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def _logger(self, request):
+        return SlowQueryLogger(request, getattr(settings, 'SLOW_QUERY_MS', 200) / 1000)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        with observe_queries(self._logger(request)):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        with observe_queries(self._logger(request)):
+            return await self.get_response(request)
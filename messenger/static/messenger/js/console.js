@@ -0,0 +1,582 @@
+const CONSOLE_CREATE_ROOT = document.body.dataset.consoleCreateRoot || '/console/create/';
+const tokenInput = document.getElementById('token');
+const status = (id, text) => { const el = document.getElementById(id); if (el) el.textContent = text; };
+const navBtns = document.querySelectorAll('.nav-btn');
+const createBtns = document.querySelectorAll('.create-btn');
+const roleJumpBtns = document.querySelectorAll('.role-jump');
+const cache = { groups: [], parents: [], students: [], teachers: [], methodists: [], managers: [], subjects: [], lessons: [], methods: [], schedule: [], assignments: [], events: [], feed: [], holidays: [] };
+const weekday = ['Пн', 'Вт', 'Ср', 'Чт', 'Пт', 'Сб', 'Вс'];
+const params = new URLSearchParams(window.location.search);
+const requestedTab = String(params.get('tab') || '').trim();
+const consoleTabStorageKey = `console_active_tab:${CONSOLE_CREATE_ROOT}`;
+const tokenFromQuery = params.get('token') || '';
+const tokenFromStorage = localStorage.getItem('consoleAccessToken') || '';
+const apiModelMap = {
+  groups: 'groups',
+  parents: 'parents',
+  students: 'students',
+  teachers: 'teachers',
+  subjects: 'subjects',
+  methods: 'method-packages',
+  schedule: 'schedule',
+  assignments: 'method-assignments',
+  holidays: 'holidays',
+  methodists: 'profiles',
+  managers: 'profiles',
+  events: 'events',
+  feed: 'feed-posts',
+};
+
+if (tokenFromQuery) {
+  tokenInput.value = tokenFromQuery;
+  localStorage.setItem('consoleAccessToken', tokenFromQuery);
+} else if (tokenFromStorage) {
+  tokenInput.value = tokenFromStorage;
+}
+
+tokenInput.addEventListener('input', () => {
+  localStorage.setItem('consoleAccessToken', tokenInput.value.trim());
+});
+
+function activateTab(tabName) {
+  const targetBtn = Array.from(navBtns).find((b) => b.dataset.tab === tabName && b.style.display !== 'none');
+  const btn = targetBtn || Array.from(navBtns).find((b) => b.style.display !== 'none') || navBtns[0];
+  if (!btn) return;
+  navBtns.forEach((x) => x.classList.remove('active'));
+  document.querySelectorAll('.tab').forEach((t) => { t.style.display = 'none'; });
+  btn.classList.add('active');
+  const tab = document.querySelector(`.tab[data-tab="${btn.dataset.tab}"]`);
+  if (tab) tab.style.display = 'block';
+  try { sessionStorage.setItem(consoleTabStorageKey, btn.dataset.tab); } catch (_) {}
+}
+
+function updateSidebarUser(me) {
+  const name = me.username || me.email || 'Пользователь';
+  const role = me.role || '';
+  const initials = name.slice(0, 2).toUpperCase();
+  const el = document.getElementById('sidebar-user-name');
+  const roleEl = document.getElementById('sidebar-user-role');
+  const avatarEl = document.getElementById('sidebar-user-avatar');
+  if (el) el.textContent = name;
+  if (roleEl) roleEl.textContent = role || '—';
+  if (avatarEl) avatarEl.textContent = initials;
+}
+
+function applyRoleScope(me) {
+  const role = String((me && me.role) || '').toLowerCase();
+  if (role !== 'manager') return;
+  const allowedTabs = new Set(['stats', 'roles', 'groups', 'events', 'feed', 'schedule', 'holidays']);
+  navBtns.forEach((btn) => {
+    btn.style.display = allowedTabs.has(btn.dataset.tab) ? '' : 'none';
+  });
+  const methodistsCard = document.querySelector('.tab[data-tab="methodists"]');
+  if (methodistsCard) methodistsCard.style.display = 'none';
+  const managersCard = document.querySelector('.tab[data-tab="managers"]');
+  if (managersCard) managersCard.style.display = 'none';
+  const pageTitle = document.getElementById('page-title');
+  if (pageTitle) pageTitle.textContent = 'Кабинет менеджера учебного процесса';
+}
+
+navBtns.forEach((btn) => {
+  btn.onclick = () => activateTab(btn.dataset.tab);
+});
+
+createBtns.forEach((btn) => {
+  btn.onclick = () => {
+    const token = tokenInput.value.trim();
+    if (token) localStorage.setItem('consoleAccessToken', token);
+    window.location.href = `${CONSOLE_CREATE_ROOT}${btn.dataset.model}/`;
+  };
+});
+roleJumpBtns.forEach((btn) => {
+  btn.onclick = () => {
+    const target = btn.dataset.targetTab;
+    const targetNav = Array.from(navBtns).find((n) => n.dataset.tab === target);
+    if (targetNav && targetNav.style.display !== 'none') {
+      activateTab(target);
+      return;
+    }
+    // Fallback for tabs that exist without a left-nav button (roles hub sections).
+    navBtns.forEach((x) => x.classList.remove('active'));
+    document.querySelectorAll('.tab').forEach((t) => { t.style.display = 'none'; });
+    const tab = document.querySelector(`.tab[data-tab="${target}"]`);
+    if (tab) tab.style.display = 'block';
+    try { sessionStorage.setItem(consoleTabStorageKey, target); } catch (_) {}
+  };
+});
+
+document.querySelectorAll('.back-to-roles').forEach((btn) => {
+  btn.onclick = () => activateTab('roles');
+});
+
+// Ответы GET запоминаются вместе с ETag: при 304 сервер не сериализует данные заново.
+const etagCache = new Map();
+
+async function api(path, method = 'GET', body = null) {
+  const headers = { 'Content-Type': 'application/json' };
+  const token = tokenInput.value.trim();
+  if (token) headers.Authorization = 'Bearer ' + token;
+  if (method !== 'GET' && method !== 'HEAD' && method !== 'OPTIONS') {
+    const m = document.cookie.match(/(?:^|; )csrftoken=([^;]+)/);
+    if (m) headers['X-CSRFToken'] = decodeURIComponent(m[1]);
+  }
+  const cacheKey = `${token}|${path}`;
+  const cached = method === 'GET' ? etagCache.get(cacheKey) : null;
+  if (cached) headers['If-None-Match'] = cached.etag;
+  const res = await fetch(path, { method, headers, body: body ? JSON.stringify(body) : null });
+  if (res.status === 304 && cached) return structuredClone(cached.data);
+  if (!res.ok) {
+    const txt = await res.text();
+    throw new Error(txt || res.statusText);
+  }
+  if (res.status === 204) return null;
+  const ct = res.headers.get('content-type') || '';
+  if (!ct.includes('application/json')) return null;
+  const data = await res.json();
+  const etag = res.headers.get('ETag');
+  if (method === 'GET' && etag) etagCache.set(cacheKey, { etag, data: structuredClone(data) });
+  return data;
+}
+
+function filterTable(inputId, tbodyId) {
+  const inp = document.getElementById(inputId);
+  const tb = document.getElementById(tbodyId);
+  inp.oninput = () => {
+    const q = inp.value.toLowerCase();
+    tb.querySelectorAll('tr').forEach((tr) => {
+      tr.style.display = tr.innerText.toLowerCase().includes(q) ? '' : 'none';
+    });
+  };
+}
+
+function renderTable(data, tbodyId, rowHtmlFn) {
+  const tb = document.getElementById(tbodyId);
+  tb.innerHTML = '';
+  data.forEach((item) => {
+    const tr = document.createElement('tr');
+    tr.innerHTML = rowHtmlFn(item);
+    tb.appendChild(tr);
+  });
+}
+
+function renderGroups() {
+  renderTable(cache.groups, 'groups-body', (g) => `<td>${g.id}</td><td>${g.name}</td><td>${g.description || ''}</td><td class="actions"><button class="secondary" data-edit-model="groups" data-id="${g.id}">Изм</button> <button class="secondary" data-del-model="groups" data-del="${g.id}">Удалить</button></td>`);
+  attachRowActions('groups');
+}
+function renderParents() {
+  renderTable(cache.parents, 'parents-body', (p) => `<td>${p.id}</td><td>${p.last_name} ${p.first_name}</td><td>${p.username || ''}</td><td>${p.initial_password || ''}</td><td class="actions"><button class="secondary" data-edit-model="parents" data-id="${p.id}">Изм</button> <button class="secondary" data-del-model="parents" data-del="${p.id}">Удалить</button></td>`);
+  attachRowActions('parents');
+}
+function renderStudents() {
+  renderTable(cache.students, 'students-body', (s) => {
+    const grp = cache.groups.find((g) => g.id === s.group);
+    return `<td>${s.id}</td><td>${s.last_name} ${s.first_name}</td><td>${grp ? grp.name : s.group}</td><td>${s.username || ''}</td><td>${s.initial_password || ''}</td><td class="actions"><button class="secondary" data-edit-model="students" data-id="${s.id}">Изм</button> <button class="secondary" data-del-model="students" data-del="${s.id}">Удалить</button></td>`;
+  });
+  attachRowActions('students');
+}
+function renderTeachers() {
+  renderTable(cache.teachers, 'teachers-body', (t) => {
+    const names = (t.groups || []).map((id) => {
+      const g = cache.groups.find((x) => x.id === id);
+      return g ? g.name : id;
+    }).join(', ');
+    return `<td>${t.id}</td><td>${t.last_name} ${t.first_name}</td><td>${t.email || ''}</td><td>${names}</td><td>${t.username || ''}</td><td>${t.initial_password || ''}</td><td class="actions"><button class="secondary" data-edit-model="teachers" data-id="${t.id}">Изм</button> <button class="secondary" data-del-model="teachers" data-del="${t.id}">Удалить</button></td>`;
+  });
+  attachRowActions('teachers');
+}
+function renderMethodists() {
+  renderTable(cache.methodists, 'methodists-body', (u) => `<td>${u.username || ''}</td><td>${u.email || ''}</td><td>${u.role || ''}</td><td class="actions"><button class="secondary" data-edit-model="methodists" data-id="${u.id}">Изм</button> <button class="secondary" data-del-model="methodists" data-del="${u.id}">Удалить</button></td>`);
+  attachRowActions('methodists');
+}
+function renderManagers() {
+  renderTable(cache.managers, 'managers-body', (u) => `<td>${u.username || ''}</td><td>${u.email || ''}</td><td>${u.role || ''}</td><td class="actions"><button class="secondary" data-edit-model="managers" data-id="${u.id}">Изм</button> <button class="secondary" data-del-model="managers" data-del="${u.id}">Удалить</button></td>`);
+  attachRowActions('managers');
+}
+function renderMethods() {
+  const subjectFilter = document.getElementById('methods-subject-filter');
+  const selectedSubject = subjectFilter ? String(subjectFilter.value || '') : '';
+  let rows = cache.methods.slice();
+  if (selectedSubject) {
+    rows = rows.filter((m) => String(m.subject || '') === selectedSubject);
+  }
+  rows.sort((a, b) => {
+    const sa = String(a.subject_name || '');
+    const sb = String(b.subject_name || '');
+    if (sa !== sb) return sa.localeCompare(sb);
+    return Number(a.method_number || 0) - Number(b.method_number || 0);
+  });
+  renderTable(rows, 'methods-body', (m) => `<td>${m.id}</td><td>${m.method_number || ''}</td><td>${m.title}</td><td>${m.subject_name || ''}</td><td class="actions"><button class="secondary" data-edit-model="methods" data-id="${m.id}">Изм</button> <button class="secondary" data-del-model="methods" data-del="${m.id}">Удалить</button></td>`);
+  attachRowActions('methods');
+}
+function renderSubjects() {
+  renderTable(cache.subjects, 'subjects-body', (s) => `<td>${s.id}</td><td>${s.name}</td><td class="actions"><button class="secondary" data-edit-model="subjects" data-id="${s.id}">Изм</button> <button class="secondary" data-del-model="subjects" data-del="${s.id}">Удалить</button></td>`);
+  attachRowActions('subjects');
+}
+function renderSchedule() {
+  renderTable(cache.schedule, 'schedule-body', (s) => {
+    const grp = cache.groups.find((g) => g.id === s.group);
+    const moved = s.moved_from_date ? `${s.moved_from_date} -> ${s.lesson_date || ''}` : '—';
+    return `<td>${s.id}</td><td>${grp ? grp.name : s.group}</td><td>${s.lesson_date || ''}</td><td>${weekday[s.weekday] || s.weekday}</td><td>${s.lesson_number}</td><td>${s.method_package ? s.method_package.title : ''}</td><td>${moved}</td><td class="actions"><button class="secondary" data-edit-model="schedule" data-id="${s.id}">Изм</button> <button class="secondary" data-del-model="schedule" data-del="${s.id}">Удалить</button></td>`;
+  });
+  attachRowActions('schedule');
+}
+function renderHolidays() {
+  renderTable(cache.holidays, 'holidays-body', (h) => {
+    const grp = cache.groups.find((g) => g.id === h.group);
+    return `<td>${h.id}</td><td>${h.date || ''}</td><td>${h.title || ''}</td><td>${grp ? grp.name : 'Все группы'}</td><td class="actions"><button class="secondary" data-edit-model="holidays" data-id="${h.id}">Изм</button> <button class="secondary" data-del-model="holidays" data-del="${h.id}">Удалить</button></td>`;
+  });
+  attachRowActions('holidays');
+}
+function renderAssignments() {
+  renderTable(cache.assignments, 'assignments-body', (a) => {
+    const method = cache.methods.find((m) => m.id === a.method_package);
+    const teacher = cache.teachers.find((t) => t.id === a.teacher);
+    const teacherName = teacher ? `${teacher.last_name} ${teacher.first_name}` : (a.teacher_name || a.teacher);
+    return `<td>${a.id}</td><td>${method ? method.title : (a.method_title || a.method_package)}</td><td>${teacherName}</td><td>${a.deadline || ''}</td><td>${a.status || ''}</td><td>${a.can_edit ? 'да' : 'нет'}</td><td class="actions"><button class="secondary" data-edit-model="assignments" data-id="${a.id}">Изм</button> <button class="secondary" data-del-model="assignments" data-del="${a.id}">Удалить</button></td>`;
+  });
+  attachRowActions('assignments');
+}
+function renderEvents() {
+  renderTable(cache.events, 'events-body', (e) => {
+    const grp = cache.groups.find((g) => g.id === e.group);
+    return `<td>${e.id}</td><td>${grp ? grp.name : e.group}</td><td>${e.title || ''}</td><td>${e.event_date || ''}</td><td>${e.media_type || 'none'}</td><td class="actions"><button class="secondary" data-edit-model="events" data-id="${e.id}">Изм</button> <button class="secondary" data-del-model="events" data-del="${e.id}">Удалить</button></td>`;
+  });
+  attachRowActions('events');
+}
+function renderFeed() {
+  renderTable(cache.feed, 'feed-body', (p) => {
+    const grp = cache.groups.find((g) => g.id === p.group);
+    const text = (p.text || '').length > 70 ? `${p.text.slice(0, 70)}...` : (p.text || '');
+    return `<td>${p.id}</td><td>${grp ? grp.name : p.group}</td><td>${p.author_name || ''}</td><td>${text}</td><td>${p.media_type || 'none'}</td><td class="actions"><button class="secondary" data-edit-model="feed" data-id="${p.id}">Изм</button> <button class="secondary" data-del-model="feed" data-del="${p.id}">Удалить</button></td>`;
+  });
+  attachRowActions('feed');
+}
+
+function setText(id, value) {
+  const el = document.getElementById(id);
+  if (el) el.textContent = value;
+}
+
+function setList(id, items) {
+  const el = document.getElementById(id);
+  if (!el) return;
+  if (!items.length) {
+    el.innerHTML = '<li>Нет данных</li>';
+    return;
+  }
+  el.innerHTML = items.map((x) => `<li>${x}</li>`).join('');
+}
+
+function renderBarChart(containerId, rows, valueKey = 'value', labelKey = 'label') {
+  const el = document.getElementById(containerId);
+  if (!el) return;
+  const items = Array.isArray(rows) ? rows : [];
+  if (!items.length) {
+    el.innerHTML = '<div class="hint">Нет данных</div>';
+    return;
+  }
+  const max = Math.max(...items.map((x) => Number(x[valueKey] || 0)), 1);
+  el.innerHTML = items.map((x) => {
+    const value = Number(x[valueKey] || 0);
+    const width = Math.max(4, Math.round((value / max) * 100));
+    return `
+      <div class="bar-row">
+        <div class="bar-label" title="${String(x[labelKey] || '')}">${String(x[labelKey] || '')}</div>
+        <div class="bar-track"><div class="bar-fill" style="width:${width}%"></div></div>
+        <div class="bar-value">${value}</div>
+      </div>
+    `;
+  }).join('');
+}
+
+function normalizeMinutes(timeStr) {
+  if (!timeStr || !timeStr.includes(':')) return 0;
+  const [h, m] = timeStr.split(':').map(Number);
+  return (h * 60) + (m || 0);
+}
+
+function updateRoleCounts() {
+  const map = [
+    ['rc-count-parents',   'rtb-parents',   cache.parents.length],
+    ['rc-count-students',  'rtb-students',  cache.students.length],
+    ['rc-count-teachers',  'rtb-teachers',  cache.teachers.length],
+    ['rc-count-methodists','rtb-methodists', cache.methodists.length],
+    ['rc-count-managers',  'rtb-managers',  cache.managers.length],
+  ];
+  map.forEach(([cardId, badgeId, val]) => { setText(cardId, val); setText(badgeId, val); });
+}
+
+function renderStats() {
+  updateRoleCounts();
+  setText('stat-groups',   cache.groups.length);
+  setText('stat-students', cache.students.length);
+  setText('stat-teachers', cache.teachers.length);
+  setText('stat-parents',  cache.parents.length);
+  setText('stat-methods',  cache.methods.length);
+  setText('stat-slots',    cache.schedule.length);
+
+  // --- Groups bar chart ---
+  const groupSizes = cache.groups.map((g) => ({
+    label: g.name,
+    value: cache.students.filter((s) => s.group === g.id).length,
+  })).sort((a, b) => b.value - a.value).slice(0, 6);
+  renderBarChart('stats-chart-groups', groupSizes);
+  setText('stats-footer-students', cache.students.length);
+
+  // --- Weekday heatmap ---
+  const weekdayLoad = [0,0,0,0,0,0,0];
+  cache.schedule.forEach((s) => {
+    if (Number.isInteger(s.weekday) && s.weekday >= 0 && s.weekday <= 6) weekdayLoad[s.weekday]++;
+  });
+  const maxLoad = Math.max(...weekdayLoad, 1);
+  const peakIdx = weekdayLoad.indexOf(maxLoad);
+  const peakEl = document.getElementById('stats-footer-peak');
+  if (peakEl) peakEl.textContent = maxLoad > 0 ? `${weekday[peakIdx]} — ${maxLoad} занятий` : 'нет данных';
+  const hmEl = document.getElementById('stats-weekday-heatmap');
+  if (hmEl) {
+    hmEl.innerHTML = weekdayLoad.map((count, i) => {
+      const fillPx = Math.max(3, Math.round((count / maxLoad) * 48));
+      const color = count > 0 ? `color:#19d1ff` : `color:var(--muted)`;
+      return `<div class="wd-cell" style="--fill:${fillPx}px">
+        <span class="wd-day">${weekday[i]}</span>
+        <span class="wd-val" style="${color}">${count}</span>
+      </div>`;
+    }).join('');
+  }
+
+  // --- Roles distribution ---
+  const rolesData = [
+    { label:'Ученики',   value: cache.students.length,   color:'#19d1ff' },
+    { label:'Родители',  value: cache.parents.length,    color:'#4ade80' },
+    { label:'Преподы',   value: cache.teachers.length,   color:'#a78bfa' },
+    { label:'Методисты', value: cache.methodists.length, color:'#fb923c' },
+    { label:'Менеджеры', value: cache.managers.length,   color:'#f472b6' },
+  ];
+  const rolesTotal = rolesData.reduce((s, r) => s + r.value, 0) || 1;
+  const rolesEl = document.getElementById('stats-chart-roles');
+  if (rolesEl) {
+    rolesEl.innerHTML = rolesData.map((r) => {
+      const pct = Math.round((r.value / rolesTotal) * 100);
+      const w = Math.max(pct > 0 ? 3 : 0, pct);
+      return `<div>
+        <div class="role-row-hdr"><span class="role-name">${r.label}</span><span class="role-badge">${r.value} <span style="color:var(--muted);font-weight:400">(${pct}%)</span></span></div>
+        <div class="role-track"><div class="role-fill" style="width:${w}%;background:${r.color}"></div></div>
+      </div>`;
+    }).join('');
+  }
+
+  // --- Timeline ---
+  const now = new Date();
+  const nowDay = (now.getDay() + 6) % 7;
+  const nowMinutes = (now.getHours() * 60) + now.getMinutes();
+  const nextLessons = cache.schedule.map((s) => {
+    const lessonMin = normalizeMinutes(s.start_time);
+    let deltaDays = s.weekday - nowDay;
+    if (deltaDays < 0 || (deltaDays === 0 && lessonMin < nowMinutes)) deltaDays += 7;
+    const grp = cache.groups.find((g) => g.id === s.group);
+    return { day: weekday[s.weekday] || '?', time: s.start_time || '--:--', group: grp ? grp.name : `#${s.group}`, num: s.lesson_number, score: deltaDays * 1440 + lessonMin };
+  }).sort((a, b) => a.score - b.score).slice(0, 6);
+  const tlEl = document.getElementById('stats-next-lessons');
+  if (tlEl) {
+    if (!nextLessons.length) {
+      tlEl.innerHTML = '<div class="hint">Нет данных</div>';
+    } else {
+      tlEl.innerHTML = nextLessons.map((l) => `
+        <div class="tl-item">
+          <div class="tl-day">${l.day}</div>
+          <div class="tl-time">${l.time}</div>
+          <div class="tl-group">${l.group}</div>
+          <div class="tl-num">Урок ${l.num}</div>
+        </div>`).join('');
+    }
+  }
+}
+
+function attachRowActions(model) {
+  document.querySelectorAll(`[data-edit-model="${model}"]`).forEach((btn) => {
+    btn.onclick = () => {
+      const token = tokenInput.value.trim();
+      if (token) localStorage.setItem('consoleAccessToken', token);
+      window.location.href = `${CONSOLE_CREATE_ROOT}${model}/?id=${btn.dataset.id}`;
+    };
+  });
+  document.querySelectorAll(`[data-del-model="${model}"]`).forEach((btn) => {
+    btn.onclick = async () => {
+      if (!confirm('Удалить запись?')) return;
+      try {
+        await api(`/api/${apiModelMap[model]}/${btn.dataset.del}/`, 'DELETE');
+        await reloadAll();
+      } catch (e) {
+        status('me-info', e.message);
+      }
+    };
+  });
+}
+
+// Локальная копия коллекций: после первого снимка /api/sync/ отдает только дельты.
+const syncStore = { token: '', collections: {} };
+let syncInFlight = null;
+
+async function runSync() {
+  const url = syncStore.token ? `/api/sync/?since=${encodeURIComponent(syncStore.token)}` : '/api/sync/';
+  const delta = await api(url);
+  if (delta.full) syncStore.collections = {};
+  Object.entries(delta.changes || {}).forEach(([name, items]) => {
+    const map = syncStore.collections[name] || (syncStore.collections[name] = new Map());
+    items.forEach((item) => map.set(item.id, item));
+  });
+  Object.entries(delta.deleted || {}).forEach(([name, ids]) => {
+    const map = syncStore.collections[name];
+    if (map) ids.forEach((id) => map.delete(id));
+  });
+  syncStore.token = delta.token;
+}
+
+function syncCollections() {
+  if (!syncInFlight) syncInFlight = runSync().finally(() => { syncInFlight = null; });
+  return syncInFlight;
+}
+
+function syncedList(name) {
+  return Array.from((syncStore.collections[name] || new Map()).values());
+}
+
+async function loadGroups() { await syncCollections(); cache.groups = syncedList('groups'); renderGroups(); }
+async function loadParents() { await syncCollections(); cache.parents = syncedList('parents'); renderParents(); }
+async function loadTeachers() { await syncCollections(); cache.teachers = syncedList('teachers'); renderTeachers(); }
+async function loadStudents() { await syncCollections(); cache.students = syncedList('students'); renderStudents(); }
+async function loadMethods() {
+  cache.methods = await api('/api/method-packages/');
+  const sel = document.getElementById('methods-subject-filter');
+  if (sel) {
+    const subjects = Array.from(new Map(cache.methods.filter((m) => m.subject).map((m) => [m.subject, m.subject_name || `Предмет ${m.subject}`])).entries());
+    const prev = sel.value;
+    sel.innerHTML = '<option value="">Все предметы</option>';
+    subjects.sort((a, b) => String(a[1]).localeCompare(String(b[1]))).forEach(([id, name]) => {
+      const o = document.createElement('option');
+      o.value = String(id);
+      o.textContent = name;
+      sel.appendChild(o);
+    });
+    if (prev && sel.querySelector(`option[value="${prev}"]`)) sel.value = prev;
+  }
+  renderMethods();
+}
+async function loadMethodists() { cache.methodists = await api('/api/profiles/?role=methodist'); renderMethodists(); }
+async function loadManagers() { cache.managers = await api('/api/profiles/?role=manager'); renderManagers(); }
+async function loadSubjects() { cache.subjects = await api('/api/subjects/'); renderSubjects(); }
+async function loadSchedule() { await syncCollections(); cache.schedule = syncedList('schedule'); renderSchedule(); }
+async function loadAssignments() { await syncCollections(); cache.assignments = syncedList('method-assignments'); renderAssignments(); }
+async function loadEvents() { await syncCollections(); cache.events = syncedList('events'); renderEvents(); }
+async function loadFeed() { await syncCollections(); cache.feed = syncedList('feed-posts'); renderFeed(); }
+async function loadHolidays() { cache.holidays = await api('/api/holidays/'); renderHolidays(); }
+
+async function reloadAll() {
+  const tasks = [
+    loadGroups().catch((e) => status('status-group', e.message)),
+    loadParents().catch((e) => status('status-parent', e.message)),
+    loadTeachers().catch((e) => status('status-teacher', e.message)),
+    loadStudents().catch((e) => status('status-student', e.message)),
+    loadMethodists().catch((e) => status('status-methodists', e.message)),
+    loadManagers().catch((e) => status('status-managers', e.message)),
+    loadSubjects().catch((e) => status('status-subjects', e.message)),
+    loadMethods().catch((e) => status('status-method', e.message)),
+    loadSchedule().catch((e) => status('status-schedule', e.message)),
+    loadAssignments().catch((e) => status('status-assignments', e.message)),
+    loadEvents().catch((e) => status('status-events', e.message)),
+    loadFeed().catch((e) => status('status-feed', e.message)),
+    loadHolidays().catch((e) => status('status-holidays', e.message)),
+  ];
+  await Promise.all(tasks);
+  renderStats();
+}
+
+function setAuthorized() {
+  const btnAuth = document.getElementById('btn-auth');
+  if (btnAuth) btnAuth.style.display = 'none';
+  tokenInput.disabled = true;
+  tokenInput.style.opacity = '0.45';
+  tokenInput.style.cursor = 'not-allowed';
+  tokenInput.style.pointerEvents = 'none';
+}
+
+document.getElementById('btn-auth').onclick = async () => {
+  const btnAuth = document.getElementById('btn-auth');
+  btnAuth.textContent = 'Загрузка...';
+  btnAuth.disabled = true;
+  try {
+    try {
+      const me = await api('/api/me/');
+      applyRoleScope(me); updateSidebarUser(me);
+    } catch (_) {}
+    await reloadAll();
+    let savedTab = '';
+    try { savedTab = sessionStorage.getItem(consoleTabStorageKey) || ''; } catch (_) {}
+    activateTab(requestedTab || savedTab || 'stats');
+    status('me-info', '');
+    setAuthorized();
+  } catch (e) {
+    status('me-info', e.message);
+    btnAuth.textContent = 'Авторизоваться';
+    btnAuth.disabled = false;
+  }
+};
+
+document.getElementById('btn-logout').onclick = async () => {
+  try {
+    await fetch('/api/session-logout/', { method: 'POST' });
+  } catch (_) {}
+  localStorage.removeItem('consoleAccessToken');
+  sessionStorage.removeItem('student_token');
+  sessionStorage.removeItem('student_id');
+  window.location.href = '/login/';
+};
+
+filterTable('search-groups', 'groups-body');
+filterTable('search-parents', 'parents-body');
+filterTable('search-students', 'students-body');
+filterTable('search-teachers', 'teachers-body');
+filterTable('search-methodists', 'methodists-body');
+filterTable('search-managers', 'managers-body');
+filterTable('search-subjects', 'subjects-body');
+filterTable('search-methods', 'methods-body');
+document.getElementById('methods-subject-filter')?.addEventListener('change', renderMethods);
+filterTable('search-schedule', 'schedule-body');
+filterTable('search-assignments', 'assignments-body');
+filterTable('search-events', 'events-body');
+filterTable('search-feed', 'feed-body');
+filterTable('search-holidays', 'holidays-body');
+
+// Sidebar collapse
+const sidebar = document.getElementById('main-sidebar');
+const sidebarToggle = document.getElementById('sidebar-toggle');
+const SIDEBAR_KEY = 'sidebar_collapsed';
+function setSidebarCollapsed(collapsed) {
+  if (collapsed) {
+    sidebar.classList.add('collapsed');
+    sessionStorage.setItem(SIDEBAR_KEY, '1');
+  } else {
+    sidebar.classList.remove('collapsed');
+    sessionStorage.setItem(SIDEBAR_KEY, '0');
+  }
+}
+sidebarToggle.onclick = () => setSidebarCollapsed(!sidebar.classList.contains('collapsed'));
+try {
+  if (sessionStorage.getItem(SIDEBAR_KEY) === '1') setSidebarCollapsed(true);
+} catch (_) {}
+
+(async () => {
+  if (!tokenInput.value.trim()) return;
+  try {
+    try {
+      const me = await api('/api/me/');
+      applyRoleScope(me); updateSidebarUser(me);
+    } catch (_) {}
+    await reloadAll();
+    let savedTab = '';
+    try { savedTab = sessionStorage.getItem(consoleTabStorageKey) || ''; } catch (_) {}
+    activateTab(requestedTab || savedTab || 'stats');
+    status('me-info', '');
+    setAuthorized();
+  } catch (_) {}
+})();
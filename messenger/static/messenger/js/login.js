@@ -0,0 +1,155 @@
+const form = document.getElementById('login-form');
+const statusBox = document.getElementById('status');
+const adminActions = document.getElementById('admin-actions');
+const btnCopyAccess = document.getElementById('btn-copy-access');
+let lastTokens = null;
+
+form.addEventListener('submit', async (e) => {
+  e.preventDefault();
+  statusBox.style.display = 'block';
+  statusBox.textContent = 'Запрос...';
+  const username = document.getElementById('username').value.trim();
+  const password = document.getElementById('password').value;
+  try {
+    const tokenResp = await fetch('/api/token/', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ username, password })
+    });
+    if (!tokenResp.ok) {
+      const errText = await tokenResp.text();
+      throw new Error('Ошибка входа: ' + errText);
+    }
+    const tokens = await tokenResp.json();
+    lastTokens = tokens;
+    const meResp = await fetch('/api/me/', {
+      headers: { 'Authorization': 'Bearer ' + tokens.access }
+    });
+    let me = { role: 'неизвестно' };
+    if (meResp.ok) me = await meResp.json();
+    const role = (me.role || '').toLowerCase();
+    const canOpenConsole = role === 'admin';
+    statusBox.style.display = 'block';
+    statusBox.innerHTML = `Успешно.\nПользователь: ${me.username || username}\nРоль: ${me.role || 'не указана'}` +
+      `<div class="role-pill">${me.role || 'role?'}</div>`;
+    adminActions.style.display = canOpenConsole ? 'flex' : 'none';
+    if (role === 'methodist') {
+      const sessionResp = await fetch('/api/session-login/', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ username, password })
+      });
+      if (!sessionResp.ok) {
+        const errText = await sessionResp.text();
+        throw new Error('Ошибка входа методиста: ' + errText);
+      }
+      localStorage.removeItem('consoleAccessToken');
+      const url = new URL(window.location.origin + '/methodist/');
+      url.searchParams.set('token', tokens.access);
+      window.location.href = url.toString();
+      return;
+    }
+    if (role === 'student') {
+      try {
+        const students = await fetch('/api/students/', { headers: { 'Authorization': 'Bearer ' + tokens.access } }).then(r => r.json());
+        const self = Array.isArray(students) ? students.find(s => s.username === me.username) : null;
+        const groupId = self ? self.group : '';
+        const url = new URL(window.location.origin + '/student/');
+        url.searchParams.set('token', tokens.access);
+        if (groupId) url.searchParams.set('group', groupId);
+        if (self) url.searchParams.set('student_id', self.id);
+        window.location.href = url.toString();
+        return;
+      } catch (_) { /* fallback: stay */ }
+    }
+    if (role === 'manager') {
+      const sessionResp = await fetch('/api/session-login/', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ username, password })
+      });
+      if (!sessionResp.ok) {
+        const errText = await sessionResp.text();
+        throw new Error('Ошибка входа менеджера: ' + errText);
+      }
+      const url = new URL(window.location.origin + '/manager/');
+      url.searchParams.set('token', tokens.access);
+      window.location.href = url.toString();
+      return;
+    }
+    if (role === 'parent' || role === 'teacher') {
+      const url = new URL(window.location.origin + `/${role}/`);
+      url.searchParams.set('token', tokens.access);
+      window.location.href = url.toString();
+      return;
+    }
+  } catch (err) {
+    statusBox.style.display = 'block';
+    statusBox.innerHTML = `<span class="error">${err.message}</span>`;
+    adminActions.style.display = 'none';
+  }
+});
+
+function copy(text) {
+  navigator.clipboard.writeText(text).then(() => {
+    statusBox.style.display = 'block';
+    statusBox.textContent = 'Скопировано в буфер обмена';
+  }).catch(() => {
+    statusBox.style.display = 'block';
+    statusBox.textContent = 'Не удалось скопировать';
+  });
+}
+
+btnCopyAccess.onclick = () => { if (lastTokens) copy(lastTokens.access); };
+
+// Robot eye tracking + smile
+const dots = document.querySelectorAll('.dot');
+const robotMouth = document.getElementById('robot-mouth');
+const robotEye = document.querySelector('.eye');
+const formFields = [...document.querySelectorAll('#login-form input, #login-form button')];
+
+document.addEventListener('mousemove', (e) => {
+  // Eye tracking
+  dots.forEach((dot) => {
+    const rect = dot.getBoundingClientRect();
+    const cx = rect.left + rect.width / 2;
+    const cy = rect.top + rect.height / 2;
+    const dx = e.clientX - cx;
+    const dy = e.clientY - cy;
+    const dist = Math.sqrt(dx * dx + dy * dy);
+    const max = 5;
+    const mx = dist > 0 ? (dx / dist) * Math.min(dist * 0.15, max) : 0;
+    const my = dist > 0 ? (dy / dist) * Math.min(dist * 0.15, max) : 0;
+    dot.style.transform = `translate(${mx}px, ${my}px)`;
+  });
+
+  // Smile: measure min distance to any input / submit button
+  let minDist = Infinity;
+  formFields.forEach((el) => {
+    const r = el.getBoundingClientRect();
+    const nearX = Math.max(r.left, Math.min(e.clientX, r.right));
+    const nearY = Math.max(r.top, Math.min(e.clientY, r.bottom));
+    const d = Math.hypot(e.clientX - nearX, e.clientY - nearY);
+    if (d < minDist) minDist = d;
+  });
+
+  // smile 0→1 over 320px range
+  const smile = Math.max(0, Math.min(1, 1 - minDist / 320));
+
+  // Border-radius: top corners stay flat, bottom curves upward (smile)
+  const topR    = Math.round(16 - smile * 12);   // 16 → 4
+  const bottomR = Math.round(16 + smile * 38);   // 16 → 54
+  robotMouth.style.borderRadius = `${topR}px ${topR}px ${bottomR}px ${bottomR}px`;
+
+  // Glow: dark-red (neutral) → warm green/cyan (happy)
+  const gr = Math.round(255 - smile * 155);                      // 255 → 100
+  const gg = Math.round(59  + smile * 190);                      // 59  → 249
+  const ga = (0.35 + smile * 0.55).toFixed(2);
+  const gSize = Math.round(12 + smile * 10);
+  robotMouth.style.boxShadow = `inset 0 0 ${gSize}px rgba(${gr},${gg},48,${ga})`;
+
+  // Eye glow intensifies when smiling
+  const eyeAlpha = (0.25 + smile * 0.45).toFixed(2);
+  const eyeSize  = Math.round(20 + smile * 18);
+  robotEye.style.boxShadow = `inset 0 0 ${eyeSize}px rgba(25,209,255,${eyeAlpha})`;
+});
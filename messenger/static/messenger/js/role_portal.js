@@ -0,0 +1,2797 @@
+const ROLE = document.body.dataset.portalRole || '';
+const CLASS_COLORS = ['#19d1ff', '#ff79b0', '#ff8c23', '#7a46ff', '#4dd37d', '#ff5f86'];
+
+const state = {
+  token: '',
+  me: null,
+  myDisplayName: '',
+  mySenderType: '',
+  selectedFile: null,
+  rooms: [],
+  groups: [],
+  activeGroupId: null,
+  activeRoomId: null,
+  unreadRoomIds: new Set(),
+  pollTimer: null,
+  activeView: 'chat',
+  scheduleSlots: [],
+  scheduleWeekOffset: 0,
+  methods: [],
+  openMethodId: null,
+  assignments: [],
+  assignmentCommentsCache: {},
+  devAssignmentId: null,
+  devEditorMethodId: null,
+  devEditorDraft: null,
+  managerAdmin: {
+    tab: 'groups',
+    selectedId: null,
+    records: {},
+    refs: { groups: [], parents: [], students: [], subjects: [], methods: [] },
+  },
+  managerEvents: [],
+  managerFeed: [],
+  managerEventEditId: null,
+  managerFeedEditId: null,
+  managerEventComposeOpen: false,
+  managerFeedComposeOpen: false,
+};
+
+function $(id) { return document.getElementById(id); }
+
+function portalKey(suffix) {
+  return `portal:${ROLE}:${suffix}`;
+}
+
+function portalSafeGet(key) {
+  try { return sessionStorage.getItem(key); } catch (_) { return null; }
+}
+
+function portalSafeSet(key, value) {
+  try { sessionStorage.setItem(key, String(value)); } catch (_) {}
+}
+
+function esc(text) {
+  return String(text || '')
+    .replaceAll('&', '&amp;')
+    .replaceAll('<', '&lt;')
+    .replaceAll('>', '&gt;');
+}
+
+function shortName(full) {
+  const value = String(full || '').trim();
+  if (!value) return 'U';
+  return value.split(/\s+/).slice(0, 2).map((w) => w[0] || '').join('').toUpperCase() || 'U';
+}
+
+function parseDate(dateStr) {
+  if (!dateStr) return null;
+  const d = new Date(`${dateStr}T00:00:00`);
+  return Number.isNaN(d.getTime()) ? null : d;
+}
+
+function getMonday(baseDate = new Date(), offsetWeeks = 0) {
+  const d = new Date(baseDate);
+  d.setHours(0, 0, 0, 0);
+  const day = (d.getDay() + 6) % 7;
+  d.setDate(d.getDate() - day + (offsetWeeks * 7));
+  return d;
+}
+
+function formatDate(d) {
+  return `${String(d.getDate()).padStart(2, '0')}.${String(d.getMonth() + 1).padStart(2, '0')}`;
+}
+
+function formatDateRange(a, b) {
+  const fa = `${formatDate(a)}.${String(a.getFullYear()).slice(-2)}`;
+  const fb = `${formatDate(b)}.${String(b.getFullYear()).slice(-2)}`;
+  return `${fa} - ${fb}`;
+}
+
+function hhmm(timeStr) {
+  const raw = String(timeStr || '');
+  return raw.length >= 5 ? raw.slice(0, 5) : raw;
+}
+
+function addMinutesToTime(timeStr, minutes) {
+  const clean = hhmm(timeStr);
+  if (!clean || !clean.includes(':')) return clean;
+  const [h, m] = clean.split(':').map(Number);
+  if (Number.isNaN(h) || Number.isNaN(m)) return clean;
+  const total = (h * 60) + m + minutes;
+  const norm = ((total % (24 * 60)) + (24 * 60)) % (24 * 60);
+  const nh = Math.floor(norm / 60);
+  const nm = norm % (60);
+  return `${String(nh).padStart(2, '0')}:${String(nm).padStart(2, '0')}`;
+}
+
+// Ответы GET запоминаются вместе с ETag: при 304 сервер не сериализует данные заново.
+const etagCache = new Map();
+
+async function api(url, method = 'GET', body = null) {
+  const headers = {};
+  const isFormData = body instanceof FormData;
+  if (!isFormData) headers['Content-Type'] = 'application/json';
+  if (state.token) headers.Authorization = `Bearer ${state.token}`;
+  if (state.cacheScope) headers['X-Portal-Scope'] = state.cacheScope;
+  const cacheKey = `${state.token || ''}|${url}`;
+  const cached = method === 'GET' ? etagCache.get(cacheKey) : null;
+  if (cached) headers['If-None-Match'] = cached.etag;
+  const res = await fetch(url, { method, headers, body: body ? (isFormData ? body : JSON.stringify(body)) : null });
+  if (res.status === 304 && cached) return structuredClone(cached.data);
+  if (!res.ok) throw new Error(await res.text() || res.statusText);
+  if (res.status === 204) return null;
+  const ct = res.headers.get('content-type') || '';
+  if (!ct.includes('application/json')) return null;
+  const data = await res.json();
+  const etag = res.headers.get('ETag');
+  if (method === 'GET' && etag) etagCache.set(cacheKey, { etag, data: structuredClone(data) });
+  return data;
+}
+
+async function uploadMedia(file) {
+  const fd = new FormData();
+  fd.append('file', file);
+  const data = await api('/api/upload/', 'POST', fd);
+  const rawUrl = data && data.url ? String(data.url) : '';
+  if (!rawUrl) return '';
+  return rawUrl.startsWith('http') ? rawUrl : `${window.location.origin}${rawUrl}`;
+}
+
+function openTeacherMethodConstructor(methodObj) {
+  if (!methodObj) return;
+  try {
+    if (state.token) localStorage.setItem('consoleAccessToken', state.token);
+  } catch (_) {}
+  const returnTo = `${window.location.pathname}${window.location.search || ''}`;
+  window.open(`/console/create/methods/?id=${methodObj.id}&return_to=${encodeURIComponent(returnTo)}&return_view=development`, '_blank');
+}
+
+function updateAttachmentPill() {
+  const pill = $('attach-pill');
+  const label = $('attach-pill-name');
+  if (!state.selectedFile) {
+    pill.style.display = 'none';
+    label.textContent = '';
+    return;
+  }
+  pill.style.display = 'inline-flex';
+  label.textContent = state.selectedFile.name || 'Файл';
+}
+
+function isImageAttachment(url, name) {
+  const raw = String(name || url || '').toLowerCase();
+  return ['.png', '.jpg', '.jpeg', '.gif', '.webp', '.bmp', '.svg'].some((ext) => raw.includes(ext));
+}
+
+function roomLabel(room) {
+  if (room.room_type === 'parents') return `Родители ${room.group_name || room.group}`;
+  if (room.room_type === 'management') return `Менеджер и преподаватель ${room.group_name || room.group}`;
+  return `Студенты ${room.group_name || room.group}`;
+}
+
+async function resolveMyDisplayName() {
+  state.mySenderType = ROLE === 'teacher'
+    ? 'teacher'
+    : ROLE === 'manager'
+      ? 'manager'
+      : ROLE === 'parent'
+        ? 'parent'
+        : 'student';
+  try {
+    if (ROLE === 'teacher') {
+      const list = await api('/api/teachers/');
+      const self = Array.isArray(list) ? list.find((x) => x.username === state.me.username) : null;
+      if (self) state.myDisplayName = `${self.last_name || ''} ${self.first_name || ''}`.trim();
+    } else if (ROLE === 'parent') {
+      const list = await api('/api/parents/');
+      const self = Array.isArray(list) ? list.find((x) => x.username === state.me.username) : null;
+      if (self) state.myDisplayName = `${self.last_name || ''} ${self.first_name || ''}`.trim();
+    } else {
+      const list = await api('/api/students/');
+      const self = Array.isArray(list) ? list.find((x) => x.username === state.me.username) : null;
+      if (self) state.myDisplayName = `${self.last_name || ''} ${self.first_name || ''}`.trim();
+    }
+  } catch (_) {
+    state.myDisplayName = state.me.username || '';
+  }
+  if (!state.myDisplayName) state.myDisplayName = state.me.username || '';
+}
+
+function isSelfMessage(msg) {
+  const sender = String(msg.sender_name || '').trim().toLowerCase();
+  const mine = String(state.myDisplayName || '').trim().toLowerCase();
+  if (sender && mine && sender === mine) return true;
+  return msg.sender_type === state.mySenderType;
+}
+
+function seenKey(roomId) {
+  const user = state.me && state.me.username ? state.me.username : 'unknown';
+  return `chat_seen:${user}:room:${roomId}`;
+}
+
+function getSeenId(roomId) {
+  const raw = localStorage.getItem(seenKey(roomId));
+  const parsed = Number(raw || 0);
+  return Number.isFinite(parsed) ? parsed : 0;
+}
+
+function setSeenId(roomId, messageId) {
+  const id = Number(messageId || 0);
+  if (!id) return;
+  const prev = getSeenId(roomId);
+  if (id > prev) localStorage.setItem(seenKey(roomId), String(id));
+}
+
+function updateBellUI() {
+  const count = state.unreadRoomIds.size;
+  const badge = $('chat-bell-count');
+  badge.style.display = count > 0 ? 'flex' : 'none';
+  badge.textContent = String(Math.min(count, 99));
+}
+
+function switchView(view) {
+  state.activeView = view;
+  portalSafeSet(portalKey('active_view'), view);
+  ['chat', 'schedule', 'methods', 'development', 'manage', 'events', 'feed'].forEach((name) => {
+    const pane = $(`pane-${name}`);
+    if (pane) pane.classList.toggle('active', name === view);
+  });
+  document.querySelectorAll('.portal-tab-btn').forEach((btn) => {
+    btn.classList.toggle('active', btn.dataset.view === view);
+  });
+  if (view === 'schedule') loadTeacherSchedule();
+  if (view === 'methods') loadTeacherMethods();
+  if (view === 'development') loadTeacherDevelopment();
+  if (view === 'chat') loadMessages();
+  if (ROLE === 'manager' && view === 'events') managerLoadEvents().catch((e) => { const b = $('manager-events-pane'); if (b) b.innerHTML = `<div class="empty">${esc(e.message)}</div>`; });
+  if (ROLE === 'manager' && view === 'feed') managerLoadFeed().catch((e) => { const b = $('manager-feed-pane'); if (b) b.innerHTML = `<div class="empty">${esc(e.message)}</div>`; });
+}
+
+const MANAGER_CFG = {
+  groups: {
+    title: 'Группы',
+    endpoint: '/api/groups/',
+    filterLabel: 'Все',
+    columnsLabel: (r) => r.name || `Группа ${r.id}`,
+    meta: (r) => `${(r.students || []).length} студентов · ${(r.teachers || []).length} преподавателей`,
+    formTitle: (r) => r ? `Группа: ${r.name || r.id}` : 'Новая группа',
+    fields: [
+      { key: 'name', label: 'Название', type: 'text', required: true, full: true },
+      { key: 'description', label: 'Описание', type: 'textarea', full: true },
+      { key: 'student_ids', label: 'Ученики в группе (добавить/переназначить)', type: 'multiselect', options: 'students', full: true },
+    ],
+  },
+  students: {
+    title: 'Ученики',
+    endpoint: '/api/students/',
+    filterLabel: 'Все группы',
+    filterType: 'groups',
+    columnsLabel: (r) => `${r.last_name || ''} ${r.first_name || ''}`.trim() || `Ученик ${r.id}`,
+    meta: (r) => `${r.group_name || `Группа ${r.group || '—'}`} · логин: ${r.username || '—'}`,
+    formTitle: (r) => r ? `Ученик: ${(r.last_name || '')} ${(r.first_name || '')}`.trim() : 'Новый ученик',
+    fields: [
+      { key: 'last_name', label: 'Фамилия', type: 'text', required: true },
+      { key: 'first_name', label: 'Имя', type: 'text', required: true },
+      { key: 'group', label: 'Группа', type: 'select', options: 'groups', required: true },
+      { key: 'parents', label: 'Родители', type: 'multiselect', options: 'parents', full: true },
+      { key: 'notes', label: 'Заметки', type: 'textarea', full: true },
+    ],
+  },
+  parents: {
+    title: 'Родители',
+    endpoint: '/api/parents/',
+    filterLabel: 'Все',
+    columnsLabel: (r) => `${r.last_name || ''} ${r.first_name || ''}`.trim() || `Родитель ${r.id}`,
+    meta: (r) => `${r.phone || 'без телефона'} · ${r.email || 'без email'} · логин: ${r.username || '—'}`,
+    formTitle: (r) => r ? `Родитель: ${(r.last_name || '')} ${(r.first_name || '')}`.trim() : 'Новый родитель',
+    fields: [
+      { key: 'last_name', label: 'Фамилия', type: 'text', required: true },
+      { key: 'first_name', label: 'Имя', type: 'text', required: true },
+      { key: 'phone', label: 'Телефон', type: 'text' },
+      { key: 'email', label: 'Email', type: 'email' },
+    ],
+  },
+  teachers: {
+    title: 'Преподаватели',
+    endpoint: '/api/teachers/',
+    filterLabel: 'Все группы',
+    filterType: 'groups',
+    columnsLabel: (r) => `${r.last_name || ''} ${r.first_name || ''}`.trim() || `Преподаватель ${r.id}`,
+    meta: (r) => `${r.email || 'без email'} · групп: ${Array.isArray(r.groups) ? r.groups.length : 0} · логин: ${r.username || '—'}`,
+    formTitle: (r) => r ? `Преподаватель: ${(r.last_name || '')} ${(r.first_name || '')}`.trim() : 'Новый преподаватель',
+    fields: [
+      { key: 'last_name', label: 'Фамилия', type: 'text', required: true },
+      { key: 'first_name', label: 'Имя', type: 'text', required: true },
+      { key: 'phone', label: 'Телефон', type: 'text' },
+      { key: 'email', label: 'Email', type: 'email' },
+      { key: 'groups', label: 'Группы', type: 'multiselect', options: 'groups', full: true },
+    ],
+  },
+  holidays: {
+    title: 'Праздники',
+    endpoint: '/api/holidays/',
+    filterLabel: 'Все группы',
+    filterType: 'groupsPlusGlobal',
+    columnsLabel: (r) => `${r.date || ''} · ${r.title || 'Праздничный день'}`,
+    meta: (r) => r.group_name ? `Для группы: ${r.group_name}` : 'Для всех групп',
+    formTitle: (r) => r ? `Праздник: ${r.date || ''}` : 'Новый праздник',
+    fields: [
+      { key: 'date', label: 'Дата', type: 'date', required: true },
+      { key: 'title', label: 'Название', type: 'text', full: true },
+      { key: 'group', label: 'Группа (необязательно)', type: 'selectOptional', options: 'groups', full: true },
+    ],
+  },
+  schedule: {
+    title: 'Расписание',
+    endpoint: '/api/schedule/',
+    filterLabel: 'Все группы',
+    filterType: 'groups',
+    columnsLabel: (r) => `${r.lesson_date || 'без даты'} · ${hhmm(r.start_time)} · пара ${r.lesson_number || '—'}`,
+    meta: (r) => `${r.group_name || `Группа ${r.group || '—'}`} · ${r.method_package ? (r.method_package.title || 'Метод') : 'без метода'}${r.moved_from_date ? ` · перенос с ${r.moved_from_date}` : ''}`,
+    formTitle: (r) => r ? `Слот расписания #${r.id}` : 'Новая пара (автогенерация по неделям)',
+    fields: [
+      { key: 'group', label: 'Группа', type: 'select', options: 'groups', required: true },
+      { key: 'subject_id', label: 'Предмет', type: 'select', options: 'subjects', required: true },
+      { key: 'start_method_number', label: 'Стартовый номер метода', type: 'number', min: 1, max: 12, default: 1 },
+      { key: 'lesson_date', label: 'Дата первого занятия', type: 'date', required: true },
+      { key: 'lesson_number', label: 'Номер первой пары', type: 'number', min: 1, default: 1 },
+      { key: 'start_time', label: 'Время начала', type: 'time', required: true },
+      { key: 'occurrences_count', label: 'Недель (автогенерация)', type: 'number', min: 1, max: 52, default: 6 },
+      { key: 'duration_minutes', label: 'Длительность (редактирование)', type: 'number', min: 30, default: 80 },
+      { key: 'method_package_id', label: 'Методпакет (для редактирования слота)', type: 'selectOptional', options: 'methods', full: true },
+      { key: 'apply_from_lesson_number', label: 'Перепривязать методы с урока № (опционально)', type: 'number', min: 1, full: true },
+    ],
+  },
+};
+
+function managerListKey(tab) { return `mgr:${tab}`; }
+
+function managerCurrentCfg() { return MANAGER_CFG[state.managerAdmin.tab]; }
+
+// Локальная копия коллекций: после первого снимка /api/sync/ отдает только дельты.
+// Портал использует только справочники менеджера, остальные коллекции не запрашиваем.
+const syncStore = { token: '', collections: {} };
+const SYNC_COLLECTIONS = 'groups,parents,students';
+let syncInFlight = null;
+
+async function runSync() {
+  const since = syncStore.token ? `&since=${encodeURIComponent(syncStore.token)}` : '';
+  const url = `/api/sync/?collections=${SYNC_COLLECTIONS}${since}`;
+  const delta = await api(url);
+  if (delta.full) syncStore.collections = {};
+  Object.entries(delta.changes || {}).forEach(([name, items]) => {
+    const map = syncStore.collections[name] || (syncStore.collections[name] = new Map());
+    items.forEach((item) => map.set(item.id, item));
+  });
+  Object.entries(delta.deleted || {}).forEach(([name, ids]) => {
+    const map = syncStore.collections[name];
+    if (map) ids.forEach((id) => map.delete(id));
+  });
+  syncStore.token = delta.token;
+}
+
+function syncCollections() {
+  if (!syncInFlight) syncInFlight = runSync().finally(() => { syncInFlight = null; });
+  return syncInFlight;
+}
+
+function syncedList(name) {
+  return Array.from((syncStore.collections[name] || new Map()).values());
+}
+
+async function managerSyncRefs() {
+  await syncCollections();
+  state.managerAdmin.refs.groups = syncedList('groups');
+  state.managerAdmin.refs.parents = syncedList('parents');
+  state.managerAdmin.refs.students = syncedList('students');
+}
+
+async function managerEnsureRefs() {
+  const needs = [];
+  if (!state.managerAdmin.refs.groups.length || !state.managerAdmin.refs.parents.length || !state.managerAdmin.refs.students.length) {
+    needs.push(managerSyncRefs());
+  }
+  if (!state.managerAdmin.refs.subjects.length) needs.push(api('/api/subjects/').then((d) => { state.managerAdmin.refs.subjects = d || []; }));
+  if (!state.managerAdmin.refs.methods.length) needs.push(api('/api/method-packages/').then((d) => { state.managerAdmin.refs.methods = d || []; }));
+  if (needs.length) await Promise.all(needs);
+}
+
+function managerRefOptions(type) {
+  if (type === 'groups') return (state.managerAdmin.refs.groups || []).map((g) => ({ value: g.id, label: g.name || `Группа ${g.id}` }));
+  if (type === 'parents') return (state.managerAdmin.refs.parents || []).map((p) => ({ value: p.id, label: `${p.last_name || ''} ${p.first_name || ''}`.trim() || `Родитель ${p.id}` }));
+  if (type === 'students') return (state.managerAdmin.refs.students || []).map((s) => ({ value: s.id, label: `${s.last_name || ''} ${s.first_name || ''}`.trim() || `Ученик ${s.id}` }));
+  if (type === 'subjects') return (state.managerAdmin.refs.subjects || []).map((s) => ({ value: s.id, label: s.name || `Предмет ${s.id}` }));
+  if (type === 'methods') {
+    return (state.managerAdmin.refs.methods || []).map((m) => ({
+      value: m.id,
+      label: `${m.subject_name || 'Без предмета'} · ${m.method_number || '—'} · ${m.title || `Метод ${m.id}`}`,
+    }));
+  }
+  return [];
+}
+
+function managerStorageGetSearch() {
+  return sessionStorage.getItem(managerListKey(`${state.managerAdmin.tab}:search`)) || '';
+}
+function managerStorageSetSearch(value) {
+  sessionStorage.setItem(managerListKey(`${state.managerAdmin.tab}:search`), value || '');
+}
+function managerStorageGetFilter() {
+  return sessionStorage.getItem(managerListKey(`${state.managerAdmin.tab}:filter`)) || '';
+}
+function managerStorageSetFilter(value) {
+  sessionStorage.setItem(managerListKey(`${state.managerAdmin.tab}:filter`), value || '');
+}
+
+async function managerLoadRecords(force = false) {
+  const cfg = managerCurrentCfg();
+  if (!cfg) return;
+  if (!force && Array.isArray(state.managerAdmin.records[cfg.endpoint])) return;
+  const data = await api(cfg.endpoint);
+  const arr = Array.isArray(data) ? data : [];
+  state.managerAdmin.records[cfg.endpoint] = arr;
+  if (cfg.endpoint === '/api/groups/') state.managerAdmin.refs.groups = arr;
+  if (cfg.endpoint === '/api/parents/') state.managerAdmin.refs.parents = arr;
+}
+
+function managerFilteredRecords() {
+  const cfg = managerCurrentCfg();
+  const records = Array.isArray(state.managerAdmin.records[cfg.endpoint]) ? state.managerAdmin.records[cfg.endpoint] : [];
+  const q = String(($('manager-admin-search') && $('manager-admin-search').value) || '').trim().toLowerCase();
+  const filterVal = String(($('manager-admin-filter') && $('manager-admin-filter').value) || '');
+  return records.filter((r) => {
+    if (q) {
+      const hay = JSON.stringify(r || {}).toLowerCase();
+      if (!hay.includes(q)) return false;
+    }
+    if (cfg.filterType === 'groups' && filterVal) {
+      if (String(r.group || '') !== filterVal && !(Array.isArray(r.groups) && r.groups.map(String).includes(filterVal))) return false;
+    }
+    if (cfg.filterType === 'groupsPlusGlobal' && filterVal) {
+      if (filterVal === 'global') return !r.group;
+      if (String(r.group || '') !== filterVal) return false;
+    }
+    return true;
+  });
+}
+
+function managerSetActiveTab(tab) {
+  state.managerAdmin.tab = tab;
+  portalSafeSet(portalKey('manager_admin_tab'), tab);
+  state.managerAdmin.selectedId = null;
+  document.querySelectorAll('.manager-admin-nav-btn').forEach((btn) => {
+    btn.classList.toggle('active', btn.dataset.managerTab === tab);
+  });
+  managerRenderToolbar();
+  managerRenderList();
+  managerRenderForm(null);
+  managerRefreshData().catch((e) => {
+    $('manager-admin-list-status').textContent = e.message;
+  });
+}
+
+function managerRenderToolbar() {
+  const cfg = managerCurrentCfg();
+  if (!cfg) return;
+  $('manager-admin-create').textContent = `Создать: ${cfg.title}`;
+  const search = $('manager-admin-search');
+  const filter = $('manager-admin-filter');
+  search.value = managerStorageGetSearch();
+  filter.innerHTML = '';
+  if (cfg.filterType === 'groups' || cfg.filterType === 'groupsPlusGlobal') {
+    const opts = managerRefOptions('groups');
+    const first = document.createElement('option');
+    first.value = '';
+    first.textContent = cfg.filterLabel || 'Все';
+    filter.appendChild(first);
+    if (cfg.filterType === 'groupsPlusGlobal') {
+      const og = document.createElement('option');
+      og.value = 'global';
+      og.textContent = 'Все группы (глобальные)';
+      filter.appendChild(og);
+    }
+    opts.forEach((o) => {
+      const opt = document.createElement('option');
+      opt.value = String(o.value);
+      opt.textContent = o.label;
+      filter.appendChild(opt);
+    });
+    filter.style.display = '';
+    filter.value = managerStorageGetFilter();
+  } else {
+    filter.style.display = 'none';
+  }
+}
+
+function managerRecordId(r) { return Number(r && r.id ? r.id : 0); }
+
+function managerCreateModelForTab(tab) {
+  const map = {
+    groups: 'groups',
+    students: 'students',
+    parents: 'parents',
+    teachers: 'teachers',
+    schedule: 'schedule',
+    holidays: 'holidays',
+  };
+  return map[tab] || null;
+}
+
+function managerRenderList() {
+  const cfg = managerCurrentCfg();
+  const list = $('manager-admin-list');
+  const statusEl = $('manager-admin-list-status');
+  if (!cfg) {
+    list.innerHTML = '<div class="empty">Нет конфигурации</div>';
+    return;
+  }
+  const items = managerFilteredRecords();
+  statusEl.textContent = `${cfg.title}: ${items.length}`;
+  if (!items.length) {
+    list.innerHTML = '<div class="empty">Список пуст</div>';
+    return;
+  }
+  if (!items.some((x) => managerRecordId(x) === Number(state.managerAdmin.selectedId))) {
+    state.managerAdmin.selectedId = managerRecordId(items[0]);
+  }
+  list.innerHTML = items.map((r) => `
+    <div class="manager-admin-item${managerRecordId(r) === Number(state.managerAdmin.selectedId) ? ' active' : ''}" data-id="${managerRecordId(r)}">
+      <div class="manager-admin-item-title">${esc(cfg.columnsLabel(r))}</div>
+      <div class="manager-admin-item-meta">${esc(cfg.meta(r) || '')}</div>
+    </div>
+  `).join('');
+  list.querySelectorAll('[data-id]').forEach((el) => {
+    el.onclick = () => {
+      state.managerAdmin.selectedId = Number(el.dataset.id);
+      managerRenderList();
+      const rec = (state.managerAdmin.records[cfg.endpoint] || []).find((x) => managerRecordId(x) === state.managerAdmin.selectedId) || null;
+      managerRenderForm(rec);
+    };
+  });
+}
+
+function managerFormFieldHtml(field) {
+  const id = `mgr-field-${field.key}`;
+  const cls = field.full ? 'full' : '';
+  if (field.type === 'textarea') {
+    return `<div class="${cls}"><label for="${id}">${field.label}</label><textarea id="${id}" name="${field.key}" ${field.required ? 'required' : ''}></textarea></div>`;
+  }
+  if (field.type === 'multiselect') {
+    return `<div class="${cls}"><label for="${id}">${field.label}</label><select id="${id}" name="${field.key}" multiple></select><div class="hint">Ctrl/Cmd для выбора нескольких</div></div>`;
+  }
+  if (field.type === 'select' || field.type === 'selectOptional' || field.type === 'selectStatic') {
+    return `<div class="${cls}"><label for="${id}">${field.label}</label><select id="${id}" name="${field.key}" ${field.required ? 'required' : ''}></select></div>`;
+  }
+  const type = field.type === 'number' || field.type === 'date' || field.type === 'time' || field.type === 'email' || field.type === 'url' ? field.type : 'text';
+  return `<div class="${cls}"><label for="${id}">${field.label}</label><input id="${id}" name="${field.key}" type="${type}" ${field.required ? 'required' : ''} ${field.min != null ? `min="${field.min}"` : ''} ${field.max != null ? `max="${field.max}"` : ''}></div>`;
+}
+
+function managerBindFieldOptions(cfg, record = null) {
+  cfg.fields.forEach((field) => {
+    if (!(field.type === 'select' || field.type === 'selectOptional' || field.type === 'multiselect' || field.type === 'selectStatic')) return;
+    const el = $(`mgr-field-${field.key}`);
+    if (!el) return;
+    let opts = [];
+    if (field.type === 'selectStatic') {
+      opts = (field.choices || []).map(([value, label]) => ({ value, label }));
+    } else {
+      opts = managerRefOptions(field.options);
+    }
+    el.innerHTML = '';
+    if (field.type === 'selectOptional') {
+      const opt = document.createElement('option');
+      opt.value = '';
+      opt.textContent = 'Не выбрано';
+      el.appendChild(opt);
+    }
+    if (field.type === 'select') {
+      const opt = document.createElement('option');
+      opt.value = '';
+      opt.textContent = 'Выберите...';
+      el.appendChild(opt);
+    }
+    opts.forEach((o) => {
+      const opt = document.createElement('option');
+      opt.value = String(o.value);
+      opt.textContent = o.label;
+      el.appendChild(opt);
+    });
+    if (!record) return;
+    if (field.type === 'multiselect') {
+      let rawValues = record[field.key];
+      if (cfg.endpoint === '/api/groups/' && field.key === 'student_ids') rawValues = Array.isArray(record.students) ? record.students.map((s) => s.id) : [];
+      const values = Array.isArray(rawValues) ? rawValues.map(String) : [];
+      Array.from(el.options).forEach((opt) => { opt.selected = values.includes(opt.value); });
+    } else if (record[field.key] != null) {
+      el.value = String(record[field.key]);
+    }
+  });
+}
+
+function managerPrefillForm(cfg, record = null) {
+  cfg.fields.forEach((field) => {
+    const el = $(`mgr-field-${field.key}`);
+    if (!el) return;
+    if (field.type === 'multiselect' || field.type === 'select' || field.type === 'selectOptional' || field.type === 'selectStatic') return;
+    if (record && record[field.key] != null) {
+      el.value = String(record[field.key]);
+    } else if (field.default != null) {
+      el.value = String(field.default);
+    } else {
+      el.value = '';
+    }
+  });
+}
+
+function managerRenderForm(record = null) {
+  const cfg = managerCurrentCfg();
+  const wrap = $('manager-admin-form-wrap');
+  if (!cfg) {
+    wrap.innerHTML = '<div class="empty">Нет формы</div>';
+    return;
+  }
+  const createModel = managerCreateModelForTab(state.managerAdmin.tab);
+  if (createModel) {
+    const title = esc(cfg.formTitle(record));
+    const idParam = record && record.id ? `?id=${encodeURIComponent(record.id)}&embedded=1` : '?embedded=1';
+    const src = `/manager/create/${createModel}/${idParam}`;
+    const groupStudentsPanel = (state.managerAdmin.tab === 'groups' && record && record.id) ? `
+      <div class="manager-admin-form" style="margin-top:12px;">
+        <div class="manager-admin-form-head">
+          <h4>Ученики в группе</h4>
+        </div>
+        <div class="manager-admin-form-grid">
+          <div class="full">
+            <label for="manager-group-students-select">Состав группы (добавление/переназначение)</label>
+            <select id="manager-group-students-select" multiple></select>
+            <div class="hint">Выбранные ученики будут привязаны к этой группе. Чтобы убрать ученика, поменяйте ему группу во вкладке "Ученики".</div>
+          </div>
+        </div>
+        <div class="manager-admin-form-actions">
+          <button id="manager-group-students-save" class="manager-link-btn primary" type="button">Сохранить состав</button>
+        </div>
+        <div id="manager-group-students-status" class="manager-inline-status"></div>
+      </div>
+    ` : '';
+    wrap.innerHTML = `
+      <div class="manager-admin-form-head">
+        <h4>${title}</h4>
+        <div class="manager-card-actions">
+          ${record ? '<button id="manager-admin-delete" class="manager-link-btn danger" type="button">🗑 Удалить</button>' : ''}
+          <button id="manager-admin-new" class="manager-link-btn" type="button">+ Новая запись</button>
+        </div>
+      </div>
+      <iframe class="manager-admin-form-embed" id="manager-admin-form-iframe" src="${src}" loading="lazy"></iframe>
+      <div id="manager-admin-form-status" class="manager-inline-status"></div>
+      ${groupStudentsPanel}
+    `;
+    $('manager-admin-new').onclick = () => {
+      state.managerAdmin.selectedId = null;
+      managerRenderList();
+      managerRenderForm(null);
+    };
+    if (record && $('manager-admin-delete')) {
+      $('manager-admin-delete').onclick = () => managerDeleteRecord(record);
+    }
+    if (state.managerAdmin.tab === 'groups' && record && record.id) {
+      const select = $('manager-group-students-select');
+      const allStudents = state.managerAdmin.refs.students || [];
+      const currentIds = new Set(Array.isArray(record.students) ? record.students.map((s) => Number(s.id)) : []);
+      select.innerHTML = allStudents.map((s) => {
+        const full = `${s.last_name || ''} ${s.first_name || ''}`.trim() || `Ученик ${s.id}`;
+        const suffix = s.group_name ? ` · ${s.group_name}` : '';
+        return `<option value="${s.id}"${currentIds.has(Number(s.id)) ? ' selected' : ''}>${esc(full + suffix)}</option>`;
+      }).join('');
+      $('manager-group-students-save').onclick = async () => {
+        const status = $('manager-group-students-status');
+        status.textContent = 'Сохранение состава...';
+        try {
+          const selectedIds = Array.from(select.selectedOptions).map((o) => Number(o.value));
+          await managerSyncGroupStudents(record.id, selectedIds, record);
+          await managerEnsureRefs();
+          await managerLoadRecords(true);
+          const fresh = (state.managerAdmin.records[cfg.endpoint] || []).find((x) => Number(x.id) === Number(record.id)) || record;
+          state.groups = (state.managerAdmin.refs.groups || []).map((g) => ({
+            id: g.id,
+            name: g.name || `Группа ${g.id}`,
+            students_count: Array.isArray(g.students) ? g.students.length : 0,
+            parents_count: Array.isArray(g.students)
+              ? new Set(g.students.flatMap((s) => Array.isArray(s.parents) ? s.parents : [])).size
+              : 0,
+          }));
+          renderClasses();
+          renderRooms();
+          managerRenderList();
+          managerRenderForm(fresh);
+          status.textContent = 'Состав обновлен.';
+        } catch (e) {
+          status.textContent = e.message;
+        }
+      };
+    }
+    return;
+  }
+  wrap.innerHTML = `
+    <div class="manager-admin-form-head">
+      <h4>${esc(cfg.formTitle(record))}</h4>
+      <div class="manager-card-actions">
+        ${record ? '<button id="manager-admin-delete" class="manager-link-btn danger" type="button">🗑 Удалить</button>' : ''}
+        <button id="manager-admin-new" class="manager-link-btn" type="button">+ Новая запись</button>
+      </div>
+    </div>
+    <form id="manager-admin-form">
+      <input type="hidden" name="id" value="${record ? record.id : ''}">
+      <div class="manager-admin-form-grid">
+        ${cfg.fields.map(managerFormFieldHtml).join('')}
+      </div>
+      <div class="manager-admin-form-actions">
+        <button id="manager-admin-save" class="manager-link-btn primary" type="submit">Сохранить</button>
+      </div>
+      <div id="manager-admin-form-status" class="manager-inline-status"></div>
+    </form>
+  `;
+  managerBindFieldOptions(cfg, record);
+  managerPrefillForm(cfg, record);
+  cfg.fields.forEach((field) => {
+    if (!field.mediaUpload) return;
+    const row = document.getElementById(`mgr-field-${field.key}`)?.parentElement;
+    if (!row) return;
+    const fileInput = document.createElement('input');
+    fileInput.type = 'file';
+    fileInput.accept = (field.key === 'media_url') ? 'image/*,video/*' : '*/*';
+    fileInput.style.marginTop = '8px';
+    const uploadBtn = document.createElement('button');
+    uploadBtn.type = 'button';
+    uploadBtn.className = 'manager-link-btn';
+    uploadBtn.textContent = 'Загрузить файл';
+    uploadBtn.style.marginTop = '8px';
+    uploadBtn.onclick = async () => {
+      const file = fileInput.files && fileInput.files[0];
+      if (!file) return;
+      const statusEl = $('manager-admin-form-status');
+      statusEl.textContent = 'Загрузка файла...';
+      try {
+        const url = await uploadMedia(file);
+        const target = $(`mgr-field-${field.key}`);
+        if (target) target.value = url;
+        statusEl.textContent = 'Файл загружен.';
+      } catch (e) {
+        statusEl.textContent = e.message;
+      }
+    };
+    row.appendChild(fileInput);
+    row.appendChild(uploadBtn);
+  });
+
+  $('manager-admin-new').onclick = () => {
+    state.managerAdmin.selectedId = null;
+    managerRenderList();
+    managerRenderForm(null);
+  };
+  if (record && $('manager-admin-delete')) {
+    $('manager-admin-delete').onclick = () => managerDeleteRecord(record);
+  }
+  $('manager-admin-form').onsubmit = (e) => {
+    e.preventDefault();
+    managerSaveForm(record);
+  };
+}
+
+function managerCollectForm(cfg, record = null) {
+  const data = {};
+  cfg.fields.forEach((field) => {
+    const el = $(`mgr-field-${field.key}`);
+    if (!el) return;
+    if (field.type === 'multiselect') {
+      data[field.key] = Array.from(el.selectedOptions).map((o) => Number(o.value));
+      return;
+    }
+    let value = el.value;
+    if (field.type === 'select' || field.type === 'selectOptional') {
+      if (value === '' && field.type === 'selectOptional') data[field.key] = null;
+      else if (value === '') data[field.key] = '';
+      else data[field.key] = Number.isFinite(Number(value)) && /^[0-9]+$/.test(String(value)) ? Number(value) : value;
+      return;
+    }
+    if (field.type === 'selectStatic') {
+      data[field.key] = value || '';
+      return;
+    }
+    if (field.type === 'number') {
+      data[field.key] = value === '' ? null : Number(value);
+      return;
+    }
+    data[field.key] = value || '';
+  });
+
+  if (cfg.endpoint === '/api/holidays/' && !data.title) data.title = 'Праздничный день';
+  if (cfg.endpoint === '/api/schedule/') {
+    if (!record) {
+      delete data.method_package_id;
+      delete data.apply_from_lesson_number;
+      delete data.duration_minutes;
+      if (!data.occurrences_count) data.occurrences_count = 6;
+      if (!data.start_method_number) data.start_method_number = 1;
+      if (!data.lesson_number) data.lesson_number = 1;
+    } else {
+      if (data.subject_id == null || data.subject_id === '') delete data.subject_id;
+      if (data.start_method_number == null) delete data.start_method_number;
+      if (data.occurrences_count != null) delete data.occurrences_count;
+      if (data.method_package_id == null || data.method_package_id === '') delete data.method_package_id;
+      if (!data.apply_from_lesson_number) delete data.apply_from_lesson_number;
+    }
+  }
+  return data;
+}
+
+async function managerSyncGroupStudents(groupId, selectedStudentIds, currentGroupRecord) {
+  const selected = new Set((selectedStudentIds || []).map(Number));
+  const current = new Set(Array.isArray(currentGroupRecord?.students) ? currentGroupRecord.students.map((s) => Number(s.id)) : []);
+  const toMove = [...selected].filter((id) => !current.has(id));
+  if (!toMove.length) return { moved: 0 };
+  const allStudents = state.managerAdmin.refs.students || [];
+  for (const sid of toMove) {
+    const st = allStudents.find((s) => Number(s.id) === Number(sid));
+    if (!st) continue;
+    const payload = {
+      last_name: st.last_name || '',
+      first_name: st.first_name || '',
+      notes: st.notes || '',
+      group: Number(groupId),
+      parents: Array.isArray(st.parents) ? st.parents : [],
+    };
+    await api(`/api/students/${sid}/`, 'PUT', payload);
+  }
+  await managerSyncRefs();
+  return { moved: toMove.length };
+}
+
+async function managerSaveForm(record = null) {
+  const cfg = managerCurrentCfg();
+  const formEl = $('manager-admin-form');
+  if (!formEl || !formEl.reportValidity()) return;
+  const statusEl = $('manager-admin-form-status');
+  statusEl.textContent = record ? 'Сохранение изменений...' : 'Создание...';
+  try {
+    const payload = managerCollectForm(cfg, record);
+    let resp;
+    const extraStudentIds = (cfg.endpoint === '/api/groups/') ? (Array.isArray(payload.student_ids) ? payload.student_ids.slice() : []) : [];
+    if (cfg.endpoint === '/api/groups/') delete payload.student_ids;
+    if (record && record.id) {
+      resp = await api(`${cfg.endpoint}${record.id}/`, 'PUT', payload);
+    } else {
+      resp = await api(cfg.endpoint, 'POST', payload);
+    }
+    if (cfg.endpoint === '/api/groups/' && resp && resp.id) {
+      const syncInfo = await managerSyncGroupStudents(resp.id, extraStudentIds, record || null);
+      if (syncInfo && syncInfo.moved) {
+        // no-op, message set below
+      }
+    }
+    await managerEnsureRefs();
+    await managerLoadRecords(true);
+    if (cfg.endpoint === '/api/groups/' || cfg.endpoint === '/api/parents/') {
+      await managerEnsureRefs();
+    }
+    if (cfg.endpoint === '/api/groups/') {
+      state.groups = (state.managerAdmin.refs.groups || []).map((g) => ({
+        id: g.id,
+        name: g.name || `Группа ${g.id}`,
+        students_count: Array.isArray(g.students) ? g.students.length : 0,
+        parents_count: Array.isArray(g.students)
+          ? new Set(g.students.flatMap((s) => Array.isArray(s.parents) ? s.parents : [])).size
+          : 0,
+      }));
+      if (!state.groups.some((g) => Number(g.id) === Number(state.activeGroupId))) {
+        state.activeGroupId = state.groups[0] ? state.groups[0].id : null;
+      }
+      renderClasses();
+      renderRooms();
+    }
+    state.managerAdmin.selectedId = Array.isArray(resp) ? null : (resp && resp.id ? resp.id : state.managerAdmin.selectedId);
+    managerRenderToolbar();
+    managerRenderList();
+    const items = state.managerAdmin.records[cfg.endpoint] || [];
+    const selected = items.find((x) => managerRecordId(x) === Number(state.managerAdmin.selectedId)) || null;
+    managerRenderForm(selected);
+    $('manager-admin-form-status').textContent = 'Сохранено.';
+  } catch (e) {
+    statusEl.textContent = e.message;
+  }
+}
+
+async function managerDeleteRecord(record) {
+  const cfg = managerCurrentCfg();
+  if (!record || !record.id) return;
+  if (!confirm('Удалить запись?')) return;
+  const statusEl = $('manager-admin-form-status');
+  if (statusEl) statusEl.textContent = 'Удаление...';
+  try {
+    await api(`${cfg.endpoint}${record.id}/`, 'DELETE');
+    state.managerAdmin.selectedId = null;
+    await managerLoadRecords(true);
+    managerRenderList();
+    managerRenderForm(null);
+  } catch (e) {
+    if (statusEl) statusEl.textContent = e.message;
+  }
+}
+
+async function managerRefreshData() {
+  await managerEnsureRefs();
+  await managerLoadRecords(true);
+  managerRenderToolbar();
+  managerRenderList();
+  const cfg = managerCurrentCfg();
+  const items = state.managerAdmin.records[cfg.endpoint] || [];
+  const selected = items.find((x) => managerRecordId(x) === Number(state.managerAdmin.selectedId)) || null;
+  managerRenderForm(selected);
+}
+
+async function initManagerAdmin() {
+  try {
+    if (state.token) localStorage.setItem('consoleAccessToken', state.token);
+  } catch (_) {}
+  const savedManagerTab = String(portalSafeGet(portalKey('manager_admin_tab')) || '').trim();
+  if (savedManagerTab && MANAGER_CFG[savedManagerTab]) state.managerAdmin.tab = savedManagerTab;
+  window.addEventListener('message', async (event) => {
+    if (event.origin !== window.location.origin) return;
+    const msg = event.data || {};
+    if (msg.type !== 'consoleCreateSaved') return;
+    const currentModel = managerCreateModelForTab(state.managerAdmin.tab);
+    if (!currentModel || msg.model !== currentModel) return;
+    try {
+      const cfg = managerCurrentCfg();
+      await managerLoadRecords(true);
+      if (msg.id) state.managerAdmin.selectedId = Number(msg.id);
+      managerRenderToolbar();
+      managerRenderList();
+      const items = (cfg && state.managerAdmin.records[cfg.endpoint]) || [];
+      const selected = items.find((x) => managerRecordId(x) === Number(state.managerAdmin.selectedId)) || null;
+      managerRenderForm(selected);
+      const status = $('manager-admin-form-status');
+      if (status) status.textContent = 'Сохранено.';
+      if (state.managerAdmin.tab === 'groups') {
+        await managerSyncRefs();
+        state.groups = (state.managerAdmin.refs.groups || []).map((g) => ({
+          id: g.id,
+          name: g.name || `Группа ${g.id}`,
+          students_count: Array.isArray(g.students) ? g.students.length : 0,
+          parents_count: Array.isArray(g.students)
+            ? new Set(g.students.flatMap((s) => Array.isArray(s.parents) ? s.parents : [])).size
+            : 0,
+        }));
+        renderClasses();
+        renderRooms();
+      }
+    } catch (e) {
+      const status = $('manager-admin-form-status');
+      if (status) status.textContent = e.message;
+    }
+  });
+  document.querySelectorAll('.manager-admin-nav-btn').forEach((btn) => {
+    btn.onclick = () => managerSetActiveTab(btn.dataset.managerTab);
+  });
+  $('manager-admin-search').addEventListener('input', () => {
+    managerStorageSetSearch($('manager-admin-search').value);
+    managerRenderList();
+  });
+  $('manager-admin-filter').addEventListener('change', () => {
+    managerStorageSetFilter($('manager-admin-filter').value);
+    managerRenderList();
+  });
+  $('manager-admin-create').onclick = () => {
+    state.managerAdmin.selectedId = null;
+    managerRenderList();
+    managerRenderForm(null);
+  };
+  managerSetActiveTab(state.managerAdmin.tab || 'groups');
+}
+
+function toEmbedUrl(url) {
+  if (!url) return null;
+  const clean = String(url).trim();
+  if (clean.includes('youtube.com/watch?v=')) {
+    const id = clean.split('v=')[1].split('&')[0];
+    return `https://www.youtube.com/embed/${id}`;
+  }
+  if (clean.includes('youtu.be/')) {
+    const id = clean.split('youtu.be/')[1].split('?')[0];
+    return `https://www.youtube.com/embed/${id}`;
+  }
+  return null;
+}
+
+function normalizeBlockStyle(style, type) {
+  const s = style || {};
+  return {
+    textColor: String(s.textColor || (type === 'quote' ? '#27334d' : '#1d2433')),
+    fontSize: Number(s.fontSize || (type === 'heading' ? 30 : 16)),
+    textAlign: String(s.textAlign || 'left'),
+    maxWidth: Number(s.maxWidth || 100),
+    radius: Number(s.radius || 10),
+    bgColor: String(s.bgColor || (type === 'quote' ? '#eaf0ff' : 'transparent')),
+    captionColor: String(s.captionColor || '#66758f'),
+    captionSize: Number(s.captionSize || 12),
+  };
+}
+
+function renderMethodBlocks(container, methodObj, doc = document) {
+  const blocks = Array.isArray(methodObj.content_blocks) ? methodObj.content_blocks : [];
+  if (!blocks.length) {
+    const empty = doc.createElement('div');
+    empty.className = 'live-desc';
+    empty.textContent = 'Для этого методпакета пока не добавлены блоки.';
+    container.appendChild(empty);
+    return;
+  }
+  blocks.forEach((b) => {
+    const box = doc.createElement('div');
+    box.className = 'live-block method-block';
+    const style = normalizeBlockStyle(b.style, b.type);
+    box.style.textAlign = style.textAlign;
+    if (b.type === 'heading' && b.text) {
+      const h = doc.createElement('h3');
+      h.textContent = b.text;
+      h.style.color = style.textColor;
+      h.style.fontSize = `${style.fontSize}px`;
+      box.appendChild(h);
+    }
+    if (b.type === 'text' && b.text) {
+      const p = doc.createElement('p');
+      p.textContent = b.text;
+      p.style.color = style.textColor;
+      p.style.fontSize = `${style.fontSize}px`;
+      p.style.lineHeight = '1.6';
+      box.appendChild(p);
+    }
+    if (b.type === 'quote' && b.text) {
+      const q = doc.createElement('div');
+      q.className = 'live-quote method-quote';
+      q.textContent = b.text;
+      q.style.color = style.textColor;
+      q.style.fontSize = `${style.fontSize}px`;
+      q.style.background = style.bgColor;
+      box.appendChild(q);
+    }
+    if (b.type === 'image' && b.url) {
+      const img = doc.createElement('img');
+      img.src = b.url;
+      img.alt = b.caption || 'image';
+      img.style.maxWidth = `${style.maxWidth}%`;
+      img.style.borderRadius = `${style.radius}px`;
+      if (style.textAlign === 'center') img.style.margin = '0 auto';
+      if (style.textAlign === 'right') img.style.margin = '0 0 0 auto';
+      box.appendChild(img);
+      if (b.caption) {
+        const cap = doc.createElement('div');
+        cap.className = 'live-caption method-cap';
+        cap.textContent = b.caption;
+        cap.style.color = style.captionColor;
+        cap.style.fontSize = `${style.captionSize}px`;
+        box.appendChild(cap);
+      }
+    }
+    if (b.type === 'video' && b.url) {
+      const embed = toEmbedUrl(b.url);
+      if (embed) {
+        const iframe = doc.createElement('iframe');
+        iframe.src = embed;
+        iframe.allowFullscreen = true;
+        iframe.style.maxWidth = `${style.maxWidth}%`;
+        iframe.style.borderRadius = `${style.radius}px`;
+        if (style.textAlign === 'center') iframe.style.margin = '0 auto';
+        if (style.textAlign === 'right') iframe.style.margin = '0 0 0 auto';
+        box.appendChild(iframe);
+      } else {
+        const link = doc.createElement('a');
+        link.href = b.url;
+        link.target = '_blank';
+        link.rel = 'noopener noreferrer';
+        link.textContent = 'Открыть видео';
+        link.className = 'method-btn';
+        box.appendChild(link);
+      }
+      if (b.caption) {
+        const cap = doc.createElement('div');
+        cap.className = 'live-caption method-cap';
+        cap.textContent = b.caption;
+        cap.style.color = style.captionColor;
+        cap.style.fontSize = `${style.captionSize}px`;
+        box.appendChild(cap);
+      }
+    }
+    container.appendChild(box);
+  });
+}
+
+function renderMethodLivePage(container, methodObj, doc = document) {
+  const page = doc.createElement('div');
+  page.className = 'live-page';
+
+  const header = doc.createElement('div');
+  header.className = 'live-header';
+  header.innerHTML = `<div class="live-badge">Методпакет</div><h2 class="live-title">${esc(methodObj.title || 'Название урока')}</h2>`;
+  page.appendChild(header);
+
+  const meta = doc.createElement('div');
+  meta.className = 'live-desc';
+  meta.textContent = `${methodObj.subject_name || 'Без предмета'} · Метод ${Number(methodObj.method_number || 0) || '—'}`;
+  page.appendChild(meta);
+
+  if (methodObj.description) {
+    const d = doc.createElement('div');
+    d.className = 'live-desc';
+    d.textContent = methodObj.description;
+    page.appendChild(d);
+  }
+
+  if (methodObj.material_url) {
+    const aWrap = doc.createElement('div');
+    aWrap.style.textAlign = 'center';
+    const a = doc.createElement('a');
+    a.className = 'live-material-link';
+    a.href = methodObj.material_url;
+    a.target = '_blank';
+    a.rel = 'noopener noreferrer';
+    a.textContent = 'Материалы';
+    aWrap.appendChild(a);
+    page.appendChild(aWrap);
+  }
+
+  renderMethodBlocks(page, methodObj, doc);
+  container.appendChild(page);
+}
+
+function formatDateRu(dateStr) {
+  if (!dateStr) return 'Без даты';
+  const d = new Date(`${String(dateStr).slice(0, 10)}T00:00:00`);
+  if (Number.isNaN(d.getTime())) return String(dateStr);
+  return d.toLocaleDateString('ru-RU', { day: '2-digit', month: '2-digit', year: 'numeric' });
+}
+
+function formatDateTimeRu(dateStr) {
+  if (!dateStr) return '';
+  const d = new Date(dateStr);
+  if (Number.isNaN(d.getTime())) return String(dateStr);
+  return d.toLocaleString('ru-RU', {
+    day: '2-digit', month: '2-digit', year: 'numeric',
+    hour: '2-digit', minute: '2-digit',
+  });
+}
+
+function currentManagerGroup() {
+  return state.groups.find((g) => Number(g.id) === Number(state.activeGroupId)) || null;
+}
+
+function managerSocialMediaHtml(item) {
+  const mediaType = String(item.media_type || 'none');
+  const mediaUrl = String(item.media_file_url || item.media_url || '').trim();
+  if (!mediaUrl || mediaType === 'none') return '';
+  if (mediaType === 'image') {
+    return `<div class="manager-social-media"><img src="${esc(item.thumbnail_url || mediaUrl)}" alt="media"></div>`;
+  }
+  if (mediaType === 'video') {
+    const embed = toEmbedUrl(mediaUrl);
+    if (embed) {
+      return `<div class="manager-social-media"><iframe src="${esc(embed)}" allowfullscreen></iframe></div>`;
+    }
+    return `<div class="manager-social-media"><video controls src="${esc(mediaUrl)}"></video></div>`;
+  }
+  return '';
+}
+
+function managerSocialKindMeta(kind) {
+  if (kind === 'events') {
+    return {
+      endpoint: '/api/events/',
+      paneId: 'manager-events-pane',
+      listStateKey: 'managerEvents',
+      editStateKey: 'managerEventEditId',
+      composeStateKey: 'managerEventComposeOpen',
+      title: 'События',
+      emptyText: 'Событий для выбранной группы пока нет.',
+      createLabel: 'Добавить событие',
+      saveLabel: 'Сохранить событие',
+      fields: [
+        { key: 'title', label: 'Заголовок', type: 'text', required: true },
+        { key: 'event_date', label: 'Дата события', type: 'date' },
+        { key: 'media_type', label: 'Медиа', type: 'selectStatic', choices: [['none', 'Без медиа'], ['image', 'Изображение'], ['video', 'Видео']] },
+        { key: 'media_url', label: 'Ссылка на медиа', type: 'url' },
+        { key: 'description', label: 'Описание', type: 'textarea', full: true, required: true },
+      ],
+      normalizePayload(payload) {
+        if (!payload.event_date) payload.event_date = null;
+        if (!payload.media_type || payload.media_type === 'none') {
+          payload.media_type = 'none';
+          payload.media_url = '';
+        }
+        return payload;
+      },
+      cardTitle(item) { return item.title || 'Событие'; },
+      cardDate(item) { return item.event_date ? `Дата: ${formatDateRu(item.event_date)}` : 'Дата не указана'; },
+      cardMeta(item) { return `Создано: ${formatDateTimeRu(item.created_at)}`; },
+      cardText(item) { return item.description || ''; },
+      prefill(record) {
+        return {
+          title: record?.title || '',
+          event_date: record?.event_date || '',
+          media_type: record?.media_type || 'none',
+          media_url: record?.media_url || '',
+          description: record?.description || '',
+        };
+      },
+    };
+  }
+  return {
+    endpoint: '/api/feed-posts/',
+    paneId: 'manager-feed-pane',
+    listStateKey: 'managerFeed',
+    editStateKey: 'managerFeedEditId',
+    composeStateKey: 'managerFeedComposeOpen',
+    title: 'Лента',
+    emptyText: 'Записей в ленте для выбранной группы пока нет.',
+    createLabel: 'Добавить пост',
+    saveLabel: 'Сохранить пост',
+    fields: [
+      { key: 'author_name', label: 'Автор', type: 'text', required: true },
+      { key: 'media_type', label: 'Медиа', type: 'selectStatic', choices: [['none', 'Без медиа'], ['image', 'Изображение'], ['video', 'Видео']] },
+      { key: 'media_url', label: 'Ссылка на медиа', type: 'url' },
+      { key: 'text', label: 'Текст поста', type: 'textarea', full: true, required: true },
+    ],
+    normalizePayload(payload) {
+      if (!payload.author_name) payload.author_name = state.myDisplayName || (state.me?.username || 'Менеджер');
+      if (!payload.media_type || payload.media_type === 'none') {
+        payload.media_type = 'none';
+        payload.media_url = '';
+      }
+      return payload;
+    },
+    cardTitle(item) { return item.author_name || 'Менеджер'; },
+    cardDate(item) { return formatDateTimeRu(item.created_at); },
+    cardMeta() { return ''; },
+    cardText(item) { return item.text || ''; },
+    prefill(record) {
+      return {
+        author_name: record?.author_name || state.myDisplayName || (state.me?.username || 'Менеджер'),
+        media_type: record?.media_type || 'none',
+        media_url: record?.media_url || '',
+        text: record?.text || '',
+      };
+    },
+  };
+}
+
+function managerSocialFieldHtml(kind, field, values) {
+  const id = `mgr-${kind}-${field.key}`;
+  const cls = field.full ? 'full' : '';
+  const rawValue = values && values[field.key] != null ? values[field.key] : '';
+  const value = String(rawValue || '');
+  if (field.type === 'textarea') {
+    return `
+      <div class="${cls}">
+        <label for="${id}">${esc(field.label)}</label>
+        <textarea id="${id}" ${field.required ? 'required' : ''}>${esc(value)}</textarea>
+      </div>
+    `;
+  }
+  if (field.type === 'selectStatic') {
+    const options = (field.choices || []).map(([v, label]) =>
+      `<option value="${esc(v)}"${String(v) === value ? ' selected' : ''}>${esc(label)}</option>`
+    ).join('');
+    return `
+      <div class="${cls}">
+        <label for="${id}">${esc(field.label)}</label>
+        <select id="${id}">${options}</select>
+      </div>
+    `;
+  }
+  const type = field.type || 'text';
+  return `
+    <div class="${cls}">
+      <label for="${id}">${esc(field.label)}</label>
+      <input id="${id}" type="${esc(type)}" value="${esc(value)}" ${field.required ? 'required' : ''}>
+    </div>
+  `;
+}
+
+function managerSocialCollect(kind) {
+  const meta = managerSocialKindMeta(kind);
+  const payload = { group: Number(state.activeGroupId) };
+  meta.fields.forEach((field) => {
+    const el = $(`mgr-${kind}-${field.key}`);
+    if (!el) return;
+    payload[field.key] = (field.type === 'textarea') ? el.value : String(el.value || '');
+  });
+  return meta.normalizePayload(payload);
+}
+
+function managerSocialSetStatus(kind, text) {
+  const el = $(`mgr-${kind}-status`);
+  if (el) el.textContent = text || '';
+}
+
+function managerSocialBindMedia(kind) {
+  const fileInput = $(`mgr-${kind}-media-file`);
+  const uploadBtn = $(`mgr-${kind}-media-upload`);
+  if (!fileInput || !uploadBtn) return;
+  uploadBtn.onclick = async () => {
+    const file = fileInput.files && fileInput.files[0];
+    if (!file) {
+      managerSocialSetStatus(kind, 'Выберите файл.');
+      return;
+    }
+    managerSocialSetStatus(kind, 'Загрузка файла...');
+    try {
+      const url = await uploadMedia(file);
+      const urlInput = $(`mgr-${kind}-media_url`);
+      const mediaTypeSelect = $(`mgr-${kind}-media_type`);
+      if (urlInput) urlInput.value = url;
+      if (mediaTypeSelect && mediaTypeSelect.value === 'none') {
+        const isVideo = (file.type || '').startsWith('video/');
+        mediaTypeSelect.value = isVideo ? 'video' : 'image';
+      }
+      managerSocialSetStatus(kind, 'Файл загружен.');
+    } catch (e) {
+      managerSocialSetStatus(kind, e.message);
+    }
+  };
+}
+
+function managerRenderSocialPane(kind) {
+  const meta = managerSocialKindMeta(kind);
+  const pane = $(meta.paneId);
+  if (!pane) return;
+  const currentGroup = currentManagerGroup();
+  if (!currentGroup) {
+    pane.innerHTML = '<div class="empty">Выберите группу в чате, чтобы работать с этим разделом.</div>';
+    return;
+  }
+  const list = Array.isArray(state[meta.listStateKey]) ? state[meta.listStateKey] : [];
+  const editId = Number(state[meta.editStateKey] || 0);
+  const editing = list.find((x) => Number(x.id) === editId) || null;
+  const composeOpen = Boolean(state[meta.composeStateKey]) || Boolean(editing);
+  const values = meta.prefill(editing);
+  pane.innerHTML = `
+    <div class="manager-social-topbar">
+      <div>
+        <h4>${esc(meta.title)}</h4>
+        <div class="sub">Группа: ${esc(currentGroup.name)}</div>
+      </div>
+      <button class="manager-plus-btn" id="mgr-${kind}-toggle-compose" type="button" title="Добавить">+</button>
+    </div>
+    ${composeOpen ? `
+      <div class="manager-social-compose">
+        <h4>${editing ? `Редактирование: ${esc(meta.title.toLowerCase())}` : meta.createLabel}</h4>
+        <form id="mgr-${kind}-form">
+          <input id="mgr-${kind}-edit-id" type="hidden" value="${editing ? editing.id : ''}">
+          <div class="manager-social-grid">
+            ${meta.fields.map((field) => managerSocialFieldHtml(kind, field, values)).join('')}
+          </div>
+          <div class="manager-social-file">
+            <input id="mgr-${kind}-media-file" type="file" accept="image/*,video/*">
+            <button id="mgr-${kind}-media-upload" class="manager-link-btn" type="button">Загрузить файл</button>
+            ${values.media_url ? `<a class="manager-social-inline-link" href="${esc(values.media_url)}" target="_blank" rel="noopener noreferrer">Открыть медиа</a>` : ''}
+          </div>
+          <div class="manager-social-actions">
+            <button class="manager-link-btn primary" type="submit">${editing ? meta.saveLabel : meta.createLabel}</button>
+            <button id="mgr-${kind}-cancel" class="manager-link-btn" type="button">${editing ? 'Отмена' : 'Свернуть'}</button>
+          </div>
+          <div id="mgr-${kind}-status" class="manager-social-status"></div>
+        </form>
+      </div>
+    ` : ''}
+    <div class="manager-social-list">
+      ${list.length ? list.map((item) => {
+        const isEdit = Number(item.id) === editId;
+        const metaText = meta.cardMeta(item);
+        return `
+          <div class="manager-social-card${isEdit ? ' active' : ''}">
+            <div class="manager-social-head">
+              <div class="manager-social-title">${esc(meta.cardTitle(item))}</div>
+              <div class="manager-social-date">${esc(meta.cardDate(item))}</div>
+            </div>
+            ${metaText ? `<div class="manager-social-meta">${esc(metaText)}</div>` : ''}
+            <div class="manager-social-text">${esc(meta.cardText(item))}</div>
+            ${managerSocialMediaHtml(item)}
+            <div class="manager-social-card-actions">
+              <button class="manager-link-btn" type="button" data-social-edit="${kind}" data-id="${item.id}">Редактировать</button>
+              <button class="manager-link-btn" type="button" data-social-del="${kind}" data-id="${item.id}">Удалить</button>
+            </div>
+          </div>
+        `;
+      }).join('') : `<div class="empty">${esc(meta.emptyText)}</div>`}
+    </div>
+  `;
+
+  const toggleComposeBtn = $(`mgr-${kind}-toggle-compose`);
+  if (toggleComposeBtn) {
+    toggleComposeBtn.onclick = () => {
+      state[meta.composeStateKey] = !Boolean(state[meta.composeStateKey]);
+      if (!state[meta.composeStateKey]) state[meta.editStateKey] = null;
+      managerRenderSocialPane(kind);
+    };
+  }
+
+  managerSocialBindMedia(kind);
+  const form = $(`mgr-${kind}-form`);
+  if (form) {
+    form.onsubmit = (e) => {
+      e.preventDefault();
+      managerSaveSocial(kind);
+    };
+  }
+  const cancelBtn = $(`mgr-${kind}-cancel`);
+  if (cancelBtn) {
+    cancelBtn.onclick = () => {
+      state[meta.editStateKey] = null;
+      state[meta.composeStateKey] = false;
+      managerRenderSocialPane(kind);
+    };
+  }
+  pane.querySelectorAll(`[data-social-edit="${kind}"]`).forEach((btn) => {
+    btn.onclick = () => {
+      state[meta.editStateKey] = Number(btn.dataset.id);
+      state[meta.composeStateKey] = true;
+      managerRenderSocialPane(kind);
+    };
+  });
+  pane.querySelectorAll(`[data-social-del="${kind}"]`).forEach((btn) => {
+    btn.onclick = () => managerDeleteSocial(kind, Number(btn.dataset.id));
+  });
+}
+
+async function managerLoadSocial(kind) {
+  const meta = managerSocialKindMeta(kind);
+  const pane = $(meta.paneId);
+  if (!pane) return;
+  if (!state.activeGroupId) {
+    pane.innerHTML = '<div class="empty">Нет выбранной группы.</div>';
+    return;
+  }
+  pane.innerHTML = '<div class="empty">Загрузка...</div>';
+  const data = await api(`${meta.endpoint}?group=${state.activeGroupId}`);
+  state[meta.listStateKey] = Array.isArray(data) ? data : [];
+  if (!state[meta.listStateKey].some((x) => Number(x.id) === Number(state[meta.editStateKey] || 0))) {
+    state[meta.editStateKey] = null;
+  }
+  managerRenderSocialPane(kind);
+}
+
+function managerLoadEvents() { return managerLoadSocial('events'); }
+function managerLoadFeed() { return managerLoadSocial('feed'); }
+
+async function managerSaveSocial(kind) {
+  const meta = managerSocialKindMeta(kind);
+  if (!state.activeGroupId) return;
+  const form = $(`mgr-${kind}-form`);
+  if (!form || !form.reportValidity()) return;
+  const editId = Number($(`mgr-${kind}-edit-id`)?.value || 0);
+  managerSocialSetStatus(kind, editId ? 'Сохранение...' : 'Создание...');
+  try {
+    const payload = managerSocialCollect(kind);
+    if (editId) {
+      await api(`${meta.endpoint}${editId}/`, 'PUT', payload);
+    } else {
+      await api(meta.endpoint, 'POST', payload);
+    }
+    state[meta.editStateKey] = null;
+    state[meta.composeStateKey] = false;
+    await managerLoadSocial(kind);
+    managerSocialSetStatus(kind, 'Сохранено.');
+  } catch (e) {
+    managerSocialSetStatus(kind, e.message);
+  }
+}
+
+async function managerDeleteSocial(kind, id) {
+  const meta = managerSocialKindMeta(kind);
+  if (!id) return;
+  if (!confirm('Удалить запись?')) return;
+  try {
+    await api(`${meta.endpoint}${id}/`, 'DELETE');
+    if (Number(state[meta.editStateKey]) === Number(id)) state[meta.editStateKey] = null;
+    await managerLoadSocial(kind);
+  } catch (e) {
+    const pane = $(meta.paneId);
+    if (pane) {
+      const msg = document.createElement('div');
+      msg.className = 'manager-social-status';
+      msg.textContent = e.message;
+      pane.prepend(msg);
+    }
+  }
+}
+
+function cloneDevMethodDraft(methodObj) {
+  return {
+    id: methodObj.id,
+    subject: methodObj.subject,
+    method_number: Number(methodObj.method_number || 1),
+    title: String(methodObj.title || ''),
+    description: String(methodObj.description || ''),
+    material_url: String(methodObj.material_url || ''),
+    content_blocks: Array.isArray(methodObj.content_blocks)
+      ? JSON.parse(JSON.stringify(methodObj.content_blocks))
+      : [],
+  };
+}
+
+function ensureDevEditorDraft(methodObj) {
+  if (!methodObj) return null;
+  if (Number(state.devEditorMethodId) !== Number(methodObj.id) || !state.devEditorDraft) {
+    state.devEditorMethodId = methodObj.id;
+    state.devEditorDraft = cloneDevMethodDraft(methodObj);
+  }
+  return state.devEditorDraft;
+}
+
+function defaultDevBlock(type) {
+  return devNormalizeMethodBlock({ type });
+}
+
+function devNormalizeMethodBlock(block) {
+  const raw = block || {};
+  const type = raw.type || 'text';
+  const style = raw.style || {};
+  const styleBase = {
+    textColor: String(style.textColor || '#1d2433'),
+    fontSize: Number(style.fontSize || (type === 'heading' ? 32 : 18)),
+    textAlign: String(style.textAlign || 'left'),
+    maxWidth: Number(style.maxWidth || 100),
+    radius: Number(style.radius || 10),
+    bgColor: String(style.bgColor || (type === 'quote' ? '#eaf0ff' : 'transparent')),
+    captionColor: String(style.captionColor || '#66758f'),
+    captionSize: Number(style.captionSize || 12),
+  };
+  if (type === 'heading') return { type: 'heading', text: String(raw.text || ''), style: styleBase };
+  if (type === 'quote') return { type: 'quote', text: String(raw.text || ''), style: styleBase };
+  if (type === 'image') return { type: 'image', url: String(raw.url || ''), caption: String(raw.caption || ''), style: styleBase };
+  if (type === 'video') return { type: 'video', url: String(raw.url || ''), caption: String(raw.caption || ''), style: styleBase };
+  return { type: 'text', text: String(raw.text || ''), style: styleBase };
+}
+
+function devAddStyleControls(block, box, onChange) {
+  const controls = document.createElement('div');
+  controls.className = 'row';
+  controls.style.marginTop = '8px';
+
+  const color = document.createElement('input');
+  color.type = 'color';
+  color.value = block.style.textColor || '#1d2433';
+  color.title = 'Цвет текста';
+  color.oninput = () => { block.style.textColor = color.value; onChange(); };
+
+  const size = document.createElement('input');
+  size.type = 'number';
+  size.min = '10';
+  size.max = '72';
+  size.value = String(block.style.fontSize || 18);
+  size.placeholder = 'Размер текста';
+  size.oninput = () => { block.style.fontSize = Number(size.value || 18); onChange(); };
+
+  const align = document.createElement('select');
+  align.innerHTML = '<option value="left">Слева</option><option value="center">По центру</option><option value="right">Справа</option>';
+  align.value = block.style.textAlign || 'left';
+  align.onchange = () => { block.style.textAlign = align.value; onChange(); };
+
+  controls.appendChild(color);
+  controls.appendChild(size);
+  controls.appendChild(align);
+  box.appendChild(controls);
+}
+
+function devAddMediaStyleControls(block, box, onChange) {
+  const controls = document.createElement('div');
+  controls.className = 'row';
+  controls.style.marginTop = '8px';
+
+  const width = document.createElement('input');
+  width.type = 'number';
+  width.min = '20';
+  width.max = '100';
+  width.value = String(block.style.maxWidth || 100);
+  width.placeholder = 'Ширина %';
+  width.oninput = () => { block.style.maxWidth = Number(width.value || 100); onChange(); };
+
+  const radius = document.createElement('input');
+  radius.type = 'number';
+  radius.min = '0';
+  radius.max = '40';
+  radius.value = String(block.style.radius || 10);
+  radius.placeholder = 'Скругление';
+  radius.oninput = () => { block.style.radius = Number(radius.value || 10); onChange(); };
+
+  const align = document.createElement('select');
+  align.innerHTML = '<option value="left">Слева</option><option value="center">По центру</option><option value="right">Справа</option>';
+  align.value = block.style.textAlign || 'left';
+  align.onchange = () => { block.style.textAlign = align.value; onChange(); };
+
+  controls.appendChild(width);
+  controls.appendChild(radius);
+  controls.appendChild(align);
+  box.appendChild(controls);
+
+  const capControls = document.createElement('div');
+  capControls.className = 'row';
+  capControls.style.marginTop = '8px';
+  const capColor = document.createElement('input');
+  capColor.type = 'color';
+  capColor.value = block.style.captionColor || '#66758f';
+  capColor.oninput = () => { block.style.captionColor = capColor.value; onChange(); };
+  const capSize = document.createElement('input');
+  capSize.type = 'number';
+  capSize.min = '10';
+  capSize.max = '24';
+  capSize.value = String(block.style.captionSize || 12);
+  capSize.oninput = () => { block.style.captionSize = Number(capSize.value || 12); onChange(); };
+  capControls.appendChild(capColor);
+  capControls.appendChild(capSize);
+  box.appendChild(capControls);
+}
+
+function renderTeacherDevEditor(methodObj, assignment) {
+  const mount = $('teacher-dev-editor');
+  if (!mount) return;
+  if (!methodObj || !assignment || !assignment.can_edit) {
+    mount.innerHTML = '<div class="empty">Конструктор станет доступен, когда метод откроется для редактирования.</div>';
+    return;
+  }
+  const draft = ensureDevEditorDraft(methodObj);
+  mount.innerHTML = `
+    <div class="dev-editor">
+      <h4>Конструктор метода</h4>
+      <label>Название</label>
+      <input id="dev-method-title" value="${esc(draft.title)}" />
+      <label>Описание</label>
+      <textarea id="dev-method-description">${esc(draft.description)}</textarea>
+      <label>Ссылка на материалы</label>
+      <input id="dev-method-url" value="${esc(draft.material_url)}" placeholder="https://..." />
+      <div class="dev-editor-toolbar">
+        <button class="method-btn" type="button" id="dev-add-heading">+ Заголовок</button>
+        <button class="method-btn" type="button" id="dev-add-text">+ Текст</button>
+        <button class="method-btn" type="button" id="dev-add-quote">+ Цитата</button>
+        <button class="method-btn" type="button" id="dev-add-image">+ Картинка</button>
+        <button class="method-btn" type="button" id="dev-add-video">+ Видео</button>
+      </div>
+      <div id="dev-editor-blocks" class="dev-blocks"></div>
+      <div class="dev-preview">
+        <div class="teacher-item-meta" style="margin-bottom:6px;">Предпросмотр (как увидит студент)</div>
+        <div id="dev-editor-preview"></div>
+      </div>
+      <div class="dev-save-row">
+        <button class="method-btn" type="button" id="dev-method-save">Сохранить метод</button>
+        <span id="dev-save-status" class="dev-save-status"></span>
+      </div>
+    </div>
+  `;
+
+  const syncTopFields = () => {
+    draft.title = $('dev-method-title') ? $('dev-method-title').value : draft.title;
+    draft.description = $('dev-method-description') ? $('dev-method-description').value : draft.description;
+    draft.material_url = $('dev-method-url') ? $('dev-method-url').value : draft.material_url;
+    renderTeacherDevEditorPreview();
+  };
+  $('dev-method-title').addEventListener('input', syncTopFields);
+  $('dev-method-description').addEventListener('input', syncTopFields);
+  $('dev-method-url').addEventListener('input', syncTopFields);
+
+  $('dev-add-heading').onclick = () => { draft.content_blocks.push(defaultDevBlock('heading')); renderTeacherDevEditorBlocks(); };
+  $('dev-add-text').onclick = () => { draft.content_blocks.push(defaultDevBlock('text')); renderTeacherDevEditorBlocks(); };
+  $('dev-add-quote').onclick = () => { draft.content_blocks.push(defaultDevBlock('quote')); renderTeacherDevEditorBlocks(); };
+  $('dev-add-image').onclick = () => { draft.content_blocks.push(defaultDevBlock('image')); renderTeacherDevEditorBlocks(); };
+  $('dev-add-video').onclick = () => { draft.content_blocks.push(defaultDevBlock('video')); renderTeacherDevEditorBlocks(); };
+  $('dev-method-save').onclick = () => saveTeacherDevMethod(methodObj, assignment);
+
+  renderTeacherDevEditorBlocks();
+  renderTeacherDevEditorPreview();
+}
+
+function renderTeacherDevEditorBlocks() {
+  const wrap = $('dev-editor-blocks');
+  if (!wrap || !state.devEditorDraft) return;
+  const draft = state.devEditorDraft;
+  wrap.innerHTML = '';
+  draft.content_blocks = draft.content_blocks.map((b) => devNormalizeMethodBlock(b));
+  const titleMap = { heading: 'Заголовок', text: 'Текст', quote: 'Цитата', image: 'Картинка', video: 'Видео' };
+  draft.content_blocks.forEach((raw, idx) => {
+    const b = raw || {};
+    const type = b.type || 'text';
+    const box = document.createElement('div');
+    box.className = 'block-item';
+    box.innerHTML = `
+      <div class="block-head">
+        <div class="block-kind">Блок ${idx + 1}: ${titleMap[type] || type}</div>
+        <div class="block-actions">
+          <button type="button" data-act="up" data-i="${idx}">Вверх</button>
+          <button type="button" data-act="down" data-i="${idx}">Вниз</button>
+          <button type="button" data-act="del" data-i="${idx}">Удалить</button>
+        </div>
+      </div>
+    `;
+    if (type === 'heading' || type === 'text' || type === 'quote') {
+      const ta = document.createElement('textarea');
+      ta.rows = type === 'heading' ? 2 : 4;
+      ta.value = String(b.text || '');
+      ta.placeholder = type === 'heading' ? 'Заголовок раздела' : (type === 'quote' ? 'Цитата/выделенный блок' : 'Текст блока');
+      ta.oninput = () => { draft.content_blocks[idx].text = ta.value; renderTeacherDevEditorPreview(); };
+      box.appendChild(ta);
+      devAddStyleControls(draft.content_blocks[idx], box, renderTeacherDevEditorPreview);
+      if (type === 'quote') {
+        const quoteBg = document.createElement('input');
+        quoteBg.type = 'color';
+        quoteBg.value = draft.content_blocks[idx].style.bgColor || '#eaf0ff';
+        quoteBg.oninput = () => { draft.content_blocks[idx].style.bgColor = quoteBg.value; renderTeacherDevEditorPreview(); };
+        box.appendChild(quoteBg);
+      }
+    } else {
+      const url = document.createElement('input');
+      url.readOnly = true;
+      url.value = String(b.url || '');
+      url.placeholder = 'Файл не выбран';
+      box.appendChild(url);
+      const uploadRow = document.createElement('div');
+      uploadRow.className = 'block-actions';
+      uploadRow.style.marginTop = '6px';
+      const pickBtn = document.createElement('button');
+      pickBtn.type = 'button';
+      pickBtn.textContent = type === 'image' ? 'Загрузить картинку' : 'Загрузить видео';
+      const uploadStatus = document.createElement('span');
+      uploadStatus.className = 'teacher-item-meta';
+      uploadStatus.style.alignSelf = 'center';
+      uploadStatus.textContent = '';
+      const fileInput = document.createElement('input');
+      fileInput.type = 'file';
+      fileInput.accept = type === 'image' ? 'image/*' : 'video/*';
+      fileInput.style.display = 'none';
+      pickBtn.onclick = () => fileInput.click();
+      fileInput.onchange = async () => {
+        const file = fileInput.files && fileInput.files[0];
+        if (!file) return;
+        try {
+          uploadStatus.textContent = 'Загрузка...';
+          const uploadedUrl = await uploadMedia(file);
+          draft.content_blocks[idx].url = uploadedUrl;
+          url.value = uploadedUrl;
+          renderTeacherDevEditorBlocks();
+          renderTeacherDevEditorPreview();
+        } catch (e) {
+          uploadStatus.textContent = e.message || 'Ошибка загрузки';
+          return;
+        }
+        uploadStatus.textContent = 'Загружено';
+      };
+      uploadRow.appendChild(pickBtn);
+      uploadRow.appendChild(uploadStatus);
+      uploadRow.appendChild(fileInput);
+      box.appendChild(uploadRow);
+      const cap = document.createElement('input');
+      cap.style.marginTop = '6px';
+      cap.value = String(b.caption || '');
+      cap.placeholder = 'Подпись (необязательно)';
+      cap.oninput = () => { draft.content_blocks[idx].caption = cap.value; renderTeacherDevEditorPreview(); };
+      box.appendChild(cap);
+      devAddMediaStyleControls(draft.content_blocks[idx], box, renderTeacherDevEditorPreview);
+    }
+    box.querySelectorAll('button[data-act]').forEach((btn) => {
+      btn.onclick = () => {
+        const i = Number(btn.dataset.i);
+        const act = btn.dataset.act;
+        if (act === 'del') draft.content_blocks.splice(i, 1);
+        if (act === 'up' && i > 0) [draft.content_blocks[i - 1], draft.content_blocks[i]] = [draft.content_blocks[i], draft.content_blocks[i - 1]];
+        if (act === 'down' && i < draft.content_blocks.length - 1) [draft.content_blocks[i + 1], draft.content_blocks[i]] = [draft.content_blocks[i], draft.content_blocks[i + 1]];
+        renderTeacherDevEditorBlocks();
+        renderTeacherDevEditorPreview();
+      };
+    });
+    wrap.appendChild(box);
+  });
+  if (!draft.content_blocks.length) {
+    wrap.innerHTML = '<div class="empty">Блоков пока нет. Добавь сверху первый блок.</div>';
+  }
+}
+
+function renderTeacherDevEditorPreview() {
+  const preview = $('dev-editor-preview');
+  if (!preview || !state.devEditorDraft) return;
+  const draft = state.devEditorDraft;
+  const normalizedBlocks = (draft.content_blocks || []).map((b) => devNormalizeMethodBlock(b));
+  preview.innerHTML = '';
+  preview.className = 'live-page';
+
+  const header = document.createElement('div');
+  header.className = 'live-header';
+  header.innerHTML = `<div class="live-badge">Методпакет</div><h2 class="live-title">${draft.title ? esc(draft.title) : 'Название урока'}</h2>`;
+  if (draft.description) {
+    const d = document.createElement('p');
+    d.className = 'live-desc';
+    d.textContent = draft.description;
+    header.appendChild(d);
+  }
+  if (draft.material_url) {
+    const a = document.createElement('a');
+    a.className = 'live-material-link';
+    a.href = draft.material_url;
+    a.target = '_blank';
+    a.rel = 'noopener noreferrer';
+    a.textContent = 'Учебные материалы';
+    header.appendChild(a);
+  }
+  preview.appendChild(header);
+  if (!normalizedBlocks.length) {
+    const empty = document.createElement('div');
+    empty.className = 'live-desc';
+    empty.textContent = 'Добавьте блоки слева, чтобы собрать страницу урока.';
+    preview.appendChild(empty);
+    return;
+  }
+
+  normalizedBlocks.forEach((block) => {
+    const section = document.createElement('section');
+    section.className = 'live-block';
+    section.style.textAlign = block.style.textAlign || 'left';
+    if (block.type === 'heading') {
+      const h = document.createElement('h3');
+      h.textContent = block.text || '';
+      h.style.color = block.style.textColor;
+      h.style.fontSize = `${block.style.fontSize}px`;
+      section.appendChild(h);
+    }
+    if (block.type === 'text') {
+      const p = document.createElement('p');
+      p.textContent = block.text || '';
+      p.style.color = block.style.textColor;
+      p.style.fontSize = `${block.style.fontSize}px`;
+      section.appendChild(p);
+    }
+    if (block.type === 'quote') {
+      const q = document.createElement('div');
+      q.className = 'live-quote';
+      q.textContent = block.text || '';
+      q.style.color = block.style.textColor;
+      q.style.fontSize = `${block.style.fontSize}px`;
+      q.style.background = block.style.bgColor || '#eaf0ff';
+      section.appendChild(q);
+    }
+    if (block.type === 'image' && block.url) {
+      const img = document.createElement('img');
+      img.src = block.url;
+      img.alt = block.caption || 'image';
+      img.style.maxWidth = `${block.style.maxWidth}%`;
+      img.style.borderRadius = `${block.style.radius}px`;
+      if (block.style.textAlign === 'center') img.style.margin = '0 auto';
+      if (block.style.textAlign === 'right') img.style.margin = '0 0 0 auto';
+      section.appendChild(img);
+      if (block.caption) {
+        const cap = document.createElement('div');
+        cap.className = 'live-caption';
+        cap.textContent = block.caption;
+        cap.style.color = block.style.captionColor;
+        cap.style.fontSize = `${block.style.captionSize}px`;
+        section.appendChild(cap);
+      }
+    }
+    if (block.type === 'video' && block.url) {
+      const embed = toEmbedUrl(block.url);
+      if (embed) {
+        const iframe = document.createElement('iframe');
+        iframe.src = embed;
+        iframe.allowFullscreen = true;
+        iframe.style.maxWidth = `${block.style.maxWidth}%`;
+        iframe.style.borderRadius = `${block.style.radius}px`;
+        if (block.style.textAlign === 'center') iframe.style.margin = '0 auto';
+        if (block.style.textAlign === 'right') iframe.style.margin = '0 0 0 auto';
+        section.appendChild(iframe);
+      } else {
+        const video = document.createElement('video');
+        video.src = block.url;
+        video.controls = true;
+        video.style.width = `${block.style.maxWidth}%`;
+        video.style.borderRadius = `${block.style.radius}px`;
+        if (block.style.textAlign === 'center') video.style.margin = '0 auto';
+        if (block.style.textAlign === 'right') video.style.margin = '0 0 0 auto';
+        section.appendChild(video);
+      }
+      if (block.caption) {
+        const cap = document.createElement('div');
+        cap.className = 'live-caption';
+        cap.textContent = block.caption;
+        cap.style.color = block.style.captionColor;
+        cap.style.fontSize = `${block.style.captionSize}px`;
+        section.appendChild(cap);
+      }
+    }
+    preview.appendChild(section);
+  });
+}
+
+async function saveTeacherDevMethod(methodObj, assignment) {
+  if (!assignment || !assignment.can_edit || !methodObj || !state.devEditorDraft) return;
+  const statusEl = $('dev-save-status');
+  if (statusEl) statusEl.textContent = 'Сохранение...';
+  try {
+    const d = state.devEditorDraft;
+    const payload = {
+      subject: methodObj.subject,
+      method_number: Number(methodObj.method_number || 1),
+      title: String(d.title || '').trim() || `Урок ${methodObj.method_number || ''}`,
+      description: String(d.description || ''),
+      material_url: String(d.material_url || ''),
+      content_blocks: (Array.isArray(d.content_blocks) ? d.content_blocks : []).map((b) => {
+        const type = b.type || 'text';
+        if (type === 'image' || type === 'video') {
+          return { type, url: String(b.url || '').trim(), caption: String(b.caption || '').trim(), style: b.style || {} };
+        }
+        return { type, text: String(b.text || '').trim(), style: b.style || {} };
+      }).filter((b) => (['image', 'video'].includes(b.type) ? b.url : b.text)),
+    };
+    const updated = await api(`/api/method-packages/${methodObj.id}/`, 'PUT', payload);
+    state.methods = state.methods.map((m) => (Number(m.id) === Number(updated.id) ? updated : m));
+    state.devEditorMethodId = updated.id;
+    state.devEditorDraft = cloneDevMethodDraft(updated);
+    if (statusEl) statusEl.textContent = 'Сохранено';
+    renderTeacherDevelopmentList();
+    renderTeacherDevelopmentDetail();
+    if (state.activeView === 'methods') renderTeacherMethodsList();
+  } catch (e) {
+    if (statusEl) statusEl.textContent = e.message;
+  }
+}
+
+function openMethodInNewTab(methodObj) {
+  const win = window.open('', '_blank');
+  if (!win) return;
+  const title = esc(methodObj.title || 'Методпакет');
+  win.document.open();
+  win.document.write(`<!doctype html><html lang="ru"><head><meta charset="UTF-8" /><meta name="viewport" content="width=device-width,initial-scale=1" /><title>${title}</title><style>
+    body{margin:0;background:#0b1021;color:#f0f5ff;font-family:Trebuchet MS,Segoe UI,system-ui,sans-serif;padding:18px;}
+    .wrap{max-width:1080px;margin:0 auto;}
+    .live-page{background:#f5f7fb;color:#1d2433;border-radius:12px;border:1px solid #dfe5f1;padding:20px;min-height:240px;}
+    .live-header{text-align:center;margin-bottom:18px;}
+    .live-badge{display:inline-block;padding:8px 14px;border-radius:999px;background:#eaf2ff;color:#2f5cab;font-size:12px;font-weight:700;margin-bottom:8px;}
+    .live-title{margin:0;font-size:30px;line-height:1.2;font-weight:800;color:#17203a;}
+    .live-desc{margin:10px auto 0;max-width:820px;color:#52607a;text-align:center;}
+    .live-material-link{display:inline-block;margin-top:10px;padding:8px 12px;border-radius:10px;background:#1f6feb;color:#fff;font-weight:700;text-decoration:none;}
+    .live-block{margin:16px 0;}
+    .live-block h3{margin:0 0 8px;font-size:25px;line-height:1.25;}
+    .live-block p{margin:0;line-height:1.65;}
+    .live-quote{border-left:4px solid #6d8ed6;background:#eaf0ff;color:#27334d;padding:12px 14px;border-radius:8px;}
+    .live-block img{max-width:100%;border-radius:10px;border:1px solid #d8dfef;display:block;}
+    .live-block iframe{width:100%;min-height:360px;border:none;border-radius:10px;background:#0f172a;display:block;}
+    .live-caption{margin-top:6px;font-size:12px;color:#66758f;}
+    .method-btn{display:inline-block;border:1px solid #d8dfef;background:#fff;color:#334155;border-radius:8px;padding:6px 10px;text-decoration:none;font-size:13px;}
+  </style></head><body><div class="wrap"><div id="mp-root"></div></div></body></html>`);
+  win.document.close();
+  const root = win.document.getElementById('mp-root');
+  if (root) renderMethodLivePage(root, methodObj, win.document);
+}
+
+function renderTeacherMethodViewer(methodObj) {
+  const viewer = $('teacher-method-viewer');
+  if (!methodObj) {
+    viewer.textContent = 'Выберите методпакет и нажмите "Открыть"';
+    return;
+  }
+  viewer.innerHTML = '';
+  const head = document.createElement('div');
+  head.className = 'method-viewer-head';
+  const h = document.createElement('h3');
+  h.textContent = methodObj.title || 'Методпакет';
+  const collapseBtn = document.createElement('button');
+  collapseBtn.type = 'button';
+  collapseBtn.className = 'method-collapse-btn';
+  collapseBtn.textContent = 'Свернуть';
+  collapseBtn.onclick = () => {
+    state.openMethodId = null;
+    renderTeacherMethodsList();
+    renderTeacherMethodViewer(null);
+  };
+  head.appendChild(h);
+  head.appendChild(collapseBtn);
+  viewer.appendChild(head);
+  const actions = document.createElement('div');
+  actions.className = 'method-actions';
+  const openTabBtn = document.createElement('button');
+  openTabBtn.type = 'button';
+  openTabBtn.className = 'method-btn';
+  openTabBtn.textContent = 'Открыть в новой вкладке';
+  openTabBtn.onclick = () => openMethodInNewTab(methodObj);
+  actions.appendChild(openTabBtn);
+  if (methodObj.material_url) {
+    const a = document.createElement('a');
+    a.className = 'method-btn';
+    a.href = methodObj.material_url;
+    a.target = '_blank';
+    a.rel = 'noopener noreferrer';
+    a.textContent = 'Источник';
+    actions.appendChild(a);
+  }
+  viewer.appendChild(actions);
+  renderMethodLivePage(viewer, methodObj);
+}
+
+function statusLabel(code) {
+  const map = {
+    todo: 'К выполнению',
+    in_progress: 'В работе',
+    review: 'На проверке',
+    done: 'Подтверждено',
+  };
+  return map[String(code || '')] || (code || '—');
+}
+
+function fmtDateTime(v) {
+  if (!v) return '';
+  const d = new Date(v);
+  if (Number.isNaN(d.getTime())) return '';
+  return d.toLocaleString([], { day: '2-digit', month: '2-digit', hour: '2-digit', minute: '2-digit' });
+}
+
+function assignmentForMethod(methodId) {
+  return state.assignments.find((a) => Number(a.method_package) === Number(methodId)) || null;
+}
+
+function isOwnAssignmentComment(c) {
+  const role = String((state.me && state.me.role) || ROLE || '').toLowerCase();
+  const senderRole = String(c.sender_role || '').toLowerCase();
+  return senderRole === role || (state.me && c.sender_username && c.sender_username === state.me.username);
+}
+
+async function loadAssignmentComments(assignmentId, rerender = false) {
+  try {
+    const comments = await api(`/api/method-assignments/${assignmentId}/comments/`);
+    state.assignmentCommentsCache[assignmentId] = comments;
+    if (rerender) {
+      if (state.activeView === 'development') renderTeacherDevelopmentDetail();
+    }
+  } catch (_) {}
+}
+
+async function sendAssignmentComment(assignmentId, inputId) {
+  const input = $(inputId);
+  const text = String(input && input.value || '').trim();
+  if (!text) return;
+  $('status').textContent = 'Отправка комментария...';
+  try {
+    await api(`/api/method-assignments/${assignmentId}/comments/`, 'POST', { text });
+    if (input) input.value = '';
+    await loadAssignmentComments(assignmentId, true);
+    $('status').textContent = '';
+  } catch (e) {
+    $('status').textContent = e.message;
+  }
+}
+
+async function submitAssignmentForReview(assignmentId) {
+  $('status').textContent = 'Отправка на проверку...';
+  try {
+    const updated = await api(`/api/method-assignments/${assignmentId}/submit/`, 'POST', {});
+    state.assignments = state.assignments.map((a) => a.id === updated.id ? updated : a);
+    await loadAssignmentComments(assignmentId);
+    if (state.activeView === 'development') {
+      renderTeacherDevelopmentList();
+      renderTeacherDevelopmentDetail();
+    }
+    if (state.activeView === 'methods') {
+      renderTeacherMethodsList();
+    }
+    $('status').textContent = '';
+  } catch (e) {
+    $('status').textContent = e.message;
+  }
+}
+
+function renderTeacherMethodsList() {
+  const box = $('teacher-methods-list');
+  const filter = $('teacher-methods-subject-filter');
+  const count = $('teacher-methods-count');
+  const selectedSubject = String(filter ? filter.value : '');
+  const subjectMethods = state.methods.filter((m) => String(m.subject_name || '') === selectedSubject);
+  const publishedMethods = subjectMethods.filter((m) => {
+    const a = assignmentForMethod(m.id);
+    return !a || a.status === 'done';
+  });
+  const hiddenDevNumbers = new Set(
+    subjectMethods
+      .filter((m) => {
+        const a = assignmentForMethod(m.id);
+        return a && a.status !== 'done';
+      })
+      .map((m) => Number(m.method_number || 0))
+  );
+  const filtered = publishedMethods;
+  const byNumber = new Map(publishedMethods.map((m) => [Number(m.method_number || 0), m]));
+
+  const rows = [];
+  for (let num = 1; num <= 12; num += 1) {
+    const method = byNumber.get(num) || null;
+    rows.push(`
+      <tr>
+        <td class="methods-template-number">${num}</td>
+        <td class="methods-template-title${method ? '' : ' placeholder'}">${method ? esc(method.title || 'Методпакет') : (hiddenDevNumbers.has(num) ? 'В разработке у преподавателя' : 'В разработке')}</td>
+        <td class="methods-template-open">
+          ${method
+            ? `<button class="method-btn" type="button" data-method-open="${method.id}">Открыть</button>
+               <button class="method-btn" type="button" data-method-open-tab="${method.id}">Новая вкладка</button>`
+            : '<span class="teacher-item-meta">—</span>'}
+        </td>
+      </tr>
+    `);
+  }
+
+  box.innerHTML = `
+    <div class="methods-template-wrap">
+      <table class="methods-template">
+        <thead>
+          <tr>
+            <th>№</th>
+            <th>Название урока</th>
+            <th>Открытие</th>
+          </tr>
+        </thead>
+        <tbody>${rows.join('')}</tbody>
+      </table>
+    </div>
+  `;
+
+  if (count) {
+    count.textContent = selectedSubject
+      ? `Предмет: ${selectedSubject} · доступно ${publishedMethods.length}/12`
+      : 'Предмет не выбран · шаблон 1-12';
+  }
+
+  if (!selectedSubject) {
+    state.openMethodId = null;
+    renderTeacherMethodViewer(null);
+  } else {
+    const selected = filtered.find((x) => x.id === state.openMethodId) || null;
+    renderTeacherMethodViewer(selected);
+  }
+
+  box.querySelectorAll('[data-method-open]').forEach((btn) => {
+    btn.onclick = () => {
+      const id = Number(btn.dataset.methodOpen);
+      const target = filtered.find((x) => x.id === id);
+      state.openMethodId = target ? target.id : null;
+      renderTeacherMethodsList();
+      renderTeacherMethodViewer(target || null);
+    };
+  });
+  box.querySelectorAll('[data-method-open-tab]').forEach((btn) => {
+    btn.onclick = () => {
+      const id = Number(btn.dataset.methodOpenTab);
+      const target = filtered.find((x) => x.id === id);
+      if (target) openMethodInNewTab(target);
+    };
+  });
+}
+
+function teacherDevelopmentAssignments() {
+  return state.assignments
+    .filter((a) => a && a.status !== 'done')
+    .slice()
+    .sort((a, b) => {
+      const s = String(a.method_subject_name || '').localeCompare(String(b.method_subject_name || ''));
+      if (s) return s;
+      const n = Number(a.method_number || 0) - Number(b.method_number || 0);
+      if (n) return n;
+      return Number(a.id || 0) - Number(b.id || 0);
+    });
+}
+
+function renderTeacherDevelopmentList() {
+  const box = $('teacher-dev-list');
+  const summary = $('teacher-dev-summary');
+  if (!box || !summary) return;
+  const items = teacherDevelopmentAssignments();
+  summary.textContent = items.length
+    ? `В разработке/на проверке: ${items.length}. Подтвержденные методы автоматически уходят из этой вкладки.`
+    : 'Активных назначений нет';
+  if (!items.length) {
+    box.innerHTML = '<div class="empty">Нет методов в разработке</div>';
+    $('teacher-dev-detail').innerHTML = 'Методист пока не назначил вам методы в разработку.';
+    state.devAssignmentId = null;
+    return;
+  }
+  if (!items.some((a) => Number(a.id) === Number(state.devAssignmentId))) {
+    state.devAssignmentId = items[0].id;
+  }
+  box.innerHTML = items.map((a) => `
+    <div class="dev-card${Number(a.id) === Number(state.devAssignmentId) ? ' active' : ''}" data-dev-assignment="${a.id}">
+      <div class="dev-card-title">${esc(a.method_title || 'Методпакет')}</div>
+      <div class="dev-card-meta">
+        ${esc(a.method_subject_name || 'Без предмета')} · Метод ${Number(a.method_number || 0) || '—'}<br>
+        ${a.can_edit ? 'Доступ открыт' : 'Доступ закрыт до подтверждения предыдущего'}
+      </div>
+      <div class="status-badge ${esc(a.status)}">${esc(statusLabel(a.status))}</div>
+    </div>
+  `).join('');
+  box.querySelectorAll('[data-dev-assignment]').forEach((el) => {
+    el.onclick = async () => {
+      state.devAssignmentId = Number(el.dataset.devAssignment);
+      renderTeacherDevelopmentList();
+      await loadAssignmentComments(state.devAssignmentId, true);
+      renderTeacherDevelopmentDetail();
+    };
+  });
+  renderTeacherDevelopmentDetail();
+}
+
+function renderTeacherDevelopmentDetail() {
+  const box = $('teacher-dev-detail');
+  if (!box) return;
+  const assignment = state.assignments.find((a) => Number(a.id) === Number(state.devAssignmentId)) || null;
+  if (!assignment) {
+    box.textContent = 'Выберите назначение слева';
+    return;
+  }
+  const methodObj = state.methods.find((m) => Number(m.id) === Number(assignment.method_package)) || null;
+  const comments = state.assignmentCommentsCache[assignment.id] || [];
+  box.innerHTML = `
+    <div class="dev-detail-head">
+      <div class="dev-detail-title">${esc(assignment.method_title || 'Методпакет')}</div>
+      <span class="status-badge ${esc(assignment.status)}">${esc(statusLabel(assignment.status))}</span>
+    </div>
+    <div class="dev-detail-meta">
+      ${esc(assignment.method_subject_name || 'Без предмета')} · Метод ${Number(assignment.method_number || 0) || '—'}<br>
+      ${assignment.can_edit ? 'Можно редактировать и отправить на проверку' : 'Редактирование закрыто'}
+      ${assignment.notes ? `<br>Последний комментарий методиста: ${esc(assignment.notes)}` : ''}
+    </div>
+    <div class="method-actions">
+      ${methodObj && assignment.can_edit ? '<button id="teacher-dev-open-constructor" class="method-btn" type="button">Разработать</button>' : ''}
+      ${methodObj ? '<button id="teacher-dev-open-method" class="method-btn" type="button">Открыть метод</button>' : ''}
+      ${methodObj ? '<button id="teacher-dev-open-tab" class="method-btn" type="button">Новая вкладка</button>' : ''}
+      <button id="teacher-dev-refresh-comments" class="method-btn" type="button">Обновить комментарии</button>
+      ${assignment.can_edit && (assignment.status === 'todo' || assignment.status === 'in_progress') ? '<button id="teacher-dev-submit" class="method-btn" type="button">Сдать на проверку</button>' : ''}
+    </div>
+    <div class="dev-comments">
+      ${comments.length ? comments.slice().reverse().map((c) => `
+        <div class="dev-comment${isOwnAssignmentComment(c) ? ' self' : ''}">
+          <div class="dev-comment-meta"><span>${esc(c.sender_name || c.sender_username || c.sender_role || 'Пользователь')}</span><span>${esc(fmtDateTime(c.created_at))}</span></div>
+          <div class="dev-comment-text">${esc(c.text || '')}</div>
+        </div>
+      `).join('') : '<div class="empty">Комментариев пока нет</div>'}
+    </div>
+    <div class="dev-comment-form">
+      <input id="teacher-dev-comment-input" placeholder="Вопрос методисту / комментарий..." />
+      <button id="teacher-dev-comment-send" class="method-btn" type="button">Отправить</button>
+    </div>
+  `;
+  if (methodObj) {
+    const ctorBtn = $('teacher-dev-open-constructor');
+    if (ctorBtn) ctorBtn.onclick = () => openTeacherMethodConstructor(methodObj);
+    const openBtn = $('teacher-dev-open-method');
+    if (openBtn) openBtn.onclick = () => {
+      state.openMethodId = methodObj.id;
+      switchView('methods');
+      renderTeacherMethodsList();
+      renderTeacherMethodViewer(methodObj);
+    };
+    const openTabBtn = $('teacher-dev-open-tab');
+    if (openTabBtn) openTabBtn.onclick = () => openMethodInNewTab(methodObj);
+  }
+  const refreshBtn = $('teacher-dev-refresh-comments');
+  if (refreshBtn) refreshBtn.onclick = () => loadAssignmentComments(assignment.id, true);
+  const sendBtn = $('teacher-dev-comment-send');
+  if (sendBtn) sendBtn.onclick = () => sendAssignmentComment(assignment.id, 'teacher-dev-comment-input');
+  const submitBtn = $('teacher-dev-submit');
+  if (submitBtn) submitBtn.onclick = () => submitAssignmentForReview(assignment.id);
+}
+
+async function refreshUnreadRooms() {
+  if (!state.rooms.length) return;
+  const checks = await Promise.all(state.rooms.map(async (room) => {
+    try {
+      const messages = await api(`/api/chats/${room.id}/messages/`);
+      const latest = messages[0];
+      if (!latest || !latest.id) return { roomId: room.id, unread: false };
+      const unread = latest.id > getSeenId(room.id) && !isSelfMessage(latest);
+      return { roomId: room.id, unread };
+    } catch (_) {
+      return { roomId: room.id, unread: false };
+    }
+  }));
+  checks.forEach((item) => {
+    if (item.unread) state.unreadRoomIds.add(item.roomId);
+    else state.unreadRoomIds.delete(item.roomId);
+  });
+  updateBellUI();
+  renderRooms();
+}
+
+function startUnreadPolling() {
+  if (state.pollTimer) return;
+  state.pollTimer = setInterval(() => {
+    refreshUnreadRooms().catch(() => {});
+  }, 12000);
+}
+
+function renderClasses() {
+  const wrap = $('classes');
+  wrap.innerHTML = '';
+
+  if (!state.groups.length) {
+    wrap.innerHTML = '<div class="empty">У вас пока нет доступных групп</div>';
+    return;
+  }
+
+  state.groups.forEach((group, idx) => {
+    const card = document.createElement('button');
+    card.type = 'button';
+    card.className = `class-card${state.activeGroupId === group.id ? ' active' : ''}`;
+    card.innerHTML = `
+      <div class="class-gear">⚙</div>
+      <div class="class-dot" style="background:${CLASS_COLORS[idx % CLASS_COLORS.length]};"></div>
+      <div class="class-name">${esc(group.name)}</div>
+      <div class="class-meta">${group.students_count} студентов · ${group.parents_count} родителей</div>
+    `;
+    card.onclick = () => {
+      state.activeGroupId = group.id;
+      portalSafeSet(portalKey('active_group_id'), group.id);
+      state.scheduleWeekOffset = 0;
+      const list = state.rooms.filter((room) => Number(room.group) === Number(group.id));
+      state.activeRoomId = list[0] ? list[0].id : null;
+      if (state.activeRoomId) portalSafeSet(portalKey('active_room_id'), state.activeRoomId);
+      renderClasses();
+      renderRooms();
+      if (state.activeView === 'chat') loadMessages();
+      if (state.activeView === 'schedule') loadTeacherSchedule();
+      if (state.activeView === 'methods') loadTeacherMethods();
+      if (ROLE === 'manager' && state.activeView === 'events') managerLoadEvents().catch(() => {});
+      if (ROLE === 'manager' && state.activeView === 'feed') managerLoadFeed().catch(() => {});
+    };
+    wrap.appendChild(card);
+  });
+}
+
+function renderTeacherScheduleWeek() {
+  const tbody = $('teacher-schedule-body-grid');
+  const headRow = $('teacher-schedule-head-row');
+  const weekTitle = $('teacher-week-title');
+  const weekRange = $('teacher-week-range');
+  const status = $('teacher-schedule-status');
+  tbody.innerHTML = '';
+  headRow.innerHTML = '';
+
+  const dayNamesFull = ['Понедельник', 'Вторник', 'Среда', 'Четверг', 'Пятница', 'Суббота', 'Воскресенье'];
+  const monday = getMonday(new Date(), state.scheduleWeekOffset);
+  const sunday = new Date(monday);
+  sunday.setDate(monday.getDate() + 6);
+  weekRange.textContent = formatDateRange(monday, sunday);
+  weekTitle.textContent = `${dayNamesFull[(new Date().getDay() + 6) % 7]}, ${formatDate(new Date())}`;
+
+  const dayDates = [];
+  for (let i = 0; i < 7; i += 1) {
+    const d = new Date(monday);
+    d.setDate(monday.getDate() + i);
+    dayDates.push(d);
+  }
+
+  const first = document.createElement('th');
+  first.textContent = 'Пара';
+  headRow.appendChild(first);
+  dayDates.forEach((d, idx) => {
+    const th = document.createElement('th');
+    th.textContent = `${dayNamesFull[idx]} ${formatDate(d)}`;
+    headRow.appendChild(th);
+  });
+
+  const cellMap = {};
+  state.scheduleSlots.forEach((slot) => {
+    const lessonNumber = Number(slot.lesson_number || 0);
+    if (!lessonNumber) return;
+    let dayIndex = Number(slot.weekday);
+    if (slot.lesson_date) {
+      const sd = parseDate(slot.lesson_date);
+      if (!sd) return;
+      const keyDate = sd.toDateString();
+      const idx = dayDates.findIndex((d) => d.toDateString() === keyDate);
+      if (idx === -1) return;
+      dayIndex = idx;
+    } else if (!(dayIndex >= 0 && dayIndex <= 6)) {
+      return;
+    }
+    const key = `${dayIndex}-${lessonNumber}`;
+    if (!cellMap[key]) cellMap[key] = [];
+    cellMap[key].push(slot);
+  });
+  Object.keys(cellMap).forEach((k) => {
+    cellMap[k].sort((a, b) => (hhmm(a.start_time) || '').localeCompare(hhmm(b.start_time) || ''));
+  });
+
+  const activeGroup = state.groups.find((g) => Number(g.id) === Number(state.activeGroupId));
+  const activeGroupName = activeGroup && activeGroup.name ? activeGroup.name : 'Группа';
+
+  const maxLesson = 12;
+  for (let lesson = 1; lesson <= maxLesson; lesson += 1) {
+    const tr = document.createElement('tr');
+    tr.innerHTML = `<td style="width:60px;text-align:center;font-weight:700;">${lesson}</td>`;
+    for (let day = 0; day < 7; day += 1) {
+      const td = document.createElement('td');
+      const list = cellMap[`${day}-${lesson}`] || [];
+      if (list.length) {
+        list.forEach((slot) => {
+          const card = document.createElement('div');
+          card.className = 'slot-card';
+          const start = hhmm(slot.start_time);
+          const duration = Number(slot.duration_minutes || 80);
+          const end = addMinutesToTime(start, duration);
+          const subjectName = (slot.lesson_topic && slot.lesson_topic.subject_name)
+            ? slot.lesson_topic.subject_name
+            : ((slot.method_package && slot.method_package.subject_name) ? slot.method_package.subject_name : 'Предмет не указан');
+          card.innerHTML = `
+            <div class="slot-title">${esc(activeGroupName)}</div>
+            <div class="slot-subject">${esc(subjectName)}</div>
+            <div class="slot-time">${esc(start)}-${esc(end)}</div>
+          `;
+          td.appendChild(card);
+        });
+      }
+      tr.appendChild(td);
+    }
+    tbody.appendChild(tr);
+  }
+  status.textContent = state.scheduleSlots.length ? '' : 'Нет расписания для выбранной группы';
+}
+
+async function loadTeacherSchedule() {
+  if (ROLE !== 'teacher') return;
+  const groupId = state.activeGroupId;
+  state.scheduleSlots = [];
+  if (!groupId) {
+    $('teacher-schedule-status').textContent = 'Выберите группу во вкладке "Чат"';
+    renderTeacherScheduleWeek();
+    return;
+  }
+  $('teacher-schedule-status').textContent = 'Загрузка...';
+  try {
+    state.scheduleSlots = await api(`/api/groups/${groupId}/schedule/`);
+    renderTeacherScheduleWeek();
+  } catch (e) {
+    $('teacher-schedule-status').textContent = esc(e.message);
+  }
+}
+
+async function loadTeacherMethods() {
+  if (ROLE !== 'teacher') return;
+  const box = $('teacher-methods-list');
+  const subjectFilter = $('teacher-methods-subject-filter');
+  box.innerHTML = '<div class="empty">Загрузка...</div>';
+  renderTeacherMethodViewer(null);
+  try {
+    const [methods, assignments] = await Promise.all([
+      api('/api/method-packages/'),
+      api('/api/method-assignments/'),
+    ]);
+    state.methods = methods;
+    state.assignments = assignments;
+    state.methods.sort((a, b) => {
+      const sa = String(a.subject_name || '');
+      const sb = String(b.subject_name || '');
+      const bySubject = sa.localeCompare(sb);
+      if (bySubject) return bySubject;
+      const byNumber = Number(a.method_number || 0) - Number(b.method_number || 0);
+      if (byNumber) return byNumber;
+      return String(a.title || '').localeCompare(String(b.title || ''));
+    });
+    const subjects = Array.from(new Set(state.methods.map((m) => String(m.subject_name || '').trim()).filter(Boolean))).sort((a, b) => a.localeCompare(b));
+    subjectFilter.innerHTML = '<option value="">Выберите предмет</option>' + subjects.map((s) => `<option value="${esc(s)}">${esc(s)}</option>`).join('');
+    if (!subjectFilter.value) subjectFilter.value = '';
+    subjectFilter.onchange = () => renderTeacherMethodsList();
+    renderTeacherMethodsList();
+  } catch (e) {
+    state.methods = [];
+    state.openMethodId = null;
+    state.assignments = [];
+    box.innerHTML = `<div class="empty">${esc(e.message)}</div>`;
+  }
+}
+
+async function loadTeacherDevelopment() {
+  if (ROLE !== 'teacher') return;
+  try {
+    const [methods, assignments] = await Promise.all([
+      api('/api/method-packages/'),
+      api('/api/method-assignments/'),
+    ]);
+    state.methods = methods || [];
+    state.assignments = assignments || [];
+    renderTeacherDevelopmentList();
+    const selected = state.assignments.find((a) => Number(a.id) === Number(state.devAssignmentId));
+    if (selected) await loadAssignmentComments(selected.id, true);
+  } catch (e) {
+    $('teacher-dev-summary').textContent = e.message;
+    $('teacher-dev-list').innerHTML = `<div class="empty">${esc(e.message)}</div>`;
+  }
+}
+
+function renderRooms() {
+  const wrap = $('rooms');
+  wrap.innerHTML = '';
+
+  const list = state.rooms.filter((room) => Number(room.group) === Number(state.activeGroupId));
+  if (!list.length) {
+    wrap.innerHTML = '<div class="empty">Нет доступных чатов в этой группе</div>';
+    return;
+  }
+
+  list.forEach((room) => {
+    const btn = document.createElement('button');
+    btn.type = 'button';
+    btn.className = `room-btn${state.activeRoomId === room.id ? ' active' : ''}`;
+    btn.innerHTML = `
+      <span class="room-main">
+        <span class="room-dot"></span>
+        <span class="room-title">${esc(roomLabel(room))}</span>
+      </span>
+    `;
+    const unreadDot = document.createElement('span');
+    unreadDot.className = 'room-unread';
+    unreadDot.style.display = state.unreadRoomIds.has(room.id) ? 'inline-block' : 'none';
+    btn.appendChild(unreadDot);
+    btn.onclick = () => {
+      state.activeRoomId = room.id;
+      portalSafeSet(portalKey('active_room_id'), room.id);
+      state.unreadRoomIds.delete(room.id);
+      updateBellUI();
+      renderRooms();
+      loadMessages();
+    };
+    wrap.appendChild(btn);
+  });
+}
+
+async function loadMessages() {
+  const box = $('messages');
+  const room = state.rooms.find((x) => x.id === state.activeRoomId);
+  if (!room) {
+    $('chat-title-text').textContent = 'Выберите чат';
+    box.innerHTML = '<div class="empty">Выберите чат слева</div>';
+    return;
+  }
+
+  $('chat-title-text').textContent = roomLabel(room);
+  $('status').textContent = 'Загрузка...';
+
+  try {
+    const data = await api(`/api/chats/${room.id}/messages/`);
+    box.innerHTML = '';
+
+    if (!data.length) {
+      box.innerHTML = '<div class="empty">Сообщений пока нет</div>';
+    } else {
+      const newest = data[0];
+      if (newest && newest.id) {
+        setSeenId(room.id, newest.id);
+        state.unreadRoomIds.delete(room.id);
+        updateBellUI();
+      }
+      data.slice().reverse().forEach((msg) => {
+        const self = isSelfMessage(msg);
+        const row = document.createElement('div');
+        row.className = `msg-row${self ? ' self' : ''}`;
+        const dt = msg.created_at ? new Date(msg.created_at).toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' }) : '';
+        row.innerHTML = `
+          <div class="avatar">${esc(shortName(msg.sender_name))}</div>
+          <div class="bubble-wrap">
+            <div class="bubble">
+              ${msg.text ? esc(msg.text) : ''}
+              ${msg.attachment_url ? `
+                <div class="bubble-attachment">
+                  ${isImageAttachment(msg.attachment_url, msg.attachment_name) ? `<img src="${esc(msg.thumbnail_url || msg.attachment_url)}" alt="attachment" loading="lazy" />` : ''}
+                  <a href="${esc(msg.attachment_url)}" target="_blank" rel="noopener noreferrer">📎 ${esc(msg.attachment_name || 'Открыть файл')}</a>
+                </div>
+              ` : ''}
+            </div>
+            <div class="meta"><span>${esc(msg.sender_name || '')}</span><span>${esc(dt)}</span></div>
+          </div>
+        `;
+        box.appendChild(row);
+      });
+    }
+
+    box.scrollTop = box.scrollHeight;
+    $('status').textContent = '';
+    renderRooms();
+  } catch (e) {
+    $('status').textContent = e.message;
+  }
+}
+
+async function sendMessage() {
+  const room = state.rooms.find((x) => x.id === state.activeRoomId);
+  const input = $('message-input');
+  const text = String(input.value || '').trim();
+  if (!room || (!text && !state.selectedFile)) return;
+
+  $('status').textContent = 'Отправка...';
+  try {
+    const payload = new FormData();
+    if (text) payload.append('text', text);
+    if (state.selectedFile) payload.append('attachment', state.selectedFile);
+    await api(`/api/chats/${room.id}/messages/`, 'POST', payload);
+    input.value = '';
+    state.selectedFile = null;
+    $('attachment-input').value = '';
+    updateAttachmentPill();
+    await loadMessages();
+  } catch (e) {
+    $('status').textContent = e.message;
+  }
+}
+
+async function loadPortal() {
+  try {
+    const params = new URLSearchParams(window.location.search);
+    const tokenFromQuery = params.get('token') || '';
+    const tokenFromStorage = sessionStorage.getItem('portal_token') || '';
+    state.token = tokenFromQuery || tokenFromStorage;
+
+    if (!state.token) {
+      window.location.href = '/login/';
+      return;
+    }
+
+    sessionStorage.setItem('portal_token', state.token);
+
+    state.me = await api('/api/me/');
+    state.cacheScope = `${state.me.username || ''}:${state.me.role || ROLE}`;
+    $('who').textContent = `${state.me.username || ''} (${state.me.role || ROLE})`;
+
+    await resolveMyDisplayName();
+
+    state.rooms = await api('/api/chats/');
+
+    const groupIds = [...new Set(state.rooms.map((room) => Number(room.group)))];
+    const groupDetails = await Promise.all(groupIds.map((id) => api(`/api/groups/${id}/`)));
+
+    state.groups = groupDetails.map((group) => {
+      const students = Array.isArray(group.students) ? group.students : [];
+      const parentsSet = new Set();
+      students.forEach((student) => {
+        const parents = Array.isArray(student.parents) ? student.parents : [];
+        parents.forEach((p) => parentsSet.add(p));
+      });
+      return {
+        id: group.id,
+        name: group.name || `Группа ${group.id}`,
+        students_count: students.length,
+        parents_count: parentsSet.size,
+      };
+    });
+
+    const savedGroupId = Number(portalSafeGet(portalKey('active_group_id')) || 0);
+    const fallbackGroupId = state.groups[0] ? Number(state.groups[0].id) : null;
+    state.activeGroupId = state.groups.some((g) => Number(g.id) === savedGroupId) ? savedGroupId : fallbackGroupId;
+    const initialRooms = state.rooms.filter((room) => Number(room.group) === Number(state.activeGroupId));
+    const savedRoomId = Number(portalSafeGet(portalKey('active_room_id')) || 0);
+    state.activeRoomId = initialRooms.some((room) => Number(room.id) === savedRoomId)
+      ? savedRoomId
+      : (initialRooms[0] ? initialRooms[0].id : null);
+    if (state.activeGroupId) portalSafeSet(portalKey('active_group_id'), state.activeGroupId);
+    if (state.activeRoomId) portalSafeSet(portalKey('active_room_id'), state.activeRoomId);
+
+    renderClasses();
+    renderRooms();
+    loadMessages();
+    await refreshUnreadRooms();
+    startUnreadPolling();
+
+    const savedView = String(portalSafeGet(portalKey('active_view')) || '').trim();
+    const allowedTeacher = new Set(['chat', 'schedule', 'methods', 'development']);
+    const allowedManager = new Set(['chat', 'manage', 'events', 'feed']);
+    const allowed = ROLE === 'manager' ? allowedManager : (ROLE === 'teacher' ? allowedTeacher : new Set(['chat']));
+    if (savedView && allowed.has(savedView)) switchView(savedView);
+  } catch (e) {
+    $('status').textContent = e.message;
+  }
+}
+
+$('new-msg').onclick = () => $('message-input').focus();
+if (ROLE === 'teacher' || ROLE === 'manager') {
+  $('portal-layout').classList.add('teacher-layout');
+  $('portal-tabs').style.display = 'flex';
+  document.querySelectorAll('.portal-tab-btn').forEach((btn) => {
+    btn.onclick = () => switchView(btn.dataset.view);
+  });
+  if (ROLE === 'teacher') {
+    $('teacher-week-prev').onclick = () => {
+      state.scheduleWeekOffset -= 1;
+      renderTeacherScheduleWeek();
+    };
+    $('teacher-week-next').onclick = () => {
+      state.scheduleWeekOffset += 1;
+      renderTeacherScheduleWeek();
+    };
+  } else {
+    document.querySelectorAll('.portal-tab-btn').forEach((btn) => {
+      const view = btn.dataset.view;
+      btn.style.display = (view === 'chat' || view === 'manage' || view === 'events' || view === 'feed') ? '' : 'none';
+    });
+    ['pane-schedule', 'pane-methods', 'pane-development'].forEach((id) => {
+      const el = $(id);
+      if (el) el.classList.remove('active');
+    });
+    initManagerAdmin().catch((e) => {
+      const status = $('manager-admin-list-status');
+      if (status) status.textContent = e.message;
+    });
+  }
+} else {
+  $('pane-chat').classList.add('active');
+  $('pane-schedule').classList.remove('active');
+  $('pane-methods').classList.remove('active');
+  const devPane = $('pane-development');
+  if (devPane) devPane.classList.remove('active');
+  const managePane = $('pane-manage');
+  if (managePane) managePane.classList.remove('active');
+}
+$('chat-bell').onclick = () => {
+  const unreadRoom = state.rooms.find((room) => state.unreadRoomIds.has(room.id));
+  if (unreadRoom) {
+    state.activeGroupId = Number(unreadRoom.group);
+    state.activeRoomId = unreadRoom.id;
+    portalSafeSet(portalKey('active_group_id'), state.activeGroupId);
+    portalSafeSet(portalKey('active_room_id'), state.activeRoomId);
+    state.unreadRoomIds.delete(unreadRoom.id);
+    updateBellUI();
+    renderClasses();
+    renderRooms();
+    switchView('chat');
+  }
+};
+$('send-btn').onclick = sendMessage;
+$('attach-btn').onclick = () => $('attachment-input').click();
+$('attachment-input').addEventListener('change', (e) => {
+  const file = e.target.files && e.target.files[0] ? e.target.files[0] : null;
+  state.selectedFile = file;
+  updateAttachmentPill();
+});
+$('attach-clear').onclick = () => {
+  state.selectedFile = null;
+  $('attachment-input').value = '';
+  updateAttachmentPill();
+};
+
+$('message-input').addEventListener('keydown', (e) => {
+  if (e.key === 'Enter') {
+    e.preventDefault();
+    sendMessage();
+  }
+});
+
+// Service worker отдает данные из кэша сразу и обновляет их в фоне; о свежих данных сообщает сюда.
+let portalCacheRefreshTimer = null;
+const portalCacheRefreshUrls = new Set();
+
+function applyPortalCacheUpdates() {
+  const paths = [...portalCacheRefreshUrls].map((url) => new URL(url).pathname);
+  portalCacheRefreshUrls.clear();
+  if (paths.some((path) => /^\/api\/groups\/\d+\/schedule\/$/.test(path))) loadTeacherSchedule();
+  if (paths.includes('/api/method-packages/')) loadTeacherMethods();
+  if (paths.includes('/api/chats/')) {
+    api('/api/chats/').then((rooms) => {
+      state.rooms = rooms;
+      renderRooms();
+    }).catch(() => {});
+  }
+}
+
+if ('serviceWorker' in navigator) {
+  navigator.serviceWorker.register('/sw.js').catch(() => {});
+  navigator.serviceWorker.addEventListener('message', (event) => {
+    if (!event.data || event.data.type !== 'portal-cache-updated') return;
+    portalCacheRefreshUrls.add(event.data.url);
+    clearTimeout(portalCacheRefreshTimer);
+    portalCacheRefreshTimer = setTimeout(applyPortalCacheUpdates, 300);
+  });
+}
+
+$('logout').onclick = async () => {
+  try { await fetch('/api/session-logout/', { method: 'POST' }); } catch (_) {}
+  sessionStorage.removeItem('portal_token');
+  window.location.href = '/login/';
+};
+
+loadPortal();
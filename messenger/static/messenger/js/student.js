@@ -0,0 +1,984 @@
+const tokenInput = document.getElementById('token');
+const groupSelect = document.getElementById('group-select');
+const info = document.getElementById('info');
+const methodMap = new Map();
+const scheduleState = { slots: [], weekOffset: 0 };
+const methodsState = { entries: [] };
+const chatState = {
+  me: null,
+  rooms: [],
+  currentRoomId: null,
+  selectedFile: null,
+  myName: '',
+  mySenderType: 'student',
+  unreadRoomIds: new Set(),
+  pollTimer: null,
+};
+
+function setStatus(elId, text) { document.getElementById(elId).textContent = text; }
+
+// Ответы GET запоминаются вместе с ETag: при 304 сервер не сериализует данные заново.
+const etagCache = new Map();
+// Ключ кэша service worker'а: пользователь и роль, известны после /api/me/.
+let portalCacheScope = '';
+
+async function api(url, token, method = 'GET', body = null) {
+  const headers = {};
+  const isFormData = body instanceof FormData;
+  if (!isFormData) headers['Content-Type'] = 'application/json';
+  if (token) headers['Authorization'] = 'Bearer ' + token;
+  if (portalCacheScope) headers['X-Portal-Scope'] = portalCacheScope;
+  const cacheKey = `${token || ''}|${url}`;
+  const cached = method === 'GET' ? etagCache.get(cacheKey) : null;
+  if (cached) headers['If-None-Match'] = cached.etag;
+  const res = await fetch(url, { method, headers, body: body ? (isFormData ? body : JSON.stringify(body)) : null });
+  if (res.status === 304 && cached) return structuredClone(cached.data);
+  if (!res.ok) throw new Error(await res.text() || res.statusText);
+  const data = await res.json();
+  const etag = res.headers.get('ETag');
+  if (method === 'GET' && etag) etagCache.set(cacheKey, { etag, data: structuredClone(data) });
+  return data;
+}
+
+function currentToken() {
+  return sessionStorage.getItem('student_token') || tokenInput.value.trim();
+}
+
+async function ensureMe() {
+  const token = currentToken();
+  if (!token) return null;
+  if (chatState.me) return chatState.me;
+  chatState.me = await api('/api/me/', token);
+  portalCacheScope = `${chatState.me.username || ''}:${chatState.me.role || ''}`;
+  return chatState.me;
+}
+
+function chatEscape(text) {
+  return String(text || '').replaceAll('&', '&amp;').replaceAll('<', '&lt;').replaceAll('>', '&gt;');
+}
+
+function chatShortName(name) {
+  const value = String(name || '').trim();
+  if (!value) return 'U';
+  return value.split(/\s+/).slice(0, 2).map((w) => w[0] || '').join('').toUpperCase() || 'U';
+}
+
+function chatIsImage(url, fileName) {
+  const raw = String(fileName || url || '').toLowerCase();
+  return ['.png', '.jpg', '.jpeg', '.gif', '.webp', '.bmp', '.svg'].some((ext) => raw.includes(ext));
+}
+
+function unreadStorageKey(roomId) {
+  const user = chatState.me && chatState.me.username ? chatState.me.username : 'unknown';
+  return `chat_seen:${user}:room:${roomId}`;
+}
+
+function getSeenMessageId(roomId) {
+  const raw = localStorage.getItem(unreadStorageKey(roomId));
+  const parsed = Number(raw || 0);
+  return Number.isFinite(parsed) ? parsed : 0;
+}
+
+function setSeenMessageId(roomId, messageId) {
+  const id = Number(messageId || 0);
+  if (!id) return;
+  const prev = getSeenMessageId(roomId);
+  if (id > prev) localStorage.setItem(unreadStorageKey(roomId), String(id));
+}
+
+function updateChatNotificationUI() {
+  const count = chatState.unreadRoomIds.size;
+  const navDot = document.getElementById('chat-nav-dot');
+  const bellCount = document.getElementById('chat-bell-count');
+  navDot.style.display = count > 0 ? 'block' : 'none';
+  bellCount.style.display = count > 0 ? 'flex' : 'none';
+  bellCount.textContent = String(Math.min(count, 99));
+}
+
+function updateChatAttachmentBox() {
+  const box = document.getElementById('chat-attach-box');
+  const name = document.getElementById('chat-attach-name');
+  if (!chatState.selectedFile) {
+    box.style.display = 'none';
+    name.textContent = '';
+    return;
+  }
+  box.style.display = 'inline-flex';
+  name.textContent = chatState.selectedFile.name || 'Файл';
+}
+
+function parseDate(dateStr) {
+  if (!dateStr) return null;
+  const d = new Date(`${dateStr}T00:00:00`);
+  return Number.isNaN(d.getTime()) ? null : d;
+}
+
+function getMonday(baseDate = new Date(), offsetWeeks = 0) {
+  const d = new Date(baseDate);
+  d.setHours(0, 0, 0, 0);
+  const day = (d.getDay() + 6) % 7;
+  d.setDate(d.getDate() - day + (offsetWeeks * 7));
+  return d;
+}
+
+function formatDate(d) {
+  return `${String(d.getDate()).padStart(2, '0')}.${String(d.getMonth() + 1).padStart(2, '0')}`;
+}
+
+function formatDateRange(a, b) {
+  const fa = `${formatDate(a)}.${String(a.getFullYear()).slice(-2)}`;
+  const fb = `${formatDate(b)}.${String(b.getFullYear()).slice(-2)}`;
+  return `${fa} - ${fb}`;
+}
+
+function hhmm(timeStr) {
+  const raw = String(timeStr || '');
+  return raw.length >= 5 ? raw.slice(0, 5) : raw;
+}
+
+function addMinutesToTime(timeStr, minutes) {
+  const clean = hhmm(timeStr);
+  if (!clean || !clean.includes(':')) return clean;
+  const [h, m] = clean.split(':').map(Number);
+  if (Number.isNaN(h) || Number.isNaN(m)) return clean;
+  const total = (h * 60) + m + minutes;
+  const norm = ((total % (24 * 60)) + (24 * 60)) % (24 * 60);
+  const nh = Math.floor(norm / 60);
+  const nm = norm % 60;
+  return `${String(nh).padStart(2, '0')}:${String(nm).padStart(2, '0')}`;
+}
+
+function renderSchedule(slots) {
+  scheduleState.slots = Array.isArray(slots) ? slots : [];
+  renderScheduleWeek();
+}
+
+function renderScheduleWeek() {
+  const tbody = document.getElementById('schedule-body-grid');
+  const headRow = document.getElementById('schedule-head-row');
+  const weekTitle = document.getElementById('week-title');
+  const weekRange = document.getElementById('week-range');
+  tbody.innerHTML = '';
+  headRow.innerHTML = '';
+
+  const dayNamesFull = ['Понедельник', 'Вторник', 'Среда', 'Четверг', 'Пятница', 'Суббота', 'Воскресенье'];
+  const monday = getMonday(new Date(), scheduleState.weekOffset);
+  const sunday = new Date(monday);
+  sunday.setDate(monday.getDate() + 6);
+  weekRange.textContent = formatDateRange(monday, sunday);
+  weekTitle.textContent = `${dayNamesFull[(new Date().getDay() + 6) % 7]}, ${formatDate(new Date())}`;
+
+  const dayDates = [];
+  for (let i = 0; i < 7; i += 1) {
+    const d = new Date(monday);
+    d.setDate(monday.getDate() + i);
+    dayDates.push(d);
+  }
+
+  const headFirst = document.createElement('th');
+  headFirst.textContent = 'Пара';
+  headRow.appendChild(headFirst);
+  dayDates.forEach((d, idx) => {
+    const th = document.createElement('th');
+    th.textContent = `${dayNamesFull[idx]} ${formatDate(d)}`;
+    headRow.appendChild(th);
+  });
+
+  const cellMap = {};
+  scheduleState.slots.forEach((slot) => {
+    const lessonNumber = Number(slot.lesson_number || 0);
+    if (!lessonNumber) return;
+    let dayIndex = Number(slot.weekday);
+    if (slot.lesson_date) {
+      const sd = parseDate(slot.lesson_date);
+      if (!sd) return;
+      const keyDate = sd.toDateString();
+      const idx = dayDates.findIndex((d) => d.toDateString() === keyDate);
+      if (idx === -1) return;
+      dayIndex = idx;
+    } else if (!(dayIndex >= 0 && dayIndex <= 6)) {
+      return;
+    }
+    const key = `${dayIndex}-${lessonNumber}`;
+    if (!cellMap[key]) cellMap[key] = [];
+    cellMap[key].push(slot);
+  });
+  Object.keys(cellMap).forEach((k) => {
+    cellMap[k].sort((a, b) => (hhmm(a.start_time) || '').localeCompare(hhmm(b.start_time) || ''));
+  });
+
+  const maxLesson = 12;
+  const groupLabel = groupSelect.options[groupSelect.selectedIndex]?.textContent || '';
+  for (let lesson = 1; lesson <= maxLesson; lesson += 1) {
+    const tr = document.createElement('tr');
+    tr.innerHTML = `<td style="width:60px;text-align:center;font-weight:700;">${lesson}</td>`;
+    for (let day = 0; day < 7; day += 1) {
+      const td = document.createElement('td');
+      const list = cellMap[`${day}-${lesson}`] || [];
+      if (list.length) {
+        list.forEach((slot) => {
+          const card = document.createElement('div');
+          card.className = 'slot-card';
+          const start = hhmm(slot.start_time);
+          const duration = Number(slot.duration_minutes || 80);
+          const end = addMinutesToTime(start, duration);
+          const pairKey = `${day}-${lesson + 1}`;
+          const nextList = cellMap[pairKey] || [];
+          const hasPairedLesson = nextList.some((s2) => hhmm(s2.start_time) === addMinutesToTime(start, duration + 10));
+          const lessonName = (slot.lesson_topic && slot.lesson_topic.name) ? slot.lesson_topic.name : (slot.method_package ? slot.method_package.title : 'Занятие');
+          card.innerHTML = `
+            <div class="slot-title">${lessonName}</div>
+            <div class="slot-time">${groupLabel}</div>
+            <div class="slot-time">${start}-${end}</div>
+            ${hasPairedLesson ? '<div class="slot-time">Перемена 10 мин</div>' : ''}
+          `;
+          td.appendChild(card);
+        });
+      }
+      tr.appendChild(td);
+    }
+    tbody.appendChild(tr);
+  }
+
+  document.getElementById('schedule-status').textContent = scheduleState.slots.length ? '' : 'Нет расписания';
+}
+
+function renderMethods(slots) {
+  const wrap = document.getElementById('methods-list');
+  const viewer = document.getElementById('method-viewer');
+  const subjectFilter = document.getElementById('methods-subject-filter');
+  const subjectSearch = document.getElementById('methods-subject-search');
+  wrap.innerHTML = '';
+  methodMap.clear();
+  const seen = new Set();
+
+  const releasedNow = (slot) => {
+    if (!slot.lesson_date || !slot.start_time) return true;
+    const startIso = `${slot.lesson_date}T${String(slot.start_time).slice(0, 8)}`;
+    const start = new Date(startIso);
+    if (Number.isNaN(start.getTime())) return true;
+    return Date.now() >= start.getTime();
+  };
+
+  const entries = [];
+  slots.forEach((s) => {
+    if (!s.method_package) return;
+    if (!releasedNow(s)) return;
+    const mp = s.method_package;
+    if (seen.has(mp.id)) return;
+    seen.add(mp.id);
+    entries.push({
+      slot: s,
+      method: mp,
+      subject: String(mp.subject_name || '').trim(),
+    });
+  });
+  methodsState.entries = entries;
+
+  const subjects = Array.from(new Set(entries.map((e) => e.subject).filter(Boolean))).sort((a, b) => a.localeCompare(b));
+  subjectFilter.innerHTML = '<option value="">Все предметы</option>' + subjects.map((s) => `<option value="${s}">${s}</option>`).join('');
+
+  const draw = () => {
+    wrap.innerHTML = '';
+    methodMap.clear();
+    const selected = String(subjectFilter.value || '').trim().toLowerCase();
+    const typed = String(subjectSearch.value || '').trim().toLowerCase();
+    const filtered = entries.filter((e) => {
+      const subj = e.subject.toLowerCase();
+      if (selected && subj !== selected) return false;
+      if (typed && !subj.includes(typed)) return false;
+      return true;
+    });
+
+    filtered.forEach((entry) => {
+      const s = entry.slot;
+      const mp = entry.method;
+      methodMap.set(mp.id, mp);
+      const card = document.createElement('div');
+      card.className = 'item';
+      const right = document.createElement('div');
+      right.className = 'item-body';
+      const title = document.createElement('div');
+      const subjLabel = entry.subject ? `<span class="item-subject">${entry.subject}</span>` : '';
+      title.innerHTML = `<a href="#">Урок ${s.lesson_number || ''}: ${mp.title}</a>${subjLabel ? '<br>' + subjLabel : ''}`;
+      title.querySelector('a').onclick = (e) => { e.preventDefault(); renderMethodContent(mp.id); };
+      const desc = document.createElement('div');
+      desc.className = 'muted';
+      desc.style.marginTop = '4px';
+      desc.textContent = mp.description || '';
+      const actions = document.createElement('div');
+      actions.className = 'method-actions';
+      const openBtn = document.createElement('button');
+      openBtn.type = 'button';
+      openBtn.className = 'method-btn open-btn';
+      openBtn.textContent = '▶ Открыть';
+      openBtn.onclick = () => renderMethodContent(mp.id);
+      actions.appendChild(openBtn);
+      if (mp.material_url) {
+        const link = document.createElement('a');
+        link.className = 'method-btn';
+        link.href = mp.material_url;
+        link.target = '_blank';
+        link.rel = 'noopener noreferrer';
+        link.textContent = 'Источник';
+        actions.appendChild(link);
+      }
+      right.appendChild(title);
+      right.appendChild(desc);
+      right.appendChild(actions);
+      card.innerHTML = `<div class='cover'>${s.lesson_number || ''}</div>`;
+      card.appendChild(right);
+      wrap.appendChild(card);
+    });
+
+    if (!filtered.length) {
+      wrap.innerHTML = '<div class="muted">Нет доступных методпакетов по выбранному предмету</div>';
+      viewer.style.display = 'none';
+    } else {
+      viewer.style.display = 'none';
+    }
+  };
+
+  subjectFilter.onchange = draw;
+  subjectSearch.oninput = draw;
+  draw();
+}
+
+function toEmbedUrl(url) {
+  if (!url) return null;
+  const clean = String(url).trim();
+  if (clean.includes('youtube.com/watch?v=')) {
+    const id = clean.split('v=')[1].split('&')[0];
+    return `https://www.youtube.com/embed/${id}`;
+  }
+  if (clean.includes('youtu.be/')) {
+    const id = clean.split('youtu.be/')[1].split('?')[0];
+    return `https://www.youtube.com/embed/${id}`;
+  }
+  return null;
+}
+
+function normalizeBlockStyle(style, type) {
+  const s = style || {};
+  return {
+    textColor: String(s.textColor || '#f0f4ff'),
+    fontSize: Number(s.fontSize || (type === 'heading' ? 28 : 16)),
+    textAlign: String(s.textAlign || 'left'),
+    maxWidth: Number(s.maxWidth || 100),
+    radius: Number(s.radius || 10),
+    bgColor: String(s.bgColor || (type === 'quote' ? 'rgba(25,209,255,0.07)' : 'transparent')),
+    captionColor: String(s.captionColor || '#c4c7d4'),
+    captionSize: Number(s.captionSize || 12),
+  };
+}
+
+function renderMediaBlock(mediaType, mediaUrl, container, thumbnailUrl) {
+  if (!mediaUrl || mediaType === 'none') return;
+  const wrap = document.createElement('div');
+  wrap.className = 'media-wrap';
+  if (mediaType === 'image') {
+    const img = document.createElement('img');
+    img.src = thumbnailUrl || mediaUrl;
+    img.alt = 'media';
+    wrap.appendChild(img);
+  } else if (mediaType === 'video') {
+    const embed = toEmbedUrl(mediaUrl);
+    if (embed) {
+      const iframe = document.createElement('iframe');
+      iframe.src = embed;
+      iframe.allowFullscreen = true;
+      wrap.appendChild(iframe);
+    } else {
+      const video = document.createElement('video');
+      video.src = mediaUrl;
+      video.controls = true;
+      wrap.appendChild(video);
+    }
+  }
+  container.appendChild(wrap);
+}
+
+function renderMethodContent(id) {
+  const viewer = document.getElementById('method-viewer');
+  const mp = methodMap.get(id);
+  if (!mp) {
+    viewer.textContent = 'Методпакет не найден.';
+    viewer.style.display = 'block';
+    return;
+  }
+  viewer.innerHTML = '';
+  viewer.style.display = 'block';
+  viewer.scrollIntoView({ behavior: 'smooth', block: 'nearest' });
+  const head = document.createElement('div');
+  head.className = 'method-viewer-head';
+  const h = document.createElement('h3');
+  h.textContent = mp.title || 'Методпакет';
+  const collapseBtn = document.createElement('button');
+  collapseBtn.type = 'button';
+  collapseBtn.className = 'method-collapse-btn';
+  collapseBtn.textContent = '✕ Свернуть';
+  collapseBtn.onclick = () => {
+    viewer.style.display = 'none';
+  };
+  head.appendChild(h);
+  head.appendChild(collapseBtn);
+  viewer.appendChild(head);
+  if (mp.description) {
+    const d = document.createElement('p');
+    d.textContent = mp.description;
+    d.style.color = 'var(--muted)';
+    d.style.marginBottom = '14px';
+    viewer.appendChild(d);
+  }
+
+  const blocks = Array.isArray(mp.content_blocks) ? mp.content_blocks : [];
+  if (!blocks.length) {
+    const empty = document.createElement('div');
+    empty.className = 'muted';
+    empty.textContent = 'Для этого методпакета пока не добавлены блоки.';
+    viewer.appendChild(empty);
+    return;
+  }
+
+  blocks.forEach((b) => {
+    const box = document.createElement('div');
+    box.className = 'method-block';
+    const style = normalizeBlockStyle(b.style, b.type);
+    box.style.textAlign = style.textAlign;
+    if (b.type === 'heading' && b.text) {
+      const h = document.createElement('h3');
+      h.textContent = b.text;
+      h.style.color = style.textColor;
+      h.style.fontSize = `${style.fontSize}px`;
+      box.appendChild(h);
+    }
+    if (b.type === 'text' && b.text) {
+      const p = document.createElement('p');
+      p.textContent = b.text;
+      p.style.color = style.textColor;
+      p.style.fontSize = `${style.fontSize}px`;
+      box.appendChild(p);
+    }
+    if (b.type === 'quote' && b.text) {
+      const q = document.createElement('div');
+      q.className = 'method-quote';
+      q.textContent = b.text;
+      q.style.color = style.textColor;
+      q.style.fontSize = `${style.fontSize}px`;
+      q.style.background = style.bgColor;
+      box.appendChild(q);
+    }
+    if (b.type === 'image' && b.url) {
+      const img = document.createElement('img');
+      img.src = b.url;
+      img.alt = b.caption || 'image';
+      img.style.maxWidth = `${style.maxWidth}%`;
+      img.style.borderRadius = `${style.radius}px`;
+      if (style.textAlign === 'center') img.style.margin = '0 auto';
+      if (style.textAlign === 'right') img.style.margin = '0 0 0 auto';
+      box.appendChild(img);
+      if (b.caption) {
+        const cap = document.createElement('div');
+        cap.className = 'method-cap';
+        cap.textContent = b.caption;
+        cap.style.color = style.captionColor;
+        cap.style.fontSize = `${style.captionSize}px`;
+        box.appendChild(cap);
+      }
+    }
+    if (b.type === 'video' && b.url) {
+      const embed = toEmbedUrl(b.url);
+      if (embed) {
+        const iframe = document.createElement('iframe');
+        iframe.src = embed;
+        iframe.allowFullscreen = true;
+        iframe.style.maxWidth = `${style.maxWidth}%`;
+        iframe.style.borderRadius = `${style.radius}px`;
+        if (style.textAlign === 'center') iframe.style.margin = '0 auto';
+        if (style.textAlign === 'right') iframe.style.margin = '0 0 0 auto';
+        box.appendChild(iframe);
+      } else {
+        const a = document.createElement('a');
+        a.href = b.url;
+        a.target = '_blank';
+        a.rel = 'noopener noreferrer';
+        a.textContent = 'Открыть видео';
+        a.className = 'method-btn';
+        box.appendChild(a);
+      }
+      if (b.caption) {
+        const cap = document.createElement('div');
+        cap.className = 'method-cap';
+        cap.textContent = b.caption;
+        cap.style.color = style.captionColor;
+        cap.style.fontSize = `${style.captionSize}px`;
+        box.appendChild(cap);
+      }
+    }
+    viewer.appendChild(box);
+  });
+}
+
+function renderEvents(events) {
+  const wrap = document.getElementById('events-list');
+  wrap.innerHTML = '';
+  if (!events.length) {
+    wrap.innerHTML = '<div class="muted">Событий пока нет</div>';
+    return;
+  }
+  events.forEach((event) => {
+    const card = document.createElement('div');
+    card.className = 'event-card';
+    const head = document.createElement('div');
+    head.className = 'event-head';
+    const title = document.createElement('div');
+    title.className = 'event-title';
+    title.textContent = event.title || 'Событие';
+    const date = document.createElement('div');
+    date.className = 'event-date';
+    date.textContent = event.event_date || '';
+    head.appendChild(title);
+    head.appendChild(date);
+    card.appendChild(head);
+    if (event.description) {
+      const text = document.createElement('div');
+      text.className = 'event-text';
+      text.textContent = event.description;
+      card.appendChild(text);
+    }
+    renderMediaBlock(event.media_type, event.media_file_url || event.media_url, card, event.thumbnail_url);
+    wrap.appendChild(card);
+  });
+}
+
+function renderFeed(posts) {
+  const wrap = document.getElementById('feed-list');
+  wrap.innerHTML = '';
+  if (!posts.length) {
+    wrap.innerHTML = '<div class="muted">Постов пока нет</div>';
+    return;
+  }
+  posts.forEach((post) => {
+    const card = document.createElement('div');
+    card.className = 'post-card';
+    const head = document.createElement('div');
+    head.className = 'post-head';
+    const author = document.createElement('div');
+    author.className = 'post-author';
+    author.textContent = post.author_name || 'Преподаватель';
+    const date = document.createElement('div');
+    date.className = 'post-date';
+    date.textContent = post.created_at ? new Date(post.created_at).toLocaleString() : '';
+    head.appendChild(author);
+    head.appendChild(date);
+    card.appendChild(head);
+    const text = document.createElement('div');
+    text.className = 'post-text';
+    text.textContent = post.text || '';
+    card.appendChild(text);
+    renderMediaBlock(post.media_type, post.media_file_url || post.media_url, card, post.thumbnail_url);
+    wrap.appendChild(card);
+  });
+}
+
+function formatRoomTitle(room) {
+  const group = room.group_name || `Группа ${room.group}`;
+  const label = room.room_label || (room.room_type === 'parents' ? 'Родители' : 'Студенты');
+  return `${group} · ${label}`;
+}
+
+async function resolveChatIdentity() {
+  const token = currentToken();
+  const sid = sessionStorage.getItem('student_id');
+  chatState.mySenderType = 'student';
+  if (!token) return;
+  try {
+    if (sid) {
+      const student = await api(`/api/students/${sid}/`, token);
+      const fullName = `${student.last_name || ''} ${student.first_name || ''}`.trim();
+      chatState.myName = fullName || (chatState.me ? chatState.me.username : '');
+      return;
+    }
+  } catch (_) {}
+  chatState.myName = chatState.me ? chatState.me.username : '';
+}
+
+function isMyChatMessage(msg) {
+  const sender = String(msg.sender_name || '').trim().toLowerCase();
+  const mine = String(chatState.myName || '').trim().toLowerCase();
+  if (sender && mine && sender === mine) return true;
+  return msg.sender_type === chatState.mySenderType;
+}
+
+async function refreshUnreadRooms() {
+  const token = currentToken();
+  if (!token || !chatState.rooms.length) return;
+  const checks = await Promise.all(chatState.rooms.map(async (room) => {
+    try {
+      const messages = await api(`/api/chats/${room.id}/messages/`, token);
+      const latest = messages[0];
+      if (!latest || !latest.id) return { roomId: room.id, unread: false };
+      const seenId = getSeenMessageId(room.id);
+      const mine = isMyChatMessage(latest);
+      const unread = latest.id > seenId && !mine;
+      return { roomId: room.id, unread };
+    } catch (_) {
+      return { roomId: room.id, unread: false };
+    }
+  }));
+  checks.forEach((item) => {
+    if (item.unread) chatState.unreadRoomIds.add(item.roomId);
+    else chatState.unreadRoomIds.delete(item.roomId);
+  });
+  updateChatNotificationUI();
+  renderChatRooms();
+}
+
+function startChatPolling() {
+  if (chatState.pollTimer) return;
+  chatState.pollTimer = setInterval(() => {
+    refreshUnreadRooms().catch(() => {});
+  }, 12000);
+}
+
+function renderChatRooms() {
+  const wrap = document.getElementById('chat-rooms');
+  wrap.innerHTML = '';
+  if (!chatState.rooms.length) {
+    wrap.innerHTML = '<div class="muted">Нет доступных чатов</div>';
+    document.getElementById('chat-title').textContent = 'Чаты недоступны';
+    document.getElementById('chat-messages').innerHTML = '<div class="muted">Сообщения недоступны</div>';
+    return;
+  }
+  chatState.rooms.forEach((room) => {
+    const btn = document.createElement('button');
+    btn.type = 'button';
+    btn.className = `chat-room-btn${chatState.currentRoomId === room.id ? ' active' : ''}`;
+    btn.innerHTML = `
+      ${room.group_name || `Группа ${room.group}`}
+      <span class="chat-room-sub">${room.room_label || room.room_type}</span>
+    `;
+    const dot = document.createElement('span');
+    dot.className = 'chat-room-dot';
+    dot.style.display = chatState.unreadRoomIds.has(room.id) ? 'inline-block' : 'none';
+    btn.appendChild(dot);
+    btn.onclick = () => {
+      chatState.currentRoomId = room.id;
+      chatState.unreadRoomIds.delete(room.id);
+      renderChatRooms();
+      loadChatMessages();
+      updateChatNotificationUI();
+    };
+    wrap.appendChild(btn);
+  });
+}
+
+async function loadChatRooms() {
+  const token = currentToken();
+  if (!token) return;
+  try {
+    await ensureMe();
+    if (!chatState.myName) await resolveChatIdentity();
+    let rooms = await api('/api/chats/', token);
+    const groupId = Number(groupSelect.value || 0);
+    if (groupId) rooms = rooms.filter((r) => Number(r.group) === groupId);
+    chatState.rooms = rooms;
+    if (!chatState.currentRoomId || !rooms.some((r) => r.id === chatState.currentRoomId)) {
+      chatState.currentRoomId = rooms[0] ? rooms[0].id : null;
+    }
+    renderChatRooms();
+    if (chatState.currentRoomId) await loadChatMessages();
+    await refreshUnreadRooms();
+    startChatPolling();
+  } catch (e) {
+    document.getElementById('chat-status').textContent = e.message;
+  }
+}
+
+async function loadChatMessages() {
+  const token = currentToken();
+  const room = chatState.rooms.find((r) => r.id === chatState.currentRoomId);
+  if (!token || !room) return;
+  const list = document.getElementById('chat-messages');
+  document.getElementById('chat-title').textContent = formatRoomTitle(room);
+  document.getElementById('chat-status').textContent = 'Загрузка сообщений...';
+  try {
+    const messages = await api(`/api/chats/${room.id}/messages/`, token);
+    list.innerHTML = '';
+    if (!messages.length) {
+      list.innerHTML = '<div class="muted">Пока нет сообщений</div>';
+    } else {
+      const newest = messages[0];
+      if (newest && newest.id) {
+        setSeenMessageId(room.id, newest.id);
+        chatState.unreadRoomIds.delete(room.id);
+        updateChatNotificationUI();
+      }
+      messages.slice().reverse().forEach((msg) => {
+        const mine = isMyChatMessage(msg);
+        const item = document.createElement('div');
+        item.className = `chat-row${mine ? ' self' : ''}`;
+        const date = msg.created_at ? new Date(msg.created_at).toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' }) : '';
+        item.innerHTML = `
+          <div class="chat-avatar">${chatEscape(chatShortName(msg.sender_name))}</div>
+          <div class="chat-bubble-wrap">
+            <div class="chat-bubble">
+              ${msg.text ? chatEscape(msg.text) : ''}
+              ${msg.attachment_url ? `
+                <div class="chat-file-wrap">
+                  ${chatIsImage(msg.attachment_url, msg.attachment_name) ? `<img src="${chatEscape(msg.thumbnail_url || msg.attachment_url)}" alt="attachment" loading="lazy" />` : ''}
+                  <a href="${chatEscape(msg.attachment_url)}" target="_blank" rel="noopener noreferrer">📎 ${chatEscape(msg.attachment_name || 'Открыть файл')}</a>
+                </div>
+              ` : ''}
+            </div>
+            <div class="chat-meta"><span>${chatEscape(msg.sender_name || 'Пользователь')}</span><span>${date}</span></div>
+          </div>
+        `;
+        list.appendChild(item);
+      });
+    }
+    list.scrollTop = list.scrollHeight;
+    document.getElementById('chat-status').textContent = '';
+    renderChatRooms();
+  } catch (e) {
+    document.getElementById('chat-status').textContent = e.message;
+  }
+}
+
+async function sendChatMessage() {
+  const token = currentToken();
+  const room = chatState.rooms.find((r) => r.id === chatState.currentRoomId);
+  const input = document.getElementById('chat-input');
+  const text = String(input.value || '').trim();
+  if (!token || !room || (!text && !chatState.selectedFile)) return;
+  document.getElementById('chat-status').textContent = 'Отправка...';
+  try {
+    const payload = new FormData();
+    if (text) payload.append('text', text);
+    if (chatState.selectedFile) payload.append('attachment', chatState.selectedFile);
+    await api(`/api/chats/${room.id}/messages/`, token, 'POST', payload);
+    input.value = '';
+    chatState.selectedFile = null;
+    document.getElementById('chat-file-input').value = '';
+    updateChatAttachmentBox();
+    await loadChatMessages();
+  } catch (e) {
+    document.getElementById('chat-status').textContent = e.message;
+  }
+}
+
+async function loadGroups() {
+  const token = currentToken();
+  const sid = sessionStorage.getItem('student_id');
+  if (!token) { info.textContent = 'Нужен токен'; return; }
+  info.textContent = 'Группы...';
+  try {
+    const me = await ensureMe();
+    groupSelect.innerHTML = '<option value=\"\">Выберите группу</option>';
+
+    // Для студента показываем только его группу.
+    if (me && me.role === 'student' && sid) {
+      const student = await api(`/api/students/${sid}/`, token);
+      if (student.group) {
+        const opt = document.createElement('option');
+        opt.value = student.group;
+        opt.textContent = student.group_name || `Группа ${student.group}`;
+        groupSelect.appendChild(opt);
+        groupSelect.value = String(student.group);
+        info.textContent = 'Группа студента загружена';
+        return;
+      }
+    }
+
+    // Для преподавателя/родителя/студента берем только группы из доступных чатов.
+    const rooms = await api('/api/chats/', token);
+    const groupsMap = new Map();
+    rooms.forEach((room) => {
+      if (!groupsMap.has(room.group)) {
+        groupsMap.set(room.group, room.group_name || `Группа ${room.group}`);
+      }
+    });
+    const data = Array.from(groupsMap.entries()).map(([id, name]) => ({ id, name }));
+    data.sort((a, b) => String(a.name).localeCompare(String(b.name)));
+
+    // Если чатов нет (например, админ), fallback на полный список.
+    if (!data.length) {
+      const allGroups = await api('/api/groups/', token);
+      allGroups.forEach((g) => data.push({ id: g.id, name: g.name }));
+    }
+
+    data.forEach((g) => {
+      const opt = document.createElement('option');
+      opt.value = g.id;
+      opt.textContent = g.name;
+      groupSelect.appendChild(opt);
+    });
+    if (data.length) groupSelect.value = data[0].id;
+    info.textContent = `Групп: ${data.length}`;
+  } catch (e) {
+    info.textContent = e.message;
+  }
+}
+
+async function loadData() {
+  const token = sessionStorage.getItem('student_token') || tokenInput.value.trim();
+  const groupId = groupSelect.value;
+  if (!token || !groupId) { info.textContent = 'Нужны токен и группа'; return; }
+  info.textContent = 'Загрузка данных...';
+  try {
+    const [slots, events, feed] = await Promise.all([
+      api(`/api/groups/${groupId}/schedule/`, token),
+      api(`/api/events/?group=${groupId}`, token),
+      api(`/api/feed-posts/?group=${groupId}`, token),
+    ]);
+    renderSchedule(slots);
+    renderMethods(slots);
+    renderEvents(events);
+    renderFeed(feed);
+    setStatus('schedule-status', `Найдено: ${slots.length}`);
+    setStatus('methods-status', slots.length ? '' : 'Методпакеты не назначены');
+    setStatus('events-status', events.length ? '' : 'Нет событий');
+    setStatus('feed-status', feed.length ? '' : 'Нет постов');
+    info.textContent = 'Готово';
+  } catch (e) {
+    info.textContent = e.message;
+  }
+}
+
+document.getElementById('btn-load').onclick = loadData;
+document.getElementById('chat-bell').onclick = () => {
+  const chatBtn = document.querySelector('.nav-btn[data-tab="tab-chat"]');
+  if (chatBtn) chatBtn.click();
+};
+document.getElementById('chat-send-btn').onclick = sendChatMessage;
+document.getElementById('chat-attach-btn').onclick = () => document.getElementById('chat-file-input').click();
+document.getElementById('chat-file-input').addEventListener('change', (e) => {
+  const file = e.target.files && e.target.files[0] ? e.target.files[0] : null;
+  chatState.selectedFile = file;
+  updateChatAttachmentBox();
+});
+document.getElementById('chat-attach-clear').onclick = () => {
+  chatState.selectedFile = null;
+  document.getElementById('chat-file-input').value = '';
+  updateChatAttachmentBox();
+};
+document.getElementById('chat-input').addEventListener('keydown', (e) => {
+  if (e.key === 'Enter') {
+    e.preventDefault();
+    sendChatMessage();
+  }
+});
+groupSelect.addEventListener('change', () => {
+  if (document.getElementById('tab-chat').classList.contains('active')) {
+    loadChatRooms();
+  }
+});
+document.getElementById('week-prev').onclick = () => {
+  scheduleState.weekOffset -= 1;
+  renderScheduleWeek();
+};
+document.getElementById('week-next').onclick = () => {
+  scheduleState.weekOffset += 1;
+  renderScheduleWeek();
+};
+// Service worker отдает данные из кэша сразу и обновляет их в фоне; о свежих данных сообщает сюда.
+let portalCacheRefreshTimer = null;
+
+if ('serviceWorker' in navigator) {
+  navigator.serviceWorker.register('/sw.js').catch(() => {});
+  navigator.serviceWorker.addEventListener('message', (event) => {
+    if (!event.data || event.data.type !== 'portal-cache-updated') return;
+    const path = new URL(event.data.url).pathname;
+    if (!/^\/api\/(groups\/\d+\/schedule|events|feed-posts)\/$/.test(path)) return;
+    clearTimeout(portalCacheRefreshTimer);
+    portalCacheRefreshTimer = setTimeout(loadData, 300);
+  });
+}
+
+document.getElementById('btn-logout').onclick = async () => {
+  try {
+    await fetch('/api/session-logout/', { method: 'POST' });
+  } catch (_) {}
+  sessionStorage.removeItem('student_token');
+  sessionStorage.removeItem('student_id');
+  localStorage.removeItem('consoleAccessToken');
+  window.location.href = '/login/';
+};
+
+// автологин при переходе с токеном
+(function autoStart() {
+  const params = new URLSearchParams(window.location.search);
+  const t = params.get('token');
+  const g = params.get('group');
+  const sid = params.get('student_id');
+  if (t) sessionStorage.setItem('student_token', t);
+  if (sid) sessionStorage.setItem('student_id', sid);
+  if (g) groupSelect.innerHTML = `<option value=\"${g}\">Группа ${g}</option>`;
+  if (t) {
+    loadGroups().then(() => {
+      if (g && groupSelect.querySelector(`option[value='${g}']`)) groupSelect.value = g;
+      loadData();
+      loadProfile();
+      loadChatRooms();
+    }).catch(()=>{});
+  }
+})();;
+
+async function loadProfile() {
+  const token = sessionStorage.getItem('student_token');
+  const sid = sessionStorage.getItem('student_id');
+  if (!token || !sid) return;
+  try {
+    const data = await api(`/api/students/${sid}/`, token);
+    const form = document.getElementById('form-profile');
+    form.first_name.value = data.first_name || '';
+    form.last_name.value = data.last_name || '';
+    document.getElementById('profile-login').value = data.username || '—';
+    document.getElementById('profile-username').textContent = `Логин: ${data.username || ''}`;
+    document.getElementById('profile-group').textContent = `Группа: ${data.group_name || data.group || '—'}`;
+    const parents = data.parents_detail || [];
+    const parentsBlock = document.getElementById('profile-parents');
+    if (parents.length) {
+      parentsBlock.innerHTML = parents.map((p) => {
+        const name = [p.last_name, p.first_name].filter(Boolean).join(' ') || '—';
+        return `
+        <div class="parent-item">
+          <div class="parent-name">${name}</div>
+          <div class="parent-contacts">${p.phone ? `📞 ${p.phone}` : ''}${p.phone && p.email ? '<br>' : ''}${p.email ? `✉️ ${p.email}` : ''}</div>
+        </div>`;
+      }).join('');
+    } else {
+      parentsBlock.innerHTML = '<div class="muted-dark">Родители не привязаны</div>';
+    }
+    // инициалы на аватарке
+    const initials = `${(data.first_name||'')[0]||''}${(data.last_name||'')[0]||''}`.toUpperCase() || 'ST';
+    document.getElementById('avatar-initials').textContent = initials;
+  } catch (e) {
+    document.getElementById('profile-status').textContent = e.message;
+  }
+}
+
+document.getElementById('form-profile').onsubmit = async (e) => {
+  e.preventDefault();
+  const token = sessionStorage.getItem('student_token');
+  const sid = sessionStorage.getItem('student_id');
+  if (!token || !sid) { document.getElementById('profile-status').textContent = 'Нет данных пользователя'; return; }
+  const data = Object.fromEntries(new FormData(e.target).entries());
+  try {
+    await api(`/api/students/${sid}/`, token, 'PATCH', data);
+    document.getElementById('profile-status').textContent = 'Обновлено';
+  } catch (err) {
+    document.getElementById('profile-status').textContent = err.message;
+  }
+};
+
+document.querySelectorAll('.nav-btn').forEach(btn => {
+  btn.onclick = () => {
+    document.querySelectorAll('.nav-btn').forEach(b => b.classList.remove('active'));
+    document.querySelectorAll('.tab').forEach(t => t.classList.remove('active'));
+    btn.classList.add('active');
+    document.getElementById(btn.dataset.tab).classList.add('active');
+    if (btn.dataset.tab === 'tab-chat') loadChatRooms();
+    if (btn.dataset.tab === 'tab-profile') loadProfile();
+  };
+});
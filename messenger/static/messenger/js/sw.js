@@ -0,0 +1,110 @@
+// Service worker порталов (родитель/преподаватель/менеджер/ученик).
+// SW_VERSION и SHELL_URLS подставляет сервер: messenger.views.service_worker.
+const SHELL_CACHE = `portal-shell-${SW_VERSION}`;
+const API_CACHE_PREFIX = 'portal-api:';
+const SCOPE_HEADER = 'X-Portal-Scope';
+const PAGE_PATHS = ['/parent/', '/teacher/', '/manager/', '/student/'];
+// Только чтение и только то, что не опрашивается таймером: сообщения чатов идут мимо кэша.
+const API_PATTERNS = [
+  /^\/api\/chats\/$/,
+  /^\/api\/groups\/$/,
+  /^\/api\/groups\/\d+\/$/,
+  /^\/api\/groups\/\d+\/schedule\/$/,
+  /^\/api\/schedule\/$/,
+  /^\/api\/method-packages\/$/,
+  /^\/api\/events\/$/,
+  /^\/api\/feed-posts\/$/,
+  /^\/api\/holidays\/$/,
+  /^\/api\/subjects\/$/,
+];
+
+self.addEventListener('install', (event) => {
+  event.waitUntil(caches.open(SHELL_CACHE).then((cache) => cache.addAll(SHELL_URLS)).then(() => self.skipWaiting()));
+});
+
+self.addEventListener('activate', (event) => {
+  event.waitUntil((async () => {
+    const names = await caches.keys();
+    await Promise.all(names
+      .filter((name) => name.startsWith('portal-shell-') && name !== SHELL_CACHE)
+      .map((name) => caches.delete(name)));
+    await self.clients.claim();
+  })());
+});
+
+async function purgeApiCaches() {
+  const names = await caches.keys();
+  await Promise.all(names.filter((name) => name.startsWith(API_CACHE_PREFIX)).map((name) => caches.delete(name)));
+}
+
+async function notifyClients(url) {
+  const clients = await self.clients.matchAll({ type: 'window' });
+  clients.forEach((client) => client.postMessage({ type: 'portal-cache-updated', url }));
+}
+
+async function revalidate(cache, request, cacheKey, cached) {
+  const headers = new Headers(request.headers);
+  headers.delete('If-None-Match');
+  const etag = cached ? cached.headers.get('ETag') : null;
+  if (etag) headers.set('If-None-Match', etag);
+  const response = await fetch(request.url, { headers, credentials: 'same-origin', cache: 'no-store' });
+  if (response.status === 304 && cached) return cached;
+  if (response.ok) {
+    await cache.put(cacheKey, response.clone());
+    if (cached) await notifyClients(request.url);
+  }
+  return response;
+}
+
+async function staleWhileRevalidate(event, cacheName, cacheKey) {
+  const cache = await caches.open(cacheName);
+  const cached = await cache.match(cacheKey, { ignoreVary: true });
+  const fresh = revalidate(cache, event.request, cacheKey, cached);
+  if (cached) {
+    event.waitUntil(fresh.catch(() => null));
+    return cached;
+  }
+  return fresh;
+}
+
+async function cacheFirst(request) {
+  const cached = await caches.match(request);
+  return cached || fetch(request);
+}
+
+async function writeThrough(request, { logout = false } = {}) {
+  try {
+    const response = await fetch(request);
+    if (response.ok) await purgeApiCaches();
+    return response;
+  } finally {
+    if (logout) await purgeApiCaches();
+  }
+}
+
+self.addEventListener('fetch', (event) => {
+  const request = event.request;
+  const url = new URL(request.url);
+  if (url.origin !== self.location.origin) return;
+
+  if (request.method !== 'GET') {
+    if (url.pathname.startsWith('/api/')) {
+      // Любая запись делает закэшированные ответы API подозрительными: сбрасываем их.
+      event.respondWith(writeThrough(request, { logout: url.pathname === '/api/session-logout/' }));
+    }
+    return;
+  }
+  if (SHELL_URLS.includes(url.pathname)) {
+    event.respondWith(cacheFirst(request));
+    return;
+  }
+  if (request.mode === 'navigate' && PAGE_PATHS.includes(url.pathname)) {
+    // Токен приходит в query string, поэтому оболочка страницы кэшируется по пути без него.
+    event.respondWith(staleWhileRevalidate(event, SHELL_CACHE, url.origin + url.pathname));
+    return;
+  }
+  const scope = request.headers.get(SCOPE_HEADER);
+  if (scope && API_PATTERNS.some((pattern) => pattern.test(url.pathname))) {
+    event.respondWith(staleWhileRevalidate(event, API_CACHE_PREFIX + scope, request.url));
+  }
+});
@@ -0,0 +1,273 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import tempfile
+from pathlib import Path
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile, File
+from django.core.files.storage import FileSystemStorage, Storage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils.deconstruct import deconstructible
+
+try:
+    import brotli
+except ImportError:  # brotli — необязательная зависимость, без нее готовим только gzip
+    brotli = None
+
+try:
+    import boto3
+except ImportError:  # boto3 — необязательная зависимость, нужна только при DJANGO_MEDIA_STORAGE=s3
+    boto3 = None
+
+NOT_FOUND_CODES = {'404', 'NoSuchKey', 'NotFound'}
+PRECONDITION_CODES = {'412', 'PreconditionFailed'}
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    ManifestStaticFilesStorage, который при collectstatic дополнительно кладет рядом
+    с хешированными файлами .gz и (если установлен brotli) .br варианты.
+    """
+    compress_extensions = ('.css', '.js', '.json', '.svg', '.txt', '.map', '.html')
+    min_compress_size = 512
+
+    def post_process(self, paths, dry_run=False, **options):
+        hashed_names = []
+        for name, hashed_name, processed in super().post_process(paths, dry_run=dry_run, **options):
+            if hashed_name and not isinstance(processed, Exception):
+                hashed_names.append(hashed_name)
+            yield name, hashed_name, processed
+        if dry_run:
+            return
+        for hashed_name in dict.fromkeys(hashed_names):
+            self._write_compressed(hashed_name)
+
+    def _write_compressed(self, name):
+        if not name.endswith(self.compress_extensions):
+            return
+        with self.open(name) as source:
+            content = source.read()
+        if len(content) < self.min_compress_size:
+            return
+        variants = [('.gz', gzip.compress(content, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            variants.append(('.br', brotli.compress(content, quality=11)))
+        for suffix, data in variants:
+            if len(data) >= len(content):
+                continue
+            compressed_name = name + suffix
+            if self.exists(compressed_name):
+                self.delete(compressed_name)
+            self._save(compressed_name, ContentFile(data))
+
+
+class DedupFileSystemStorage(FileSystemStorage):
+    """
+    Медиа с дедупликацией: файл хешируется (sha256) прямо при записи и хранится один раз
+    под именем blobs/<ab>/<sha256><расширение>. Строка Blob считает ссылки: повторная
+    загрузка того же файла только увеличивает refcount, delete() — уменьшает,
+    файл удаляется вместе с последней ссылкой. Имена вне blobs/ работают как раньше.
+    """
+    blob_prefix = 'blobs'
+
+    def is_blob(self, name):
+        return str(name).startswith(self.blob_prefix + '/')
+
+    def blob_name(self, digest, name):
+        suffix = Path(name).suffix.lower()
+        # Расширение оставляем для Content-Type при раздаче, но только безопасное и короткое.
+        if not re.fullmatch(r'\.[a-z0-9]{1,10}', suffix):
+            suffix = ''
+        return f'{self.blob_prefix}/{digest[:2]}/{digest}{suffix}'
+
+    def get_available_name(self, name, max_length=None):
+        # Итоговое имя определяет содержимое, подбирать свободное имя не нужно.
+        return name
+
+    def _save(self, name, content):
+        tmp_dir = Path(self.path(self.blob_prefix)) / 'tmp'
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir, suffix='.tmp')
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with os.fdopen(fd, 'wb') as handle:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    handle.write(chunk)
+                    size += len(chunk)
+            name = self.blob_name(digest.hexdigest(), name)
+            self._acquire(name, digest.hexdigest(), size, tmp_path)
+        finally:
+            Path(tmp_path).unlink(missing_ok=True)
+        return name
+
+    def _acquire(self, name, digest, size, tmp_path):
+        from .models import Blob
+
+        for _ in range(2):
+            try:
+                with transaction.atomic():
+                    # Блокировка строки не дает параллельному delete() убрать файл между проверкой и ссылкой.
+                    blob = Blob.objects.select_for_update().filter(name=name).first()
+                    path = Path(self.path(name))
+                    if blob is None or not path.exists():
+                        path.parent.mkdir(parents=True, exist_ok=True)
+                        os.replace(tmp_path, path)
+                    if blob is None:
+                        Blob.objects.create(name=name, digest=digest, size=size, refcount=1)
+                    else:
+                        Blob.objects.filter(pk=blob.pk).update(refcount=F('refcount') + 1)
+                return
+            except IntegrityError:
+                # Ту же строку только что создала параллельная загрузка: повторяем как увеличение ссылок.
+                continue
+        raise IntegrityError(f'Не удалось сохранить ссылку на {name}')
+
+    def retain(self, name, count=1):
+        """Еще count ссылок на уже сохраненный файл (копии FileField без повторной записи)."""
+        from .models import Blob
+
+        if self.is_blob(name) and count > 0:
+            Blob.objects.filter(name=name).update(refcount=F('refcount') + count)
+        return name
+
+    def delete(self, name):
+        if not self.is_blob(name):
+            return super().delete(name)
+        from .models import Blob
+
+        with transaction.atomic():
+            blob = Blob.objects.select_for_update().filter(name=name).first()
+            if blob is not None and blob.refcount > 1:
+                Blob.objects.filter(pk=blob.pk).update(refcount=F('refcount') - 1)
+                return
+            if blob is not None:
+                blob.delete()
+            super().delete(name)
+
+
+
+def make_client(endpoint_url=None, region=None, access_key=None, secret_key=None):
+    """Клиент S3 API (AWS, MinIO, Yandex Object Storage и т.п.)."""
+    if boto3 is None:
+        raise RuntimeError('Для DJANGO_MEDIA_STORAGE=s3 установите boto3.')
+    return boto3.client(
+        's3',
+        endpoint_url=endpoint_url or None,
+        region_name=region or None,
+        aws_access_key_id=access_key or None,
+        aws_secret_access_key=secret_key or None,
+    )
+
+
+def _error_code(exc):
+    return str(getattr(exc, 'response', {}).get('Error', {}).get('Code', ''))
+
+
+def _is_not_found(exc):
+    return _error_code(exc) in NOT_FOUND_CODES
+
+
+@deconstructible
+class S3Storage(Storage):
+    """
+    Медиа в S3-совместимом бакете. Приложение не держит файлы у себя: url() — подписанная
+    ссылка на чтение, presigned_put() — ссылка, по которой клиент кладет файл сам, минуя воркеры.
+    """
+
+    def __init__(self, bucket='', endpoint_url='', region='', access_key='', secret_key='', url_expires=3600, location=''):
+        self.bucket = bucket
+        self.endpoint_url = endpoint_url
+        self.region = region
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.url_expires = url_expires
+        self.location = location.strip('/')
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = make_client(self.endpoint_url, self.region, self.access_key, self.secret_key)
+        return self._client
+
+    def _key(self, name):
+        name = str(name).lstrip('/')
+        return f'{self.location}/{name}' if self.location else name
+
+    def _head(self, name):
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self._key(name))
+        except Exception as exc:  # noqa: BLE001 — тип ошибки зависит от клиента, различаем по коду
+            if _is_not_found(exc):
+                return None
+            raise
+
+    def _open(self, name, mode='rb'):
+        # Тело читается потоком из ответа, без загрузки в память.
+        body = self.client.get_object(Bucket=self.bucket, Key=self._key(name))['Body']
+        return File(body, name=name)
+
+    def _save(self, name, content):
+        content_type = getattr(content, 'content_type', None) or mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        # upload_fileobj сам разбивает большие файлы на multipart-части.
+        self.client.upload_fileobj(content, self.bucket, self._key(name), ExtraArgs={'ContentType': content_type})
+        return name
+
+    def delete(self, name):
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(name))
+
+    def exists(self, name):
+        return self._head(name) is not None
+
+    def size(self, name):
+        head = self._head(name)
+        if head is None:
+            raise FileNotFoundError(name)
+        return head['ContentLength']
+
+    def object_info(self, name):
+        """(размер, ETag) объекта одним HEAD; FileNotFoundError, если его нет."""
+        head = self._head(name)
+        if head is None:
+            raise FileNotFoundError(name)
+        return head['ContentLength'], head.get('ETag', '')
+
+    def copy(self, source, target, if_match=''):
+        """
+        Копирует объект внутри бакета (большие boto3 копирует multipart), Content-Type — по имени target.
+        С if_match копируется только версия с этим ETag; False — объект успели подменить.
+        """
+        extra = {'ContentType': mimetypes.guess_type(target)[0] or 'application/octet-stream', 'MetadataDirective': 'REPLACE'}
+        if if_match:
+            extra['CopySourceIfMatch'] = if_match
+        try:
+            self.client.copy({'Bucket': self.bucket, 'Key': self._key(source)}, self.bucket, self._key(target), ExtraArgs=extra)
+        except Exception as exc:  # noqa: BLE001 — как в _head, различаем по коду
+            if _error_code(exc) in PRECONDITION_CODES:
+                return False
+            raise
+        return True
+
+    def url(self, name):
+        return self.client.generate_presigned_url(
+            'get_object', Params={'Bucket': self.bucket, 'Key': self._key(name)}, ExpiresIn=self.url_expires,
+        )
+
+    def presigned_put(self, name, content_type='', size=None):
+        """Подписанный PUT на ключ name: заголовки из ответа клиент обязан повторить."""
+        params = {'Bucket': self.bucket, 'Key': self._key(name)}
+        headers = {}
+        if content_type:
+            params['ContentType'] = headers['Content-Type'] = content_type
+        if size is not None:
+            params['ContentLength'] = size
+        url = self.client.generate_presigned_url('put_object', Params=params, ExpiresIn=self.url_expires)
+        return {'url': url, 'method': 'PUT', 'headers': headers, 'expires_in': self.url_expires}
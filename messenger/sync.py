@@ -0,0 +1,143 @@
+import hashlib
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Group, Student, Parent, Teacher, ScheduleSlot, Event, FeedPost, MethodAssignment, Tombstone
+from .serializers import (
+    GroupSerializer,
+    StudentSerializer,
+    ParentSerializer,
+    TeacherSerializer,
+    ScheduleSlotSerializer,
+    EventSerializer,
+    FeedPostSerializer,
+    MethodAssignmentSerializer,
+)
+
+# Имя коллекции совпадает с маршрутом списка в /api/, чтобы клиент мог подменять им ответы list.
+# Третий элемент — связи, чьи updated_at попадают во вложенные поля сериализатора.
+SYNC_COLLECTIONS = {
+    'groups': (Group, GroupSerializer, ('students', 'teachers')),
+    'students': (Student, StudentSerializer, ('group', 'parents')),
+    'parents': (Parent, ParentSerializer, ()),
+    'teachers': (Teacher, TeacherSerializer, ()),
+    'schedule': (ScheduleSlot, ScheduleSlotSerializer, ('lesson_topic', 'method_package')),
+    'events': (Event, EventSerializer, ('group',)),
+    'feed-posts': (FeedPost, FeedPostSerializer, ('group',)),
+    'method-assignments': (MethodAssignment, MethodAssignmentSerializer, ('method_package', 'teacher')),
+}
+
+COLLECTION_BY_MODEL = {model: name for name, (model, _, _) in SYNC_COLLECTIONS.items()}
+
+# Транзакция может закоммититься позже, чем выставила updated_at: берем окно с перекрытием,
+# клиент применяет изменения идемпотентно по id.
+SYNC_OVERLAP = timedelta(seconds=getattr(settings, 'SYNC_OVERLAP_SECONDS', 2))
+TOMBSTONE_RETENTION = timedelta(days=getattr(settings, 'SYNC_TOMBSTONE_RETENTION_DAYS', 30))
+
+
+def scope_fingerprint(scopes) -> str:
+    """Отпечаток области видимости пользователя (None — видит все); попадает в токен."""
+    source = '*' if scopes is None else ','.join(sorted(scopes))
+    return hashlib.sha1(source.encode()).hexdigest()[:12]
+
+
+def encode_token(moment: datetime, fingerprint: str = '') -> str:
+    micros = str(int(moment.timestamp() * 1_000_000))
+    return f'{micros}.{fingerprint}' if fingerprint else micros
+
+
+def decode_token(token: str):
+    """Возвращает (момент, отпечаток области) из токена или (None, ''), если токен пустой; ValueError для мусора."""
+    if not token:
+        return None, ''
+    micros, _, fingerprint = token.partition('.')
+    return datetime.fromtimestamp(int(micros) / 1_000_000, tz=dt_timezone.utc), fingerprint
+
+
+def scopes_of(instance):
+    """
+    Ключи областей видимости, в которых запись видна не-staff пользователям: group:<id> или
+    user:<id> (назначения методпакетов). Пустой список — запись видят только staff.
+    """
+    if isinstance(instance, Group):
+        return [f'group:{instance.pk}']
+    if isinstance(instance, Teacher):
+        return [f'group:{pk}' for pk in instance.groups.values_list('pk', flat=True)]
+    if isinstance(instance, Parent):
+        group_ids = Group.objects.filter(students__parents=instance).values_list('pk', flat=True).distinct()
+        return [f'group:{pk}' for pk in group_ids]
+    if isinstance(instance, MethodAssignment):
+        user_id = Teacher.objects.filter(pk=instance.teacher_id).values_list('user_id', flat=True).first()
+        return [f'user:{user_id}'] if user_id else []
+    group_id = getattr(instance, 'group_id', None)
+    return [f'group:{group_id}'] if group_id else []
+
+
+def record_tombstone(instance, scopes=None, collection=None):
+    """
+    Запись пропала из областей scopes (по умолчанию — из всех своих): удалена или ушла
+    из группы. Одна строка на область, чтобы клиент получал только id из своей области.
+    """
+    collection = collection or COLLECTION_BY_MODEL.get(type(instance))
+    if not collection or instance.pk is None:
+        return
+    scopes = scopes_of(instance) if scopes is None else scopes
+    Tombstone.objects.bulk_create([
+        Tombstone(collection=collection, object_id=instance.pk, scope=scope) for scope in (scopes or [''])
+    ])
+
+
+def purge_tombstones(now=None):
+    """Удаляет записи журнала старше SYNC_TOMBSTONE_RETENTION_DAYS: с такими токенами клиент все равно получит полный снимок."""
+    deleted, _ = Tombstone.objects.filter(deleted_at__lt=(now or timezone.now()) - TOMBSTONE_RETENTION).delete()
+    return deleted
+
+
+def _changed_filter(since, dependencies):
+    condition = Q(updated_at__gte=since)
+    for relation in dependencies:
+        condition |= Q(**{f'{relation}__updated_at__gte': since})
+    return condition
+
+
+def build_delta(querysets, token, context=None, scopes=None):
+    """
+    querysets: {коллекция: выборка в области видимости пользователя}; scopes — ключи этой области
+    (None для staff); token — результат decode_token. При пустом или слишком старом токене, а также
+    если область пользователя сменилась после выдачи токена, отдает полный снимок и флаг full.
+    """
+    now = timezone.now()
+    since, token_fingerprint = token
+    fingerprint = scope_fingerprint(scopes)
+    full = since is None or since < now - TOMBSTONE_RETENTION or token_fingerprint != fingerprint
+    changes = {}
+    for name, queryset in querysets.items():
+        _, serializer_class, dependencies = SYNC_COLLECTIONS[name]
+        if not full:
+            window = since - SYNC_OVERLAP
+            changed_ids = queryset.filter(_changed_filter(window, dependencies)).values('pk').distinct()
+            queryset = queryset.filter(pk__in=changed_ids)
+        changes[name] = serializer_class(queryset, many=True, context=context or {}).data
+
+    deleted = {}
+    if not full:
+        rows = Tombstone.objects.filter(deleted_at__gte=since - SYNC_OVERLAP, collection__in=list(querysets))
+        if scopes is not None:
+            rows = rows.filter(scope__in=list(scopes))
+        for collection, object_id in rows.values_list('collection', 'object_id').distinct():
+            deleted.setdefault(collection, []).append(object_id)
+        # Запись могла уйти из области и вернуться в нее в том же окне: актуальное состояние важнее.
+        for collection, ids in deleted.items():
+            present = {item['id'] for item in changes.get(collection, [])}
+            deleted[collection] = sorted(set(ids) - present)
+        deleted = {collection: ids for collection, ids in deleted.items() if ids}
+
+    return {
+        'full': full,
+        'token': encode_token(now, fingerprint),
+        'changes': changes,
+        'deleted': deleted,
+    }
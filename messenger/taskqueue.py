@@ -0,0 +1,161 @@
+import logging
+import os
+import socket
+import traceback
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Callable
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_LOW = -10
+PRIORITY_NORMAL = 0
+PRIORITY_HIGH = 10
+# Сколько кандидатов берется за один опрос: остальные воркеры разбирают соседние строки.
+CLAIM_BATCH = 10
+
+
+@dataclass
+class TaskSpec:
+    func: Callable
+    priority: int
+    max_attempts: int
+
+
+_registry = {}
+
+
+def task(name, priority=PRIORITY_NORMAL, max_attempts=3):
+    """Регистрирует функцию как фоновую задачу. Аргументы — JSON-совместимые kwargs из payload."""
+    def decorator(func):
+        _registry[name] = TaskSpec(func, priority, max_attempts)
+        return func
+    return decorator
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def retry_delay(attempts):
+    # Экспоненциальная пауза: 1x, 2x, 4x ... от TASKS_RETRY_DELAY.
+    return timedelta(seconds=getattr(settings, 'TASKS_RETRY_DELAY', 10) * 2 ** max(0, attempts - 1))
+
+
+def enqueue(name, payload=None, *, priority=None, idempotency_key=None, delay=0, user=None):
+    """
+    Ставит задачу в очередь. Строка пишется в текущей транзакции, поэтому воркер увидит ее
+    только после коммита. Повтор с тем же idempotency_key возвращает уже созданную задачу.
+    """
+    spec = _registry.get(name)
+    if spec is None:
+        raise LookupError(f'Неизвестная задача: {name}')
+    if idempotency_key:
+        existing = Task.objects.filter(idempotency_key=idempotency_key).first()
+        if existing:
+            return existing
+    item = Task(
+        name=name,
+        payload=payload or {},
+        priority=spec.priority if priority is None else priority,
+        max_attempts=spec.max_attempts,
+        idempotency_key=idempotency_key or None,
+        run_after=timezone.now() + timedelta(seconds=delay),
+        created_by=user if user is not None and user.is_authenticated else None,
+    )
+    try:
+        with transaction.atomic():
+            item.save()
+    except IntegrityError:
+        if not idempotency_key:
+            raise
+        return Task.objects.get(idempotency_key=idempotency_key)
+    if getattr(settings, 'TASKS_EAGER', False):
+        run_eager(item)
+    return item
+
+
+def run_eager(item):
+    # Для тестов и разработки без воркера: все попытки подряд, без пауз между ними.
+    while item.status == 'queued':
+        item.attempts += 1
+        item.status = 'running'
+        execute(item)
+    return item
+
+
+def execute(item):
+    """Выполняет уже захваченную задачу (status=running, attempts увеличен) и сохраняет итог."""
+    spec = _registry.get(item.name)
+    now = timezone.now
+    try:
+        if spec is None:
+            raise LookupError(f'Неизвестная задача: {item.name}')
+        with transaction.atomic():
+            result = spec.func(**item.payload)
+    except Exception:  # noqa: BLE001 — любая ошибка задачи уходит в last_error и на повтор
+        item.last_error = traceback.format_exc(limit=20)
+        if spec is not None and item.attempts < item.max_attempts:
+            item.status = 'queued'
+            item.run_after = now() + retry_delay(item.attempts)
+        else:
+            item.status = 'failed'
+            item.finished_at = now()
+        logger.warning('Задача %s#%s: попытка %s из %s неудачна', item.name, item.id, item.attempts, item.max_attempts)
+    else:
+        item.status = 'done'
+        item.result = result
+        item.last_error = ''
+        item.finished_at = now()
+    item.locked_by = ''
+    item.locked_at = None
+    item.save(update_fields=['status', 'attempts', 'result', 'last_error', 'run_after', 'finished_at', 'locked_by', 'locked_at', 'updated_at'])
+    return item
+
+
+def claim(worker):
+    """
+    Захватывает самую приоритетную готовую задачу. Захват — условный UPDATE по status,
+    поэтому несколько воркеров не возьмут одну строку и без SELECT ... FOR UPDATE.
+    """
+    now = timezone.now()
+    candidates = list(
+        Task.objects
+        .filter(status='queued', run_after__lte=now)
+        .order_by('-priority', 'run_after', 'id')
+        .values_list('pk', flat=True)[:CLAIM_BATCH]
+    )
+    for pk in candidates:
+        claimed = Task.objects.filter(pk=pk, status='queued').update(
+            status='running', locked_by=worker, locked_at=now, attempts=F('attempts') + 1, updated_at=now,
+        )
+        if claimed:
+            return Task.objects.get(pk=pk)
+    return None
+
+
+def requeue_stale(timeout=None):
+    """Возвращает в очередь задачи упавших воркеров: running дольше TASKS_LOCK_TIMEOUT."""
+    timeout = timeout if timeout is not None else getattr(settings, 'TASKS_LOCK_TIMEOUT', 600)
+    now = timezone.now()
+    stale = Task.objects.filter(status='running', locked_at__lt=now - timedelta(seconds=timeout))
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status='failed', locked_by='', locked_at=None, finished_at=now, last_error='Воркер не завершил задачу.', updated_at=now,
+    )
+    requeued = stale.update(status='queued', locked_by='', locked_at=None, run_after=now, updated_at=now)
+    return requeued + failed
+
+
+def work_once(worker=None):
+    """Выполняет одну задачу, если она есть. Возвращает задачу или None."""
+    item = claim(worker or worker_name())
+    if item is None:
+        return None
+    return execute(item)
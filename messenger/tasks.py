@@ -0,0 +1,145 @@
+from datetime import timedelta
+
+from django.apps import apps
+
+from . import extraction, previews, search
+from .models import Holiday, MethodAssignment, MethodAssignmentComment, MethodPackage, ScheduleSlot
+from .taskqueue import PRIORITY_HIGH, PRIORITY_LOW, PRIORITY_NORMAL, task
+
+
+@task('set_initial_password', priority=PRIORITY_NORMAL)
+def set_initial_password(model, pk):
+    """PBKDF2 для сгенерированного пароля: учетка создается сразу, хеш — в воркере."""
+    owner = apps.get_model(model).objects.select_related('user').filter(pk=pk).first()
+    if owner is None or owner.user is None or not owner.initial_password:
+        return {'skipped': True}
+    user = owner.user
+    # Пароль уже задан (повтор задачи или пользователь успел сменить его сам).
+    if user.has_usable_password():
+        return {'skipped': True}
+    user.set_password(owner.initial_password)
+    user.save(update_fields=['password'])
+    return {'user': user.id}
+
+
+@task('shift_holiday_lessons', priority=PRIORITY_HIGH)
+def shift_holiday_lessons(holiday):
+    """Переносит уроки с даты выходного на ближайшую свободную неделю вперед."""
+    holiday = Holiday.objects.filter(pk=holiday).first()
+    if holiday is None:
+        return {'moved': 0}
+    day_slots = ScheduleSlot.objects.filter(lesson_date=holiday.date)
+    if holiday.group_id:
+        day_slots = day_slots.filter(group_id=holiday.group_id)
+
+    moved = 0
+    for slot in day_slots:
+        target_date = slot.lesson_date + timedelta(days=7)
+        for _ in range(52):
+            clash_holiday = Holiday.objects.filter(date=target_date).filter(group_id=slot.group_id).exists()
+            clash_global = Holiday.objects.filter(date=target_date, group__isnull=True).exists()
+            clash_slot = ScheduleSlot.objects.filter(
+                group_id=slot.group_id,
+                lesson_date=target_date,
+                start_time=slot.start_time,
+            ).exclude(id=slot.id).exists()
+            if not (clash_holiday or clash_global or clash_slot):
+                break
+            target_date = target_date + timedelta(days=7)
+        slot.moved_from_date = slot.lesson_date
+        slot.lesson_date = target_date
+        slot.weekday = target_date.weekday()
+        slot.save(update_fields=['lesson_date', 'weekday', 'moved_from_date', 'updated_at'])
+        moved += 1
+    return {'moved': moved}
+
+
+@task('enforce_sequential_access', priority=PRIORITY_HIGH)
+def enforce_sequential_access(teacher, subject):
+    """
+    Для предмета у преподавателя в разработке может быть доступен только один следующий метод:
+    - done/review => can_edit=False
+    - первый из todo/in_progress => can_edit=True
+    - остальные todo/in_progress => can_edit=False
+    """
+    qs = (
+        MethodAssignment.objects
+        .filter(teacher_id=teacher, method_package__subject_id=subject)
+        .select_related('method_package')
+        .order_by('method_package__method_number', 'id')
+    )
+    changed = 0
+    next_open_given = False
+    for item in qs:
+        if item.status == 'done':
+            desired = False
+        elif item.status == 'review':
+            desired = False
+            next_open_given = True
+        elif item.status in ('todo', 'in_progress'):
+            if not next_open_given:
+                desired = True
+                next_open_given = True
+            else:
+                desired = False
+        else:
+            desired = item.can_edit
+        if item.can_edit != desired:
+            item.can_edit = desired
+            item.save(update_fields=['can_edit', 'updated_at'])
+            changed += 1
+    return {'changed': changed}
+
+
+@task('create_placeholder_methods', priority=PRIORITY_LOW)
+def create_placeholder_methods(teacher, subject, numbers, assign_from=1, granted_by=None, status='todo', deadline=None, notes='', sender_role='', sender_name=''):
+    """
+    Заготовки недостающих методпакетов предмета и назначения преподавателю на них начиная
+    с assign_from (статус, срок и заметки — как у bulk_assign_subject), затем — порядок доступа.
+    """
+    created_methods = []
+    created_assignments = []
+    for n in numbers:
+        method, created = MethodPackage.objects.get_or_create(
+            subject_id=subject,
+            method_number=n,
+            defaults={'title': f'Урок {n}', 'description': '', 'content_blocks': []},
+        )
+        if created:
+            created_methods.append(n)
+        if n < assign_from or MethodAssignment.objects.filter(teacher_id=teacher, method_package=method).exists():
+            continue
+        assignment = MethodAssignment.objects.create(
+            method_package=method,
+            teacher_id=teacher,
+            granted_by_id=granted_by,
+            deadline=deadline,
+            can_edit=False,
+            status=status,
+            notes=notes,
+        )
+        created_assignments.append(assignment.id)
+        if notes:
+            MethodAssignmentComment.objects.create(
+                assignment=assignment, sender_id=granted_by, sender_role=sender_role, sender_name=sender_name, text=notes,
+            )
+    enforce_sequential_access(teacher, subject)
+    return {'placeholder_methods_created': created_methods, 'created': created_assignments}
+
+
+@task('generate_preview', priority=PRIORITY_LOW)
+def generate_preview(source, filename=''):
+    """Миниатюра картинки или первая страница PDF (см. messenger.previews)."""
+    preview = previews.generate(source, filename)
+    return {'status': preview.status if preview is not None else 'unsupported'}
+
+
+@task('extract_attachment_text', priority=PRIORITY_LOW)
+def extract_attachment_text(source, filename=''):
+    """Текст PDF, DOCX или TXT-вложения для поиска (см. messenger.extraction)."""
+    item = extraction.extract(source, filename)
+    if item is None:
+        return {'status': 'unsupported'}
+    if item.status == 'ready' and item.text:
+        search.reindex_attachment(source, item.text)
+    return {'status': item.status, 'chars': len(item.text), 'truncated': item.truncated}
@@ -0,0 +1,760 @@
+import gzip
+import json
+import os
+import pstats
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.management import call_command
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, connections
+from django.test import Client, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from messenger import routers
+from messenger.assets import serve_static
+from messenger.db import describe_database
+from messenger.ingest import MessageIngestor
+from messenger.metrics import registry, render_prometheus
+from messenger.models import Blob, Group, Teacher, Parent, Student, ChatRoom, Message, SearchEntry, Task, Tombstone, UploadSession, UserProfile
+from messenger.routers import ReadReplicaRouter
+from messenger.slowlog import buffer as slow_query_buffer, explain
+from messenger.storage import CompressedManifestStaticFilesStorage
+
+User = get_user_model()
+
+
+class GroupModelTest(TestCase):
+    def test_str(self):
+        group = Group.objects.create(name='Группа А')
+        self.assertEqual(str(group), 'Группа А')
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ConditionalGetTest(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', password='x', is_staff=True)
+        self.client.force_authenticate(self.admin)
+        self.group = Group.objects.create(name='Группа А')
+
+    def test_list_returns_304_until_data_changes(self):
+        first = self.client.get('/api/groups/')
+        self.assertEqual(first.status_code, 200)
+        etag = first['ETag']
+
+        with self.assertNumQueries(4):
+            cached = self.client.get('/api/groups/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached.content, b'')
+
+        self.group.description = 'новое описание'
+        self.group.save()
+        changed = self.client.get('/api/groups/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], etag)
+
+    def test_nested_m2m_change_invalidates_etag(self):
+        teacher = Teacher.objects.create(first_name='Иван', last_name='Петров')
+        etag = self.client.get('/api/groups/')['ETag']
+        teacher.groups.add(self.group)
+        self.assertEqual(self.client.get('/api/groups/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_room_messages_etag(self):
+        room = ChatRoom.objects.get(group=self.group, room_type='students')
+        url = f'/api/chats/{room.id}/messages/'
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.client.post(url, {'text': 'Привет'})
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class DeltaSyncTest(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', password='x', is_staff=True)
+        self.client.force_authenticate(self.admin)
+        self.group = Group.objects.create(name='Группа А')
+        self.student = Student.objects.create(first_name='Анна', last_name='Иванова', group=self.group)
+
+    def _advanced_token(self, response):
+        # Смещаем токен за пределы окна перекрытия, чтобы проверить именно дельту.
+        micros, _, fingerprint = response.data['token'].partition('.')
+        return f'{int(micros) + 5_000_000}.{fingerprint}'
+
+    def test_full_snapshot_then_delta(self):
+        full = self.client.get('/api/sync/')
+        self.assertTrue(full.data['full'])
+        self.assertEqual([g['id'] for g in full.data['changes']['groups']], [self.group.id])
+
+        token = self._advanced_token(full)
+        Student.objects.filter(pk=self.student.pk).update(updated_at=timezone.now() + timedelta(seconds=10))
+        delta = self.client.get('/api/sync/', {'since': token})
+        self.assertFalse(delta.data['full'])
+        self.assertEqual([s['id'] for s in delta.data['changes']['students']], [self.student.id])
+        # Группа вкладывает учеников, поэтому тоже попадает в дельту.
+        self.assertEqual([g['id'] for g in delta.data['changes']['groups']], [self.group.id])
+        self.assertEqual(delta.data['changes']['teachers'], [])
+
+    def test_delete_produces_tombstone(self):
+        token = self.client.get('/api/sync/').data['token']
+        student_id = self.student.id
+        self.student.delete()
+        delta = self.client.get('/api/sync/', {'since': token})
+        self.assertEqual(delta.data['deleted'], {'students': [student_id]})
+
+    def test_student_scope(self):
+        other = Group.objects.create(name='Группа Б')
+        Student.objects.create(first_name='Олег', last_name='Смирнов', group=other)
+        self.client.force_authenticate(self.student.user)
+        data = self.client.get('/api/sync/', {'collections': 'groups,students'}).data
+        self.assertEqual(set(data['changes']), {'groups', 'students'})
+        self.assertEqual([g['id'] for g in data['changes']['groups']], [self.group.id])
+        self.assertEqual([s['id'] for s in data['changes']['students']], [self.student.id])
+
+    def test_tombstones_are_scoped_to_groups(self):
+        other = Group.objects.create(name='Группа Б')
+        stranger = Student.objects.create(first_name='Олег', last_name='Смирнов', group=other)
+        moved = Student.objects.create(first_name='Петр', last_name='Сидоров', group=self.group)
+        parent = Parent.objects.create(first_name='Мария', last_name='Сидорова')
+        moved.parents.add(parent)
+        teacher = Teacher.objects.create(first_name='Иван', last_name='Петров')
+        teacher.groups.add(self.group)
+        self.client.force_authenticate(teacher.user)
+        token = self.client.get('/api/sync/').data['token']
+
+        stranger.delete()
+        moved.group = other
+        moved.save()
+        delta = self.client.get('/api/sync/', {'since': token}).data
+        self.assertFalse(delta['full'])
+        self.assertEqual(delta['deleted'], {'students': [moved.id], 'parents': [parent.id]})
+
+        # Свою область пользователь потерял сам: дельты не хватит, нужен полный снимок.
+        teacher.groups.remove(self.group)
+        self.assertTrue(self.client.get('/api/sync/', {'since': delta['token']}).data['full'])
+
+    def test_previous_scope_is_read_once_and_only_for_scope_fields(self):
+        other = Group.objects.create(name='Группа Б')
+        Group.objects.filter(pk=self.group.pk).update(updated_at=timezone.now() - timedelta(days=1))
+        self.student.group = other
+        with CaptureQueriesContext(connection) as captured:
+            self.student.save()
+        lookups = [q['sql'] for q in captured.captured_queries if q['sql'].startswith('SELECT "messenger_student"."group_id"')]
+        self.assertEqual(len(lookups), 1)
+        # Прежняя группа теряет ученика: ее updated_at обновляется для ETag и дельты.
+        self.group.refresh_from_db()
+        self.assertGreater(self.group.updated_at, timezone.now() - timedelta(minutes=1))
+
+        self.student.notes = 'Переведен'
+        with CaptureQueriesContext(connection) as captured:
+            self.student.save(update_fields=['notes', 'updated_at'])
+        self.assertFalse([q for q in captured.captured_queries if 'group_id' in q['sql'] and q['sql'].startswith('SELECT')])
+
+    def test_teacher_leaving_group_is_deleted_for_its_members(self):
+        teacher = Teacher.objects.create(first_name='Иван', last_name='Петров')
+        teacher.groups.add(self.group)
+        self.client.force_authenticate(self.student.user)
+        token = self.client.get('/api/sync/', {'collections': 'teachers'}).data['token']
+        self.group.teachers.remove(teacher)
+        delta = self.client.get('/api/sync/', {'since': token, 'collections': 'teachers'}).data
+        self.assertEqual((delta['full'], delta['deleted']), (False, {'teachers': [teacher.id]}))
+
+    def test_purge_is_a_command(self):
+        token = self.client.get('/api/sync/').data['token']
+        self.student.delete()
+        Tombstone.objects.update(deleted_at=timezone.now() - timedelta(days=31))
+        self.client.get('/api/sync/')
+        self.assertTrue(Tombstone.objects.exists())
+        call_command('purge_tombstones', stdout=StringIO())
+        self.assertFalse(Tombstone.objects.exists())
+        self.assertEqual(self.client.get('/api/sync/', {'since': token}).data['deleted'], {})
+
+    def test_invalid_token(self):
+        self.assertEqual(self.client.get('/api/sync/', {'since': 'abc'}).status_code, 400)
+
+
+class StaticPipelineTest(TestCase):
+    def test_collectstatic_precompresses_hashed_bundles(self):
+        with tempfile.TemporaryDirectory() as root:
+            storage = CompressedManifestStaticFilesStorage(location=root, base_url='/static/')
+            source = FileSystemStorage(location=os.path.join(settings.BASE_DIR, 'messenger', 'static'))
+            name = 'messenger/js/login.js'
+            storage.save(name, source.open(name))
+            list(storage.post_process({name: (source, name)}))
+
+            hashed = storage.stored_name(name)
+            self.assertRegex(hashed, r'login\.[0-9a-f]{12}\.js$')
+            self.assertTrue(storage.exists(hashed + '.gz'))
+
+            with override_settings(STATIC_ROOT=root):
+                request = RequestFactory().get('/static/' + hashed, HTTP_ACCEPT_ENCODING='gzip')
+                response = serve_static(request, hashed)
+                self.assertEqual(response['Content-Encoding'], 'gzip')
+                self.assertIn('immutable', response['Cache-Control'])
+                self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), source.open(name).read())
+                response.close()
+
+
+class ServiceWorkerTest(TestCase):
+    def test_service_worker_served_from_root_with_shell(self):
+        response = self.client.get('/sw.js')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Service-Worker-Allowed'], '/')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        body = response.content.decode()
+        self.assertIn('const SW_VERSION = ', body)
+        self.assertIn('messenger/js/role_portal.js', body)
+        self.assertIn('messenger/js/student.js', body)
+
+    def test_logout_clears_browser_cache(self):
+        response = self.client.post('/api/session-logout/')
+        self.assertEqual(response['Clear-Site-Data'], '"cache"')
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class MetricsTest(APITestCase):
+    def setUp(self):
+        registry.reset()
+        self.admin = User.objects.create_user('admin', password='x', is_staff=True)
+
+    def test_metrics_are_staff_only(self):
+        self.client.force_authenticate(User.objects.create_user('plain', password='x'))
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 403)
+
+    def test_records_route_latency_queries_and_status(self):
+        self.client.force_authenticate(self.admin)
+        self.client.get('/api/groups/')
+        body = self.client.get('/api/metrics/').content.decode()
+        self.assertIn('diplom_http_request_duration_seconds_count{route="group-list",method="GET"} 1', body)
+        self.assertIn('diplom_http_responses_total{route="group-list",method="GET",status="200"} 1.0', body)
+        self.assertRegex(body, r'diplom_http_request_db_queries_sum\{route="group-list",method="GET"\} [1-9]')
+
+    def test_multiprocess_snapshots_are_summed(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(METRICS_DIR=directory):
+            with open(os.path.join(directory, 'metrics-1.json'), 'w', encoding='utf-8') as handle:
+                json.dump({'histograms': [], 'counters': [['diplom_http_responses_total', ['group-list', 'GET', '200'], 2.0]]}, handle)
+            registry.inc('diplom_http_responses_total', ('group-list', 'GET', '200'))
+            body = render_prometheus()
+        self.assertIn('diplom_http_responses_total{route="group-list",method="GET",status="200"} 3.0', body)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ProfilingTest(APITestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.settings_override = override_settings(PROFILING_DIR=self.directory, PROFILING_SAMPLE_RATE=0.0, PROFILING_ENGINE='cprofile')
+        self.settings_override.enable()
+        self.admin = User.objects.create_user('admin', password='x', is_staff=True)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_staff_header_saves_profile_listed_and_downloadable(self):
+        # Права проверяются до запуска профилировщика, по настоящему JWT, а не force_authenticate.
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.admin)}')
+        self.assertNotIn('X-Profile-Saved', self.client.get('/api/groups/'))
+        self.assertEqual(os.listdir(self.directory), [])
+
+        response = self.client.get('/api/groups/', HTTP_X_PROFILE='1')
+        name = response['X-Profile-Saved']
+        self.assertIn('__group-list__GET__', name)
+        self.assertTrue(name.endswith('.prof'))
+        pstats.Stats(os.path.join(self.directory, name))
+
+        listing = self.client.get('/api/debug/profiles/').json()
+        self.assertEqual([item['name'] for item in listing], [name])
+        self.assertEqual(listing[0]['route'], 'group-list')
+        download = self.client.get(f'/api/debug/profiles/{name}/')
+        self.assertEqual(download.status_code, 200)
+        self.assertEqual(b''.join(download.streaming_content), Path(self.directory, name).read_bytes())
+        self.assertEqual(self.client.get('/api/debug/profiles/..%2Fsettings.py/').status_code, 404)
+
+    def test_header_from_non_staff_is_ignored(self):
+        plain = User.objects.create_user('plain', password='x')
+        with mock.patch('messenger.profiling._CProfileRun') as run:
+            self.assertNotIn('X-Profile-Saved', self.client.get('/api/groups/', HTTP_X_PROFILE='1'))
+            self.client.credentials(HTTP_AUTHORIZATION='Bearer broken')
+            self.client.get('/api/groups/', HTTP_X_PROFILE='1')
+            self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(plain)}')
+            response = self.client.get('/api/groups/', HTTP_X_PROFILE='1')
+        self.assertFalse(run.called)
+        self.assertNotIn('X-Profile-Saved', response)
+        self.assertEqual(os.listdir(self.directory), [])
+        self.assertEqual(self.client.get('/api/debug/profiles/').status_code, 403)
+
+    def test_staff_session_header(self):
+        self.client.login(username='admin', password='x')
+        self.assertIn('X-Profile-Saved', self.client.get('/api/groups/', HTTP_X_PROFILE='1'))
+
+    def test_sampling_rate_and_retention(self):
+        self.client.force_authenticate(self.admin)
+        with override_settings(PROFILING_SAMPLE_RATE=1.0, PROFILING_KEEP=2):
+            for _ in range(3):
+                self.client.get('/api/subjects/')
+        self.assertEqual(len(os.listdir(self.directory)), 2)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'], SLOW_QUERY_MS=0)
+class SlowQueryLogTest(APITestCase):
+    def setUp(self):
+        slow_query_buffer.clear()
+        self.admin = User.objects.create_user('admin', password='x', is_staff=True)
+        self.group = Group.objects.create(name='Группа А')
+
+    def test_logs_queries_with_view_action_params_and_plan(self):
+        self.client.force_authenticate(self.admin)
+        with self.assertLogs('messenger.slow_queries', level='WARNING') as captured:
+            self.client.get(f'/api/groups/{self.group.id}/schedule/')
+        entries = [json.loads(line.split(':', 2)[2]) for line in captured.output]
+        slots = [entry for entry in entries if 'messenger_scheduleslot' in entry['sql']]
+        self.assertTrue(slots)
+        entry = slots[0]
+        self.assertEqual(entry['route'], 'group-schedule')
+        self.assertEqual(entry['view'], 'messenger.views.GroupViewSet')
+        self.assertEqual(entry['action'], 'schedule')
+        self.assertIn(str(self.group.id), entry['params'])
+        self.assertRegex(entry['explain'], r'SCAN|SEARCH')
+
+        listed = self.client.get('/api/debug/slow-queries/').json()
+        self.assertTrue(any(item['action'] == 'schedule' for item in listed))
+        self.assertEqual(self.client.delete('/api/debug/slow-queries/').status_code, 204)
+        self.assertEqual(
+            [item for item in self.client.get('/api/debug/slow-queries/').json() if item['route'] != 'debug_slow_queries'],
+            [],
+        )
+
+    @override_settings(SLOW_QUERY_EXPLAIN_ANALYZE=True)
+    def test_analyze_only_reruns_plain_selects(self):
+        executed = []
+        cursor = mock.Mock(fetchall=lambda: [('Seq Scan',)], execute=lambda sql, params: executed.append(sql))
+        postgres = mock.Mock(vendor='postgresql', create_cursor=lambda: cursor)
+        postgres.ops.explain_query_prefix = lambda **options: 'EXPLAIN (ANALYZE)' if options.get('analyze') else 'EXPLAIN'
+        explain(postgres, 'SELECT 1', ())
+        explain(postgres, 'WITH moved AS (DELETE FROM t RETURNING id) SELECT * FROM moved', ())
+        self.assertIsNone(explain(postgres, 'UPDATE t SET x = 1', ()))
+        self.assertEqual([sql.split(' ', 2)[:2] for sql in executed], [['EXPLAIN', '(ANALYZE)'], ['EXPLAIN', 'WITH']])
+
+    def test_buffer_is_staff_only(self):
+        self.client.force_authenticate(User.objects.create_user('plain', password='x'))
+        self.assertEqual(self.client.get('/api/debug/slow-queries/').status_code, 403)
+
+
+class DatabaseProfileTest(TestCase):
+    @override_settings(SQLITE_PRAGMAS={'journal_mode': 'WAL', 'synchronous': 'NORMAL', 'busy_timeout': 1234, 'cache_size': -4096})
+    def test_sqlite_pragmas_applied_on_new_connection(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('только SQLite')
+        with tempfile.TemporaryDirectory() as directory:
+            default = connections['default']
+            wrapper = type(default)({**default.settings_dict, 'NAME': os.path.join(directory, 'tuned.sqlite3')}, alias='tuned')
+            try:
+                info = describe_database(wrapper)
+            finally:
+                wrapper.close()
+        self.assertEqual(info['journal_mode'], 'wal')
+        self.assertEqual(info['synchronous'], 1)
+        self.assertEqual(info['busy_timeout'], 1234)
+        self.assertEqual(info['cache_size'], -4096)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'], DATABASE_REPLICAS=['default'])
+class ReplicaRoutingTest(APITestCase):
+    """В тестах реплика — зеркало default, поэтому маршрут виден по ответу роутера: 'default' = реплика, None = основная."""
+
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', password='x', is_staff=True)
+        self.group = Group.objects.create(name='Группа А')
+        self.client.force_authenticate(self.admin)
+        self.decisions = []
+        original = ReadReplicaRouter.db_for_read
+
+        def spy(router, model, **hints):
+            result = original(router, model, **hints)
+            self.decisions.append((model._meta.label, result))
+            return result
+
+        patcher = mock.patch.object(ReadReplicaRouter, 'db_for_read', spy)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def replica_reads(self):
+        return [label for label, alias in self.decisions if alias == 'default']
+
+    def test_list_and_retrieve_read_from_replica(self):
+        self.client.get('/api/groups/')
+        self.assertIn('messenger.Group', self.replica_reads())
+        self.decisions.clear()
+        self.client.get(f'/api/groups/{self.group.id}/')
+        self.assertIn('messenger.Group', self.replica_reads())
+
+    def test_actions_writes_and_pinned_reads_use_primary(self):
+        self.client.get(f'/api/groups/{self.group.id}/schedule/')
+        self.assertEqual(self.replica_reads(), [])
+
+        response = self.client.post('/api/groups/', {'name': 'Группа Б'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertIn('db_pin', response.cookies)
+        self.assertEqual(self.replica_reads(), [])
+
+        # Cookie от записи: ближайшие чтения пользователя идут на основную базу.
+        self.client.get('/api/groups/')
+        self.assertEqual(self.replica_reads(), [])
+
+    def test_router_rules(self):
+        router = ReadReplicaRouter()
+        token = routers._state.set(routers.RoutingState(read_only=True))
+        try:
+            self.assertIsNone(router.db_for_read(User))
+            self.assertEqual(router.db_for_read(Group), 'default')
+            self.assertEqual(router.db_for_write(Group), 'default')
+            self.assertIsNone(router.db_for_read(Group))
+        finally:
+            routers._state.reset(token)
+        self.assertIsNone(router.db_for_read(Group))
+        with override_settings(DATABASE_REPLICAS=['replica1']):
+            self.assertFalse(router.allow_migrate('replica1', 'messenger'))
+            self.assertTrue(router.allow_migrate('default', 'messenger'))
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class RoomSummaryTest(APITestCase):
+    def setUp(self):
+        self.first_group = Group.objects.create(name='Группа А')
+        self.second_group = Group.objects.create(name='Группа Б')
+        self.teacher = Teacher.objects.create(first_name='Анна', last_name='Учитель')
+        self.teacher.groups.add(self.first_group, self.second_group)
+        self.client.force_authenticate(self.teacher.user)
+        self.room = ChatRoom.objects.get(group=self.second_group, room_type='parents')
+
+    def post(self, room, text):
+        return self.client.post(f'/api/chats/{room.id}/messages/', {'text': text}).data
+
+    def test_summary_follows_created_edited_and_deleted_messages(self):
+        first = self.post(self.room, 'Собрание  в пятницу')
+        second = self.post(self.room, 'Я' * 200)
+        self.room.refresh_from_db()
+        self.assertEqual((self.room.message_count, self.room.last_message_id), (2, second['id']))
+        self.assertEqual(len(self.room.last_message_preview), ChatRoom.PREVIEW_CHARS)
+        self.assertTrue(self.room.last_message_preview.endswith('…'))
+
+        Message.objects.get(pk=second['id']).delete()
+        self.room.refresh_from_db()
+        self.assertEqual((self.room.message_count, self.room.last_message_id), (1, first['id']))
+        self.assertEqual(self.room.last_message_preview, 'Собрание в пятницу')
+
+        message = Message.objects.get(pk=first['id'])
+        message.text = 'Собрание в субботу'
+        message.save()
+        self.room.refresh_from_db()
+        self.assertEqual(self.room.last_message_preview, 'Собрание в субботу')
+
+        message.delete()
+        self.room.refresh_from_db()
+        self.assertEqual((self.room.message_count, self.room.last_message_id, self.room.last_message_preview), (0, None, ''))
+
+    def test_ingest_batch_updates_summary(self):
+        ingestor = MessageIngestor()
+        messages = [
+            ingestor.prepare(Message(room=self.room, sender_type='teacher', sender_name='Анна', text=f'Ответ {n}')) for n in range(3)
+        ]
+        futures = [ingestor.submit(message) for message in messages]
+        ingestor.flush()
+        last = [future.result(1) for future in futures][-1]
+        self.room.refresh_from_db()
+        self.assertEqual((self.room.message_count, self.room.last_message_id, self.room.last_message_preview), (3, last.id, 'Ответ 2'))
+
+    def test_activity_order_and_list_etag(self):
+        etag = self.client.get('/api/chats/', {'order': 'activity'})['ETag']
+        self.post(self.room, 'Новости')
+        response = self.client.get('/api/chats/', {'order': 'activity'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data[0]['id'], self.room.id)
+        self.assertEqual((response.data[0]['last_message_preview'], response.data[0]['message_count']), ('Новости', 1))
+        self.assertTrue(all(room['last_message_at'] is None for room in response.data[1:]))
+
+        default = self.client.get('/api/chats/').data
+        self.assertEqual(default[0]['group'], self.first_group.id)
+        self.assertEqual(self.client.get('/api/chats/', {'order': 'random'}).status_code, 400)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class BroadcastTest(APITestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, True)
+        overrides = override_settings(MEDIA_ROOT=directory)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.groups = [Group.objects.create(name=f'{n}А класс') for n in range(1, 4)] + [Group.objects.create(name='Кружок')]
+        self.manager = User.objects.create_user('manager')
+        UserProfile.objects.create(user=self.manager, role='manager')
+        self.client.force_authenticate(self.manager)
+
+    def broadcast(self, **data):
+        return self.client.post('/api/groups/broadcast/', data, format='multipart')
+
+    def test_filter_with_shared_attachment(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.broadcast(
+                name='класс', room_type='parents', text='Перенос собрания', attachment=SimpleUploadedFile('schedule.txt', 'План собраний'.encode()),
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['count'], 3)
+        messages = Message.objects.filter(pk__in=[item['id'] for item in response.data['messages']])
+        self.assertEqual({message.room.group.name for message in messages}, {'1А класс', '2А класс', '3А класс'})
+        self.assertEqual({message.room.room_type for message in messages}, {'parents'})
+        self.assertEqual(len({message.attachment.name for message in messages}), 1)
+        self.assertEqual(Blob.objects.get().refcount, 3)
+        self.assertEqual(ChatRoom.objects.filter(room_type='parents', message_count=1, last_message_preview='Перенос собрания').count(), 3)
+        self.assertEqual(SearchEntry.objects.filter(kind='message').count(), 3)
+        self.assertEqual(Task.objects.filter(name='extract_attachment_text').count(), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            messages.first().delete()
+        self.assertEqual(Blob.objects.get().refcount, 2)
+
+    def test_query_count_does_not_grow_with_groups(self):
+        with CaptureQueriesContext(connection) as few:
+            self.broadcast(groups=[self.groups[0].id], text='Один')
+        with CaptureQueriesContext(connection) as many:
+            self.assertEqual(self.broadcast(groups=[group.id for group in self.groups], text='Всем').data['count'], 4)
+        self.assertEqual(len(few), len(many))
+
+    def test_permissions_are_checked_once_for_all_groups(self):
+        teacher = Teacher.objects.create(first_name='Анна', last_name='Учитель')
+        teacher.groups.add(self.groups[0])
+        self.client.force_authenticate(teacher.user)
+        response = self.broadcast(groups=[self.groups[0].id, self.groups[1].id], text='Всем')
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Message.objects.exists())
+        self.assertEqual(self.broadcast(all='true', text='Своим').data['count'], 1)
+
+        student = Student.objects.create(first_name='Иван', last_name='Иванов', group=self.groups[0])
+        self.client.force_authenticate(student.user)
+        self.assertEqual(self.broadcast(groups=[self.groups[0].id], text='Привет').status_code, 403)
+
+    def test_validation(self):
+        self.assertEqual(self.broadcast(text='Без групп').status_code, 400)
+        self.assertEqual(self.broadcast(all='true').status_code, 400)
+        self.assertEqual(self.broadcast(all='true', text='x', room_type='other').status_code, 400)
+        self.assertEqual(self.broadcast(name='нет такой', text='x').status_code, 400)
+
+    @override_settings(STORAGES={**settings.STORAGES, 'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'}})
+    def test_shared_file_without_refcount_outlives_first_delete(self):
+        response = self.broadcast(groups=[self.groups[0].id, self.groups[1].id], text='Лист', attachment=SimpleUploadedFile('a.txt', b'x'))
+        first, second = Message.objects.filter(pk__in=[item['id'] for item in response.data['messages']])
+        name = first.attachment.name
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(default_storage.exists(name))
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(default_storage.exists(name))
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class AsyncChatTest(TestCase):
+    def setUp(self):
+        self.group = Group.objects.create(name='Группа А')
+        self.teacher = Teacher.objects.create(first_name='Анна', last_name='Учитель')
+        self.teacher.groups.add(self.group)
+        self.room = ChatRoom.objects.get(group=self.group, room_type='students')
+        self.other_room = ChatRoom.objects.get(group=Group.objects.create(name='Группа Б'), room_type='students')
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(self.teacher.user)}'}
+        self.first = Message.objects.create(group=self.group, room=self.room, sender_type='student', sender_name='Иван', text='Первое')
+
+    def sync_get(self, url):
+        return self.client.get(url, **self.auth).json()
+
+    def test_rooms_and_messages_match_sync_routes(self):
+        response = self.client.get('/api/async/chats/', **self.auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), self.sync_get('/api/chats/'))
+
+        url = f'/api/async/chats/{self.room.id}/messages/'
+        response = self.client.get(url, **self.auth)
+        self.assertEqual(response.json(), self.sync_get(f'/api/chats/{self.room.id}/messages/'))
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'], **self.auth).status_code, 304)
+
+    def test_post_validates_and_checks_access(self):
+        url = f'/api/async/chats/{self.room.id}/messages/'
+        response = self.client.post(url, {'text': 'Домашнее задание'}, content_type='application/json', **self.auth)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['sender_type'], 'teacher')
+        self.assertTrue(Message.objects.filter(room=self.room, text='Домашнее задание').exists())
+
+        self.assertEqual(self.client.post(url, {'text': ' '}, content_type='application/json', **self.auth).status_code, 400)
+        foreign = f'/api/async/chats/{self.other_room.id}/messages/'
+        self.assertEqual(self.client.post(foreign, {'text': 'x'}, content_type='application/json', **self.auth).status_code, 403)
+        self.assertEqual(self.client.get(url).status_code, 401)
+        self.assertEqual(self.client.get('/api/async/chats/999999/messages/', **self.auth).status_code, 404)
+
+    def test_session_post_requires_csrf(self):
+        self.teacher.user.set_password('x')
+        self.teacher.user.save()
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.teacher.user)
+        url = f'/api/async/chats/{self.room.id}/messages/'
+        self.assertEqual(client.get(url).status_code, 200)
+        self.assertEqual(client.post(url, {'text': 'x'}, content_type='application/json').status_code, 403)
+
+    def test_unread_counts_only_new_foreign_messages(self):
+        Message.objects.create(group=self.group, room=self.room, sender_type='student', sender_name='Иван', text='Второе')
+        Message.objects.create(group=self.group, room=self.room, sender_type='teacher', sender_name='Учитель Анна', text='Свое')
+        latest = Message.objects.create(group=self.group, room=self.room, sender_type='student', sender_name='Иван', text='Третье')
+
+        state = {row['room']: row for row in self.client.get('/api/async/unread/', **self.auth).json()}
+        self.assertNotIn(self.other_room.id, state)
+        self.assertEqual(state[self.room.id]['latest_id'], latest.id)
+
+        state = {row['room']: row for row in self.client.get(f'/api/async/unread/?seen={self.room.id}:{self.first.id}', **self.auth).json()}
+        self.assertEqual(state[self.room.id]['unread'], 2)
+
+    def test_unread_tells_namesakes_apart_by_sender(self):
+        namesake = Teacher.objects.create(first_name='Анна', last_name='Учитель')
+        namesake.groups.add(self.group)
+        for teacher, text in ((namesake, 'От тезки'), (self.teacher, 'Свое')):
+            auth = {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(teacher.user)}'}
+            response = self.client.post(f'/api/chats/{self.room.id}/messages/', {'text': text}, content_type='application/json', **auth)
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual(response.json()['sender'], teacher.user_id)
+
+        seen = f'?seen={self.room.id}:{self.first.id}'
+        state = {row['room']: row for row in self.client.get(f'/api/async/unread/{seen}', **self.auth).json()}
+        self.assertEqual(state[self.room.id]['unread'], 1)
+
+    async def test_asgi_stack_counts_async_queries(self):
+        registry.reset()
+        response = await self.async_client.get('/api/async/chats/', headers={'Authorization': self.auth['HTTP_AUTHORIZATION']})
+        self.assertEqual(response.status_code, 200)
+        # Запросы async ORM идут в потоке sync_to_async, но наблюдатель из contextvar их видит.
+        sums = [line for line in render_prometheus().splitlines() if line.startswith('diplom_http_request_db_queries_sum{route="async_chat_rooms"')]
+        self.assertEqual(len(sums), 1)
+        self.assertGreater(float(sums[0].rsplit(' ', 1)[1]), 0)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class MessageIngestTest(TransactionTestCase):
+    def setUp(self):
+        self.group = Group.objects.create(name='Группа А')
+        self.room = ChatRoom.objects.get(group=self.group, room_type='students')
+
+    def message(self, text, **extra):
+        fields = {'sender_type': 'student', 'sender_name': 'Иван', **extra}
+        return Message(group_id=self.group.id, room=self.room, text=text, **fields)
+
+    def test_save_does_not_refetch_loaded_room(self):
+        # Транзакция: INSERT сообщения, строка поискового индекса, UPDATE сводки комнаты — без SELECT комнаты.
+        with self.assertNumQueries(5):
+            self.message('Привет').save()
+
+    def test_burst_is_written_in_one_batch_in_submit_order(self):
+        ingestor = MessageIngestor(flush_ms=200)
+        with mock.patch.object(Message.objects, 'bulk_create', wraps=Message.objects.bulk_create) as bulk_create:
+            futures = [ingestor.submit(ingestor.prepare(self.message(f'Ответ {n}'))) for n in range(5)]
+            written = [future.result(timeout=5) for future in futures]
+        self.assertEqual(bulk_create.call_count, 1)
+        ids = [message.id for message in written]
+        self.assertEqual(ids, sorted(ids))
+        self.assertEqual(list(Message.objects.order_by('id').values_list('text', flat=True)), [f'Ответ {n}' for n in range(5)])
+
+    def test_invalid_message_is_rejected_before_buffering(self):
+        with self.assertRaises(DjangoValidationError):
+            MessageIngestor().prepare(self.message('x', sender_type='robot'))
+
+    @override_settings(MESSAGE_INGEST='wait')
+    def test_api_returns_final_id(self):
+        teacher = Teacher.objects.create(first_name='Анна', last_name='Учитель')
+        teacher.groups.add(self.group)
+        auth = {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(teacher.user)}'}
+        for url in (f'/api/chats/{self.room.id}/messages/', f'/api/async/chats/{self.room.id}/messages/'):
+            response = self.client.post(url, {'text': 'Домашнее задание'}, content_type='application/json', **auth)
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual(Message.objects.get(pk=response.json()['id']).text, 'Домашнее задание')
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'], UPLOAD_CHUNK_SIZE=4, UPLOAD_MAX_BYTES=64, UPLOAD_MAX_SESSIONS=2)
+class ResumableUploadTest(APITestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, True)
+        overrides = override_settings(UPLOAD_TEMP_DIR=os.path.join(self.directory, 'parts'), MEDIA_ROOT=os.path.join(self.directory, 'media'))
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.group = Group.objects.create(name='Группа А')
+        self.room = ChatRoom.objects.get(group=self.group, room_type='students')
+        self.teacher = Teacher.objects.create(first_name='Анна', last_name='Учитель')
+        self.teacher.groups.add(self.group)
+        self.client.force_authenticate(self.teacher.user)
+
+    def start(self, content, filename='homework.pdf'):
+        response = self.client.post('/api/uploads/', {'filename': filename, 'size': len(content)}, format='json')
+        self.assertEqual(response.status_code, 201)
+        return response.data['id']
+
+    def put(self, upload_id, index, data, **headers):
+        return self.client.generic('PUT', f'/api/uploads/{upload_id}/chunks/{index}/', data, content_type='application/octet-stream', **headers)
+
+    def test_resume_after_dropped_chunk_and_attach_to_message(self):
+        content = b'0123456789'
+        upload_id = self.start(content)
+        self.assertEqual(self.put(upload_id, 0, content[:4]).status_code, 200)
+        # Обрыв: часть пришла не полностью и не засчитана.
+        self.assertEqual(self.put(upload_id, 1, content[4:6]).status_code, 400)
+        state = self.client.get(f'/api/uploads/{upload_id}/').data
+        self.assertEqual((state['received'], state['missing_chunks']), (4, [1, 2]))
+        self.assertEqual(self.client.post(f'/api/uploads/{upload_id}/complete/', {}, format='json').status_code, 400)
+
+        self.assertEqual(self.put(upload_id, 2, content[8:], HTTP_CONTENT_RANGE='bytes 8-9/10').status_code, 200)
+        self.assertEqual(self.put(upload_id, 1, content[4:8]).status_code, 200)
+        response = self.client.post(f'/api/uploads/{upload_id}/complete/', {'attach_to': 'message', 'room': self.room.id, 'text': 'ДЗ'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        message = Message.objects.get(pk=response.data['id'])
+        self.assertEqual((message.text, message.attachment_name), ('ДЗ', 'homework.pdf'))
+        with message.attachment.open('rb') as handle:
+            self.assertEqual(handle.read(), content)
+        self.assertFalse(os.path.exists(os.path.join(self.directory, 'parts', upload_id)))
+        # Повторный complete после обрыва ответа возвращает тот же результат.
+        self.assertEqual(self.client.post(f'/api/uploads/{upload_id}/complete/', {}, format='json').data['id'], message.id)
+
+    def test_limits_and_access(self):
+        self.assertEqual(self.client.post('/api/uploads/', {'filename': 'big.pdf', 'size': 65}, format='json').status_code, 400)
+        upload_id = self.start(b'abc')
+        self.start(b'abc')
+        self.assertEqual(self.client.post('/api/uploads/', {'filename': 'x.pdf', 'size': 3}, format='json').status_code, 429)
+        self.assertEqual(self.put(upload_id, 0, b'abcd').status_code, 400)
+        self.assertEqual(self.put(upload_id, 0, b'abc', HTTP_CONTENT_RANGE='bytes 1-3/3').status_code, 400)
+        self.assertEqual(self.put(upload_id, 0, b'abc').status_code, 200)
+
+        other_room = ChatRoom.objects.get(group=Group.objects.create(name='Группа Б'), room_type='students')
+        response = self.client.post(f'/api/uploads/{upload_id}/complete/', {'attach_to': 'message', 'room': other_room.id}, format='json')
+        self.assertEqual(response.status_code, 403)
+        self.client.force_authenticate(User.objects.create_user('plain', password='x'))
+        self.assertEqual(self.client.get(f'/api/uploads/{upload_id}/').status_code, 404)
+
+    @override_settings(UPLOAD_MAX_PENDING_BYTES=100, UPLOAD_MAX_SESSIONS=5)
+    def test_pending_bytes_limit(self):
+        self.start(b'x' * 60)
+        self.assertEqual(self.client.post('/api/uploads/', {'filename': 'b.pdf', 'size': 41}, format='json').status_code, 429)
+        self.start(b'x' * 40)
+        self.assertEqual(UploadSession.objects.count(), 2)
+
+    def test_stale_sessions_are_collected(self):
+        upload_id = self.start(b'abc')
+        self.put(upload_id, 0, b'abc')
+        UploadSession.objects.filter(pk=upload_id).update(updated_at=timezone.now() - timedelta(days=2))
+        call_command('cleanup_uploads', stdout=StringIO())
+        self.assertFalse(UploadSession.objects.filter(pk=upload_id).exists())
+        self.assertFalse(os.path.exists(os.path.join(self.directory, 'parts', upload_id)))
@@ -0,0 +1,125 @@
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from messenger import archive
+from messenger.models import ArchivedMessageChunk, Blob, ChatRoom, Group, Message, SearchEntry, Student, Teacher
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'], MESSAGE_RETENTION_DAYS={'students': 30})
+class ArchiveMessagesTest(APITestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, True)
+        overrides = override_settings(MEDIA_ROOT=directory)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.group = Group.objects.create(name='Группа А')
+        self.room = ChatRoom.objects.get(group=self.group, room_type='students')
+        self.parents_room = ChatRoom.objects.get(group=self.group, room_type='parents')
+        self.student = Student.objects.create(first_name='Анна', last_name='Иванова', group=self.group)
+        now = timezone.now()
+        # Пять старых сообщений в двух месяцах и два свежих.
+        self.old = [self.post(self.room, f'Старое {n}', now - timedelta(days=100 - n * 15)) for n in range(5)]
+        self.recent = [self.post(self.room, f'Новое {n}', now - timedelta(days=1)) for n in range(2)]
+        self.parents_old = self.post(self.parents_room, 'Родителям', now - timedelta(days=400))
+
+    def post(self, room, text, created_at):
+        message = Message.objects.create(room=room, group=self.group, sender_type='teacher', sender_name='Учитель', text=text)
+        Message.objects.filter(pk=message.pk).update(created_at=created_at)
+        return message
+
+    def archive(self, *args):
+        out = StringIO()
+        call_command('archive_messages', *args, stdout=out)
+        return out.getvalue()
+
+    def test_policy_moves_old_messages_in_batches(self):
+        self.assertIn('students: 5', self.archive('--dry-run'))
+        self.assertEqual(Message.objects.count(), 8)
+
+        self.archive('--batch-size', '2')
+        self.assertEqual(set(Message.objects.values_list('id', flat=True)), {m.id for m in self.recent} | {self.parents_old.id})
+        chunks = ArchivedMessageChunk.objects.filter(room=self.room)
+        self.assertEqual(sum(chunk.count for chunk in chunks), 5)
+        self.assertTrue(all(chunk.count <= 2 for chunk in chunks))
+        self.assertLess(len(chunks[0].data), 1000)
+        rows = [row for chunk in chunks.order_by('first_id') for row in archive.unpack(chunk)]
+        self.assertEqual([row['text'] for row in rows], [f'Старое {n}' for n in range(5)])
+        self.assertEqual(SearchEntry.objects.filter(kind='message', object_id__in=[m.id for m in self.old]).count(), 5)
+
+        self.room.refresh_from_db()
+        self.assertEqual((self.room.message_count, self.room.last_message_id), (7, self.recent[-1].id))
+
+    def test_older_than_overrides_policy_for_room_type(self):
+        self.archive('--older-than', '365', '--room-type', 'parents')
+        self.assertFalse(Message.objects.filter(pk=self.parents_old.pk).exists())
+        self.assertEqual(Message.objects.filter(room=self.room).count(), 7)
+
+    def test_history_pages_through_live_and_archived_messages(self):
+        self.archive()
+        self.client.force_authenticate(self.student.user)
+        url = f'/api/chats/{self.room.id}/history/'
+        first = self.client.get(url, {'limit': 3}).data
+        self.assertEqual([item['text'] for item in first['results']], ['Новое 1', 'Новое 0', 'Старое 4'])
+        self.assertEqual([item['archived'] for item in first['results']], [False, False, True])
+
+        second = self.client.get(url, {'limit': 3, 'before': first['next_before']}).data
+        self.assertEqual([item['text'] for item in second['results']], ['Старое 3', 'Старое 2', 'Старое 1'])
+        last = self.client.get(url, {'limit': 3, 'before': second['next_before']}).data
+        self.assertEqual(([item['text'] for item in last['results']], last['next_before']), (['Старое 0'], None))
+
+        self.client.force_authenticate(Teacher.objects.create(first_name='Олег', last_name='Чужой').user)
+        self.assertIn(self.client.get(url).status_code, (403, 404))
+
+    def test_archived_messages_stay_searchable(self):
+        self.archive()
+        self.client.force_authenticate(self.student.user)
+        results = self.client.get('/api/search/', {'q': 'старое'}).data['results']
+        self.assertEqual({item['id'] for item in results}, {m.id for m in self.old})
+        self.assertTrue(all(item['archived'] and item['room'] == self.room.id for item in results))
+        self.assertEqual([item['archived'] for item in self.client.get('/api/search/', {'q': 'новое'}).data['results']], [False, False])
+        # Пересборка индекса берет архивные сообщения из пачек.
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual({item['id'] for item in self.client.get('/api/search/', {'q': 'старое'}).data['results']}, {m.id for m in self.old})
+
+        # Архив удаляется вместе с комнатой, строки поиска — вместе с ним.
+        self.room.delete()
+        self.assertFalse(SearchEntry.objects.filter(kind='message', object_id__in=[m.id for m in self.old + self.recent]).exists())
+        self.assertTrue(SearchEntry.objects.filter(kind='message', object_id=self.parents_old.id).exists())
+
+    def test_archived_attachment_is_kept_and_served(self):
+        message = Message.objects.get(pk=self.old[0].pk)
+        message.attachment.save('old.pdf', ContentFile(b'%PDF old'), save=False)
+        Message.objects.filter(pk=message.pk).update(attachment=message.attachment.name, attachment_name='План.pdf')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.archive()
+        self.assertEqual(Blob.objects.get().refcount, 1)
+        row = archive.unpack(ArchivedMessageChunk.objects.filter(room=self.room).order_by('first_id').first())[0]
+        self.assertEqual((row['attachment'], row['attachment_name']), (message.attachment.name, 'План.pdf'))
+
+        self.client.force_authenticate(self.student.user)
+        item = self.client.get(f'/api/chats/{self.room.id}/history/', {'limit': 10}).data['results'][-1]
+        self.assertTrue(item['attachment_url'].endswith(f'/api/chats/{self.room.id}/archived/{message.id}/attachment/'))
+        response = self.client.get(item['attachment_url'])
+        self.assertEqual((response.status_code, b''.join(response.streaming_content)), (200, b'%PDF old'))
+        self.assertEqual(self.client.get(f'/api/chats/{self.room.id}/archived/{self.old[1].id}/attachment/').status_code, 404)
+        self.client.force_authenticate(Teacher.objects.create(first_name='Олег', last_name='Чужой').user)
+        self.assertIn(self.client.get(item['attachment_url']).status_code, (403, 404))
+
+        # Файл освобождается только вместе с архивом комнаты.
+        with self.captureOnCommitCallbacks(execute=True):
+            self.room.delete()
+        self.assertFalse(Blob.objects.exists())
+
+    def test_nothing_without_policy(self):
+        with override_settings(MESSAGE_RETENTION_DAYS={}):
+            self.assertIn('архивировать нечего', self.archive())
+        self.assertEqual(Message.objects.count(), 8)
@@ -0,0 +1,56 @@
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from messenger.models import ChatRoom, Holiday, Message, MethodAssignment, MethodPackage, ScheduleSlot, Student, Teacher
+from messenger.benchmark import SCENARIOS, percentile
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class SeedAndBenchTest(TestCase):
+    def _seed(self, **options):
+        call_command('seed_scale', groups=2, students_per_group=3, messages_per_room=4, weeks=2, holidays=1, subjects=2, stdout=StringIO(), **options)
+
+    def test_seed_scale_builds_school_without_signals(self):
+        self._seed()
+        self.assertEqual(Student.objects.count(), 6)
+        self.assertEqual(ChatRoom.objects.count(), 6)
+        self.assertEqual(Message.objects.count(), 24)
+        self.assertEqual(MethodPackage.objects.count(), 24)
+        self.assertEqual(ScheduleSlot.objects.count(), 2 * 2 * 2)
+        self.assertEqual(MethodAssignment.objects.count(), Teacher.objects.count() * 12)
+        # Сигнал create_teacher_user не срабатывал: пароль общий, а не сгенерированный.
+        self.assertFalse(Teacher.objects.exclude(initial_password='').exists())
+        self.assertTrue(Teacher.objects.get(user__username='seed-t0').user.check_password('seed-password'))
+
+        with self.assertRaisesMessage(Exception, 'уже есть'):
+            self._seed()
+        self._seed(flush=True)
+        self.assertEqual(Student.objects.count(), 6)
+
+    def test_bench_writes_result_file(self):
+        self._seed()
+        with tempfile.TemporaryDirectory() as tmp:
+            output = Path(tmp) / 'result.json'
+            call_command('bench', iterations=3, warmup=1, output=str(output), stdout=StringIO())
+            result = json.loads(output.read_text(encoding='utf-8'))
+
+        self.assertEqual(result['mode'], 'in-process')
+        self.assertEqual(set(result['scenarios']), set(SCENARIOS))
+        for name, stats in result['scenarios'].items():
+            self.assertEqual(stats['errors'], 0, f'{name}: {stats.get("first_error")}')
+            self.assertEqual(stats['iterations'], 3)
+            self.assertLessEqual(stats['p50_ms'], stats['p99_ms'])
+        # Сценарии убирают за собой созданные сообщения и выходные.
+        self.assertFalse(Message.objects.filter(text__startswith='bench').exists())
+        self.assertEqual(Holiday.objects.count(), 1)
+
+    def test_percentile_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 0.5), 50)
+        self.assertEqual(percentile(values, 0.99), 99)
+        self.assertEqual(percentile([7], 0.95), 7)
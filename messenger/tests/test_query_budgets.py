@@ -0,0 +1,259 @@
+import os
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient, APITestCase
+
+from messenger import archive, search
+from messenger.models import (
+    ChatRoom,
+    Event,
+    FeedPost,
+    Group,
+    Holiday,
+    LessonTopic,
+    Message,
+    MethodAssignment,
+    MethodAssignmentComment,
+    MethodPackage,
+    Parent,
+    ScheduleSlot,
+    Student,
+    Subject,
+    Teacher,
+    UserProfile,
+)
+
+User = get_user_model()
+
+SMALL_SCALE = 5
+LARGE_SCALE = int(os.getenv('QUERY_BUDGET_LARGE_SCALE', '500'))
+
+# Бюджет SQL-запросов на эндпоинт. Число не должно зависеть от объема данных:
+# если правка добавляет запросы, поднимайте бюджет осознанно, а не ради зеленого CI.
+# имя: (роль, метод, URL, тело, бюджет)
+QUERY_BUDGETS = {
+    'group-list': ('admin', 'get', '/api/groups/', None, 12),
+    'group-detail': ('teacher', 'get', '/api/groups/{group}/', None, 9),
+    'group-schedule': ('teacher', 'get', '/api/groups/{group}/schedule/', None, 6),
+    'group-messages': ('teacher', 'get', '/api/groups/{group}/messages/?room_type=students', None, 8),
+    'teacher-list': ('admin', 'get', '/api/teachers/', None, 3),
+    'parent-list': ('admin', 'get', '/api/parents/', None, 2),
+    'student-list': ('admin', 'get', '/api/students/', None, 6),
+    'methodpackage-list': ('teacher', 'get', '/api/method-packages/', None, 4),
+    'scheduleslot-list': ('admin', 'get', '/api/schedule/', None, 5),
+    'holiday-list': ('admin', 'get', '/api/holidays/', None, 3),
+    'subject-list': ('admin', 'get', '/api/subjects/', None, 2),
+    'lessontopic-list': ('admin', 'get', '/api/lesson-topics/', None, 4),
+    'chatroom-list-teacher': ('teacher', 'get', '/api/chats/', None, 7),
+    'chatroom-list-parent': ('parent', 'get', '/api/chats/', None, 7),
+    'chatroom-list-student': ('student', 'get', '/api/chats/', None, 6),
+    'chatroom-messages': ('parent', 'get', '/api/chats/{room}/messages/', None, 8),
+    # +2 — строка поискового индекса (messenger.search) и сводка комнаты, в той же транзакции.
+    'chatroom-send': ('teacher', 'post', '/api/chats/{room}/messages/', {'text': 'Домашнее задание'}, 9),
+    'message-list': ('teacher', 'get', '/api/messages/', None, 5),
+    'event-list': ('admin', 'get', '/api/events/', None, 3),
+    'feedpost-list': ('admin', 'get', '/api/feed-posts/', None, 3),
+    'methodassignment-list': ('teacher', 'get', '/api/method-assignments/', None, 6),
+    'methodassignment-comments': ('teacher', 'get', '/api/method-assignments/{assignment}/comments/', None, 3),
+    # submit/approve/rework идут по кругу: rework снова открывает назначение для submit следующего замера.
+    'methodassignment-rework': ('admin', 'post', '/api/method-assignments/{assignment}/rework/', {'comment': 'Доработать'}, 9),
+    'methodassignment-submit': ('teacher', 'post', '/api/method-assignments/{assignment}/submit/', {}, 10),
+    'methodassignment-approve': ('admin', 'post', '/api/method-assignments/{assignment}/approve/', {}, 9),
+    'methodassignment-bulk-assign': (
+        'admin', 'post', '/api/method-assignments/bulk_assign_subject/', {'teacher': '{teacher}', 'subject': '{subject}'}, 8,
+    ),
+    # Перенос уроков (shift_holiday_lessons) идет в фоне: в запросе — только постановка задачи.
+    'holiday-create': ('admin', 'post', '/api/holidays/', {'date': '{free_day}'}, 6),
+    # Рассылка во все группы: строки пишутся пачкой, число запросов не зависит от числа групп.
+    'group-broadcast': ('admin', 'post', '/api/groups/broadcast/', {'all': 'true', 'text': 'Объявление'}, 10),
+    # Страница целиком из живых сообщений и страница из архива (комната archive_room — только архив).
+    'chatroom-history': ('parent', 'get', '/api/chats/{room}/history/?limit=5', None, 7),
+    'chatroom-history-archived': ('parent', 'get', '/api/chats/{archive_room}/history/', None, 8),
+    # +1 — какие из найденных сообщений ушли в архив.
+    'search': ('teacher', 'get', '/api/search/?q=Сообщение', None, 7),
+    'me': ('teacher', 'get', '/api/me/', None, 1),
+    'userprofile-list': ('admin', 'get', '/api/profiles/', None, 3),
+    'sync-full': ('admin', 'get', '/api/sync/', None, 20),
+    'sync-teacher': ('teacher', 'get', '/api/sync/', None, 22),
+}
+
+
+def _statements(queries):
+    """
+    SQL запросов эндпоинта. SQLite режет bulk_create на пачки по 999 параметров: подряд идущие
+    многострочные INSERT в ту же таблицу — один bulk_create, считаем их одним запросом.
+    """
+    statements = []
+    for query in queries:
+        sql = query['sql']
+        if statements and sql.startswith('INSERT INTO') and '), (' in statements[-1]:
+            if statements[-1].split(' VALUES ', 1)[0] == sql.split(' VALUES ', 1)[0]:
+                continue
+        statements.append(sql)
+    return statements
+
+
+class SchoolFixture:
+    """
+    Школа, которую можно наращивать: основные пользователи (учитель, родитель, ученик)
+    видят все новые данные, так что их выборки растут вместе с масштабом.
+    Массовые строки вставляются bulk_create в обход сигналов.
+    """
+
+    def __init__(self):
+        self.grown = 0
+        self.subject = Subject.objects.create(name='Предмет 0')
+        self.group = Group.objects.create(name='Основная группа')
+        self.teacher = Teacher.objects.create(first_name='Анна', last_name='Учитель')
+        self.teacher.groups.add(self.group)
+        self.parent = Parent.objects.create(first_name='Олег', last_name='Родитель')
+        self.student = Student.objects.create(first_name='Иван', last_name='Ученик', group=self.group)
+        self.student.parents.add(self.parent)
+        self.room = ChatRoom.objects.get(group=self.group, room_type='students')
+        self.archive_room = ChatRoom.objects.get(group=self.group, room_type='parents')
+        ChatRoom.objects.get_or_create(group=self.group, room_type='management')
+        self.method = MethodPackage.objects.create(subject=self.subject, method_number=1, title='Урок 1')
+        self.assignment = MethodAssignment.objects.create(method_package=self.method, teacher=self.teacher)
+        self.users = {
+            'admin': User.objects.create_user('budget-admin', is_staff=True),
+            'teacher': self.teacher.user,
+            'parent': self.parent.user,
+            'student': self.student.user,
+        }
+
+    def _users(self, prefix, indexes, role):
+        users = User.objects.bulk_create([User(username=f'{prefix}{i}') for i in indexes])
+        UserProfile.objects.bulk_create([UserProfile(user=user, role=role) for user in users])
+        return users
+
+    def grow(self, count):
+        indexes = range(self.grown, self.grown + count)
+        self.grown += count
+        first_day = date(2025, 9, 1)
+
+        groups = Group.objects.bulk_create([Group(name=f'Группа {i}') for i in indexes])
+        ChatRoom.objects.bulk_create([
+            ChatRoom(group=group, room_type=room_type)
+            for group in groups
+            for room_type in ('parents', 'students', 'management')
+        ])
+
+        teachers = Teacher.objects.bulk_create([
+            Teacher(first_name='Учитель', last_name=str(i), user=user)
+            for i, user in zip(indexes, self._users('t', indexes, 'teacher'))
+        ])
+        parents = Parent.objects.bulk_create([
+            Parent(first_name='Родитель', last_name=str(i), user=user)
+            for i, user in zip(indexes, self._users('p', indexes, 'parent'))
+        ])
+        students = Student.objects.bulk_create([
+            Student(first_name='Ученик', last_name=str(i), group=group, user=user)
+            for i, group, user in zip(indexes, groups, self._users('s', indexes, 'student'))
+        ])
+
+        teacher_groups = Teacher.groups.through
+        teacher_groups.objects.bulk_create(
+            [teacher_groups(teacher_id=t.id, group_id=g.id) for t, g in zip(teachers, groups)]
+            + [teacher_groups(teacher_id=self.teacher.id, group_id=g.id) for g in groups]
+            + [teacher_groups(teacher_id=t.id, group_id=self.group.id) for t in teachers]
+        )
+        student_parents = Student.parents.through
+        student_parents.objects.bulk_create(
+            [student_parents(student_id=s.id, parent_id=p.id) for s, p in zip(students, parents)]
+            + [student_parents(student_id=s.id, parent_id=self.parent.id) for s in students]
+        )
+
+        subjects = Subject.objects.bulk_create([Subject(name=f'Предмет {i + 1}') for i in range(self.grown - count, self.grown, 12)])
+        methods = MethodPackage.objects.bulk_create([
+            MethodPackage(subject=subjects[n // 12], method_number=n % 12 + 1, title=f'Урок {i}')
+            for n, i in enumerate(indexes)
+        ])
+        topics = LessonTopic.objects.bulk_create([
+            LessonTopic(name=f'Тема {i}', subject=method.subject, method_package=method)
+            for i, method in zip(indexes, methods)
+        ])
+        ScheduleSlot.objects.bulk_create([
+            ScheduleSlot(
+                group=self.group,
+                lesson_topic=topic,
+                lesson_date=first_day + timedelta(days=i),
+                weekday=(first_day + timedelta(days=i)).weekday(),
+                lesson_number=i + 1,
+                start_time=time(10, 0),
+                method_package=topic.method_package,
+            )
+            for i, topic in zip(indexes, topics)
+        ])
+        Holiday.objects.bulk_create([Holiday(date=date(2030, 1, 1) + timedelta(days=i)) for i in indexes])
+
+        assignments = MethodAssignment.objects.bulk_create([
+            MethodAssignment(method_package=method, teacher=self.teacher, granted_by=self.users['admin'])
+            for method in methods
+        ])
+        MethodAssignmentComment.objects.bulk_create([
+            MethodAssignmentComment(assignment=self.assignment, sender=self.users['admin'], text=f'Комментарий {i}')
+            for i in indexes
+        ])
+        search.index_messages(Message.objects.bulk_create([
+            Message(group=self.group, room=self.room, sender_type='teacher', sender_name='Учитель', text=f'Сообщение {i}')
+            for i in indexes
+        ]))
+        old = Message.objects.bulk_create([
+            Message(group=self.group, room=self.archive_room, sender_type='parent', sender_name='Родитель', text=f'Старое {i}')
+            for i in indexes
+        ])
+        Message.objects.filter(pk__in=[message.pk for message in old]).update(created_at=datetime(2020, 1, 1, tzinfo=dt_timezone.utc))
+        archive.archive_batch('parents', datetime(2021, 1, 1, tzinfo=dt_timezone.utc), batch_size=count)
+        Event.objects.bulk_create([Event(group=self.group, title=f'Событие {i}') for i in indexes])
+        FeedPost.objects.bulk_create([FeedPost(group=self.group, author_name='Менеджер', text=f'Пост {i}') for i in indexes])
+        return assignments
+
+    def format(self, template):
+        """Подставляет id фикстуры в URL или в строковые значения тела запроса."""
+        if isinstance(template, dict):
+            return {key: self.format(value) for key, value in template.items()}
+        if not isinstance(template, str):
+            return template
+        return template.format(
+            group=self.group.id, room=self.room.id, archive_room=self.archive_room.id, assignment=self.assignment.id,
+            teacher=self.teacher.id, subject=self.subject.id,
+            # Свой день на каждый замер (дата выходного уникальна), раньше выходных из grow().
+            free_day=(date(2030, 1, 1) - timedelta(days=self.grown)).isoformat(),
+        )
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class QueryBudgetTest(APITestCase):
+    """Каждый эндпоинт выполняет одинаковое число запросов при 5 и при LARGE_SCALE записях."""
+
+    def _measure(self, fixture):
+        results = {}
+        for name, (role, method, url, body, _) in QUERY_BUDGETS.items():
+            # Свежий экземпляр пользователя, чтобы кэш profile/teacher_profile не переносился между запросами.
+            client = APIClient()
+            client.force_authenticate(User.objects.get(pk=fixture.users[role].pk))
+            with CaptureQueriesContext(connection) as captured:
+                response = getattr(client, method)(fixture.format(url), fixture.format(body))
+            self.assertLess(response.status_code, 300, f'{name}: {response.status_code} {response.content[:300]!r}')
+            results[name] = _statements(captured.captured_queries)
+        return results
+
+    def test_query_counts_do_not_grow_with_data(self):
+        fixture = SchoolFixture()
+        fixture.grow(SMALL_SCALE)
+        small = self._measure(fixture)
+        fixture.grow(LARGE_SCALE - SMALL_SCALE)
+        large = self._measure(fixture)
+
+        for name, (_, _, _, _, budget) in QUERY_BUDGETS.items():
+            with self.subTest(endpoint=name):
+                sql = '\n'.join(f'  {n}. {q}' for n, q in enumerate(large[name], start=1))
+                self.assertEqual(
+                    len(small[name]), len(large[name]),
+                    f'{name}: {len(small[name])} запросов при {SMALL_SCALE}, {len(large[name])} при {LARGE_SCALE}:\n{sql}',
+                )
+                self.assertLessEqual(len(large[name]), budget, f'{name}: бюджет {budget} превышен:\n{sql}')
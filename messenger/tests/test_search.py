@@ -0,0 +1,219 @@
+import shutil
+import tempfile
+import zipfile
+from io import BytesIO, StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+from rest_framework.test import APITestCase
+
+from messenger import extraction, search
+from messenger.ingest import MessageIngestor
+from messenger.models import (
+    AttachmentText, ChatRoom, Group, Message, MethodAssignment, MethodAssignmentComment, MethodPackage, SearchEntry, Student,
+    Task, Teacher,
+)
+
+User = get_user_model()
+
+
+class StemTest(SimpleTestCase):
+    def test_word_forms_share_stem(self):
+        for forms in (
+            ('расписание', 'расписания', 'расписанию', 'расписаниями'),
+            ('контрольная', 'контрольной', 'контрольную'),
+            ('учитель', 'учителя', 'учителем', 'учителей'),
+        ):
+            self.assertEqual(len({search.stem(word) for word in forms}), 1, forms)
+
+    def test_latin_and_numbers_unchanged(self):
+        self.assertEqual(search.stem('Python3'), 'python3')
+        self.assertEqual(search.stem('2024'), '2024')
+
+    def test_highlight_escapes_and_marks(self):
+        snippet = search.highlight('<b>Новое</b> расписание на неделю', {search.stem('расписания')})
+        self.assertEqual(snippet, '&lt;b&gt;Новое&lt;/b&gt; <mark>расписание</mark> на неделю')
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class SearchApiTest(APITestCase):
+    def setUp(self):
+        self.group = Group.objects.create(name='Группа А')
+        self.other_group = Group.objects.create(name='Группа Б')
+        self.student = Student.objects.create(first_name='Анна', last_name='Иванова', group=self.group)
+        self.admin = User.objects.create_user('admin', is_staff=True)
+        self.room = ChatRoom.objects.get(group=self.group, room_type='students')
+        self.other_room = ChatRoom.objects.get(group=self.other_group, room_type='students')
+
+    def post(self, room, text):
+        return Message.objects.create(room=room, group=room.group, sender_type='teacher', sender_name='Учитель', text=text)
+
+    def find(self, user, q, **params):
+        self.client.force_authenticate(user)
+        return self.client.get('/api/search/', {'q': q, **params})
+
+    def test_finds_other_word_forms_with_highlight(self):
+        message = self.post(self.room, 'Новое расписание на следующую неделю')
+        response = self.find(self.student.user, 'расписания')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 1)
+        result = response.data['results'][0]
+        self.assertEqual((result['kind'], result['id'], result['room']), ('message', message.id, self.room.id))
+        self.assertIn('<mark>расписание</mark>', result['snippet'])
+
+    def test_last_word_matches_as_prefix(self):
+        self.post(self.room, 'Контрольная по геометрии в пятницу')
+        self.assertEqual(self.find(self.student.user, 'контрольная геом').data['count'], 1)
+
+    def test_scope_excludes_other_groups_and_rooms(self):
+        self.post(self.room, 'Экскурсия в музей')
+        self.post(self.other_room, 'Экскурсия в планетарий')
+        self.post(ChatRoom.objects.create(group=self.group, room_type='management'), 'Экскурсия: бюджет')
+        self.assertEqual(self.find(self.student.user, 'экскурсия').data['count'], 1)
+        self.assertEqual(self.find(self.admin, 'экскурсия').data['count'], 3)
+
+    def test_edit_and_delete_update_index(self):
+        message = self.post(self.room, 'Собрание в среду')
+        message.text = 'Собрание в четверг'
+        message.save()
+        self.assertEqual(self.find(self.student.user, 'среда').data['count'], 0)
+        self.assertEqual(self.find(self.student.user, 'четверг').data['count'], 1)
+        message.delete()
+        self.assertFalse(SearchEntry.objects.exists())
+
+    def test_pagination(self):
+        for index in range(5):
+            self.post(self.room, f'Домашнее задание номер {index}')
+        response = self.find(self.student.user, 'задание', page=2, page_size=2)
+        self.assertEqual((response.data['count'], len(response.data['results'])), (5, 2))
+        self.assertEqual(self.find(self.student.user, 'задание', page=3, page_size=2).data['results'].__len__(), 1)
+
+    def test_empty_query_rejected(self):
+        self.assertEqual(self.find(self.student.user, ' ?! ').status_code, 400)
+
+    def test_comments_and_methods(self):
+        teacher = Teacher.objects.create(first_name='Олег', last_name='Петров')
+        other_teacher = Teacher.objects.create(first_name='Ирина', last_name='Сидорова')
+        method = MethodPackage.objects.create(
+            title='Дроби', content_blocks=[{'type': 'text', 'text': 'Сложение обыкновенных дробей'}],
+        )
+        assignment = MethodAssignment.objects.create(method_package=method, teacher=teacher)
+        MethodAssignmentComment.objects.create(assignment=assignment, text='Добавьте задачи на сложение')
+
+        kinds = sorted(result['kind'] for result in self.find(teacher.user, 'сложения').data['results'])
+        self.assertEqual(kinds, ['comment', 'method'])
+        kinds = [result['kind'] for result in self.find(other_teacher.user, 'сложения').data['results']]
+        self.assertEqual(kinds, ['method'])
+        self.assertEqual(self.find(self.student.user, 'сложения').data['count'], 0)
+        self.assertEqual(self.find(self.admin, 'дробь', kind='method').data['results'][0]['title'], 'Дроби')
+
+    def test_ingest_batch_is_indexed(self):
+        ingestor = MessageIngestor()
+        message = ingestor.prepare(Message(room=self.room, sender_type='teacher', sender_name='Учитель', text='Олимпиада завтра'))
+        future = ingestor.submit(message)
+        ingestor.flush()
+        future.result(1)
+        self.assertEqual(self.find(self.student.user, 'олимпиады').data['count'], 1)
+
+    def test_rebuild_command(self):
+        self.post(self.room, 'Каникулы начинаются в понедельник')
+        SearchEntry.objects.all().delete()
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('1', out.getvalue())
+        self.assertEqual(self.find(self.student.user, 'каникул').data['count'], 1)
+
+
+def docx(*paragraphs):
+    body = ''.join(f'<w:p><w:r><w:t>{text}</w:t></w:r></w:p>' for text in paragraphs)
+    buffer = BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        # Фиксированная дата: одинаковый текст — одинаковые байты (и один blob).
+        archive.writestr(
+            zipfile.ZipInfo('word/document.xml', date_time=(2024, 1, 1, 0, 0, 0)),
+            '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+            f'<w:body>{body}</w:body></w:document>',
+        )
+    return buffer.getvalue()
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class AttachmentTextTest(APITestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, True)
+        overrides = override_settings(MEDIA_ROOT=directory)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.group = Group.objects.create(name='Группа А')
+        self.teacher = Teacher.objects.create(first_name='Анна', last_name='Учитель')
+        self.teacher.groups.add(self.group)
+        self.room = ChatRoom.objects.get(group=self.group, room_type='students')
+        self.client.force_authenticate(self.teacher.user)
+
+    def send(self, name, content, text='Материалы'):
+        # Извлечение ставится в очередь после коммита.
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                f'/api/chats/{self.room.id}/messages/',
+                {'text': text, 'attachment': SimpleUploadedFile(name, content)},
+                format='multipart',
+            )
+        self.assertEqual(response.status_code, 201)
+        return Message.objects.get(pk=response.data['id'])
+
+    def run_worker(self):
+        call_command('run_worker', '--once', stdout=StringIO())
+
+    def found(self, q):
+        return [(result['kind'], result['id']) for result in self.client.get('/api/search/', {'q': q}).data['results']]
+
+    def test_text_is_extracted_in_background_and_indexed(self):
+        message = self.send('Unity_ДЗ_3.docx', docx('Домашнее задание', 'Создать префабы врагов'))
+        self.assertFalse(AttachmentText.objects.exists())
+        self.assertTrue(Task.objects.filter(name='extract_attachment_text').exists())
+        self.assertEqual(self.found('префабов'), [])
+
+        self.run_worker()
+        self.assertEqual(AttachmentText.objects.get().text, 'Домашнее задание\nСоздать префабы врагов')
+        self.assertEqual(self.found('префабов'), [('message', message.id)])
+        # Тот же файл еще раз: текст уже есть, в индекс он попадает сразу.
+        copy = self.send('copy.docx', docx('Домашнее задание', 'Создать префабы врагов'))
+        self.assertEqual(AttachmentText.objects.count(), 1)
+        self.assertIn(('message', copy.id), self.found('префабов'))
+
+    def test_method_package_attachment(self):
+        method = MethodPackage.objects.create(title='Урок 3')
+        with self.captureOnCommitCallbacks(execute=True):
+            method.attachment.save('notes.txt', SimpleUploadedFile('notes.txt', 'Шейдеры и освещение'.encode('cp1251')), save=True)
+        self.run_worker()
+        self.assertEqual(self.found('шейдер'), [('method', method.id)])
+
+    @override_settings(TASKS_EAGER=True)
+    def test_eager_extraction_runs_after_message_is_indexed(self):
+        message = self.send('a.txt', 'Расписание экзаменов'.encode())
+        self.assertEqual(AttachmentText.objects.get().status, 'ready')
+        self.assertEqual(SearchEntry.objects.filter(kind='message', object_id=message.id).count(), 1)
+        self.assertEqual(self.found('экзаменов'), [('message', message.id)])
+
+    @override_settings(EXTRACT_MAX_CHARS=10)
+    def test_text_is_truncated(self):
+        self.send('long.txt', ('слово ' * 100).encode())
+        self.run_worker()
+        item = AttachmentText.objects.get()
+        self.assertTrue(item.truncated)
+        self.assertEqual(len(item.text), 10)
+
+    @override_settings(EXTRACT_MAX_BYTES=16)
+    def test_large_file_is_skipped(self):
+        self.send('big.txt', b'x' * 100)
+        self.run_worker()
+        self.assertEqual(AttachmentText.objects.get().status, 'skipped')
+
+    def test_unsupported_and_broken_files(self):
+        self.assertFalse(extraction.supports('clip.mp4'))
+        self.send('broken.docx', b'not a zip')
+        self.run_worker()
+        self.assertEqual(AttachmentText.objects.get().status, 'failed')
@@ -0,0 +1,416 @@
+import hashlib
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock, skipUnless
+from urllib.parse import urlsplit
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from messenger import previews
+from messenger.models import Blob, ChatRoom, Event, FeedPost, Group, Message, MethodPackage, Preview, Task, Teacher, UploadSession
+from messenger.storage import S3Storage
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class DedupStorageTest(APITestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, True)
+        overrides = override_settings(MEDIA_ROOT=self.directory)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.group = Group.objects.create(name='Группа А')
+        self.other_group = Group.objects.create(name='Группа Б')
+        self.teacher = Teacher.objects.create(first_name='Анна', last_name='Учитель')
+        self.teacher.groups.add(self.group, self.other_group)
+        self.client.force_authenticate(self.teacher.user)
+
+    def send(self, group, content, name='worksheet.PDF'):
+        room = ChatRoom.objects.get(group=group, room_type='students')
+        response = self.client.post(
+            f'/api/chats/{room.id}/messages/',
+            {'text': 'Лист', 'attachment': SimpleUploadedFile(name, content)},
+            format='multipart',
+        )
+        self.assertEqual(response.status_code, 201)
+        return Message.objects.get(pk=response.data['id'])
+
+    def blob_files(self):
+        return sorted(path.name for path in Path(self.directory, 'blobs').glob('??/*'))
+
+    def test_same_content_is_stored_once_and_released_with_last_reference(self):
+        first = self.send(self.group, b'%PDF worksheet')
+        second = self.send(self.other_group, b'%PDF worksheet', name='copy.pdf')
+        self.assertEqual(first.attachment.name, second.attachment.name)
+        self.assertTrue(first.attachment.name.startswith('blobs/') and first.attachment.name.endswith('.pdf'))
+        self.assertEqual(second.attachment_name, 'copy.pdf')
+        self.assertEqual(len(self.blob_files()), 1)
+        self.assertEqual(Blob.objects.get().refcount, 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertEqual(Blob.objects.get().refcount, 1)
+        self.assertEqual(len(self.blob_files()), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(Blob.objects.exists())
+        self.assertEqual(self.blob_files(), [])
+
+    def test_replaced_method_attachment_releases_previous_blob(self):
+        method = MethodPackage.objects.create(title='Урок 1')
+        method.attachment.save('v1.pdf', ContentFile(b'first'), save=True)
+        previous = method.attachment.name
+        with self.captureOnCommitCallbacks(execute=True):
+            method.attachment.save('v2.pdf', ContentFile(b'second'), save=True)
+        self.assertFalse(default_storage.exists(previous))
+        self.assertEqual(list(Blob.objects.values_list('name', flat=True)), [method.attachment.name])
+
+    def test_deleted_feed_post_releases_uploaded_media(self):
+        upload = self.client.post('/api/upload/', {'file': SimpleUploadedFile('photo.jpg', b'jpeg bytes')}, format='multipart').data
+        post = FeedPost.objects.create(group=self.group, author_name='Анна', text='', media_type='video', media_url=f'http://testserver{upload["url"]}')
+        self.assertEqual(Blob.objects.get().refcount, 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            post.delete()
+        self.assertFalse(Blob.objects.exists())
+        self.assertEqual(self.blob_files(), [])
+
+    def test_replaced_event_media_releases_previous_blob(self):
+        first = self.client.post('/api/upload/', {'file': SimpleUploadedFile('a.jpg', b'first')}, format='multipart').data
+        second = self.client.post('/api/upload/', {'file': SimpleUploadedFile('b.jpg', b'second')}, format='multipart').data
+        event = Event.objects.create(group=self.group, title='Концерт', media_type='video', media_url=f'http://testserver{first["url"]}')
+        with self.captureOnCommitCallbacks(execute=True):
+            event.media_url = f'http://testserver{second["url"]}'
+            event.save()
+        self.assertEqual(list(Blob.objects.values_list('name', flat=True)), [second['path']])
+
+    def test_dedup_media_moves_legacy_files(self):
+        legacy = Path(self.directory, 'chat_attachments')
+        legacy.mkdir()
+        for name in ('a.txt', 'b.txt'):
+            (legacy / name).write_bytes(b'same text')
+        room = ChatRoom.objects.get(group=self.group, room_type='students')
+        for name in ('a.txt', 'b.txt'):
+            Message.objects.create(room=room, group=self.group, sender_type='teacher', sender_name='Учитель Анна', text='', attachment=f'chat_attachments/{name}')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('dedup_media', stdout=StringIO())
+        names = set(Message.objects.values_list('attachment', flat=True))
+        self.assertEqual(len(names), 1)
+        self.assertEqual(Blob.objects.get().refcount, 2)
+        self.assertEqual(list(legacy.iterdir()), [])
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'], MEDIA_ACCEL='', MEDIA_CACHE_SECONDS=60)
+class AttachmentDownloadTest(APITestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, True)
+        overrides = override_settings(MEDIA_ROOT=self.directory)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.group = Group.objects.create(name='Группа А')
+        self.room = ChatRoom.objects.get(group=self.group, room_type='students')
+        self.teacher = Teacher.objects.create(first_name='Анна', last_name='Учитель')
+        self.teacher.groups.add(self.group)
+        self.client.force_authenticate(self.teacher.user)
+        self.message = self.attach(b'0123456789', 'lesson.mp4')
+
+    def attach(self, content, name):
+        message = Message(room=self.room, group=self.group, sender_type='teacher', sender_name='Учитель Анна', text='', attachment_name=name)
+        message.attachment.save(name, ContentFile(content), save=True)
+        return message
+
+    def fetch(self, url, **headers):
+        response = self.client.get(url, **headers)
+        body = b''.join(response.streaming_content) if getattr(response, 'streaming', False) else response.content
+        return response, body
+
+    def test_full_range_and_conditional_requests(self):
+        url = self.client.get(f'/api/messages/{self.message.id}/').data['attachment_url']
+        self.assertTrue(url.endswith(f'/api/messages/{self.message.id}/attachment/'))
+        response, body = self.fetch(url)
+        self.assertEqual((response.status_code, body), (200, b'0123456789'))
+        self.assertEqual(response['Content-Type'], 'video/mp4')
+        self.assertEqual(response['Cache-Control'], 'private, max-age=60')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        etag = response['ETag']
+        self.assertEqual(etag, '"%s"' % Blob.objects.get().digest)
+
+        response, body = self.fetch(url, HTTP_RANGE='bytes=2-5')
+        self.assertEqual((response.status_code, body, response['Content-Range']), (206, b'2345', 'bytes 2-5/10'))
+        self.assertEqual(response['Content-Length'], '4')
+        response, body = self.fetch(url, HTTP_RANGE='bytes=-3', HTTP_IF_RANGE=etag)
+        self.assertEqual((response.status_code, body), (206, b'789'))
+        response, body = self.fetch(url, HTTP_RANGE='bytes=2-5', HTTP_IF_RANGE='"stale"')
+        self.assertEqual((response.status_code, body), (200, b'0123456789'))
+        response, _ = self.fetch(url, HTTP_RANGE='bytes=10-')
+        self.assertEqual((response.status_code, response['Content-Range']), (416, 'bytes */10'))
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_access_is_checked(self):
+        url = f'/api/messages/{self.message.id}/attachment/'
+        outsider = Teacher.objects.create(first_name='Олег', last_name='Чужой')
+        self.client.force_authenticate(outsider.user)
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get(url).status_code, 401)
+
+        method = MethodPackage.objects.create(title='Урок 1')
+        method.attachment.save('plan.pdf', ContentFile(b'%PDF'), save=True)
+        self.client.force_authenticate(outsider.user)
+        response, body = self.fetch(f'/api/method-packages/{method.id}/attachment/')
+        self.assertEqual((response.status_code, body), (200, b'%PDF'))
+        self.assertTrue(response['Content-Disposition'].startswith('inline'))
+
+    def test_storage_path_is_not_exposed(self):
+        data = self.client.get(f'/api/messages/{self.message.id}/').data
+        self.assertNotIn('attachment', data)
+        self.assertEqual(self.client.get(f'/media/{self.message.attachment.name}').status_code, 404)
+
+        path = default_storage.save('uploads/clip.mp4', ContentFile(b'clip'))
+        post = FeedPost.objects.create(group=self.group, author_name='Анна', text='', media_type='video', media_url=f'http://testserver/media/{path}')
+        url = self.client.get(f'/api/feed-posts/{post.id}/').data['media_file_url']
+        self.assertTrue(url.endswith(f'/api/feed-posts/{post.id}/media/'))
+        response, body = self.fetch(url)
+        self.assertEqual((response.status_code, body), (200, b'clip'))
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get(url).status_code, 401)
+
+    def test_active_content_is_downloaded_and_accel_hands_off(self):
+        page = self.attach(b'<script>alert(1)</script>', 'page.html')
+        response, _ = self.fetch(f'/api/messages/{page.id}/attachment/')
+        self.assertTrue(response['Content-Disposition'].startswith('attachment'))
+
+        with override_settings(MEDIA_ACCEL='nginx', MEDIA_ACCEL_PREFIX='/protected-media/'):
+            response = self.client.get(f'/api/messages/{self.message.id}/attachment/')
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/' + self.message.attachment.name)
+        self.assertEqual(response.content, b'')
+        self.assertIn('ETag', response)
+
+
+class FakeS3Error(Exception):
+    def __init__(self, code):
+        super().__init__(code)
+        self.response = {'Error': {'Code': code}}
+
+
+class FakeS3Client:
+    """Бакет в памяти с подмножеством API boto3, которым пользуется S3Storage."""
+
+    def __init__(self):
+        self.objects = {}
+        self.content_types = {}
+
+    def generate_presigned_url(self, operation, Params, ExpiresIn):
+        return f'https://s3.test/{Params["Bucket"]}/{Params["Key"]}?op={operation}&expires={ExpiresIn}'
+
+    def put_presigned(self, url, data):
+        # Так клиент загружает файл по ссылке, минуя приложение.
+        bucket, key = urlsplit(url).path.lstrip('/').split('/', 1)
+        self.objects[(bucket, key)] = data
+
+    def head_object(self, Bucket, Key):
+        if (Bucket, Key) not in self.objects:
+            raise FakeS3Error('404')
+        data = self.objects[(Bucket, Key)]
+        return {'ContentLength': len(data), 'ETag': '"%s"' % hashlib.md5(data).hexdigest()}
+
+    def copy(self, CopySource, Bucket, Key, ExtraArgs=None):
+        extra = ExtraArgs or {}
+        source = (CopySource['Bucket'], CopySource['Key'])
+        if source not in self.objects:
+            raise FakeS3Error('404')
+        if 'CopySourceIfMatch' in extra and self.head_object(*source)['ETag'] != extra['CopySourceIfMatch']:
+            raise FakeS3Error('PreconditionFailed')
+        self.objects[(Bucket, Key)] = self.objects[source]
+        self.content_types[(Bucket, Key)] = extra.get('ContentType')
+
+    def get_object(self, Bucket, Key):
+        if (Bucket, Key) not in self.objects:
+            raise FakeS3Error('NoSuchKey')
+        return {'Body': BytesIO(self.objects[(Bucket, Key)])}
+
+    def upload_fileobj(self, fileobj, Bucket, Key, ExtraArgs=None):
+        self.objects[(Bucket, Key)] = fileobj.read()
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop((Bucket, Key), None)
+
+
+@override_settings(
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+    STORAGES={
+        'default': {'BACKEND': 'messenger.storage.S3Storage', 'OPTIONS': {'bucket': 'media', 'url_expires': 600}},
+        'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    },
+)
+class DirectUploadTest(APITestCase):
+    def setUp(self):
+        self.s3 = FakeS3Client()
+        # Экземпляр хранилища живет весь класс, поэтому подменяем клиент, а не make_client.
+        patcher = mock.patch.object(S3Storage, 'client', new_callable=mock.PropertyMock, return_value=self.s3)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.group = Group.objects.create(name='Группа А')
+        self.room = ChatRoom.objects.get(group=self.group, room_type='students')
+        self.teacher = Teacher.objects.create(first_name='Анна', last_name='Учитель')
+        self.teacher.groups.add(self.group)
+        self.client.force_authenticate(self.teacher.user)
+
+    def start(self, content, filename='lecture.mp4'):
+        response = self.client.post('/api/uploads/direct/', {'filename': filename, 'size': len(content), 'content_type': 'video/mp4'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        return response.data
+
+    def test_presigned_put_then_complete_creates_message(self):
+        content = b'video-bytes'
+        state = self.start(content)
+        self.assertTrue(state['direct'])
+        self.assertEqual(state['upload']['method'], 'PUT')
+        self.assertEqual(state['upload']['headers'], {'Content-Type': 'video/mp4'})
+        complete_url = f'/api/uploads/{state["id"]}/complete/'
+        payload = {'attach_to': 'message', 'room': self.room.id, 'text': 'Запись урока'}
+        self.assertEqual(self.client.post(complete_url, payload, format='json').status_code, 400)
+
+        self.s3.put_presigned(state['upload']['url'], content)
+        self.assertEqual(self.client.get(f'/api/uploads/{state["id"]}/').data['received'], len(content))
+        response = self.client.post(complete_url, payload, format='json')
+        self.assertEqual(response.status_code, 201)
+        message = Message.objects.get(pk=response.data['id'])
+        key = UploadSession.objects.get(pk=state['id']).object_key
+        self.assertTrue(key.startswith('direct/') and key.endswith('/lecture.mp4'))
+        # Прикреплена серверная копия: ключ, открытый клиенту на запись, удален.
+        self.assertEqual(message.attachment.name, 'files/' + key.removeprefix('direct/'))
+        self.assertEqual(set(self.s3.objects), {('media', message.attachment.name)})
+        self.assertEqual(self.s3.content_types[('media', message.attachment.name)], 'video/mp4')
+
+        # Presigned PUT еще действует, но прикрепленный файл он уже не меняет.
+        self.s3.put_presigned(state['upload']['url'], b'<script>')
+        self.assertEqual(self.s3.objects[('media', message.attachment.name)], content)
+
+        download = self.client.get(f'/api/messages/{message.id}/attachment/')
+        self.assertEqual(download.status_code, 302)
+        self.assertIn('op=get_object', download['Location'])
+
+    def test_object_replaced_during_complete_is_rejected(self):
+        state = self.start(b'abc')
+        self.s3.put_presigned(state['upload']['url'], b'abc')
+        original_copy = self.s3.copy
+
+        def replaced_before_copy(CopySource, *args, **kwargs):
+            self.s3.objects[(CopySource['Bucket'], CopySource['Key'])] = b'xyz'
+            return original_copy(CopySource, *args, **kwargs)
+
+        self.s3.copy = replaced_before_copy
+        response = self.client.post(f'/api/uploads/{state["id"]}/complete/', {'attach_to': 'media'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(UploadSession.objects.get(pk=state['id']).status, 'open')
+
+    def test_cancel_removes_uploaded_object(self):
+        state = self.start(b'abc')
+        self.s3.put_presigned(state['upload']['url'], b'abc')
+        self.assertEqual(self.client.delete(f'/api/uploads/{state["id"]}/').status_code, 204)
+        self.assertEqual(self.s3.objects, {})
+
+    def test_local_storage_has_no_direct_uploads(self):
+        with override_settings(STORAGES={'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'}, 'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'}}):
+            response = self.client.post('/api/uploads/direct/', {'filename': 'a.pdf', 'size': 3}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'], TASKS_EAGER=False, PREVIEW_SIZE=64)
+class PreviewTest(APITestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, True)
+        overrides = override_settings(MEDIA_ROOT=self.directory)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        # Построитель-заглушка первым в списке: тесты не зависят от Pillow.
+        self.calls = []
+        previews._generators.insert(0, previews.PreviewGenerator(self.fake_thumbnail, ('image/',), lambda: True))
+        self.addCleanup(previews._generators.pop, 0)
+        self.group = Group.objects.create(name='Группа А')
+        self.room = ChatRoom.objects.get(group=self.group, room_type='students')
+        self.teacher = Teacher.objects.create(first_name='Анна', last_name='Учитель')
+        self.teacher.groups.add(self.group)
+        self.client.force_authenticate(self.teacher.user)
+
+    def fake_thumbnail(self, handle, size):
+        self.calls.append(handle.read())
+        return b'thumb-%d' % size, size, size // 2
+
+    def send(self, content, name):
+        response = self.client.post(
+            f'/api/chats/{self.room.id}/messages/',
+            {'text': '', 'attachment': SimpleUploadedFile(name, content)},
+            format='multipart',
+        )
+        self.assertEqual(response.status_code, 201)
+        return response.data
+
+    def body(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content)
+
+    def test_worker_builds_preview_after_upload(self):
+        # Задача ставится после коммита.
+        with self.captureOnCommitCallbacks() as callbacks:
+            data = self.send(b'big-photo', 'photo.png')
+        self.assertFalse(Task.objects.filter(name='generate_preview').exists())
+        for callback in callbacks:
+            callback()
+        self.assertTrue(data['thumbnail_url'].endswith(f'/api/messages/{data["id"]}/thumbnail/'))
+        self.assertTrue(Task.objects.filter(name='generate_preview').exists())
+        call_command('run_worker', once=True, stdout=StringIO())
+        preview = Preview.objects.get()
+        self.assertEqual((preview.status, preview.width, preview.height), ('ready', 64, 32))
+        self.assertEqual(self.body(data['thumbnail_url']), b'thumb-64')
+        self.assertEqual(self.calls, [b'big-photo'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Message.objects.get(pk=data['id']).delete()
+        self.assertFalse(Preview.objects.exists())
+        self.assertFalse(Task.objects.filter(name='generate_preview').exists())
+        # Тот же файл снова: ключ идемпотентности свободен, воркер получает новую задачу.
+        with self.captureOnCommitCallbacks(execute=True):
+            self.send(b'big-photo', 'photo.png')
+        self.assertEqual(Task.objects.filter(name='generate_preview', status='queued').count(), 1)
+
+    def test_preview_is_built_lazily_and_only_for_supported_types(self):
+        data = self.send(b'photo', 'photo.jpg')
+        self.assertEqual(self.body(data['thumbnail_url']), b'thumb-64')
+        self.body(data['thumbnail_url'])
+        self.assertEqual(len(self.calls), 1)
+
+        text = self.send(b'notes', 'notes.txt')
+        self.assertEqual(text['thumbnail_url'], '')
+        self.assertEqual(self.client.get(f'/api/messages/{text["id"]}/thumbnail/').status_code, 404)
+
+    def test_feed_post_media_thumbnail(self):
+        path = default_storage.save('uploads/cover.png', ContentFile(b'cover'))
+        post = FeedPost.objects.create(group=self.group, author_name='Анна', text='Новость', media_type='image', media_url=f'http://testserver/media/{path}')
+        data = self.client.get(f'/api/feed-posts/{post.id}/').data
+        self.assertTrue(data['thumbnail_url'].endswith(f'/api/feed-posts/{post.id}/thumbnail/'))
+        self.assertEqual(self.body(data['thumbnail_url']), b'thumb-64')
+
+        external = FeedPost.objects.create(group=self.group, author_name='Анна', text='', media_type='image', media_url='https://example.com/a.png')
+        self.assertEqual(self.client.get(f'/api/feed-posts/{external.id}/').data['thumbnail_url'], '')
+
+    @skipUnless(previews.Image is not None, 'нужен Pillow')
+    def test_pillow_thumbnail_keeps_aspect_ratio(self):
+        previews._generators.pop(0)
+        self.addCleanup(previews._generators.insert, 0, None)
+        source = BytesIO()
+        previews.Image.new('RGB', (400, 200), 'red').save(source, 'PNG')
+        path = default_storage.save('photo.png', ContentFile(source.getvalue()))
+        preview = previews.generate(path)
+        self.assertEqual((preview.status, preview.width, preview.height), ('ready', 64, 32))
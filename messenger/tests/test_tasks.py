@@ -0,0 +1,130 @@
+from datetime import date, time, timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from messenger import taskqueue
+from messenger.models import Group, MethodAssignment, MethodPackage, ScheduleSlot, Subject, Task, Teacher
+from messenger.taskqueue import PRIORITY_HIGH, PRIORITY_LOW, enqueue, requeue_stale, work_once
+
+User = get_user_model()
+
+
+class QueueTestMixin:
+    def register(self, name, func, **options):
+        taskqueue.task(name, **options)(func)
+        self.addCleanup(taskqueue._registry.pop, name, None)
+
+    def drain(self):
+        call_command('run_worker', once=True, stdout=StringIO())
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'], TASKS_EAGER=False, TASKS_RETRY_DELAY=0)
+class TaskQueueTest(QueueTestMixin, TestCase):
+    def test_priority_order_and_idempotency(self):
+        calls = []
+        self.register('test-record', lambda label: calls.append(label) or label)
+        enqueue('test-record', {'label': 'low'}, priority=PRIORITY_LOW)
+        enqueue('test-record', {'label': 'high'}, priority=PRIORITY_HIGH)
+        first = enqueue('test-record', {'label': 'normal'}, idempotency_key='once')
+        self.assertEqual(enqueue('test-record', {'label': 'normal'}, idempotency_key='once').id, first.id)
+
+        self.drain()
+        self.assertEqual(calls, ['high', 'normal', 'low'])
+        first.refresh_from_db()
+        self.assertEqual((first.status, first.result, first.attempts), ('done', 'normal', 1))
+
+    def test_retries_then_fails(self):
+        attempts = []
+
+        def flaky():
+            attempts.append(1)
+            if len(attempts) < 2:
+                raise RuntimeError('временный сбой')
+            return 'ok'
+
+        self.register('test-flaky', flaky, max_attempts=2)
+        self.register('test-broken', lambda: 1 / 0, max_attempts=2)
+        flaky_task = enqueue('test-flaky')
+        broken = enqueue('test-broken')
+        self.drain()
+
+        flaky_task.refresh_from_db()
+        broken.refresh_from_db()
+        self.assertEqual((flaky_task.status, flaky_task.attempts), ('done', 2))
+        self.assertEqual((broken.status, broken.attempts), ('failed', 2))
+        self.assertIn('ZeroDivisionError', broken.last_error)
+
+    def test_claimed_task_is_not_taken_twice_and_stale_lock_is_released(self):
+        self.register('test-noop', lambda: None)
+        item = enqueue('test-noop')
+        claimed = taskqueue.claim('worker-a')
+        self.assertEqual(claimed.id, item.id)
+        self.assertIsNone(taskqueue.claim('worker-b'))
+
+        Task.objects.filter(pk=item.pk).update(locked_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(requeue_stale(timeout=60), 1)
+        self.assertEqual(work_once('worker-b').status, 'done')
+
+    def test_eager_mode_runs_inline(self):
+        self.register('test-noop', lambda: 'inline')
+        with self.settings(TASKS_EAGER=True):
+            item = enqueue('test-noop')
+        self.assertEqual((item.status, item.result), ('done', 'inline'))
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'], TASKS_EAGER=False)
+class DeferredSideEffectsTest(QueueTestMixin, APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', password='x', is_staff=True)
+        self.client.force_authenticate(self.admin)
+
+    def test_new_teacher_can_log_in_after_worker_hashes_password(self):
+        teacher = Teacher.objects.create(first_name='Анна', last_name='Учитель')
+        self.assertIsNotNone(teacher.user)
+        self.assertFalse(teacher.user.has_usable_password())
+        self.drain()
+        teacher.user.refresh_from_db()
+        self.assertTrue(teacher.user.check_password(teacher.initial_password))
+
+    def test_holiday_shift_runs_in_worker_and_status_is_pollable(self):
+        group = Group.objects.create(name='Группа А')
+        lesson_day = date(2030, 9, 2)
+        slot = ScheduleSlot.objects.create(group=group, lesson_date=lesson_day, weekday=lesson_day.weekday(), lesson_number=1, start_time=time(10, 0))
+
+        response = self.client.post('/api/holidays/', {'date': lesson_day.isoformat(), 'title': 'Праздник'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        task_url = f'/api/tasks/{response.data["task"]}/'
+        self.assertEqual(self.client.get(task_url).data['status'], 'queued')
+        slot.refresh_from_db()
+        self.assertEqual(slot.lesson_date, lesson_day)
+
+        self.drain()
+        slot.refresh_from_db()
+        self.assertEqual(slot.lesson_date, lesson_day + timedelta(days=7))
+        self.assertEqual(self.client.get(task_url).data['result'], {'moved': 1})
+
+        self.client.force_authenticate(User.objects.create_user('plain', password='x'))
+        self.assertEqual(self.client.get(task_url).status_code, 404)
+
+    def test_bulk_assign_defers_placeholders_and_access_order(self):
+        teacher = Teacher.objects.create(first_name='Анна', last_name='Учитель')
+        subject = Subject.objects.create(name='Математика')
+        MethodPackage.objects.create(subject=subject, method_number=1, title='Урок 1')
+
+        response = self.client.post(
+            '/api/method-assignments/bulk_assign_subject/', {'teacher': teacher.id, 'subject': subject.id}, format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['created_count'], 1)
+        self.assertEqual(response.data['missing_method_numbers'], list(range(2, 13)))
+        self.assertEqual(MethodPackage.objects.filter(subject=subject).count(), 1)
+
+        self.drain()
+        self.assertEqual(MethodPackage.objects.filter(subject=subject).count(), 12)
+        assignments = MethodAssignment.objects.filter(teacher=teacher).order_by('method_package__method_number')
+        self.assertEqual([a.can_edit for a in assignments], [True] + [False] * 11)
@@ -0,0 +1,206 @@
+import io
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+
+from .models import UploadSession
+
+COPY_BUFFER = 64 * 1024
+
+
+class UploadError(Exception):
+    """Ошибка протокола загрузки: текст уходит клиенту как detail."""
+
+
+def session_dir(session):
+    return Path(settings.UPLOAD_TEMP_DIR) / str(session.id)
+
+
+def chunk_path(session, index):
+    return session_dir(session) / f'{index:06d}.part'
+
+
+def chunk_bounds(session, index):
+    start = index * session.chunk_size
+    return start, min(start + session.chunk_size, session.size)
+
+
+def parse_content_range(value):
+    """'bytes 0-1023/4096' -> (0, 1023, 4096); total может быть '*'."""
+    unit, _, spec = value.partition(' ')
+    span, _, total = spec.partition('/')
+    start, _, end = span.partition('-')
+    if unit != 'bytes':
+        raise ValueError(value)
+    return int(start), int(end), None if total == '*' else int(total)
+
+
+def write_chunk(session, index, stream, content_range=''):
+    """
+    Потоково пишет часть во временный файл и атомарно подменяет ею прежнюю:
+    повтор той же части после обрыва безопасен.
+    """
+    if not 0 <= index < session.chunk_count:
+        raise UploadError(f'Номер части должен быть от 0 до {session.chunk_count - 1}.')
+    start, end = chunk_bounds(session, index)
+    expected = end - start
+    if content_range:
+        try:
+            range_start, range_end, total = parse_content_range(content_range)
+        except ValueError:
+            raise UploadError('Некорректный заголовок Content-Range.')
+        if (range_start, range_end + 1) != (start, end) or total not in (None, session.size):
+            raise UploadError(f'Часть {index} должна покрывать байты {start}-{end - 1}/{session.size}.')
+
+    directory = session_dir(session)
+    directory.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    written = 0
+    try:
+        with os.fdopen(fd, 'wb') as handle:
+            while True:
+                block = stream.read(min(COPY_BUFFER, expected - written + 1))
+                if not block:
+                    break
+                written += len(block)
+                if written > expected:
+                    raise UploadError(f'Часть {index} длиннее {expected} байт.')
+                handle.write(block)
+        if written != expected:
+            raise UploadError(f'Часть {index}: получено {written} байт из {expected}.')
+        os.replace(tmp_name, chunk_path(session, index))
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+    # updated_at отодвигает сборку мусора, пока клиент докачивает.
+    session.save(update_fields=['updated_at'])
+    return written
+
+
+def missing_chunks(session):
+    return [index for index in range(session.chunk_count) if not chunk_path(session, index).exists()]
+
+
+def received_bytes(session):
+    return sum(chunk_path(session, index).stat().st_size for index in range(session.chunk_count) if chunk_path(session, index).exists())
+
+
+class ChunkReader(io.RawIOBase):
+    """Файл из частей по порядку: сборка идет потоком, без склейки на диске и в памяти."""
+
+    def __init__(self, paths, size):
+        self._paths = list(paths)
+        self._current = None
+        self.size = size
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while True:
+            if self._current is None:
+                if not self._paths:
+                    return 0
+                self._current = open(self._paths.pop(0), 'rb')
+            count = self._current.readinto(buffer)
+            if count:
+                return count
+            self._current.close()
+            self._current = None
+
+    def close(self):
+        if self._current is not None:
+            self._current.close()
+            self._current = None
+        super().close()
+
+
+def assembled_file(session):
+    """File со всем содержимым загрузки; части должны быть на месте (см. missing_chunks)."""
+    missing = missing_chunks(session)
+    if missing:
+        raise UploadError(f'Не загружены части: {", ".join(map(str, missing))}.')
+    paths = [chunk_path(session, index) for index in range(session.chunk_count)]
+    return File(ChunkReader(paths, session.size), name=session.filename)
+
+
+def _object_name(session):
+    try:
+        name = get_valid_filename(session.filename)
+    except SuspiciousFileOperation:
+        name = 'file'
+    stem, suffix = os.path.splitext(name)
+    return f'{session.id.hex}/{stem[:40]}{suffix[:12]}'
+
+
+def direct_key(session):
+    """Ключ объекта прямой загрузки: id сессии делает его уникальным, имя файла — узнаваемым."""
+    return f'direct/{_object_name(session)}'
+
+
+def final_key(session):
+    """Ключ прикрепленного файла прямой загрузки: presigned PUT на него не выдается."""
+    return f'files/{_object_name(session)}'
+
+
+def direct_received(session):
+    """Сколько байт объекта прямой загрузки уже лежит в хранилище (0, если клиент еще не загрузил)."""
+    try:
+        return default_storage.size(session.object_key)
+    except FileNotFoundError:
+        return 0
+
+
+def finalize_direct(session):
+    """
+    Проверяет объект прямой загрузки и копирует ровно проверенную версию (по ETag) на final_key.
+    Presigned PUT действует еще url_expires, но подменить прикрепленный файл (а с ним и Content-Type,
+    который отдаст ссылка на чтение) по нему уже нельзя. Исходный объект удаляет complete после прикрепления.
+    """
+    try:
+        received, etag = default_storage.object_info(session.object_key)
+    except FileNotFoundError:
+        received, etag = 0, ''
+    if received != session.size:
+        raise UploadError(f'Файл в хранилище не найден или неполон: {received} байт из {session.size}.')
+    target = final_key(session)
+    if not default_storage.copy(session.object_key, target, if_match=etag):
+        raise UploadError('Файл в хранилище изменился во время проверки, повторите завершение загрузки.')
+    return target
+
+
+def discard(session):
+    shutil.rmtree(session_dir(session), ignore_errors=True)
+    if session.object_key and session.status == 'open':
+        # Прямая загрузка, которую так и не прикрепили: объект в бакете больше не нужен.
+        default_storage.delete(session.object_key)
+
+
+def open_sessions(user):
+    return UploadSession.objects.filter(user=user, status='open', updated_at__gte=stale_before())
+
+
+def stale_before():
+    return timezone.now() - timedelta(seconds=getattr(settings, 'UPLOAD_SESSION_TTL', 24 * 3600))
+
+
+def cleanup_sessions(user=None):
+    """Удаляет сессии, не обновлявшиеся UPLOAD_SESSION_TTL, вместе с оставшимися частями."""
+    sessions = UploadSession.objects.filter(updated_at__lt=stale_before())
+    if user is not None:
+        sessions = sessions.filter(user=user)
+    removed = 0
+    for session in sessions.only('id', 'object_key', 'status'):
+        discard(session)
+        session.delete()
+        removed += 1
+    return removed
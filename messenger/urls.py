@@ -1,6 +1,7 @@
 from rest_framework import routers
 from django.urls import path, include
 
+from .async_views import chat_rooms as async_chat_rooms, room_messages as async_room_messages, unread_state
 from .views import (
     GroupViewSet,
     TeacherViewSet,
@@ -19,6 +20,18 @@ from .views import (
     UserProfileViewSet,
     MediaUploadView,
     MeView,
+    MetricsView,
+    ProfileDownloadView,
+    ProfileListView,
+    SearchView,
+    SlowQueryListView,
+    SyncView,
+    TaskStatusView,
+    UploadChunkView,
+    UploadCompleteView,
+    UploadDirectView,
+    UploadSessionCreateView,
+    UploadSessionView,
     session_login,
     session_logout,
 )
@@ -43,7 +56,23 @@ router.register(r'profiles', UserProfileViewSet)
 urlpatterns = [
     path('', include(router.urls)),
     path('upload/', MediaUploadView.as_view(), name='media_upload'),
+    path('uploads/', UploadSessionCreateView.as_view(), name='upload_create'),
+    path('uploads/direct/', UploadDirectView.as_view(), name='upload_direct'),
+    path('uploads/<uuid:pk>/', UploadSessionView.as_view(), name='upload_session'),
+    path('uploads/<uuid:pk>/chunks/<int:index>/', UploadChunkView.as_view(), name='upload_chunk'),
+    path('uploads/<uuid:pk>/complete/', UploadCompleteView.as_view(), name='upload_complete'),
     path('me/', MeView.as_view(), name='me'),
+    path('sync/', SyncView.as_view(), name='sync'),
+    path('search/', SearchView.as_view(), name='search'),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
+    path('tasks/<int:pk>/', TaskStatusView.as_view(), name='task_status'),
+    path('debug/profiles/', ProfileListView.as_view(), name='debug_profiles'),
+    path('debug/profiles/<str:name>/', ProfileDownloadView.as_view(), name='debug_profile_download'),
+    path('debug/slow-queries/', SlowQueryListView.as_view(), name='debug_slow_queries'),
+    # Async-версии горячих путей чата для ASGI; синхронные /api/chats/ остаются.
+    path('async/chats/', async_chat_rooms, name='async_chat_rooms'),
+    path('async/chats/<int:pk>/messages/', async_room_messages, name='async_room_messages'),
+    path('async/unread/', unread_state, name='async_unread'),
     path('session-login/', session_login, name='session_login'),
     path('session-logout/', session_logout, name='session_logout'),
 ]
@@ -1,14 +1,22 @@
+import hashlib
+import io
 import json
 from datetime import timedelta
 from datetime import date, datetime
+from pathlib import Path
 
-from rest_framework import viewsets
-from rest_framework.permissions import IsAuthenticated
-from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework import serializers, viewsets
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.exceptions import PermissionDenied, Throttled, ValidationError
 from rest_framework.views import APIView
+from django.conf import settings
 from django.shortcuts import render
-from django.contrib.auth import authenticate, login, logout
-from django.http import JsonResponse
+from django.contrib.auth import authenticate, get_user_model, login, logout
+from django.db import transaction
+from django.db.models import Count, F, Prefetch, Sum
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse
+from django.templatetags.static import static
+from django.urls import reverse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
 from django.views.decorators.csrf import ensure_csrf_cookie
@@ -16,9 +24,24 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework import status
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.core.files.storage import default_storage
 
-from .models import Group, Teacher, Parent, Student, MethodPackage, ScheduleSlot, ChatRoom, Message, Event, FeedPost, MethodAssignment, MethodAssignmentComment, UserProfile, Holiday, Subject, LessonTopic
+from .access import CHAT_ROOM_TYPES, accessible_group_ids, allowed_room_types_for_role, role_for_user
+from .assets import serve_attachment, serve_stored
+from .conditional import ConditionalListMixin, conditional_response, queryset_fingerprint
+from .ingest import ingest, ingest_mode
+from . import archive, extraction, previews, search
+from .metrics import render_prometheus
+from .profiling import list_profiles, profile_path
+from .slowlog import buffer as slow_query_buffer
+from .sync import build_delta, decode_token
+from .taskqueue import enqueue
+from .uploads import (
+    UploadError, assembled_file, cleanup_sessions, direct_key, direct_received, discard as discard_upload,
+    finalize_direct, missing_chunks, open_sessions, received_bytes, write_chunk,
+)
+from .models import Group, Teacher, Parent, Student, MethodPackage, ScheduleSlot, ChatRoom, Message, Event, FeedPost, MethodAssignment, MethodAssignmentComment, UserProfile, Holiday, Subject, LessonTopic, Task, UploadSession
 from .serializers import (
     GroupSerializer,
     GroupDetailSerializer,
@@ -37,33 +60,10 @@ from .serializers import (
     HolidaySerializer,
     SubjectSerializer,
     LessonTopicSerializer,
+    TaskSerializer,
 )
 
 
-CHAT_ROOM_TYPES = ('parents', 'students', 'management')
-ROLE_CHAT_ACCESS = {
-    'teacher': {'parents', 'students', 'management'},
-    'manager': {'parents', 'students', 'management'},
-    'parent': {'parents', 'students'},
-    'student': {'students'},
-    'admin': {'parents', 'students', 'management'},
-    'methodist': {'parents', 'students', 'management'},
-}
-
-
-def _role_for_user(user):
-    profile = getattr(user, 'profile', None)
-    if profile and profile.role:
-        return profile.role
-    if user.is_staff:
-        return 'admin'
-    return ''
-
-
-def _allowed_room_types_for_role(role: str):
-    return ROLE_CHAT_ACCESS.get(role, set())
-
-
 def _sender_meta(user, role: str):
     if role == 'teacher':
         teacher = getattr(user, 'teacher_profile', None)
@@ -82,27 +82,6 @@ def _sender_meta(user, role: str):
     return 'system', user.get_username()
 
 
-def _accessible_group_ids(user, role: str):
-    if role in ('admin', 'methodist', 'manager') or user.is_staff:
-        return set(Group.objects.values_list('id', flat=True))
-    if role == 'teacher':
-        teacher = getattr(user, 'teacher_profile', None)
-        if not teacher:
-            return set()
-        return set(teacher.groups.values_list('id', flat=True))
-    if role == 'student':
-        student = getattr(user, 'student_profile', None)
-        if not student or not student.group_id:
-            return set()
-        return {student.group_id}
-    if role == 'parent':
-        parent = getattr(user, 'parent_profile', None)
-        if not parent:
-            return set()
-        return set(Group.objects.filter(students__parents=parent).values_list('id', flat=True).distinct())
-    return set()
-
-
 def _ensure_chat_rooms_for_groups(group_ids):
     if not group_ids:
         return
@@ -117,18 +96,185 @@ def _ensure_chat_rooms_for_groups(group_ids):
 
 
 def _can_access_group_chat(user, role: str, group_id: int, room_type: str):
-    if room_type not in _allowed_room_types_for_role(role):
+    if room_type not in allowed_room_types_for_role(role):
         return False
-    return group_id in _accessible_group_ids(user, role)
+    return group_id in accessible_group_ids(user, role)
 
 
 def _can_access_room(user, role: str, room: ChatRoom):
     return _can_access_group_chat(user, role, room.group_id, room.room_type)
 
 
-class GroupViewSet(viewsets.ModelViewSet):
-    queryset = Group.objects.all().prefetch_related('teachers', 'students')
+def _can_manage_methods(user):
+    return user.is_staff or role_for_user(user) in ('admin', 'methodist', 'manager')
+
+
+def _can_edit_method_package(user, method: MethodPackage):
+    if _can_manage_methods(user):
+        return True
+    # Преподаватель правит только метод, открытый ему для разработки.
+    return role_for_user(user) == 'teacher' and MethodAssignment.objects.filter(
+        method_package=method,
+        teacher__user=user,
+        can_edit=True,
+    ).exists()
+
+
+def _schedule_queryset():
+    return ScheduleSlot.objects.select_related(
+        'method_package__subject',
+        'lesson_topic__subject',
+        'lesson_topic__method_package',
+    )
+
+
+def _room_messages_response(request, room):
+    def build_response():
+        messages_qs = room.messages.order_by('-created_at')[:100]
+        return Response(MessageSerializer(messages_qs, many=True, context={'request': request}).data)
+
+    return conditional_response(request, [queryset_fingerprint(room.messages.all())], build_response)
+
+
+def _post_message(request, room, role):
+    text = str(request.data.get('text', '')).strip()
+    attachment = request.FILES.get('attachment')
+    if not text and not attachment:
+        raise ValidationError({'detail': 'Нужно передать текст сообщения или файл.'})
+    sender_type, sender_name = _sender_meta(request.user, role)
+    message = Message(
+        group_id=room.group_id,
+        room=room,
+        sender=request.user,
+        sender_type=sender_type,
+        sender_name=sender_name,
+        text=text,
+        attachment=attachment,
+        attachment_name=attachment.name if attachment else '',
+    )
+    if attachment or ingest_mode() == 'off':
+        message.save()
+    else:
+        # Текстовые сообщения — через буфер пачечной записи (MESSAGE_INGEST).
+        try:
+            message = ingest(message)
+        except DjangoValidationError as exc:
+            raise ValidationError(exc.message_dict)
+    return Response(MessageSerializer(message, context={'request': request}).data, status=status.HTTP_201_CREATED)
+
+
+BROADCAST_ROLES = ('admin', 'manager', 'methodist', 'teacher')
+
+
+def _id_list(data, name):
+    # JSON-список, повторяющееся поле формы или "1,2,3".
+    values = data.getlist(name) if hasattr(data, 'getlist') else data.get(name)
+    if values in (None, ''):
+        return []
+    if not isinstance(values, (list, tuple)):
+        values = [values]
+    try:
+        return sorted({int(part) for value in values for part in str(value).split(',') if part.strip()})
+    except ValueError:
+        raise ValidationError({name: 'Ожидается список id.'})
+
+
+def _broadcast_group_ids(data, user, role):
+    """Группы рассылки: явный список groups или фильтр (all, name, teacher) — в пределах доступных пользователю."""
+    accessible = accessible_group_ids(user, role)
+    requested = _id_list(data, 'groups')
+    if requested:
+        forbidden = [group_id for group_id in requested if group_id not in accessible]
+        if forbidden:
+            raise PermissionDenied(f"Нет доступа к группам: {', '.join(map(str, forbidden))}.")
+        return set(requested)
+    name = str(data.get('name') or '').strip()
+    teacher = data.get('teacher')
+    if not (name or teacher or str(data.get('all', '')).lower() in ('1', 'true')):
+        raise ValidationError({'groups': 'Укажите группы или фильтр: all, name, teacher.'})
+    groups = Group.objects.filter(id__in=accessible)
+    if name:
+        groups = groups.filter(name__icontains=name)
+    if teacher:
+        groups = groups.filter(teachers__id__in=_id_list(data, 'teacher'))
+    return set(groups.values_list('id', flat=True))
+
+
+def _broadcast(request, role):
+    """
+    Одно сообщение в чаты room_type многих групп: права проверяются один раз, строки пишутся одним
+    bulk_create, файл сохраняется один раз, и все сообщения ссылаются на него.
+    """
+    if not (request.user.is_staff or role in BROADCAST_ROLES):
+        raise PermissionDenied('Рассылать сообщения могут только сотрудники.')
+    room_type = str(request.data.get('room_type') or 'students').strip().lower()
+    if room_type not in CHAT_ROOM_TYPES:
+        raise ValidationError({'room_type': f"Доступны только значения: {', '.join(CHAT_ROOM_TYPES)}."})
+    if room_type not in allowed_room_types_for_role(role):
+        raise PermissionDenied('Нет доступа к чатам этого типа.')
+    text = str(request.data.get('text', '')).strip()
+    attachment = request.FILES.get('attachment')
+    if not text and not attachment:
+        raise ValidationError({'detail': 'Нужно передать текст сообщения или файл.'})
+    group_ids = _broadcast_group_ids(request.data, request.user, role)
+    if not group_ids:
+        raise ValidationError({'groups': 'Под фильтр не попала ни одна группа.'})
+
+    _ensure_chat_rooms_for_groups(group_ids)
+    rooms = list(ChatRoom.objects.filter(group_id__in=group_ids, room_type=room_type).select_related('group'))
+    sender_type, sender_name = _sender_meta(request.user, role)
+    messages = [
+        Message(
+            group_id=room.group_id, room=room, sender=request.user, sender_type=sender_type, sender_name=sender_name,
+            text=text, attachment_name=attachment.name if attachment else '',
+        )
+        for room in rooms
+    ]
+    field = Message._meta.get_field('attachment')
+    stored = ''
+    if attachment:
+        # Сохраняем вне транзакции: при откате освобождаем единственную ссылку (см. except ниже).
+        stored = field.storage.save(field.generate_filename(None, attachment.name), attachment, max_length=field.max_length)
+        for message in messages:
+            message.attachment.name = stored
+    try:
+        with transaction.atomic():
+            if stored and hasattr(field.storage, 'retain'):
+                field.storage.retain(stored, count=len(messages) - 1)
+            Message.objects.bulk_create(messages)
+            # bulk_create не шлет post_save: сводки комнат и поисковый индекс — пачкой.
+            ChatRoom.record_messages(messages)
+            search.index_messages(messages)
+    except Exception:
+        if stored:
+            field.storage.delete(stored)
+        raise
+    if stored:
+        previews.queue(stored, attachment.name)
+        extraction.queue(stored, attachment.name)
+    data = MessageSerializer(messages, many=True, context={'request': request}).data
+    return Response({'count': len(messages), 'messages': data}, status=status.HTTP_201_CREATED)
+
+
+class GroupViewSet(ConditionalListMixin, viewsets.ModelViewSet):
+    queryset = Group.objects.all().prefetch_related(
+        'teachers__user',
+        'teachers__groups',
+        'students__user',
+        'students__group',
+        'students__parents__user',
+    )
     serializer_class = GroupSerializer
+    etag_related_models = (Teacher, Student, Parent)
+
+    def get_queryset(self):
+        if self.action in ('schedule', 'messages', 'broadcast'):
+            # Действиям нужна только сама группа, вложенные списки не сериализуются.
+            return Group.objects.all()
+        qs = super().get_queryset()
+        if self.action == 'retrieve':
+            qs = qs.prefetch_related(Prefetch('schedule', queryset=_schedule_queryset()))
+        return qs
 
     def get_serializer_class(self):
         if self.action == 'retrieve':
@@ -138,13 +284,14 @@ class GroupViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['get'])
     def schedule(self, request, pk=None):
         group = self.get_object()
-        serializer = ScheduleSlotSerializer(group.schedule.all(), many=True)
-        return Response(serializer.data)
+        slots = _schedule_queryset().filter(group=group)
+        fingerprints = [queryset_fingerprint(qs) for qs in (slots, LessonTopic.objects.all(), MethodPackage.objects.all(), Subject.objects.all())]
+        return conditional_response(request, fingerprints, lambda: Response(ScheduleSlotSerializer(slots, many=True).data))
 
     @action(detail=True, methods=['get', 'post'])
     def messages(self, request, pk=None):
         group = self.get_object()
-        role = _role_for_user(request.user)
+        role = role_for_user(request.user)
         room_type = (request.query_params.get('room_type') or 'students').strip().lower()
         if room_type not in CHAT_ROOM_TYPES:
             raise ValidationError({'room_type': f"Доступны только значения: {', '.join(CHAT_ROOM_TYPES)}."})
@@ -154,43 +301,34 @@ class GroupViewSet(viewsets.ModelViewSet):
         room = ChatRoom.objects.get(group=group, room_type=room_type)
 
         if request.method.lower() == 'post':
-            text = str(request.data.get('text', '')).strip()
-            attachment = request.FILES.get('attachment')
-            if not text and not attachment:
-                raise ValidationError({'detail': 'Нужно передать текст сообщения или файл.'})
-            sender_type, sender_name = _sender_meta(request.user, role)
-            message = Message.objects.create(
-                group=group,
-                room=room,
-                sender_type=sender_type,
-                sender_name=sender_name,
-                text=text,
-                attachment=attachment,
-                attachment_name=attachment.name if attachment else '',
-            )
-            return Response(MessageSerializer(message, context={'request': request}).data, status=status.HTTP_201_CREATED)
-        messages_qs = room.messages.order_by('-created_at')[:100]
-        return Response(MessageSerializer(messages_qs, many=True, context={'request': request}).data)
+            return _post_message(request, room, role)
+        return _room_messages_response(request, room)
 
+    @action(detail=False, methods=['post'])
+    def broadcast(self, request):
+        return _broadcast(request, role_for_user(request.user))
 
-class TeacherViewSet(viewsets.ModelViewSet):
-    queryset = Teacher.objects.all()
+
+class TeacherViewSet(ConditionalListMixin, viewsets.ModelViewSet):
+    queryset = Teacher.objects.select_related('user').prefetch_related('groups')
     serializer_class = TeacherSerializer
 
 
-class ParentViewSet(viewsets.ModelViewSet):
-    queryset = Parent.objects.all()
+class ParentViewSet(ConditionalListMixin, viewsets.ModelViewSet):
+    queryset = Parent.objects.select_related('user')
     serializer_class = ParentSerializer
 
 
-class StudentViewSet(viewsets.ModelViewSet):
-    queryset = Student.objects.select_related('group').prefetch_related('parents')
+class StudentViewSet(ConditionalListMixin, viewsets.ModelViewSet):
+    queryset = Student.objects.select_related('group', 'user').prefetch_related('parents__user')
     serializer_class = StudentSerializer
+    etag_related_models = (Group, Parent)
 
 
-class MethodPackageViewSet(viewsets.ModelViewSet):
-    queryset = MethodPackage.objects.all()
+class MethodPackageViewSet(ConditionalListMixin, viewsets.ModelViewSet):
+    queryset = MethodPackage.objects.select_related('subject')
     serializer_class = MethodPackageSerializer
+    etag_related_models = (Subject,)
 
     def _role(self):
         profile = getattr(self.request.user, 'profile', None)
@@ -206,15 +344,7 @@ class MethodPackageViewSet(viewsets.ModelViewSet):
         return qs.none()
 
     def _can_manage(self):
-        role = self._role()
-        return self.request.user.is_staff or role in ('admin', 'methodist', 'manager')
-
-    def _teacher_can_edit(self, method_obj: MethodPackage):
-        return MethodAssignment.objects.filter(
-            method_package=method_obj,
-            teacher__user=self.request.user,
-            can_edit=True,
-        ).exists()
+        return _can_manage_methods(self.request.user)
 
     def perform_create(self, serializer):
         if not self._can_manage():
@@ -222,24 +352,30 @@ class MethodPackageViewSet(viewsets.ModelViewSet):
         serializer.save()
 
     def perform_update(self, serializer):
-        if self._can_manage():
-            serializer.save()
-            return
-        role = self._role()
-        if role == 'teacher' and self._teacher_can_edit(self.get_object()):
-            serializer.save()
-            return
-        raise PermissionDenied('Нет прав на изменение этого методпакета.')
+        if not _can_edit_method_package(self.request.user, self.get_object()):
+            raise PermissionDenied('Нет прав на изменение этого методпакета.')
+        serializer.save()
 
     def perform_destroy(self, instance):
         if not self._can_manage():
             raise PermissionDenied('Только методист или админ может удалять методпакеты.')
         instance.delete()
 
-
-class ScheduleSlotViewSet(viewsets.ModelViewSet):
-    queryset = ScheduleSlot.objects.select_related('group', 'method_package')
+    @action(detail=True, methods=['get'])
+    def attachment(self, request, pk=None):
+        # get_object() проверяет доступ тем же get_queryset, что и чтение методпакета.
+        return serve_attachment(request, self.get_object().attachment)
+
+
+class ScheduleSlotViewSet(ConditionalListMixin, viewsets.ModelViewSet):
+    queryset = ScheduleSlot.objects.select_related(
+        'group',
+        'method_package__subject',
+        'lesson_topic__subject',
+        'lesson_topic__method_package',
+    )
     serializer_class = ScheduleSlotSerializer
+    etag_related_models = (LessonTopic, MethodPackage, Subject)
 
     def _ordered_methods_for_subject(self, subject, start_method_number: int):
         if not subject:
@@ -336,42 +472,29 @@ class ScheduleSlotViewSet(viewsets.ModelViewSet):
             )
             for offset, slot in enumerate(target_slots):
                 slot.method_package = self._method_by_offset(methods, start_idx, offset)
-                slot.save(update_fields=['method_package'])
+                slot.save(update_fields=['method_package', 'updated_at'])
 
 
-class HolidayViewSet(viewsets.ModelViewSet):
+class HolidayViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     queryset = Holiday.objects.select_related('group')
     serializer_class = HolidaySerializer
+    etag_related_models = (Group,)
+
+    def create(self, request, *args, **kwargs):
+        response = super().create(request, *args, **kwargs)
+        # Перенос уроков идет в фоне: клиент может опросить /api/tasks/<id>/.
+        response.data['task'] = self.shift_task.id
+        return response
 
     def perform_create(self, serializer):
         holiday = serializer.save()
-        self._shift_lessons(holiday)
-
-    def _shift_lessons(self, holiday):
-        day_slots = ScheduleSlot.objects.filter(lesson_date=holiday.date)
-        if holiday.group_id:
-            day_slots = day_slots.filter(group_id=holiday.group_id)
-
-        for slot in day_slots:
-            target_date = slot.lesson_date + timedelta(days=7)
-            for _ in range(52):
-                clash_holiday = Holiday.objects.filter(date=target_date).filter(group_id=slot.group_id).exists()
-                clash_global = Holiday.objects.filter(date=target_date, group__isnull=True).exists()
-                clash_slot = ScheduleSlot.objects.filter(
-                    group_id=slot.group_id,
-                    lesson_date=target_date,
-                    start_time=slot.start_time,
-                ).exclude(id=slot.id).exists()
-                if not (clash_holiday or clash_global or clash_slot):
-                    break
-                target_date = target_date + timedelta(days=7)
-            slot.moved_from_date = slot.lesson_date
-            slot.lesson_date = target_date
-            slot.weekday = target_date.weekday()
-            slot.save(update_fields=['lesson_date', 'weekday', 'moved_from_date'])
-
-
-class SubjectViewSet(viewsets.ModelViewSet):
+        self.shift_task = enqueue(
+            'shift_holiday_lessons', {'holiday': holiday.id},
+            idempotency_key=f'holiday-shift:{holiday.id}', user=self.request.user,
+        )
+
+
+class SubjectViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     queryset = Subject.objects.all()
     serializer_class = SubjectSerializer
 
@@ -399,65 +522,115 @@ class SubjectViewSet(viewsets.ModelViewSet):
         instance.delete()
 
 
-class LessonTopicViewSet(viewsets.ModelViewSet):
+class LessonTopicViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     queryset = LessonTopic.objects.select_related('subject', 'method_package')
     serializer_class = LessonTopicSerializer
+    etag_related_models = (Subject, MethodPackage)
 
 
-class ChatRoomViewSet(viewsets.ReadOnlyModelViewSet):
+def _room_ordering(order):
+    # activity — недавние чаты сверху (индекс chatroom_activity_idx), чаты без сообщений в конце.
+    if order == 'activity':
+        return (F('last_message_at').desc(nulls_last=True), 'id')
+    if order not in (None, '', 'group'):
+        raise ValidationError({'order': 'Допустимые значения: group, activity.'})
+    return ('group__name', 'room_type')
+
+
+class ChatRoomViewSet(ConditionalListMixin, viewsets.ReadOnlyModelViewSet):
     queryset = ChatRoom.objects.select_related('group')
     serializer_class = ChatRoomSerializer
+    etag_related_models = (Group,)
 
     def get_queryset(self):
-        role = _role_for_user(self.request.user)
-        allowed_room_types = _allowed_room_types_for_role(role)
+        role = role_for_user(self.request.user)
+        allowed_room_types = allowed_room_types_for_role(role)
         if not allowed_room_types:
             return ChatRoom.objects.none()
-        group_ids = _accessible_group_ids(self.request.user, role)
+        group_ids = accessible_group_ids(self.request.user, role)
         _ensure_chat_rooms_for_groups(group_ids)
-        return (
-            super()
-            .get_queryset()
-            .filter(group_id__in=group_ids, room_type__in=allowed_room_types)
-            .order_by('group__name', 'room_type')
-        )
+        rooms = super().get_queryset().filter(group_id__in=group_ids, room_type__in=allowed_room_types)
+        return rooms.order_by(*_room_ordering(self.request.query_params.get('order')))
 
     @action(detail=True, methods=['get', 'post'])
     def messages(self, request, pk=None):
         room = self.get_object()
-        role = _role_for_user(request.user)
+        role = role_for_user(request.user)
         if not _can_access_room(request.user, role, room):
             raise PermissionDenied('Нет доступа к этому чату.')
 
         if request.method.lower() == 'post':
-            text = str(request.data.get('text', '')).strip()
-            attachment = request.FILES.get('attachment')
-            if not text and not attachment:
-                raise ValidationError({'detail': 'Нужно передать текст сообщения или файл.'})
-            sender_type, sender_name = _sender_meta(request.user, role)
-            message = Message.objects.create(
-                group=room.group,
-                room=room,
-                sender_type=sender_type,
-                sender_name=sender_name,
-                text=text,
-                attachment=attachment,
-                attachment_name=attachment.name if attachment else '',
-            )
-            return Response(MessageSerializer(message, context={'request': request}).data, status=status.HTTP_201_CREATED)
-
-        messages_qs = room.messages.order_by('-created_at')[:100]
-        return Response(MessageSerializer(messages_qs, many=True, context={'request': request}).data)
+            return _post_message(request, room, role)
 
+        return _room_messages_response(request, room)
 
-class MessageViewSet(viewsets.ReadOnlyModelViewSet):
+    @action(detail=True, methods=['get'])
+    def history(self, request, pk=None):
+        """Постраничная история ?before=<id>&limit=: от новых к старым, включая архив (archive_messages)."""
+        room = self.get_object()
+        if not _can_access_room(request.user, role_for_user(request.user), room):
+            raise PermissionDenied('Нет доступа к этому чату.')
+        before = _positive_int(request, 'before', 0) if request.query_params.get('before') else None
+        limit = min(_positive_int(request, 'limit', HISTORY_PAGE_SIZE), HISTORY_MAX_PAGE_SIZE)
+        live, archived = archive.history(room, before, limit)
+        results = [
+            {**item, 'archived': False}
+            for item in MessageSerializer(live, many=True, context={'request': request}).data
+        ] + [_archived_message(row, room, request) for row in archived]
+        return Response({'results': results, 'next_before': results[-1]['id'] if len(results) == limit else None})
+
+    @action(detail=True, methods=['get'], url_path=r'archived/(?P<message_id>[0-9]+)/attachment', url_name='archived-attachment')
+    def archived_attachment(self, request, pk=None, message_id=None):
+        # Права — как у самой комнаты; чужой или несуществующий файл дает 404.
+        room = self.get_object()
+        item = archive.attachment(room, message_id)
+        if item is None or not _can_access_room(request.user, role_for_user(request.user), room):
+            raise Http404
+        return serve_stored(request, Message._meta.get_field('attachment').storage, item.name, item.filename)
+
+
+HISTORY_PAGE_SIZE = 50
+HISTORY_MAX_PAGE_SIZE = 200
+
+
+def _archived_message(row, room, request):
+    # Те же поля, что у MessageSerializer; файл отдается через archived/<id>/attachment/ комнаты.
+    attachment_url = ''
+    if row['attachment']:
+        attachment_url = request.build_absolute_uri(reverse('chatroom-archived-attachment', args=[room.pk, row['id']]))
+    return {
+        'id': row['id'],
+        'group': row['group_id'],
+        'room': row['room_id'],
+        'room_type': room.room_type,
+        # В пачках, заархивированных до появления поля sender, его нет.
+        'sender': row.get('sender_id'),
+        'sender_type': row['sender_type'],
+        'sender_name': row['sender_name'],
+        'text': row['text'],
+        'attachment_name': row['attachment_name'],
+        'attachment_url': attachment_url,
+        'thumbnail_url': '',
+        'created_at': serializers.DateTimeField().to_representation(row['created_at']),
+        'archived': True,
+    }
+
+
+def _serve_preview(request, source, filename=''):
+    preview = previews.ready(source, filename) if source else None
+    if preview is None:
+        raise Http404('Превью для этого файла нет.')
+    return serve_stored(request, default_storage, preview.name, f'{Path(filename or source).stem}.jpg')
+
+
+class MessageViewSet(ConditionalListMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Message.objects.select_related('group', 'room')
     serializer_class = MessageSerializer
 
     def get_queryset(self):
-        role = _role_for_user(self.request.user)
-        group_ids = _accessible_group_ids(self.request.user, role)
-        allowed_room_types = _allowed_room_types_for_role(role)
+        role = role_for_user(self.request.user)
+        group_ids = accessible_group_ids(self.request.user, role)
+        allowed_room_types = allowed_room_types_for_role(role)
         if not group_ids or not allowed_room_types:
             return Message.objects.none()
         qs = (
@@ -471,10 +644,43 @@ class MessageViewSet(viewsets.ReadOnlyModelViewSet):
             qs = qs.filter(room_id=room_id)
         return qs
 
+    @action(detail=True, methods=['get'])
+    def attachment(self, request, pk=None):
+        message = self.get_object()
+        if not _can_access_room(request.user, role_for_user(request.user), message.room):
+            raise PermissionDenied('Нет доступа к этому чату.')
+        return serve_attachment(request, message.attachment, message.attachment_name)
+
+    @action(detail=True, methods=['get'])
+    def thumbnail(self, request, pk=None):
+        message = self.get_object()
+        if not _can_access_room(request.user, role_for_user(request.user), message.room) or not message.attachment:
+            raise Http404
+        return _serve_preview(request, message.attachment.name, message.attachment_name)
+
+
+class MediaThumbnailMixin:
+    @action(detail=True, methods=['get'])
+    def thumbnail(self, request, pk=None):
+        item = self.get_object()
+        if item.media_type != 'image':
+            raise Http404
+        return _serve_preview(request, previews.media_name(item.media_url))
+
+    @action(detail=True, methods=['get'])
+    def media(self, request, pk=None):
+        # Загруженный через /api/media/upload/ файл: публичного /media/ нет, отдаем с проверкой прав.
+        item = self.get_object()
+        name = previews.media_name(item.media_url)
+        if item.media_type == 'none' or not name:
+            raise Http404
+        return serve_stored(request, default_storage, name)
+
 
-class EventViewSet(viewsets.ModelViewSet):
+class EventViewSet(MediaThumbnailMixin, ConditionalListMixin, viewsets.ModelViewSet):
     queryset = Event.objects.select_related('group')
     serializer_class = EventSerializer
+    etag_related_models = (Group,)
 
     def get_queryset(self):
         qs = super().get_queryset()
@@ -484,9 +690,10 @@ class EventViewSet(viewsets.ModelViewSet):
         return qs
 
 
-class FeedPostViewSet(viewsets.ModelViewSet):
+class FeedPostViewSet(MediaThumbnailMixin, ConditionalListMixin, viewsets.ModelViewSet):
     queryset = FeedPost.objects.select_related('group')
     serializer_class = FeedPostSerializer
+    etag_related_models = (Group,)
 
     def get_queryset(self):
         qs = super().get_queryset()
@@ -496,9 +703,10 @@ class FeedPostViewSet(viewsets.ModelViewSet):
         return qs
 
 
-class MethodAssignmentViewSet(viewsets.ModelViewSet):
-    queryset = MethodAssignment.objects.select_related('method_package', 'teacher', 'teacher__user', 'granted_by')
+class MethodAssignmentViewSet(ConditionalListMixin, viewsets.ModelViewSet):
+    queryset = MethodAssignment.objects.select_related('method_package__subject', 'teacher__user', 'granted_by')
     serializer_class = MethodAssignmentSerializer
+    etag_related_models = (MethodPackage, Subject, Teacher)
 
     def _role(self):
         profile = getattr(self.request.user, 'profile', None)
@@ -520,42 +728,9 @@ class MethodAssignmentViewSet(viewsets.ModelViewSet):
     def _subject_id_for_assignment(self, assignment: MethodAssignment):
         return getattr(assignment.method_package, 'subject_id', None)
 
-    def _ordered_subject_assignments(self, teacher: Teacher, subject_id: int):
-        if not subject_id:
-            return MethodAssignment.objects.none()
-        return (
-            MethodAssignment.objects
-            .filter(teacher=teacher, method_package__subject_id=subject_id)
-            .select_related('method_package')
-            .order_by('method_package__method_number', 'id')
-        )
-
     def _enforce_sequential_access(self, teacher: Teacher, subject_id: int):
-        """
-        Для предмета у преподавателя в разработке может быть доступен только один следующий метод:
-        - done/review => can_edit=False
-        - первый из todo/in_progress => can_edit=True
-        - остальные todo/in_progress => can_edit=False
-        """
-        qs = list(self._ordered_subject_assignments(teacher, subject_id))
-        next_open_given = False
-        for item in qs:
-            if item.status == 'done':
-                desired = False
-            elif item.status == 'review':
-                desired = False
-                next_open_given = True
-            elif item.status in ('todo', 'in_progress'):
-                if not next_open_given:
-                    desired = True
-                    next_open_given = True
-                else:
-                    desired = False
-            else:
-                desired = item.can_edit
-            if item.can_edit != desired:
-                item.can_edit = desired
-                item.save(update_fields=['can_edit'])
+        """Пересчет can_edit по предмету — фоновой задачей (messenger.tasks.enforce_sequential_access)."""
+        return enqueue('enforce_sequential_access', {'teacher': teacher.id, 'subject': subject_id}, user=self.request.user)
 
     def get_queryset(self):
         qs = super().get_queryset()
@@ -636,22 +811,6 @@ class MethodAssignmentViewSet(viewsets.ModelViewSet):
 
         methods = list(MethodPackage.objects.filter(subject=subject).order_by('method_number', 'id'))
         by_number = {int(m.method_number): m for m in methods}
-        placeholder_methods_created = []
-        for n in range(1, 13):
-            if n in by_number:
-                continue
-            method_obj, created_flag = MethodPackage.objects.get_or_create(
-                subject=subject,
-                method_number=n,
-                defaults={
-                    'title': f'Урок {n}',
-                    'description': '',
-                    'content_blocks': [],
-                },
-            )
-            by_number[n] = method_obj
-            if created_flag:
-                placeholder_methods_created.append(n)
         missing_numbers = [n for n in range(1, 13) if n not in by_number]
 
         existing_assignments = {
@@ -683,7 +842,23 @@ class MethodAssignmentViewSet(viewsets.ModelViewSet):
             if notes_value:
                 self._add_comment(assignment, notes_value)
 
-        self._enforce_sequential_access(teacher, subject.id)
+        if missing_numbers:
+            # Заготовки недостающих методов и назначения на них создаются в фоне, там же — порядок доступа.
+            role = self._role()
+            task = enqueue('create_placeholder_methods', {
+                'teacher': teacher.id,
+                'subject': subject.id,
+                'numbers': missing_numbers,
+                'assign_from': start_method_number,
+                'granted_by': request.user.id,
+                'status': status_value,
+                'deadline': deadline_value,
+                'notes': notes_value,
+                'sender_role': 'admin' if (request.user.is_staff and role in ('', 'admin')) else (role or 'user'),
+                'sender_name': self._display_name(),
+            }, user=request.user)
+        else:
+            task = self._enforce_sequential_access(teacher, subject.id)
 
         return Response({
             'teacher': teacher.id,
@@ -694,8 +869,8 @@ class MethodAssignmentViewSet(viewsets.ModelViewSet):
             'created_count': len(created),
             'existing_methods_skipped': skipped_existing,
             'missing_method_numbers': missing_numbers,
-            'placeholder_methods_created': placeholder_methods_created,
             'created': MethodAssignmentSerializer(created, many=True).data,
+            'task': task.id,
         })
 
     def _can_access_assignment(self, instance):
@@ -742,7 +917,7 @@ class MethodAssignmentViewSet(viewsets.ModelViewSet):
             raise PermissionDenied('Этот метод пока недоступен для сдачи. Сначала завершите предыдущий.')
         assignment.status = 'review'
         assignment.can_edit = False
-        assignment.save(update_fields=['status', 'can_edit'])
+        assignment.save(update_fields=['status', 'can_edit', 'updated_at'])
         self._add_comment(assignment, request.data.get('comment') or request.data.get('text') or 'Отправлено на проверку.')
         subject_id = self._subject_id_for_assignment(assignment)
         if subject_id:
@@ -757,7 +932,7 @@ class MethodAssignmentViewSet(viewsets.ModelViewSet):
         assignment = self.get_object()
         assignment.status = 'done'
         assignment.can_edit = False
-        assignment.save(update_fields=['status', 'can_edit'])
+        assignment.save(update_fields=['status', 'can_edit', 'updated_at'])
         self._add_comment(assignment, request.data.get('comment') or request.data.get('text') or 'Методпакет подтвержден и опубликован.')
         subject_id = self._subject_id_for_assignment(assignment)
         if subject_id:
@@ -776,7 +951,7 @@ class MethodAssignmentViewSet(viewsets.ModelViewSet):
         assignment.status = 'in_progress'
         assignment.can_edit = True
         assignment.notes = comment_text
-        assignment.save(update_fields=['status', 'can_edit', 'notes'])
+        assignment.save(update_fields=['status', 'can_edit', 'notes', 'updated_at'])
         self._add_comment(
             assignment,
             f'Отправлено на доработку.\nКомментарий методиста: {comment_text}'
@@ -787,7 +962,7 @@ class MethodAssignmentViewSet(viewsets.ModelViewSet):
         return Response(MethodAssignmentSerializer(assignment).data)
 
 
-class UserProfileViewSet(viewsets.ModelViewSet):
+class UserProfileViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     queryset = UserProfile.objects.select_related('user')
     serializer_class = UserProfileSerializer
 
@@ -858,6 +1033,201 @@ class MeView(APIView):
         return Response(serializer.data)
 
 
+def _sync_querysets(user, role, group_ids=None):
+    if group_ids is None:
+        groups = Group.objects.all()
+        students = Student.objects.all()
+        parents = Parent.objects.all()
+        teachers = Teacher.objects.all()
+        schedule = ScheduleSlot.objects.all()
+        events = Event.objects.all()
+        feed_posts = FeedPost.objects.all()
+    else:
+        groups = Group.objects.filter(id__in=group_ids)
+        students = Student.objects.filter(group_id__in=group_ids)
+        parents = Parent.objects.filter(children__group_id__in=group_ids).distinct()
+        teachers = Teacher.objects.filter(groups__id__in=group_ids).distinct()
+        schedule = ScheduleSlot.objects.filter(group_id__in=group_ids)
+        events = Event.objects.filter(group_id__in=group_ids)
+        feed_posts = FeedPost.objects.filter(group_id__in=group_ids)
+
+    assignments = MethodAssignment.objects.none()
+    if user.is_staff or role in ('admin', 'methodist'):
+        assignments = MethodAssignment.objects.all()
+    elif role == 'teacher':
+        assignments = MethodAssignment.objects.filter(teacher__user=user)
+
+    return {
+        'groups': groups.prefetch_related('teachers__user', 'teachers__groups', 'students__user', 'students__group', 'students__parents__user'),
+        'students': students.select_related('group', 'user').prefetch_related('parents__user'),
+        'parents': parents.select_related('user'),
+        'teachers': teachers.select_related('user').prefetch_related('groups'),
+        'schedule': schedule.select_related('lesson_topic__subject', 'lesson_topic__method_package', 'method_package__subject'),
+        'events': events.select_related('group'),
+        'feed-posts': feed_posts.select_related('group'),
+        'method-assignments': assignments.select_related('method_package__subject', 'teacher__user', 'granted_by'),
+    }
+
+
+def _sync_scope(user, role):
+    """
+    (группы пользователя, ключи области для журнала удалений messenger.sync.scopes_of);
+    (None, None) — пользователь видит все.
+    """
+    if role in ('admin', 'methodist', 'manager') or user.is_staff:
+        return None, None
+    group_ids = accessible_group_ids(user, role)
+    # Роль — только в отпечатке токена: от нее зависит набор назначений методпакетов.
+    return group_ids, {f'group:{group_id}' for group_id in group_ids} | {f'user:{user.pk}', f'role:{role}'}
+
+
+class SyncView(APIView):
+    """
+    Дельта-синхронизация: GET /api/sync/?since=<token>.
+    Без since отдает полный снимок; дальше — только измененные записи и id удаленных.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            token = decode_token(request.query_params.get('since', '').strip())
+        except (ValueError, OverflowError, OSError):
+            raise ValidationError({'since': 'Некорректный токен синхронизации.'})
+        role = role_for_user(request.user)
+        group_ids, scopes = _sync_scope(request.user, role)
+        querysets = _sync_querysets(request.user, role, group_ids)
+        requested = {name.strip() for name in request.query_params.get('collections', '').split(',') if name.strip()}
+        if requested:
+            querysets = {name: qs for name, qs in querysets.items() if name in requested}
+        return Response(build_delta(querysets, token, context={'request': request}, scopes=scopes))
+
+
+class MetricsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return HttpResponse(render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+class ProfileListView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(list_profiles())
+
+
+class ProfileDownloadView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, name):
+        path = profile_path(name)
+        if path is None:
+            raise Http404
+        return FileResponse(open(path, 'rb'), as_attachment=True, filename=name)
+
+
+class SlowQueryListView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(slow_query_buffer.entries())
+
+    def delete(self, request):
+        slow_query_buffer.clear()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class TaskStatusView(APIView):
+    """Статус фоновой задачи: видна тому, кто ее поставил, и персоналу."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        task = Task.objects.filter(pk=pk).first()
+        if task is None or not (request.user.is_staff or task.created_by_id == request.user.id):
+            raise Http404
+        return Response(TaskSerializer(task).data)
+
+
+SEARCH_KINDS = ('message', 'comment', 'method')
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 50
+
+
+def _search_scope(user, role, kinds):
+    """Условия доступа для search.search: те же правила, что у чатов, назначений и методпакетов."""
+    scope = []
+    full_access = user.is_staff or role in ('admin', 'methodist', 'manager')
+    room_types = sorted(allowed_room_types_for_role(role))
+    if 'message' in kinds and room_types:
+        marks = ', '.join(['%s'] * len(room_types))
+        if full_access:
+            scope.append((f"e.kind = 'message' AND e.room_type IN ({marks})", room_types))
+        else:
+            group_ids = sorted(accessible_group_ids(user, role))
+            if group_ids:
+                group_marks = ', '.join(['%s'] * len(group_ids))
+                scope.append((
+                    f"e.kind = 'message' AND e.room_type IN ({marks}) AND e.group_id IN ({group_marks})",
+                    room_types + group_ids,
+                ))
+    if 'comment' in kinds:
+        if user.is_staff or role in ('admin', 'methodist'):
+            scope.append(("e.kind = 'comment'", []))
+        elif role == 'teacher':
+            scope.append(("e.kind = 'comment' AND e.teacher_user_id = %s", [user.id]))
+    if 'method' in kinds and (full_access or role == 'teacher'):
+        scope.append(("e.kind = 'method'", []))
+    return scope
+
+
+def _positive_int(request, name, default):
+    try:
+        value = int(request.query_params.get(name, default))
+    except (TypeError, ValueError):
+        raise ValidationError({name: 'Ожидается целое число.'})
+    if value < 1:
+        raise ValidationError({name: 'Ожидается положительное число.'})
+    return value
+
+
+class SearchView(APIView):
+    """
+    Полнотекстовый поиск: GET /api/search/?q=&kind=&page=&page_size=.
+    Ищет по сообщениям, комментариям к назначениям и методпакетам, к которым у пользователя есть доступ.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not search.query_terms(query):
+            raise ValidationError({'q': 'Введите слова для поиска.'})
+        kinds = {kind.strip() for kind in request.query_params.get('kind', '').split(',') if kind.strip()} or set(SEARCH_KINDS)
+        if not kinds <= set(SEARCH_KINDS):
+            raise ValidationError({'kind': f'Допустимые значения: {", ".join(SEARCH_KINDS)}.'})
+        page = _positive_int(request, 'page', 1)
+        page_size = min(_positive_int(request, 'page_size', SEARCH_PAGE_SIZE), SEARCH_MAX_PAGE_SIZE)
+
+        scope = _search_scope(request.user, role_for_user(request.user), kinds)
+        count, found = search.search(query, scope, page=page, page_size=page_size)
+        # Сообщения, ушедшие в архив (archive_messages), остаются в индексе и открываются через history/.
+        message_ids = [entry.object_id for entry, _ in found if entry.kind == 'message']
+        live = set(Message.objects.filter(pk__in=message_ids).values_list('pk', flat=True)) if message_ids else set()
+        results = [
+            {
+                'kind': entry.kind,
+                'id': entry.object_id,
+                'room': entry.room_id,
+                'group': entry.group_id,
+                'title': entry.title,
+                'snippet': snippet,
+                'created_at': entry.created_at,
+                'archived': entry.kind == 'message' and entry.object_id not in live,
+            }
+            for entry, snippet in found
+        ]
+        return Response({'count': count, 'page': page, 'page_size': page_size, 'results': results})
+
+
 class MediaUploadView(APIView):
     permission_classes = [IsAuthenticated]
     parser_classes = [MultiPartParser, FormParser]
@@ -867,7 +1237,224 @@ class MediaUploadView(APIView):
         if not file_obj:
             return Response({'detail': 'Файл не передан'}, status=status.HTTP_400_BAD_REQUEST)
         path = default_storage.save(f'uploads/{file_obj.name}', file_obj)
-        return Response({'url': default_storage.url(path), 'path': path})
+        # При дедупликации путь — хеш содержимого, исходное имя отдаем отдельно.
+        return Response({'url': default_storage.url(path), 'path': path, 'name': file_obj.name})
+
+
+def _get_upload(request, pk):
+    session = UploadSession.objects.filter(pk=pk, user=request.user).first()
+    if session is None:
+        raise Http404
+    return session
+
+
+def _upload_state(session):
+    complete = session.status == 'complete'
+    if complete:
+        received, missing = session.size, []
+    elif session.object_key:
+        received, missing = direct_received(session), []
+    else:
+        received, missing = received_bytes(session), missing_chunks(session)
+    return {
+        'id': str(session.id),
+        'filename': session.filename,
+        'size': session.size,
+        'chunk_size': session.chunk_size,
+        'chunk_count': session.chunk_count,
+        'direct': bool(session.object_key),
+        'status': session.status,
+        'received': received,
+        'missing_chunks': missing,
+        'result': session.result,
+    }
+
+
+def _new_upload_session(request, direct=False):
+    """Проверяет имя, размер и лимиты незавершенных загрузок пользователя и сохраняет сессию."""
+    filename = Path(str(request.data.get('filename') or '')).name.strip()[:255]
+    if not filename:
+        raise ValidationError({'filename': 'Нужно передать имя файла.'})
+    try:
+        size = int(request.data.get('size'))
+    except (TypeError, ValueError):
+        raise ValidationError({'size': 'Размер файла должен быть числом.'})
+    if not 0 < size <= settings.UPLOAD_MAX_BYTES:
+        raise ValidationError({'size': f'Размер файла должен быть от 1 до {settings.UPLOAD_MAX_BYTES} байт.'})
+    cleanup_sessions(user=request.user)
+    session = UploadSession(
+        user=request.user,
+        filename=filename,
+        content_type=str(request.data.get('content_type') or '')[:120],
+        size=size,
+        chunk_size=size if direct else settings.UPLOAD_CHUNK_SIZE,
+    )
+    if direct:
+        session.object_key = direct_key(session)
+    with transaction.atomic():
+        # Блокировка строки пользователя: иначе параллельные POST пройдут проверку лимита раньше любой вставки.
+        get_user_model().objects.select_for_update().filter(pk=request.user.pk).values_list('pk', flat=True).first()
+        pending = open_sessions(request.user).aggregate(count=Count('id'), total=Sum('size'))
+        if pending['count'] >= settings.UPLOAD_MAX_SESSIONS:
+            raise Throttled(detail='Слишком много незавершенных загрузок: завершите или отмените одну из них.')
+        if (pending['total'] or 0) + size > settings.UPLOAD_MAX_PENDING_BYTES:
+            raise Throttled(detail=f'Незавершенные загрузки заняли бы больше {settings.UPLOAD_MAX_PENDING_BYTES} байт: завершите или отмените одну из них.')
+        session.save()
+    return session
+
+
+class UploadSessionCreateView(APIView):
+    """
+    Докачиваемая загрузка: POST {filename, size} создает сессию, PUT .../chunks/<n>/ присылает
+    части по chunk_size байт (повтор части безопасен), POST .../complete/ собирает файл.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        session = _new_upload_session(request)
+        return Response(_upload_state(session), status=status.HTTP_201_CREATED)
+
+
+class UploadDirectView(APIView):
+    """
+    Прямая загрузка в объектное хранилище: POST {filename, size, content_type} возвращает
+    presigned PUT, клиент кладет файл в бакет сам, затем вызывает .../complete/ как обычно.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        if not hasattr(default_storage, 'presigned_put'):
+            raise ValidationError({'detail': 'Хранилище не поддерживает прямую загрузку, используйте /api/uploads/.'})
+        session = _new_upload_session(request, direct=True)
+        state = _upload_state(session)
+        state['upload'] = default_storage.presigned_put(session.object_key, session.content_type, session.size)
+        return Response(state, status=status.HTTP_201_CREATED)
+
+
+class UploadSessionView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        return Response(_upload_state(_get_upload(request, pk)))
+
+    def delete(self, request, pk):
+        session = _get_upload(request, pk)
+        discard_upload(session)
+        session.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class UploadChunkView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def put(self, request, pk, index):
+        session = _get_upload(request, pk)
+        if session.status != 'open':
+            raise ValidationError({'detail': 'Загрузка уже завершена.'})
+        if session.object_key:
+            raise ValidationError({'detail': 'Файл этой загрузки кладется в хранилище напрямую.'})
+        # Тело читается потоком прямо из запроса, request.data не трогаем.
+        try:
+            written = write_chunk(session, index, request.stream or io.BytesIO(), request.headers.get('Content-Range', ''))
+        except UploadError as exc:
+            raise ValidationError({'detail': str(exc)})
+        return Response({'index': index, 'received': written, 'missing_chunks': missing_chunks(session)})
+
+
+def _placer(filename, content=None, key=''):
+    """
+    place(field) для UploadCompleteView: кладет файл в FileField, а при field=None (media)
+    сохраняет его как uploads/<имя>. Возвращает имя в хранилище. С key файл уже лежит
+    в хранилище (прямая загрузка), и запись только ссылается на него.
+    """
+    def place(field):
+        if key:
+            if field is not None:
+                field.name = key
+            return key
+        if field is not None:
+            field.save(filename, content, save=False)
+            return field.name
+        return default_storage.save(f'uploads/{filename}', content)
+    return place
+
+
+class UploadCompleteView(APIView):
+    """Собирает файл и прикрепляет его: attach_to=message (room, text), method_package (method_package) или media."""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, pk):
+        session = _get_upload(request, pk)
+        if session.status == 'complete':
+            return Response(session.result)
+        attach = self._target(request, session.filename)
+        # Сборку выполняет только один из параллельных complete.
+        if not UploadSession.objects.filter(pk=session.pk, status='open').update(status='complete'):
+            return Response({'detail': 'Файл уже собирается.'}, status=status.HTTP_409_CONFLICT)
+        try:
+            if session.object_key:
+                result = attach(_placer(session.filename, key=finalize_direct(session)))
+            else:
+                with assembled_file(session) as content:
+                    result = attach(_placer(session.filename, content=content))
+        except UploadError as exc:
+            UploadSession.objects.filter(pk=session.pk).update(status='open')
+            raise ValidationError({'detail': str(exc)})
+        except BaseException:
+            UploadSession.objects.filter(pk=session.pk).update(status='open')
+            raise
+        session.status = 'complete'
+        session.result = result
+        session.save(update_fields=['status', 'result', 'updated_at'])
+        discard_upload(session)
+        if session.object_key:
+            # Прикреплена копия (finalize_direct), а исходный ключ клиент еще может перезаписать.
+            default_storage.delete(session.object_key)
+        return Response(result, status=status.HTTP_201_CREATED)
+
+    def _target(self, request, filename):
+        """Права и параметры проверяются до сборки; возвращает attach(place), см. _placer."""
+        target = str(request.data.get('attach_to') or 'media')
+        if target == 'message':
+            room = ChatRoom.objects.filter(pk=request.data.get('room') or 0).first()
+            role = role_for_user(request.user)
+            if room is None:
+                raise ValidationError({'room': 'Чат не найден.'})
+            if not _can_access_room(request.user, role, room):
+                raise PermissionDenied('Нет доступа к этому чату.')
+            sender_type, sender_name = _sender_meta(request.user, role)
+
+            def attach(place):
+                message = Message(
+                    group_id=room.group_id,
+                    room=room,
+                    sender=request.user,
+                    sender_type=sender_type,
+                    sender_name=sender_name,
+                    text=str(request.data.get('text', '')).strip(),
+                    attachment_name=filename,
+                )
+                place(message.attachment)
+                message.save()
+                return MessageSerializer(message, context={'request': request}).data
+        elif target == 'method_package':
+            method = MethodPackage.objects.filter(pk=request.data.get('method_package') or 0).first()
+            if method is None:
+                raise ValidationError({'method_package': 'Методпакет не найден.'})
+            if not _can_edit_method_package(request.user, method):
+                raise PermissionDenied('Нет прав на изменение этого методпакета.')
+
+            def attach(place):
+                place(method.attachment)
+                method.save()
+                return MethodPackageSerializer(method, context={'request': request}).data
+        elif target == 'media':
+            def attach(place):
+                path = place(None)
+                return {'url': default_storage.url(path), 'path': path, 'name': filename}
+        else:
+            raise ValidationError({'attach_to': 'Допустимо: message, method_package, media.'})
+        return attach
 
 
 @ensure_csrf_cookie
@@ -953,6 +1540,27 @@ def manager_create_page(request, model):
     })
 
 
+SERVICE_WORKER_SOURCE = Path(__file__).resolve().parent / 'static' / 'messenger' / 'js' / 'sw.js'
+SERVICE_WORKER_SHELL = (
+    'messenger/css/role_portal.css',
+    'messenger/js/role_portal.js',
+    'messenger/css/student.css',
+    'messenger/js/student.js',
+)
+
+
+def service_worker(request):
+    # Отдается с корня сайта, чтобы область SW покрывала и страницы порталов, и /api/.
+    shell_urls = [static(name) for name in SERVICE_WORKER_SHELL]
+    source = SERVICE_WORKER_SOURCE.read_text(encoding='utf-8')
+    version = hashlib.sha1(('|'.join(shell_urls) + source).encode('utf-8')).hexdigest()[:12]
+    prelude = f"const SW_VERSION = {json.dumps(version)};\nconst SHELL_URLS = {json.dumps(shell_urls)};\n"
+    response = HttpResponse(prelude + source, content_type='application/javascript; charset=utf-8')
+    response['Cache-Control'] = 'no-cache'
+    response['Service-Worker-Allowed'] = '/'
+    return response
+
+
 @csrf_exempt
 @require_POST
 def session_login(request):
@@ -985,4 +1593,7 @@ def session_login(request):
 @require_POST
 def session_logout(request):
     logout(request)
-    return JsonResponse({'ok': True})
+    response = JsonResponse({'ok': True})
+    # Service worker сам чистит свои кэши API, а HTTP-кэш браузера сбрасываем заголовком.
+    response['Clear-Site-Data'] = '"cache"'
+    return response